@@ -223,6 +223,98 @@ export class FastApiClient {
     }
   }
 
+  /**
+   * Encode audio file to encrypted images (ZIP) as a background job.
+   * The upload returns immediately; the job is polled until done, so large
+   * files are not bound by the request timeout.
+   */
+  async encodeAudioToImageJob(
+    request: EncodeRequest,
+    onProgress?: (chunksDone: number, totalChunks: number | null) => void,
+    pollIntervalMs: number = 2000
+  ): Promise<EncodeResponse> {
+    try {
+      Logger.info('FASTAPI', `Submitting encode job: ${request.audioFilePath}`);
+
+      await fs.mkdir(this.tempDir, { recursive: true });
+
+      try {
+        await fs.access(request.audioFilePath);
+      } catch (error) {
+        return {
+          success: false,
+          error: `Audio file not found: ${request.audioFilePath}`,
+        };
+      }
+
+      const formData = new FormData();
+      formData.append('file', createReadStream(request.audioFilePath));
+      formData.append('user_id', request.userId);
+      formData.append('master_key', request.masterKey);
+
+      if (request.compress !== undefined) {
+        formData.append('compress', String(request.compress));
+      }
+
+      if (request.maxChunkBytes) {
+        formData.append('max_chunk_bytes', String(request.maxChunkBytes));
+      }
+
+      const submitted: AxiosResponse = await this.client.post('/api/v1/jobs/encode', formData, {
+        headers: {
+          ...formData.getHeaders(),
+        },
+      });
+      const jobId: string = submitted.data.job_id;
+      Logger.info('FASTAPI', `Encode job queued: ${jobId}`);
+
+      // Poll until the job finishes
+      let job = submitted.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+        job = (await this.client.get(`/api/v1/jobs/${jobId}`)).data;
+        onProgress?.(job.progress.chunks_done, job.progress.total_chunks);
+      }
+
+      if (job.status !== 'done') {
+        return {
+          success: false,
+          error: job.error || `Encode job ${jobId} ${job.status}`,
+        };
+      }
+
+      const response: AxiosResponse = await this.client.get(`/api/v1/jobs/${jobId}/result`, {
+        responseType: 'arraybuffer',
+      });
+
+      const zipFilePath = path.join(this.tempDir, `encoded_${Date.now()}.zip`);
+      await fs.writeFile(zipFilePath, response.data);
+
+      // The server keeps results until they expire; free them now
+      await this.client.delete(`/api/v1/jobs/${jobId}`).catch(() => undefined);
+
+      Logger.info('FASTAPI', `Encode job ${jobId} finished: ${zipFilePath}`);
+
+      return {
+        success: true,
+        message: 'Audio converted to image successfully',
+        zipFilePath: zipFilePath,
+      };
+    } catch (error: any) {
+      const data = error.response?.data;
+      const errorMessage = data
+        ? (Buffer.isBuffer(data) || data instanceof ArrayBuffer ? Buffer.from(data).toString('utf-8') : JSON.stringify(data))
+        : error.message;
+
+      Logger.error('FASTAPI', `Encode job error: ${errorMessage}`);
+
+      return {
+        success: false,
+        error: errorMessage || 'Unknown error during encoding',
+      };
+    }
+  }
+
   /**
    * Get API information
    */
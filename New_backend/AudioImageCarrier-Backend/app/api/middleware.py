@@ -0,0 +1,41 @@
+"""ASGI middleware shared by the API routes."""
+
+import json
+
+from app.core.config import settings
+
+# Multipart boundaries, part headers and the small form fields sent along with the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject multipart audio uploads whose Content-Length is already over
+    settings.max_upload_size_bytes with 413, before any of the body is read.
+
+    FastAPI parses (and spools) the whole form before a route or its
+    dependencies run, so a check inside the route only fires once the
+    oversize upload is already on disk.
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths:
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            limit = settings.max_upload_size_bytes + MULTIPART_OVERHEAD_BYTES
+            if length.isdigit() and int(length) > limit:
+                body = json.dumps({
+                    "detail": f"File too large: {int(length)} bytes (max: {settings.max_upload_size_bytes})"
+                }).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
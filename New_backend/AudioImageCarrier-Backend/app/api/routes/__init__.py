@@ -1,5 +1,5 @@
 """API routes package."""
 
-from app.api.routes import encode, decode
+from app.api.routes import encode, decode, bundle, ingest, verify
 
-__all__ = ["encode", "decode"]
+__all__ = ["encode", "decode", "bundle", "ingest", "verify"]
@@ -0,0 +1,226 @@
+"""Bundle endpoints - Pack many recordings into shared images and extract single members."""
+
+import uuid
+from pathlib import Path
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.api.dependencies import get_api_key
+from app.services.bundle_service import BundleService
+from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key
+from app.utils.file_handler import cleanup_directory, cleanup_file, save_upload
+from app.core.config import settings
+from app.core.worker_pool import JobTimeout, run_job
+
+router = APIRouter()
+
+
+def cleanup_resources(upload_path: Path = None, extract_dir: Path = None, temp_dir: Path = None):
+    """Background task to cleanup temporary files."""
+    if upload_path and upload_path.exists():
+        if upload_path.is_dir():
+            cleanup_directory(upload_path)
+        else:
+            cleanup_file(upload_path)
+    if extract_dir and extract_dir.exists():
+        cleanup_directory(extract_dir)
+    if temp_dir and temp_dir.exists():
+        cleanup_directory(temp_dir)
+
+
+def _validate_credentials(user_id: str, master_key: str = None) -> None:
+    """Validate user_id and optional master_key, raising HTTP 400 on failure."""
+    is_valid, error = validate_user_id(user_id)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid user_id: {error}")
+
+    if master_key:
+        is_valid, error = validate_master_key(master_key)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
+
+
+@router.post(
+    "/bundle",
+    summary="Pack many audio files into bundle images",
+    description="""
+    Upload several short recordings and receive a ZIP of bundle images. Each image
+    holds many recordings plus an encrypted table of contents, so small clips avoid
+    the per-file header, PNG container and ZIP entry overhead.
+
+    **Parameters:**
+    - **files**: Audio files (filenames must be unique)
+    - **user_id**: User identifier for encryption key derivation
+    - **master_key** (optional): 64-character hex master key (uses env var if not provided)
+    - **bundle_name** (optional): Name used for the bundle images (default: "bundle")
+    - **max_bundle_bytes** (optional): Maximum raw audio bytes per image (default: 50MB)
+    - **compress** (optional): Enable zstd compression (default: true)
+
+    **Returns:** ZIP file containing bundle images
+
+    **Example:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/bundle" \\
+      -H "X-API-Key: your-api-key" \\
+      -F "files=@clip1.m4a" -F "files=@clip2.m4a" \\
+      -F "user_id=alice" \\
+      -o bundle.zip
+    ```
+    """
+)
+async def bundle_audio(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(..., description="Audio files to bundle"),
+    user_id: str = Form(..., description="User ID for encryption"),
+    master_key: str = Form(None, description="Master key (64 hex chars)"),
+    bundle_name: str = Form("bundle", description="Bundle name"),
+    max_bundle_bytes: int = Form(None, description="Max raw bytes per bundle image"),
+    compress: bool = Form(True, description="Enable compression"),
+    api_key: str = Depends(get_api_key)
+):
+    """Pack several audio files into bundle images."""
+
+    upload_dir = None
+    result_data = None
+
+    try:
+        _validate_credentials(user_id, master_key)
+
+        # Save uploads under their (sanitized) names; names identify bundle members
+        upload_dir = Path(settings.upload_dir) / f"bundle_{uuid.uuid4().hex[:8]}"
+
+        saved_paths = []
+        for upload in files:
+            if not upload.filename:
+                raise HTTPException(status_code=400, detail="No filename provided")
+            dest = upload_dir / sanitize_filename(upload.filename)
+            if dest in saved_paths:
+                raise HTTPException(status_code=400, detail=f"Duplicate filename: {dest.name}")
+            saved_paths.append(await run_in_threadpool(save_upload, upload.file, dest))
+
+        result_data = await run_job(
+            BundleService.encode_files_to_bundle,
+            audio_file_paths=saved_paths,
+            user_id=user_id,
+            master_key=master_key,
+            bundle_name=sanitize_filename(bundle_name),
+            max_bundle_bytes=max_bundle_bytes,
+            compress=compress
+        )
+
+        background_tasks.add_task(cleanup_resources, upload_dir, None, result_data["temp_dir"])
+
+        return FileResponse(
+            path=result_data["zip_path"],
+            media_type="application/zip",
+            filename=result_data["zip_filename"],
+            headers={
+                "X-Total-Images": str(result_data["total_images"]),
+                "X-Total-Members": str(result_data["total_members"]),
+                "X-Original-Size": str(result_data["original_size_bytes"]),
+                "X-User-ID": user_id
+            }
+        )
+
+    except HTTPException:
+        if upload_dir:
+            cleanup_directory(upload_dir)
+        raise
+
+    except ValueError as e:
+        if upload_dir:
+            cleanup_directory(upload_dir)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        if upload_dir:
+            cleanup_directory(upload_dir)
+        if result_data and "temp_dir" in result_data:
+            cleanup_directory(result_data["temp_dir"])
+        if isinstance(e, JobTimeout):
+            raise HTTPException(status_code=504, detail=f"Bundling timed out: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bundling failed: {str(e)}")
+
+
+@router.post(
+    "/bundle/extract",
+    summary="Extract one recording from bundle images",
+    description="""
+    Upload a ZIP of bundle images and receive a single recording. Only the table of
+    contents and the requested member are decrypted.
+
+    **Parameters:**
+    - **images**: ZIP file containing bundle images (from the bundle endpoint)
+    - **member**: Filename of the recording to extract
+    - **user_id**: User identifier used during bundling (must match!)
+    - **master_key** (optional): 64-character hex master key (uses env var if not provided)
+
+    **Returns:** Recovered audio file
+    """
+)
+async def extract_bundle_member(
+    background_tasks: BackgroundTasks,
+    images: UploadFile = File(..., description="ZIP file containing bundle images"),
+    member: str = Form(..., description="Member filename to extract"),
+    user_id: str = Form(..., description="User ID used for encoding"),
+    master_key: str = Form(None, description="Master key (64 hex chars)"),
+    api_key: str = Depends(get_api_key)
+):
+    """Extract a single recording from bundle images."""
+
+    temp_zip_path = None
+    result_data = None
+
+    try:
+        if not images.filename or not images.filename.endswith('.zip'):
+            raise HTTPException(status_code=400, detail="File must be a ZIP archive")
+
+        _validate_credentials(user_id, master_key)
+
+        safe_filename = sanitize_filename(images.filename)
+        temp_zip_path = Path(settings.upload_dir) / f"upload_{uuid.uuid4().hex[:8]}_{safe_filename}"
+        await run_in_threadpool(save_upload, images.file, temp_zip_path)
+
+        result_data = await run_job(
+            BundleService.extract_member_from_bundle,
+            images_zip_path=temp_zip_path,
+            member_name=sanitize_filename(member),
+            user_id=user_id,
+            master_key=master_key
+        )
+
+        background_tasks.add_task(cleanup_resources, temp_zip_path, None, result_data.get("temp_dir"))
+
+        return FileResponse(
+            path=result_data["output_path"],
+            media_type="application/octet-stream",
+            filename=result_data["member_name"],
+            headers={
+                "X-File-Size": str(result_data["recovered_size_bytes"]),
+                "X-User-ID": user_id
+            }
+        )
+
+    except HTTPException:
+        if temp_zip_path:
+            cleanup_file(temp_zip_path)
+        raise
+
+    except ValueError as e:
+        if temp_zip_path:
+            cleanup_file(temp_zip_path)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except KeyError as e:
+        if temp_zip_path:
+            cleanup_file(temp_zip_path)
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    except Exception as e:
+        if temp_zip_path:
+            cleanup_file(temp_zip_path)
+        if isinstance(e, JobTimeout):
+            raise HTTPException(status_code=504, detail=f"Bundle extraction timed out: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bundle extraction failed: {str(e)}")
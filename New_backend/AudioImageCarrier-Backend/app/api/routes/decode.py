@@ -1,30 +1,87 @@
 """Decode endpoint - Convert encrypted images back to audio."""
 
+import re
 import tempfile
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
-import shutil
+from typing import Iterator, List, Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 from app.api.dependencies import get_api_key
-from app.services.decode_service import DecodeService
+from app.services.decode_service import DecodeService, IMAGE_EXTENSIONS
 from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key
-from app.utils.file_handler import cleanup_directory, cleanup_file
+from app.utils.file_handler import cleanup_directory, cleanup_file, attachment_header, save_upload
+from app.utils.parts_feed import PartsFeed
 from app.core.config import settings
+from app.core.worker_pool import JobTimeout, run_job, stream_job
 
 router = APIRouter()
 
 
-def cleanup_resources(temp_zip_path: Path = None, extract_dir: Path = None, temp_dir: Path = None):
+def cleanup_resources(temp_zip_path: Path = None, temp_dir: Path = None):
     """Background task to cleanup temporary files."""
     if temp_zip_path and temp_zip_path.exists():
         cleanup_file(temp_zip_path)
-    if extract_dir and extract_dir.exists():
-        cleanup_directory(extract_dir)
     if temp_dir and temp_dir.exists():
         cleanup_directory(temp_dir)
 
 
+def parse_byte_range(value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a Range header against a body of size bytes.
+    
+    Args:
+        value: Range header value (e.g. "bytes=0-1023", "bytes=500-", "bytes=-500")
+        size: Full body length
+        
+    Returns:
+        (start, end) with end exclusive, or None to send the whole body
+        (no header, another unit, several ranges or bad syntax)
+        
+    Raises:
+        ValueError: If the range cannot be satisfied (answer 416)
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (value or "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - suffix, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _audio_body(first: bytes, pieces: Iterator, zip_path: Path = None) -> Iterator[bytes]:
+    """Response body: recovered audio as each chunk is decoded; removes the uploaded ZIP when done."""
+    try:
+        if first:
+            yield first
+        yield from pieces
+    finally:
+        _stop_decoding(pieces, zip_path)
+
+
+def _stop_decoding(pieces: Iterator, zip_path: Path = None) -> None:
+    """
+    Stop the decoder and remove the uploaded ZIP. Also run as the response's
+    background task: when the client disconnects, Starlette stops iterating
+    the body without closing it.
+    """
+    pieces.close()
+    if zip_path is not None:
+        cleanup_file(zip_path)
+
+
 @router.post(
     "/decode",
     summary="Decode encrypted images to audio file",
@@ -38,7 +95,10 @@ def cleanup_resources(temp_zip_path: Path = None, extract_dir: Path = None, temp
     - **user_id**: User identifier used during encoding (must match!)
     - **master_key** (optional): 64-character hex master key (uses env var if not provided)
     
-    **Returns:** Recovered audio file
+    **Returns:** Recovered audio file, streamed as each chunk is decrypted and
+    authenticated. A `Range: bytes=...` header gets a 206 partial response for
+    which only the chunks covering the range are decrypted, so players can
+    start and seek without the whole recording being decoded.
     
     **Example:**
     ```bash
@@ -51,6 +111,7 @@ def cleanup_resources(temp_zip_path: Path = None, extract_dir: Path = None, temp
     """
 )
 async def decode_images(
+    request: Request,
     background_tasks: BackgroundTasks,
     images: UploadFile = File(..., description="ZIP file containing encrypted images"),
     user_id: str = Form(..., description="User ID used for encoding"),
@@ -81,65 +142,194 @@ async def decode_images(
             if not is_valid:
                 raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
         
+        # Small and medium ZIPs of plain image sets are decoded in memory (whole files only)
+        zip_bytes = None
+        if images.size is not None and images.size <= settings.inmemory_max_bytes \
+                and "range" not in request.headers:
+            zip_bytes = await images.read()
+            memory_result = await run_job(
+                DecodeService.decode_images_zip_bytes,
+                zip_bytes=zip_bytes,
+                user_id=user_id,
+                master_key=master_key
+            )
+            if memory_result is not None:
+                return Response(
+                    content=memory_result["audio_bytes"],
+                    media_type="audio/wav",
+                    headers={
+                        "Content-Disposition": attachment_header(memory_result["original_filename"]),
+                        "Accept-Ranges": "bytes",
+                        "X-Total-Chunks": str(memory_result["total_chunks_decoded"]),
+                        "X-File-Size": str(memory_result["recovered_size_bytes"]),
+                        "X-Compressed": str(memory_result["compressed"]),
+                        "X-User-ID": user_id
+                    }
+                )
+        
         # Save uploaded ZIP temporarily
         safe_filename = sanitize_filename(images.filename)
         import uuid
         temp_name = f"upload_{uuid.uuid4().hex[:8]}_{safe_filename}"
         temp_zip_path = Path(settings.upload_dir) / temp_name
-        temp_zip_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with temp_zip_path.open("wb") as buffer:
-            shutil.copyfileobj(images.file, buffer)
+        if zip_bytes is not None:
+            images.file.seek(0)
+        await run_in_threadpool(save_upload, images.file, temp_zip_path)
         
-        # Decode images to audio
-        result_data = DecodeService.decode_images_to_audio(
+        # Lay out the recording (chunk headers only), then decrypt just the chunks the response covers
+        result_data = await run_job(
+            DecodeService.plan_decode,
             images_zip_path=temp_zip_path,
             user_id=user_id,
             master_key=master_key
         )
+        size = result_data["recovered_size_bytes"]
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            cleanup_file(temp_zip_path)
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"})
+        start, end = byte_range or (0, size)
         
-        # Get output audio path
-        output_path = result_data["output_path"]
-        
-        # Schedule cleanup after response is sent
-        background_tasks.add_task(
-            cleanup_resources,
-            temp_zip_path,
-            result_data.get("extract_dir"),
-            result_data.get("temp_dir")
+        pieces = stream_job(
+            DecodeService.iter_decode_range,
+            images_zip_path=temp_zip_path,
+            plan=result_data["plan"],
+            user_id=user_id,
+            master_key=master_key,
+            start=start,
+            end=end
         )
+        first = await run_in_threadpool(next, pieces, b"")
+        zip_path, temp_zip_path = temp_zip_path, None  # cleaned up by the response body
         
-        # Return audio file
-        return FileResponse(
-            path=output_path,
+        headers = {
+            "Content-Disposition": attachment_header(result_data["original_filename"]),
+            "Content-Length": str(end - start),
+            "Accept-Ranges": "bytes",
+            "X-Total-Chunks": str(result_data["total_chunks_decoded"]),
+            "X-File-Size": str(size),
+            "X-Compressed": str(result_data["compressed"]),
+            "X-User-ID": user_id
+        }
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        return StreamingResponse(
+            _audio_body(first, pieces, zip_path),
+            status_code=206 if byte_range else 200,
             media_type="audio/wav",
-            filename=result_data["original_filename"],
-            headers={
-                "X-Total-Chunks": str(result_data["total_chunks_decoded"]),
-                "X-File-Size": str(result_data["recovered_size_bytes"]),
-                "X-Compressed": str(result_data["compressed"]),
-                "X-User-ID": user_id
-            }
+            headers=headers,
+            background=BackgroundTask(_stop_decoding, pieces, zip_path)
         )
         
     except ValueError as e:
         # Cleanup on error
         if temp_zip_path:
             cleanup_file(temp_zip_path)
-        if result_data:
-            if "extract_dir" in result_data:
-                cleanup_directory(result_data["extract_dir"])
-            if "temp_dir" in result_data:
-                cleanup_directory(result_data["temp_dir"])
+        if result_data and "temp_dir" in result_data:
+            cleanup_directory(result_data["temp_dir"])
         raise HTTPException(status_code=400, detail=str(e))
     
     except Exception as e:
         # Cleanup on error
         if temp_zip_path:
             cleanup_file(temp_zip_path)
-        if result_data:
-            if "extract_dir" in result_data:
-                cleanup_directory(result_data["extract_dir"])
-            if "temp_dir" in result_data:
-                cleanup_directory(result_data["temp_dir"])
+        if result_data and "temp_dir" in result_data:
+            cleanup_directory(result_data["temp_dir"])
+        if isinstance(e, JobTimeout):
+            raise HTTPException(status_code=504, detail=f"Decoding timed out: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Decoding failed: {str(e)}")
+
+
+@router.post(
+    "/decode/parts",
+    summary="Decode individually uploaded images to audio file",
+    description="""
+    Upload the encrypted PNG images of one recording as separate multipart
+    parts (no ZIP) and receive the recovered audio file. The images are
+    decoded straight from their uploads; nothing is extracted to disk.
+    
+    **Parameters:**
+    - **parts**: The images (repeat the field once per image; a sealed stream's manifest may be included)
+    - **user_id**: User identifier used during encoding (must match!)
+    - **master_key** (optional): 64-character hex master key (uses env var if not provided)
+    
+    **Returns:** Recovered audio file, streamed as each chunk is decrypted and
+    authenticated (send the images in chunk order to keep memory use flat).
+    A wrong key, a tampered image or a missing chunk is answered with 400.
+    
+    **Example:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/decode/parts" \\
+      -H "X-API-Key: your-api-key" \\
+      -F "parts=@take_part0001_of_0002.png" \\
+      -F "parts=@take_part0002_of_0002.png" \\
+      -F "user_id=alice" \\
+      -o recovered_audio.wav
+    ```
+    """
+)
+async def decode_image_parts(
+    parts: List[UploadFile] = File(..., description="Encrypted images of one recording"),
+    user_id: str = Form(..., description="User ID used for encoding"),
+    master_key: str = Form(None, description="Master key (64 hex chars)"),
+    api_key: str = Depends(get_api_key)
+):
+    """Decode individually uploaded images to audio file."""
+    
+    # Validate user_id
+    is_valid, error = validate_user_id(user_id)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid user_id: {error}")
+    
+    # Validate master_key if provided
+    if master_key:
+        is_valid, error = validate_master_key(master_key)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
+    
+    total_size = sum(part.size or 0 for part in parts)
+    if total_size > settings.max_upload_size_bytes * 2:
+        raise HTTPException(status_code=413, detail=f"Images too large: {total_size} bytes")
+    
+    members = [(sanitize_filename(part.filename or ""), part.file) for part in parts]
+    total_images = sum(Path(name).suffix.lower() in IMAGE_EXTENSIONS for name, _ in members)
+    
+    # The worker reads the parts from the form's spool files as it decodes (its feed),
+    # and the audio streams back as each chunk is authenticated
+    pieces = stream_job(
+        DecodeService.iter_decode_image_parts,
+        feed=PartsFeed(members),
+        total_images=total_images,
+        user_id=user_id,
+        master_key=master_key
+    )
+    try:
+        try:
+            info = await run_in_threadpool(next, pieces, None)
+            first = await run_in_threadpool(next, pieces, b"")
+        except BaseException:
+            pieces.close()
+            raise
+        if info is None:
+            raise HTTPException(status_code=400, detail="No audio decoded from the images")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Decoding timed out: {str(e)}")
+    except Exception as e:
         raise HTTPException(status_code=500, detail=f"Decoding failed: {str(e)}")
+    
+    return StreamingResponse(
+        _audio_body(first, pieces),
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": attachment_header(info["original_filename"]),
+            "X-Total-Chunks": str(info["total_chunks"]),
+            "X-Compressed": str(info["compressed"]),
+            "X-User-ID": user_id
+        },
+        background=BackgroundTask(_stop_decoding, pieces)
+    )
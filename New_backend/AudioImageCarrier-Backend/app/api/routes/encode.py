@@ -1,16 +1,24 @@
 """Encode endpoint - Convert audio to encrypted images."""
 
+import asyncio
+import io
+import itertools
 import tempfile
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
-import shutil
+from typing import Iterator
+from fastapi import APIRouter, UploadFile, File, Form, Query, Header, Depends, HTTPException, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
 
 from app.api.dependencies import get_api_key
 from app.services.encode_service import EncodeService
-from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key
-from app.utils.file_handler import cleanup_directory, cleanup_file
+from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key, validate_audio_upload
+from app.utils.upload_stream import UploadStream
+from app.utils.file_handler import cleanup_directory, cleanup_file, attachment_header, iter_zip_stream, save_upload
 from app.core.config import settings
+from app.core.worker_pool import JobTimeout, run_job, stream_job
 
 router = APIRouter()
 
@@ -23,6 +31,60 @@ def cleanup_resources(temp_upload_path: Path = None, result_temp_dir: Path = Non
         cleanup_directory(result_temp_dir)
 
 
+def _zip_body(first: tuple, images: Iterator, stream: UploadStream = None) -> Iterator[bytes]:
+    """Response body: stored ZIP entries written as the images arrive."""
+    try:
+        members = itertools.chain([first], images)
+        yield from iter_zip_stream((name, png) for name, png, _ in members)
+    finally:
+        _stop_encoding(images, stream)
+
+
+def _stop_encoding(images: Iterator, stream: UploadStream = None) -> None:
+    """
+    Stop the encoder (and the task feeding it the upload). Also run as the
+    response's background task: when the client disconnects, Starlette stops
+    iterating the body without closing it.
+    """
+    images.close()
+    if stream is not None:
+        stream.close()
+
+
+async def _feed_upload(request: Request, stream: UploadStream) -> bool:
+    """
+    Pump the request body into stream for the encoder. Returns False if the
+    client disconnected before the body was complete.
+    """
+    try:
+        async for piece in request.stream():
+            if piece and not await stream.feed(piece):
+                return True  # the encoder stopped early; its error ends the response
+        await stream.finish()
+        return True
+    except ClientDisconnect:
+        await stream.fail(ValueError("Client disconnected during upload"))
+        return False
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose request body is still being read by a feeding
+    task. Starlette listens for a disconnect by reading receive() while it
+    streams; that would swallow body messages meant for the encoder, so it
+    only starts once the feeding task has read the whole body.
+    """
+
+    def __init__(self, feeding: asyncio.Future, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.feeding = feeding
+
+    async def listen_for_disconnect(self, receive) -> None:
+        if not await self.feeding:
+            return  # the client is gone: stop streaming
+        await super().listen_for_disconnect(receive)
+
+
 @router.post(
     "/encode",
     summary="Encode audio file to encrypted images",
@@ -38,6 +100,8 @@ def cleanup_resources(temp_upload_path: Path = None, result_temp_dir: Path = Non
     - **max_chunk_bytes** (optional): Maximum bytes per image (default: 50MB)
     - **compress** (optional): Enable zstd compression (default: true)
     - **delete_source** (optional): Delete uploaded file after encoding (default: false)
+    - **chunking** (optional): "fixed" (default) or "cdc" for content-defined chunks that are
+      deduplicated against the user's previously encoded uploads
     
     **Returns:** ZIP file containing encrypted PNG images
     
@@ -60,6 +124,7 @@ async def encode_audio(
     max_chunk_bytes: int = Form(None, description="Max bytes per chunk"),
     compress: bool = Form(True, description="Enable compression"),
     delete_source: bool = Form(False, description="Delete source after encoding"),
+    chunking: str = Form("fixed", description="Chunking mode: fixed or cdc"),
     api_key: str = Depends(get_api_key)
 ):
     """Encode audio file to encrypted images."""
@@ -83,26 +148,98 @@ async def encode_audio(
             if not is_valid:
                 raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
         
+        if chunking not in ("fixed", "cdc"):
+            raise HTTPException(status_code=400, detail="chunking must be 'fixed' or 'cdc'")
+        
+        # Requests whose Content-Length is over the limit never get here (UploadSizeLimitMiddleware);
+        # this catches chunked uploads, which only have a size once parsed
+        size = file.size
+        if size is None:
+            size = file.file.seek(0, io.SEEK_END)
+            file.file.seek(0)
+        if size > settings.max_upload_size_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large: {size} bytes (max: {settings.max_upload_size_bytes})"
+            )
+        
         # Sanitize filename
         safe_filename = sanitize_filename(file.filename)
         
-        # Save uploaded file temporarily with unique name
+        # Small and medium uploads are encoded in memory: no upload, image or ZIP files
+        if chunking == "fixed" and size <= settings.inmemory_max_bytes:
+            result_data = await run_job(
+                EncodeService.encode_audio_bytes,
+                data=await file.read(),
+                filename=safe_filename,
+                user_id=user_id,
+                master_key=master_key,
+                max_chunk_bytes=max_chunk_bytes,
+                compress=compress
+            )
+            return Response(
+                content=result_data["zip_bytes"],
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": attachment_header(result_data["zip_filename"]),
+                    "X-Total-Images": str(result_data["total_images"]),
+                    "X-Original-Size": str(result_data["original_size_bytes"]),
+                    "X-Compressed": str(result_data["compressed"]),
+                    "X-Chunking": chunking,
+                    "X-Reused-Chunks": "0",
+                    "X-User-ID": user_id
+                }
+            )
+        
+        if chunking == "fixed":
+            # Stream the ZIP: each image is stored in it as soon as a worker has packed it,
+            # so the first bytes go out after the first chunk instead of after the last.
+            # The worker reads the upload from the form's spool file as it goes (its feed),
+            # so the upload is not copied to upload_dir first
+            images = stream_job(
+                EncodeService.iter_encode_images,
+                feed=file.file,
+                size=size,
+                filename=safe_filename,
+                user_id=user_id,
+                master_key=master_key,
+                max_chunk_bytes=max_chunk_bytes,
+                compress=compress
+            )
+            first = await run_in_threadpool(next, images, None)
+            if first is None:
+                raise HTTPException(status_code=400, detail="Encoding produced no images")
+            return StreamingResponse(
+                _zip_body(first, images),
+                media_type="application/zip",
+                background=BackgroundTask(_stop_encoding, images),
+                headers={
+                    "Content-Disposition": attachment_header(f"{Path(safe_filename).stem}_images.zip"),
+                    "X-Total-Images": str(first[2]["total_chunks"]),
+                    "X-Original-Size": str(size),
+                    "X-Compressed": str(compress),
+                    "X-Chunking": chunking,
+                    "X-Reused-Chunks": "0",
+                    "X-User-ID": user_id
+                }
+            )
+        
+        # CDC chunks and deduplicates a file on disk, so it still needs its own copy of the upload
         import uuid
         temp_name = f"upload_{uuid.uuid4().hex[:8]}_{safe_filename}"
         temp_upload_path = Path(settings.upload_dir) / temp_name
-        temp_upload_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with temp_upload_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_threadpool(save_upload, file.file, temp_upload_path)
         
         # Encode audio to images
-        result_data = EncodeService.encode_audio_to_images(
+        result_data = await run_job(
+            EncodeService.encode_audio_to_images,
             audio_file_path=temp_upload_path,
             user_id=user_id,
             master_key=master_key,
             max_chunk_bytes=max_chunk_bytes,
             compress=compress,
-            delete_source=delete_source
+            delete_source=delete_source,
+            chunking=chunking
         )
         
         # Get ZIP file path
@@ -124,10 +261,16 @@ async def encode_audio(
                 "X-Total-Images": str(result_data["total_images"]),
                 "X-Original-Size": str(result_data["original_size_bytes"]),
                 "X-Compressed": str(result_data["compressed"]),
+                "X-Chunking": chunking,
+                "X-Reused-Chunks": str(result_data["metadata"].get("reused_chunks", 0)),
                 "X-User-ID": user_id
             }
         )
-        
+
+    except HTTPException:
+        # Validation errors raised above are already client errors
+        raise
+
     except ValueError as e:
         # Cleanup on error
         if temp_upload_path:
@@ -142,4 +285,120 @@ async def encode_audio(
             cleanup_file(temp_upload_path)
         if result_data and "temp_dir" in result_data:
             cleanup_directory(result_data["temp_dir"])
+        if isinstance(e, JobTimeout):
+            raise HTTPException(status_code=504, detail=f"Encoding timed out: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Encoding failed: {str(e)}")
+
+
+@router.post(
+    "/encode/stream",
+    summary="Encode an audio upload while it is still arriving",
+    description="""
+    Send the audio file itself as the request body (not multipart) and receive
+    the same ZIP as `/api/v1/encode`. Chunks are encoded as soon as their bytes
+    arrive, overlapping encoding with the upload, and the ZIP streams back as
+    images are packed: neither the upload nor the ZIP is written to disk.
+    `Content-Length` is required: oversize uploads are rejected with 413
+    before any of the body is read.
+    
+    **Parameters (query string):**
+    - **user_id**: User identifier for encryption key derivation
+    - **filename**: Original audio filename (its extension is validated)
+    - **max_chunk_bytes** (optional): Maximum bytes per image (default: 50MB)
+    - **compress** (optional): Enable zstd compression (default: true)
+    
+    The master key (optional) goes in the `X-Master-Key` header so it stays out of URLs and logs.
+    
+    **Example:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/encode/stream?user_id=alice&filename=audio.wav" \\
+      -H "X-API-Key: your-api-key" \\
+      -H "Content-Type: application/octet-stream" \\
+      --data-binary @audio.wav \\
+      -o encrypted_images.zip
+    ```
+    """
+)
+async def encode_audio_stream(
+    request: Request,
+    user_id: str = Query(..., description="User ID for encryption"),
+    filename: str = Query(..., description="Original audio filename"),
+    max_chunk_bytes: int = Query(None, description="Max bytes per chunk"),
+    compress: bool = Query(True, description="Enable compression"),
+    master_key: str = Header(None, alias="X-Master-Key", description="Master key (64 hex chars)"),
+    api_key: str = Depends(get_api_key)
+):
+    """Encode a raw audio request body as it streams in."""
+    
+    is_valid, error = validate_user_id(user_id)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid user_id: {error}")
+    
+    if master_key:
+        is_valid, error = validate_master_key(master_key)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
+    
+    # Size checks happen before any of the body is read
+    content_length = request.headers.get("content-length")
+    if content_length is None or not content_length.isdigit():
+        raise HTTPException(status_code=411, detail="Content-Length header is required")
+    size = int(content_length)
+    if size > settings.max_upload_size_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large: {size} bytes (max: {settings.max_upload_size_bytes})"
+        )
+    
+    safe_filename = sanitize_filename(filename)
+    is_valid, error = validate_audio_upload(safe_filename, size, max_size=settings.max_upload_size_bytes)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid audio file: {error}")
+    
+    # The worker reads the body through the pool as a background task feeds it in,
+    # and the ZIP streams back as images are packed, so neither side is held in full
+    stream = UploadStream()
+    feeding = asyncio.ensure_future(_feed_upload(request, stream))
+    images = stream_job(
+        EncodeService.iter_encode_images,
+        feed=stream,
+        size=size,
+        filename=safe_filename,
+        user_id=user_id,
+        master_key=master_key,
+        max_chunk_bytes=max_chunk_bytes,
+        compress=compress
+    )
+    try:
+        try:
+            first = await run_in_threadpool(next, images, None)
+        except BaseException:
+            _stop_encoding(images, stream)
+            raise
+        if first is None:
+            stream.close()
+            raise HTTPException(status_code=400, detail="Encoding produced no images")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Encoding timed out: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Encoding failed: {str(e)}")
+    
+    return _UploadStreamingResponse(
+        feeding,
+        _zip_body(first, images, stream),
+        media_type="application/zip",
+        background=BackgroundTask(_stop_encoding, images, stream),
+        headers={
+            "Content-Disposition": attachment_header(f"{Path(safe_filename).stem}_images.zip"),
+            "X-Total-Images": str(first[2]["total_chunks"]),
+            "X-Original-Size": str(size),
+            "X-Compressed": str(compress),
+            "X-Chunking": "fixed",
+            "X-Reused-Chunks": "0",
+            "X-User-ID": user_id
+        }
+    )
@@ -0,0 +1,232 @@
+"""Ingest endpoints - Encode audio frames into images while recording is in progress."""
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, Depends, HTTPException, BackgroundTasks, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.api.dependencies import get_api_key
+from app.core.security import verify_api_key
+from app.core.config import settings
+from app.services.ingest_service import IngestService, IngestSession
+from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key
+from app.utils.file_handler import cleanup_directory
+
+router = APIRouter()
+
+
+class IngestError(Exception):
+    """Client protocol error; reported to the client before closing."""
+
+
+def _parse_start(message: dict) -> dict:
+    """Validate the start message and fill in segmenting defaults."""
+    if message.get("type") != "start":
+        raise IngestError("First message must be {\"type\": \"start\", ...}")
+
+    user_id = message.get("user_id") or ""
+    is_valid, error = validate_user_id(user_id)
+    if not is_valid:
+        raise IngestError(f"Invalid user_id: {error}")
+
+    master_key = message.get("master_key")
+    if master_key:
+        is_valid, error = validate_master_key(master_key)
+        if not is_valid:
+            raise IngestError(f"Invalid master_key: {error}")
+
+    filename = sanitize_filename(message.get("filename") or "recording.raw")
+
+    segment_bytes = int(message.get("segment_bytes") or settings.ingest_segment_bytes)
+    if not 1 <= segment_bytes <= settings.default_max_chunk_bytes:
+        raise IngestError(f"segment_bytes must be between 1 and {settings.default_max_chunk_bytes}")
+
+    segment_seconds = float(message.get("segment_seconds") or settings.ingest_segment_seconds)
+    if segment_seconds <= 0:
+        raise IngestError("segment_seconds must be positive")
+
+    return {
+        "user_id": user_id,
+        "master_key": master_key,
+        "filename": filename,
+        "compress": bool(message.get("compress", True)),
+        "segment_bytes": segment_bytes,
+        "segment_seconds": segment_seconds
+    }
+
+
+async def _read_messages(websocket: WebSocket, inbox: asyncio.Queue) -> None:
+    """Move raw websocket messages into a queue (bounded, so a slow encoder applies back-pressure)."""
+    while True:
+        message = await websocket.receive()
+        await inbox.put(message)
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+async def _run_session(websocket: WebSocket, session: IngestSession, options: dict) -> Optional[dict]:
+    """
+    Cut incoming frames into segments by size or age and encode each one on
+    the worker pool while later frames keep arriving. Returns the finished
+    session result, or None if the client disconnected before stopping.
+    """
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_max_pending_frames)
+    reader = asyncio.create_task(_read_messages(websocket, inbox))
+    pending: Optional[asyncio.Task] = None
+    buffer = bytearray()
+    segment_started = None
+
+    async def encode_and_report(segment: bytes) -> None:
+        info = await session.encode_segment(segment)
+        await websocket.send_json({"type": "segment", **info})
+
+    async def submit(segment: bytes) -> None:
+        # One segment encodes at a time, in order (re-raises if the previous one failed)
+        nonlocal pending
+        if pending is not None:
+            await pending
+        pending = asyncio.create_task(encode_and_report(segment))
+
+    try:
+        while True:
+            timeout = None
+            if buffer:
+                timeout = max(0.0, segment_started + options["segment_seconds"] - loop.time())
+            try:
+                message = await asyncio.wait_for(inbox.get(), timeout)
+            except asyncio.TimeoutError:
+                await submit(bytes(buffer))
+                buffer.clear()
+                continue
+
+            if message["type"] == "websocket.disconnect":
+                if pending is not None:
+                    await asyncio.gather(pending, return_exceptions=True)
+                return None
+
+            if message.get("bytes"):
+                if not buffer:
+                    segment_started = loop.time()
+                buffer += message["bytes"]
+                while len(buffer) >= options["segment_bytes"]:
+                    await submit(bytes(buffer[:options["segment_bytes"]]))
+                    del buffer[:options["segment_bytes"]]
+                    segment_started = loop.time()
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    raise IngestError("Text messages must be JSON")
+                if control.get("type") == "stop":
+                    break
+                raise IngestError(f"Unknown message type: {control.get('type')}")
+
+        if buffer:
+            await submit(bytes(buffer))
+        if pending is not None:
+            await pending
+        return await session.finish()
+
+    finally:
+        reader.cancel()
+
+
+@router.websocket("/ingest")
+async def ingest_audio(websocket: WebSocket):
+    """
+    Live ingest over WebSocket.
+
+    Authenticate with the `X-API-Key` header (or `api_key` query parameter for
+    browser clients). Protocol:
+
+    1. Client sends `{"type": "start", "user_id": "alice", "filename": "live.aac",
+       "master_key": null, "segment_bytes": 1048576, "segment_seconds": 10, "compress": true}`
+    2. Client sends audio as binary frames; the server replies
+       `{"type": "segment", "seq": 0, "bytes": ..., "image": ...}` as each segment is encrypted
+    3. Client sends `{"type": "stop"}`; the server seals the stream and replies
+       `{"type": "done", "session_id": ..., "download": "/api/v1/ingest/<session_id>"}`
+
+    Errors are reported as `{"type": "error", "detail": ...}` before the socket closes.
+    """
+    try:
+        await verify_api_key(websocket.headers.get("x-api-key") or websocket.query_params.get("api_key"))
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    session = None
+    result = None
+
+    try:
+        try:
+            options = _parse_start(await websocket.receive_json())
+        except (ValueError, TypeError) as e:
+            raise IngestError(f"Invalid start message: {e}")
+
+        session = await run_in_threadpool(
+            IngestService.start_session,
+            user_id=options["user_id"],
+            filename=options["filename"],
+            master_key=options["master_key"],
+            compress=options["compress"]
+        )
+        await websocket.send_json({
+            "type": "started",
+            "session_id": session.session_id,
+            "stream_id": session.stream_id
+        })
+
+        result = await _run_session(websocket, session, options)
+        if result is None:
+            return
+
+        await websocket.send_json({
+            "type": "done",
+            **result,
+            "download": f"/api/v1/ingest/{session.session_id}"
+        })
+        await websocket.close()
+
+    except IngestError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Ingest failed: {str(e)}"})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+    finally:
+        if session is not None and result is None:
+            session.abort()
+
+
+@router.get(
+    "/ingest/{session_id}",
+    summary="Download the images of a finished live ingest session",
+    description="""
+    Returns the ZIP (sealed stream manifest + images) produced by a finished
+    `/api/v1/ingest` WebSocket session. The session is removed after download,
+    or after `INGEST_RESULT_TTL_SECONDS` if it is never downloaded.
+    """
+)
+async def download_ingest(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    api_key: str = Depends(get_api_key)
+):
+    """Download a finished ingest session."""
+    zip_path = await run_in_threadpool(IngestService.get_result_zip, session_id)
+    if zip_path is None:
+        raise HTTPException(status_code=404, detail="Unknown or unfinished ingest session")
+
+    background_tasks.add_task(cleanup_directory, zip_path.parent)
+    return FileResponse(
+        path=zip_path,
+        media_type="application/zip",
+        filename=zip_path.name
+    )
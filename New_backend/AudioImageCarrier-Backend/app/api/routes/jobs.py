@@ -0,0 +1,173 @@
+"""Job endpoints - Submit encodes that run in the background, poll them and fetch the result."""
+
+from pathlib import Path
+from typing import Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.api.dependencies import get_api_key
+from app.services.job_service import JobService, DONE, FAILED
+from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key, validate_audio_file
+from app.utils.file_handler import cleanup_directory, save_upload
+from app.core.config import settings
+
+router = APIRouter()
+
+
+async def _job_or_404(job_id: str) -> dict:
+    job = await run_in_threadpool(JobService.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+def _store_upload(file: UploadFile, input_path: Path) -> Tuple[bool, Optional[str]]:
+    """Copy the spooled upload to the job's input file and validate it (blocking; run off the event loop)."""
+    save_upload(file.file, input_path)
+    return validate_audio_file(input_path, max_size=settings.max_upload_size_bytes)
+
+
+@router.post(
+    "/jobs/encode",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit an audio file to be encoded in the background",
+    description="""
+    Same parameters as `/api/v1/encode`, but the response is returned as soon as
+    the upload is stored: a job whose progress is polled at `/api/v1/jobs/{job_id}`
+    and whose ZIP is downloaded from `/api/v1/jobs/{job_id}/result` once its
+    status is `done`. Use this for large files that would outlast an HTTP timeout.
+
+    A job may run for `BACKGROUND_JOB_TIMEOUT_SECONDS` (default 6h, 0 = no
+    limit) rather than the inline `JOB_TIMEOUT_SECONDS`.
+    Finished jobs are kept for `JOB_RESULT_TTL_SECONDS` (default 24h). Jobs
+    survive a server restart if they use the server's master key; a master_key
+    sent with the request is never stored, so such jobs must be resubmitted.
+
+    **Example:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/jobs/encode" \\
+      -H "X-API-Key: your-api-key" \\
+      -F "file=@audio.wav" \\
+      -F "user_id=alice"
+    ```
+    """
+)
+async def submit_encode_job(
+    file: UploadFile = File(..., description="Audio file to encode"),
+    user_id: str = Form(..., description="User ID for encryption"),
+    master_key: str = Form(None, description="Master key (64 hex chars)"),
+    max_chunk_bytes: int = Form(None, description="Max bytes per chunk"),
+    compress: bool = Form(True, description="Enable compression"),
+    chunking: str = Form("fixed", description="Chunking mode: fixed or cdc"),
+    api_key: str = Depends(get_api_key)
+):
+    """Store the upload and queue an encode job."""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+
+    is_valid, error = validate_user_id(user_id)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=f"Invalid user_id: {error}")
+
+    if master_key:
+        is_valid, error = validate_master_key(master_key)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
+
+    if chunking not in ("fixed", "cdc"):
+        raise HTTPException(status_code=400, detail="chunking must be 'fixed' or 'cdc'")
+
+    safe_filename = sanitize_filename(file.filename)
+    job_id = JobService.new_job_id()
+    input_path = JobService.input_path(job_id, safe_filename)
+
+    try:
+        is_valid, error = await run_in_threadpool(_store_upload, file, input_path)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid audio file: {error}")
+
+        job = await run_in_threadpool(
+            JobService.submit_encode,
+            job_id=job_id,
+            filename=safe_filename,
+            user_id=user_id,
+            master_key=master_key,
+            max_chunk_bytes=max_chunk_bytes,
+            compress=compress,
+            chunking=chunking
+        )
+    except HTTPException:
+        await run_in_threadpool(cleanup_directory, JobService.job_dir(job_id))
+        raise
+    except Exception as e:
+        await run_in_threadpool(cleanup_directory, JobService.job_dir(job_id))
+        raise HTTPException(status_code=500, detail=f"Could not submit job: {str(e)}")
+
+    job["status_url"] = f"/api/v1/jobs/{job_id}"
+    job["result_url"] = f"/api/v1/jobs/{job_id}/result"
+    return job
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Get the status and progress of a job",
+    description="""
+    Returns the job's `status` (`queued`, `running`, `done` or `failed`),
+    `progress` (chunks written so far out of `total_chunks`, which is known
+    once encoding starts), the `result` summary when done and the `error`
+    when failed.
+    """
+)
+async def get_job_status(job_id: str, api_key: str = Depends(get_api_key)):
+    """Report a job's status."""
+    return JobService.describe(await _job_or_404(job_id))
+
+
+@router.get(
+    "/jobs/{job_id}/result",
+    summary="Download the ZIP produced by a finished job",
+    description="""
+    Returns the encrypted images ZIP of a `done` job (409 while it is still
+    queued or running, or if it failed). The result can be downloaded until the
+    job expires.
+    """
+)
+async def download_job_result(job_id: str, api_key: str = Depends(get_api_key)):
+    """Download a finished job's result."""
+    job = await _job_or_404(job_id)
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}" +
+                            (f": {job['error']}" if job["error"] else ""))
+
+    zip_path = await run_in_threadpool(JobService.get_result_zip, job)
+    if zip_path is None:
+        raise HTTPException(status_code=404, detail="Job result is no longer available")
+
+    result = job["result"]
+    return FileResponse(
+        path=zip_path,
+        media_type="application/zip",
+        filename=result["zip_filename"],
+        headers={
+            "X-Total-Images": str(result["total_images"]),
+            "X-Original-Size": str(result["original_size_bytes"]),
+            "X-Compressed": str(result["compressed"]),
+            "X-Chunking": result["chunking"],
+            "X-Reused-Chunks": str(result["reused_chunks"]),
+            "X-User-ID": job["user_id"]
+        }
+    )
+
+
+@router.delete(
+    "/jobs/{job_id}",
+    summary="Delete a finished job and its result",
+)
+async def delete_job(job_id: str, api_key: str = Depends(get_api_key)):
+    """Delete a finished job before it expires."""
+    job = await _job_or_404(job_id)
+    if job["status"] not in (DONE, FAILED):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; only finished jobs can be deleted")
+    await run_in_threadpool(JobService.delete_job, job_id)
+    return {"job_id": job_id, "deleted": True}
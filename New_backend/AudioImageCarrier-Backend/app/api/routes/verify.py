@@ -0,0 +1,90 @@
+"""Verify endpoint - Audit encrypted images without recovering the audio."""
+
+import uuid
+from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.dependencies import get_api_key
+from app.services.verify_service import VerifyService
+from app.utils.validators import sanitize_filename, validate_user_id, validate_master_key
+from app.utils.file_handler import cleanup_file, save_upload
+from app.core.config import settings
+from app.core.worker_pool import JobTimeout, run_job
+
+router = APIRouter()
+
+
+@router.post(
+    "/verify",
+    summary="Verify encrypted images without decoding",
+    description="""
+    Upload a ZIP archive of encrypted images and receive an integrity report. Every
+    chunk is decrypted and authenticated in parallel and chunk coverage is checked,
+    but no audio is written anywhere.
+    
+    **Parameters:**
+    - **images**: ZIP file containing encrypted images (any set type)
+    - **user_id**: User identifier used during encoding (must match!)
+    - **master_key** (optional): 64-character hex master key (uses env var if not provided)
+    
+    **Returns:** JSON report with `ok` plus per-recording, per-chunk results
+    
+    **Example:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/verify" \\
+      -H "X-API-Key: your-api-key" \\
+      -F "images=@encrypted_images.zip" \\
+      -F "user_id=alice"
+    ```
+    """
+)
+async def verify_images(
+    images: UploadFile = File(..., description="ZIP file containing encrypted images"),
+    user_id: str = Form(..., description="User ID used for encoding"),
+    master_key: str = Form(None, description="Master key (64 hex chars)"),
+    api_key: str = Depends(get_api_key)
+):
+    """Verify encrypted images."""
+
+    temp_zip_path = None
+
+    try:
+        if not images.filename or not images.filename.endswith('.zip'):
+            raise HTTPException(status_code=400, detail="File must be a ZIP archive")
+
+        is_valid, error = validate_user_id(user_id)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=f"Invalid user_id: {error}")
+
+        if master_key:
+            is_valid, error = validate_master_key(master_key)
+            if not is_valid:
+                raise HTTPException(status_code=400, detail=f"Invalid master_key: {error}")
+
+        safe_filename = sanitize_filename(images.filename)
+        temp_zip_path = Path(settings.upload_dir) / f"upload_{uuid.uuid4().hex[:8]}_{safe_filename}"
+        await run_in_threadpool(save_upload, images.file, temp_zip_path)
+
+        return await run_job(
+            VerifyService.verify_images_zip,
+            images_zip_path=temp_zip_path,
+            user_id=user_id,
+            master_key=master_key
+        )
+
+    except HTTPException:
+        raise
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=f"Verification timed out: {str(e)}")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
+
+    finally:
+        if temp_zip_path:
+            cleanup_file(temp_zip_path)
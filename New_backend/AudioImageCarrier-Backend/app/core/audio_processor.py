@@ -1,24 +1,19 @@
 """
-Audio processor - Core logic wrapper for audio_image_chunked.py script.
+Audio processor - Core logic wrapper for the aicarrier_codec package.
 Imports and calls functions directly for better performance and error handling.
 """
 
 import sys
+import asyncio
 from pathlib import Path
-from typing import List, Optional
-import importlib.util
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-# Add scripts directory to Python path
+# Add scripts directory (home of the aicarrier_codec package) to Python path
 SCRIPT_DIR = Path(__file__).parent.parent.parent / "scripts"
 sys.path.insert(0, str(SCRIPT_DIR))
 
-# Import the audio_image_chunked module directly
-spec = importlib.util.spec_from_file_location(
-    "audio_image_chunked",
-    SCRIPT_DIR / "audio_image_chunked.py"
-)
-audio_module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(audio_module)
+# The codec module itself (not the package facade), so its globals can be configured
+from aicarrier_codec import codec as audio_module  # noqa: E402
 
 
 class AudioProcessor:
@@ -68,43 +63,790 @@ class AudioProcessor:
         except Exception as e:
             raise RuntimeError(f"Encoding failed: {str(e)}") from e
     
+    @staticmethod
+    def iter_encode_audio(
+        input_file: Path,
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True,
+        retries: int = 0
+    ) -> Iterator[Tuple[Path, Dict]]:
+        """
+        Encode audio file to encrypted images, yielding each image as soon as it is written.
+        
+        Args:
+            input_file: Path to input audio file
+            output_dir: Directory to save output images
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            max_chunk_bytes: Maximum bytes per image chunk
+            compress: Enable compression
+            retries: Times to resume from the last intact image after an I/O failure
+            
+        Yields:
+            (image path, chunk metadata incl. width/height) in chunk order
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        yielded = 0
+        attempt = 0
+        while True:
+            images = audio_module.iter_encode_file(
+                input_file=input_file,
+                user_id=user_id,
+                out_dir=output_dir,
+                max_chunk_bytes=max_chunk_bytes,
+                master_hex=master_hex,
+                compress=compress,
+                resume=attempt > 0
+            )
+            try:
+                for _, image_path, meta in images:
+                    # A resumed run replays completed images first; skip those already yielded
+                    if meta["chunk_index"] < yielded:
+                        continue
+                    yielded += 1
+                    yield image_path, meta
+                return
+            except (OSError, MemoryError) as e:
+                if attempt >= retries:
+                    raise RuntimeError(f"Encoding failed: {str(e)}") from e
+                attempt += 1
+            except Exception as e:
+                raise RuntimeError(f"Encoding failed: {str(e)}") from e
+            finally:
+                images.close()
+    
+    @staticmethod
+    def iter_encode_audio_images(
+        input_file: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True
+    ) -> Iterator[Tuple[str, bytes, Dict]]:
+        """
+        Encode audio file to encrypted images held in memory, yielding each
+        image as soon as it is packed (nothing is written to disk).
+        
+        Args:
+            input_file: Path to input audio file
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            max_chunk_bytes: Maximum bytes per image chunk
+            compress: Enable compression
+            
+        Yields:
+            (image filename, PNG bytes, chunk metadata incl. width/height) in chunk order
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        images = audio_module.iter_encode_file(
+            input_file=input_file,
+            user_id=user_id,
+            max_chunk_bytes=max_chunk_bytes,
+            master_hex=master_hex,
+            compress=compress
+        )
+        try:
+            yield from images
+        except Exception as e:
+            raise RuntimeError(f"Encoding failed: {str(e)}") from e
+        finally:
+            images.close()
+    
+    @staticmethod
+    async def aiter_encode_audio(
+        input_file: Path,
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True
+    ) -> AsyncIterator[Tuple[Path, Dict]]:
+        """
+        Async form of iter_encode_audio for endpoints: encoding runs in worker
+        threads and each image is yielded as soon as it is written.
+        
+        Yields:
+            (image path, chunk metadata incl. width/height) in chunk order
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        loop = asyncio.get_running_loop()
+        images = AudioProcessor.iter_encode_audio(
+            input_file, output_dir, user_id, master_hex, max_chunk_bytes, compress=compress
+        )
+        done = object()
+        try:
+            while True:
+                item = await loop.run_in_executor(None, next, images, done)
+                if item is done:
+                    return
+                yield item
+        finally:
+            await loop.run_in_executor(None, images.close)
+    
+    @staticmethod
+    def encode_bytes(
+        data: bytes,
+        filename: str,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True
+    ) -> List[Tuple[str, bytes, Dict]]:
+        """
+        Encode audio held in memory to encrypted PNG images, without temp files.
+        
+        Args:
+            data: Audio file content
+            filename: Original audio filename (stored in the headers)
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            max_chunk_bytes: Maximum bytes per image chunk
+            compress: Enable compression
+            
+        Returns:
+            List of (image filename, PNG bytes, chunk metadata) in chunk order
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        try:
+            return audio_module.encode_bytes(
+                data=data,
+                orig_filename=filename,
+                user_id=user_id,
+                max_chunk_bytes=max_chunk_bytes,
+                master_hex=master_hex,
+                compress=compress
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"Encoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def iter_encode_stream(
+        stream,
+        size: int,
+        filename: str,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True
+    ) -> Iterator[Tuple[str, bytes, Dict]]:
+        """
+        Encode audio read from a binary stream of known size (e.g. a request body
+        that is still arriving), yielding each image as soon as it is packed.
+
+        Args:
+            stream: Binary stream with readinto()
+            size: Exact number of bytes the stream holds
+            filename: Original audio filename (stored in the headers)
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            max_chunk_bytes: Maximum bytes per image chunk
+            compress: Enable compression
+
+        Yields:
+            (image filename, PNG bytes, chunk metadata) in chunk order
+
+        Raises:
+            ValueError: If the stream holds fewer or more than size bytes
+            RuntimeError: If encoding fails
+        """
+        images = audio_module.iter_encode_reader(
+            src=stream,
+            size=size,
+            orig_filename=filename,
+            user_id=user_id,
+            max_chunk_bytes=max_chunk_bytes,
+            master_hex=master_hex,
+            compress=compress
+        )
+        try:
+            yield from images
+        except ValueError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Encoding failed: {str(e)}") from e
+        finally:
+            images.close()
+
+    @staticmethod
+    def encode_audio_cdc(
+        input_file: Path,
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        store_dir: Path,
+        avg_chunk_bytes: int,
+        compress: bool = True
+    ) -> Dict:
+        """
+        Encode audio file with content-defined chunking and per-user deduplication.
+        
+        Args:
+            input_file: Path to input audio file
+            output_dir: Directory to save the manifest and referenced chunk images
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            store_dir: Root of the per-user chunk store
+            avg_chunk_bytes: Target average chunk size
+            compress: Enable compression
+            
+        Returns:
+            Dictionary with manifest path, image paths and reuse statistics
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            
+            return audio_module.encode_cdc(
+                input_file=input_file,
+                out_dir=output_dir,
+                user_id=user_id,
+                store_dir=store_dir,
+                master_hex=master_hex,
+                compress=compress,
+                avg_chunk_bytes=avg_chunk_bytes
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"Encoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def encode_audio_append(
+        input_file: Path,
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        max_chunk_bytes: int,
+        compress: bool = True,
+        seal: bool = False
+    ) -> Dict:
+        """
+        Encode the audio appended to a growing recording since the last call.
+
+        Args:
+            input_file: Path to the (growing) input audio file
+            output_dir: Directory holding the stream's images
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            max_chunk_bytes: Maximum bytes per image chunk
+            compress: Enable compression
+            seal: Write the final manifest after encoding
+
+        Returns:
+            Dictionary with stream id, new image paths and chunk counts
+
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        try:
+            return audio_module.encode_append(
+                input_file=input_file,
+                out_dir=output_dir,
+                user_id=user_id,
+                max_chunk_bytes=max_chunk_bytes,
+                master_hex=master_hex,
+                compress=compress,
+                seal=seal
+            )
+
+        except Exception as e:
+            raise RuntimeError(f"Encoding failed: {str(e)}") from e
+
     @staticmethod
     def decode_images(
         input_dir: Path,
         output_file: Path,
         user_id: str,
-        master_hex: Optional[str]
+        master_hex: Optional[str],
+        store_dir: Optional[Path] = None,
+        retries: int = 0
     ) -> Path:
         """
         Decode encrypted images to audio file.
         
         Args:
-            input_dir: Directory containing input images
+            input_dir: Directory containing input images (or a CDC manifest)
             output_file: Path to save recovered audio file
             user_id: User ID used for encoding
             master_hex: Master encryption key (hex string)
+            store_dir: Chunk store searched for chunks missing from input_dir
+            retries: Times to resume from the last intact chunk after an I/O failure
             
         Returns:
             Path to recovered audio file
             
         Raises:
+            ValueError: If the images cannot be decoded (wrong key, tampered, incomplete)
+            RuntimeError: If decoding fails
+        """
+        attempt = 0
+        while True:
+            try:
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+                
+                # Call decode_images_to_file function directly
+                audio_module.decode_images_to_file(
+                    indir=input_dir,
+                    out_file=output_file,
+                    user_id=user_id,
+                    master_hex=master_hex,
+                    store_dir=store_dir,
+                    resume=attempt > 0
+                )
+                
+                return output_file
+                
+            except audio_module.DecodeError as e:
+                raise ValueError(str(e)) from e
+            except (OSError, MemoryError) as e:
+                if attempt >= retries:
+                    raise RuntimeError(f"Decoding failed: {str(e)}") from e
+                attempt += 1
+            except Exception as e:
+                raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def decode_zip(
+        zip_path: Path,
+        output_file: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        store_dir: Optional[Path] = None,
+        retries: int = 0
+    ) -> Dict:
+        """
+        Decode a ZIP of encrypted images to an audio file without extracting it.
+        
+        Args:
+            zip_path: ZIP containing the images (or a CDC manifest)
+            output_file: Path to save recovered audio file
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            store_dir: Chunk store searched for CDC chunks missing from the ZIP
+            retries: Times to start over after an I/O failure
+            
+        Returns:
+            Dictionary with kind, orig_filename, total_chunks, size and the
+            first chunk's "header" (or the CDC "manifest")
+            
+        Raises:
+            ValueError: If the ZIP has unsafe paths or the images cannot be decoded
             RuntimeError: If decoding fails
         """
+        attempt = 0
+        while True:
+            try:
+                output_file.parent.mkdir(parents=True, exist_ok=True)
+                return audio_module.decode_zip(
+                    zip_path,
+                    output_file,
+                    user_id=user_id,
+                    master_hex=master_hex,
+                    store_dir=store_dir
+                )
+            except ValueError:
+                raise
+            except audio_module.DecodeError as e:
+                raise ValueError(str(e)) from e
+            except (OSError, MemoryError) as e:
+                if attempt >= retries:
+                    raise RuntimeError(f"Decoding failed: {str(e)}") from e
+                attempt += 1
+            except Exception as e:
+                raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def plan_zip_recording(
+        zip_path: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        store_dir: Optional[Path] = None
+    ) -> Dict:
+        """
+        Lay out the recording in a ZIP without decrypting it.
+        
+        Args:
+            zip_path: ZIP containing the images (or a CDC manifest)
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            store_dir: Chunk store searched for CDC chunks missing from the ZIP
+            
+        Returns:
+            Plan with kind, orig_filename, size, info and chunks (see
+            iter_decode_range)
+            
+        Raises:
+            ValueError: If the ZIP has unsafe paths or the images are not one complete recording
+            RuntimeError: If reading the ZIP fails
+        """
+        try:
+            return audio_module.plan_zip_recording(zip_path, user_id=user_id, master_hex=master_hex,
+                                                   store_dir=store_dir)
+        except ValueError:
+            raise
+        except audio_module.DecodeError as e:
+            raise ValueError(str(e)) from e
+        except Exception as e:
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def iter_decode_range(
+        zip_path: Path,
+        plan: Dict,
+        user_id: str,
+        master_hex: Optional[str],
+        start: int = 0,
+        end: Optional[int] = None,
+        store_dir: Optional[Path] = None
+    ) -> Iterator[bytes]:
+        """
+        Decode bytes [start, end) of a planned recording, chunk by chunk.
+        
+        Args:
+            zip_path: ZIP the plan was made from
+            plan: Result of plan_zip_recording
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            start: First byte of the range
+            end: End of the range (exclusive; None for the end of the recording)
+            store_dir: Chunk store searched for CDC chunks missing from the ZIP
+            
+        Yields:
+            Recovered audio bytes, as each covering chunk is authenticated
+            
+        Raises:
+            ValueError: If the images cannot be decoded (wrong key, tampered, incomplete)
+            RuntimeError: If decoding fails
+        """
+        try:
+            yield from audio_module.iter_decode_zip_range(zip_path, plan, user_id=user_id, master_hex=master_hex,
+                                                          store_dir=store_dir, start=start, end=end)
+        except audio_module.DecodeError as e:
+            raise ValueError(str(e)) from e
+        except Exception as e:
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def iter_decode_members(
+        members: Iterable[Tuple[str, Union[bytes, BinaryIO]]],
+        user_id: str,
+        master_hex: Optional[str],
+        total_images: Optional[int] = None
+    ) -> Iterator[Tuple[Dict, bytes]]:
+        """
+        Decode images given as bytes or file objects (e.g. uploaded parts), chunk by chunk.
+        
+        Args:
+            members: (image filename, bytes or binary file object) pairs of one recording
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            total_images: Number of images among members, if known up front
+            
+        Yields:
+            (authenticated chunk header, recovered audio bytes) in chunk order
+            
+        Raises:
+            ValueError: If the images cannot be decoded (wrong key, tampered, incomplete)
+            RuntimeError: If decoding fails
+        """
+        try:
+            yield from audio_module.iter_decode_members(members, user_id=user_id, master_hex=master_hex,
+                                                        total_images=total_images)
+        except audio_module.DecodeError as e:
+            raise ValueError(str(e)) from e
+        except Exception as e:
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def decode_bytes(
+        images: List[Tuple[str, bytes]],
+        user_id: str,
+        master_hex: Optional[str]
+    ) -> bytes:
+        """
+        Decode the images of one recording held in memory, without temp files.
+        
+        Args:
+            images: List of (image filename, PNG bytes) in any order
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            
+        Returns:
+            Recovered audio bytes
+            
+        Raises:
+            ValueError: If the images cannot be decoded (wrong key, tampered, incomplete)
+            RuntimeError: If decoding fails
+        """
+        try:
+            return audio_module.decode_bytes(images, user_id=user_id, master_hex=master_hex)
+            
+        except audio_module.DecodeError as e:
+            raise ValueError(str(e)) from e
+        except Exception as e:
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def decode_directory(
+        input_dir: Path,
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        store_dir: Optional[Path] = None,
+        workers: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Decode every recording in a directory holding several image sets.
+        
+        Args:
+            input_dir: Directory containing the images of one or more recordings
+            output_dir: Directory receiving one audio file per recording
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            store_dir: Chunk store searched for CDC chunks missing from input_dir
+            workers: Recordings decoded at once (default: min(4, CPUs))
+            
+        Returns:
+            One report per recording (ok, output path, missing chunks, error)
+            
+        Raises:
+            RuntimeError: If the directory cannot be scanned
+        """
+        try:
+            return audio_module.decode_directory(
+                input_dir, output_dir, user_id, master_hex=master_hex, store_dir=store_dir, workers=workers
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def verify_images(
+        input_dirs: List[Path],
+        user_id: str,
+        master_hex: Optional[str],
+        store_dir: Optional[Path] = None,
+        workers: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Authenticate every chunk of one or more image sets without writing audio.
+        
+        Args:
+            input_dirs: Directories containing image sets
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            store_dir: Chunk store searched for chunks missing from a CDC set
+            workers: Number of verification threads
+            
+        Returns:
+            One report per recording (per-chunk results and coverage problems)
+            
+        Raises:
+            RuntimeError: If verification cannot run
+        """
+        try:
+            return audio_module.verify_archives(
+                indirs=input_dirs,
+                user_id=user_id,
+                master_hex=master_hex,
+                store_dir=store_dir,
+                workers=workers
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"Verification failed: {str(e)}") from e
+    
+    @staticmethod
+    def encode_bundle(
+        input_files: List[Path],
+        output_dir: Path,
+        user_id: str,
+        master_hex: Optional[str],
+        bundle_name: str,
+        max_bundle_bytes: int,
+        compress: bool = True
+    ) -> List[Path]:
+        """
+        Pack several audio files into bundle images.
+        
+        Args:
+            input_files: Paths to input audio files (filenames must be unique)
+            output_dir: Directory to save bundle images
+            user_id: User ID for key derivation
+            master_hex: Master encryption key (hex string)
+            bundle_name: Name used for the bundle image filenames
+            max_bundle_bytes: Maximum raw audio bytes per bundle image
+            compress: Enable compression
+            
+        Returns:
+            List of generated bundle image paths
+            
+        Raises:
+            RuntimeError: If encoding fails
+        """
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            
+            return audio_module.encode_bundle(
+                input_files=input_files,
+                out_dir=output_dir,
+                user_id=user_id,
+                bundle_name=bundle_name,
+                max_bundle_bytes=max_bundle_bytes,
+                master_hex=master_hex,
+                compress=compress
+            )
+            
+        except Exception as e:
+            raise RuntimeError(f"Bundle encoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def extract_bundle_member(
+        zip_path: Path,
+        member_name: str,
+        output_file: Path,
+        user_id: str,
+        master_hex: Optional[str]
+    ) -> Path:
+        """
+        Extract one recording from a ZIP of bundle images without extracting
+        the ZIP or decrypting the other recordings.
+        
+        Args:
+            zip_path: ZIP containing the bundle images
+            member_name: Filename of the recording to extract
+            output_file: Path to save the recovered audio file
+            user_id: User ID used for encoding
+            master_hex: Master encryption key (hex string)
+            
+        Returns:
+            Path to recovered audio file
+            
+        Raises:
+            ValueError: If the ZIP has unsafe paths
+            KeyError: If no bundle image holds member_name
+            RuntimeError: If extraction fails
+        """
         try:
             output_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # Call decode_images_to_file function directly
-            audio_module.decode_images_to_file(
-                indir=input_dir,
+            return audio_module.extract_bundle_member_zip(
+                zip_path,
+                member_name=member_name,
                 out_file=output_file,
                 user_id=user_id,
                 master_hex=master_hex
             )
             
-            return output_file
-            
+        except (ValueError, KeyError):
+            raise
         except Exception as e:
-            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+            raise RuntimeError(f"Bundle extraction failed: {str(e)}") from e
+    
+    @staticmethod
+    def select_cipher(cipher: Optional[str]) -> str:
+        """
+        Choose the AEAD used for new encodes.
+        
+        Args:
+            cipher: "aes-256-gcm", "chacha20-poly1305", or "auto" to benchmark
+                both on this host and keep the faster one
+            
+        Returns:
+            Name of the active cipher
+            
+        Raises:
+            ValueError: If the cipher name is unknown
+        """
+        return audio_module.select_cipher(cipher)
+    
+    @staticmethod
+    def select_hash(mode: Optional[str]) -> str:
+        """
+        Choose the chunk integrity hash used for new encodes.
+        
+        Args:
+            mode: "sha256" (one serial pass per chunk) or "merkle" (fixed-size
+                leaves hashed in parallel, root stored per chunk)
+            
+        Returns:
+            Name of the active hash mode
+            
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        return audio_module.select_hash(mode)
+    
+    @staticmethod
+    def configure_buffer_pool(
+        max_pooled_bytes: Optional[int] = None,
+        idle_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Set the limits of the shared chunk buffer pool.
+        
+        Args:
+            max_pooled_bytes: Total size of idle buffers kept for reuse
+            idle_seconds: Idle buffers older than this are freed
+        """
+        audio_module.BUFFER_POOL.configure(max_pooled_bytes=max_pooled_bytes, idle_seconds=idle_seconds)
+        audio_module.BUFFER_POOL.trim(audio_module.BUFFER_POOL.idle_seconds)
+    
+    @staticmethod
+    def buffer_pool_stats() -> Dict:
+        """
+        Reuse statistics of the shared chunk buffer pool.
+        
+        Returns:
+            Dictionary with hit/miss/drop counters and pooled/outstanding bytes
+        """
+        return audio_module.BUFFER_POOL.stats()
+    
+    @staticmethod
+    def trim_buffers() -> int:
+        """
+        Free every idle pooled buffer (e.g. after a burst of large uploads).
+        
+        Returns:
+            Number of bytes released
+        """
+        return audio_module.BUFFER_POOL.trim()
+    
+    @staticmethod
+    def configure_pipeline(depth: int) -> None:
+        """
+        Set how many chunks are queued between the overlapped encode/decode stages.
+        
+        Args:
+            depth: Queue depth between stages (0 runs the stages one after another)
+        """
+        audio_module.PIPELINE_DEPTH = max(0, int(depth))
+    
+    @staticmethod
+    def read_image_header(image) -> Dict:
+        """
+        Peek the (unauthenticated) header of a carrier image without decrypting it.
+        
+        Args:
+            image: Path to the image, or its PNG bytes
+            
+        Returns:
+            Header dictionary (filename, chunk position, format version, ...)
+        """
+        return audio_module.read_image_header(image)
     
     @staticmethod
     def get_wav_duration(file_path: Path) -> Optional[float]:
@@ -112,7 +854,7 @@ class AudioProcessor:
         Get duration of WAV file in seconds.
         
         Args:
-            file_path: Path to WAV file
+            file_path: Path to WAV file (or an open binary file object)
             
         Returns:
             Duration in seconds, or None if not a WAV or cannot determine
@@ -26,10 +26,35 @@ class Settings(BaseSettings):
     upload_dir: str = Field(default=os.environ.get("UPLOAD_DIR", "/tmp/uploads" if os.environ.get("VERCEL") else "storage/uploads"))
     temp_dir: str = Field(default=os.environ.get("TEMP_DIR", "/tmp" if os.environ.get("VERCEL") else "storage/temp"))
     max_upload_size_mb: int = Field(default=500)
+    inmemory_max_mb: int = Field(default=32)  # Uploads up to this size are encoded/decoded without temp files
     
     # Audio Processing
     default_max_chunk_bytes: int = Field(default=52428800)  # 50MB
+    cipher: str = Field(default="aes-256-gcm")  # aes-256-gcm, chacha20-poly1305 or auto (benchmark at startup)
+    hash_mode: str = Field(default="sha256")  # sha256 or merkle (parallel leaf hashing, per-chunk roots)
     max_width: int = Field(default=8192)
+    max_bundle_files: int = Field(default=1000)
+    buffer_pool_max_mb: int = Field(default=256)  # Idle chunk buffers kept for reuse across requests
+    buffer_pool_idle_seconds: float = Field(default=60.0)  # Idle buffers older than this are freed
+    pipeline_depth: int = Field(default=2)  # Chunks queued between encode/decode stages (0 = no overlap)
+    job_retries: int = Field(default=1)  # Resume an encode/decode this many times after an I/O failure
+    worker_processes: int = Field(default=2)  # Processes running encode/decode jobs (0 = threads in the API process)
+    job_timeout_seconds: float = Field(default=900.0)  # Kill and replace a worker whose job runs longer (0 = no limit)
+    
+    # Content-defined chunking / deduplication
+    chunk_store_dir: str = Field(default=os.environ.get("CHUNK_STORE_DIR", "/tmp/chunks" if os.environ.get("VERCEL") else "storage/chunks"))
+    cdc_avg_chunk_bytes: int = Field(default=1048576)  # 1MB
+    
+    # Background jobs (/api/v1/jobs)
+    jobs_dir: str = Field(default=os.environ.get("JOBS_DIR", "/tmp/jobs" if os.environ.get("VERCEL") else "storage/jobs"))
+    job_result_ttl_seconds: float = Field(default=86400.0)  # Finished jobs and their results are deleted after this
+    background_job_timeout_seconds: float = Field(default=21600.0)  # Replaces job_timeout_seconds for these jobs (0 = no limit)
+    
+    # Live ingest (WebSocket)
+    ingest_segment_bytes: int = Field(default=1048576)  # Cut a segment every 1MB...
+    ingest_segment_seconds: float = Field(default=10.0)  # ...or after 10s, whichever comes first
+    ingest_max_pending_frames: int = Field(default=256)  # Frames buffered before reads pause
+    ingest_result_ttl_seconds: float = Field(default=86400.0)  # Sessions not downloaded (or left behind) are deleted after this
     
     # CORS
     cors_origins: List[str] = Field(default=["http://localhost:3000", "http://localhost:8000"])
@@ -49,6 +74,11 @@ class Settings(BaseSettings):
     def max_upload_size_bytes(self) -> int:
         """Get max upload size in bytes."""
         return self.max_upload_size_mb * 1024 * 1024
+    
+    @property
+    def inmemory_max_bytes(self) -> int:
+        """Get the in-memory processing threshold in bytes."""
+        return self.inmemory_max_mb * 1024 * 1024
 
 
 # Global settings instance
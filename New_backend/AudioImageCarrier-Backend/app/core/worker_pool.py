@@ -0,0 +1,361 @@
+"""
+Managed process pool for CPU-bound encode/decode jobs.
+
+Routes await run_job() instead of calling the services inline, so one large
+encode no longer blocks the event loop (and /health) for every other client.
+Worker processes are started once, preload the codec and are reused; a job
+that outlives its timeout has its worker killed and replaced, and a worker
+that dies mid-job (or while idle) is replaced before the next job.
+"""
+
+import asyncio
+import functools
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+# Most input handed to a worker per request from its feed reader
+FEED_PIECE_BYTES = 1024 * 1024
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process running a job died before returning a result."""
+
+
+class JobTimeout(RuntimeError):
+    """A job ran longer than its timeout; its worker was killed."""
+
+
+def _job_context() -> Dict[str, Any]:
+    """Settings and codec selections a worker applies before each job, so it behaves like this process."""
+    from app.core.audio_processor import AudioProcessor
+    return {
+        "settings": settings.model_dump(),
+        "cipher": AudioProcessor.select_cipher(None),
+        "hash": AudioProcessor.select_hash(None),
+    }
+
+
+def _apply_context(context: Dict[str, Any]) -> None:
+    from app.core.audio_processor import AudioProcessor
+    for name, value in context["settings"].items():
+        if getattr(settings, name) != value:
+            setattr(settings, name, value)
+    AudioProcessor.select_cipher(context["cipher"])
+    AudioProcessor.select_hash(context["hash"])
+
+
+class _FeedReader(io.RawIOBase):
+    """Worker side of a job's input: each read asks the parent for the next piece of its feed."""
+
+    def __init__(self, conn):
+        super().__init__()
+        self._conn = conn
+        self._current = memoryview(b"")
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._current:
+            if self._eof or not len(b):
+                return 0
+            self._conn.send(("read", len(b)))
+            piece = self._conn.recv_bytes()
+            if not piece:
+                self._eof = True
+                return 0
+            self._current = memoryview(piece)
+        n = min(len(b), len(self._current))
+        b[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+
+def _worker_main(conn, context: Dict[str, Any]) -> None:
+    """Worker process: preload the codec, then run (fn, args, kwargs) jobs from conn until it closes."""
+    from app.core.audio_processor import AudioProcessor  # numpy, PIL and cryptography load once here
+    _apply_context(context)
+    AudioProcessor.configure_buffer_pool(
+        max_pooled_bytes=settings.buffer_pool_max_mb * 1024 * 1024,
+        idle_seconds=settings.buffer_pool_idle_seconds
+    )
+    AudioProcessor.configure_pipeline(settings.pipeline_depth)
+    conn.send(("ready", None))
+    while True:
+        try:
+            context, fn, args, kwargs, stream, feed = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            _apply_context(context)
+            if feed:
+                args = (_FeedReader(conn),) + args
+            if stream:
+                # Generator job: send each item as soon as it is produced
+                for item in fn(*args, **kwargs):
+                    conn.send(("item", item))
+                reply = ("ok", None)
+            else:
+                reply = ("ok", fn(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, mp_context, context: Dict[str, Any]):
+        self.conn, child = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child, context),
+                                          name="aicarrier-worker", daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def send(self, job: tuple, startup_timeout: float) -> None:
+        """Send a job once the worker has booted. Raises WorkerCrashed."""
+        try:
+            if not self.ready:
+                if not self.conn.poll(startup_timeout):
+                    raise WorkerCrashed("worker did not start")
+                self.conn.recv()
+                self.ready = True
+            self.conn.send(job)
+        except (EOFError, OSError) as e:
+            raise WorkerCrashed(f"worker process died (exit code {self.process.exitcode})") from e
+
+    def reply(self, data: bytes) -> None:
+        """Answer a "read" request from the job's feed reader (b"" = end of input). Raises WorkerCrashed."""
+        try:
+            self.conn.send_bytes(data)
+        except OSError as e:
+            raise WorkerCrashed(f"worker process died (exit code {self.process.exitcode})") from e
+
+    def receive(self, deadline: Optional[float], timeout: Optional[float]):
+        """Wait for the next message until deadline (time.monotonic()). Raises JobTimeout or WorkerCrashed."""
+        try:
+            if not self.conn.poll(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                raise JobTimeout(f"job exceeded its {timeout:g}s timeout")
+            return self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerCrashed(f"worker process died (exit code {self.process.exitcode})") from e
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of warm worker processes.
+    size=0 runs jobs on threads in this process instead (no isolation, and a
+    timed-out job keeps running in the background).
+    """
+
+    def __init__(self, size: Optional[int] = None, timeout: Optional[float] = None,
+                 startup_timeout: float = 120.0, start_method: str = "spawn"):
+        self.size = settings.worker_processes if size is None else size
+        self.timeout = settings.job_timeout_seconds if timeout is None else timeout
+        self.startup_timeout = startup_timeout
+        self._mp = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._busy = 0
+        self._stats = {"jobs": 0, "failed": 0, "timeouts": 0, "crashes": 0, "restarts": 0}
+        # Threads that wait on worker replies (jobs beyond the pool size queue here)
+        self._waiters = ThreadPoolExecutor(max_workers=max(4, self.size * 4), thread_name_prefix="job-wait")
+
+    def start(self) -> None:
+        """Start the workers now (they finish booting in the background)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            context = _job_context() if self.size else None
+            for _ in range(self.size):
+                self._idle.put(_Worker(self._mp, context))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._started = False
+            while True:
+                try:
+                    self._idle.get_nowait().kill()
+                except queue.Empty:
+                    break
+        self._waiters.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.size, "busy": self._busy, "idle": self._idle.qsize(), **self._stats}
+
+    def _acquire(self) -> _Worker:
+        worker = self._idle.get()
+        with self._lock:
+            self._busy += 1
+        if not worker.process.is_alive():
+            worker = self._replace(worker)
+        return worker
+
+    def _release(self, worker: _Worker) -> None:
+        with self._lock:
+            self._busy -= 1
+        self._idle.put(worker)
+
+    def _messages(self, fn: Callable, args: tuple, kwargs: dict, timeout: Optional[float], stream: bool,
+                  feed=None):
+        """
+        Run one job on an idle worker and yield its ("item" | "ok", value)
+        messages, answering its reads from feed. Errors raised by fn (or by
+        feed) are re-raised here; a worker that times out, dies, or is
+        abandoned before its job finished is replaced.
+        """
+        job = (_job_context(), fn, args, kwargs, stream, feed is not None)
+        deadline = time.monotonic() + timeout if timeout else None
+        worker = self._acquire()
+        finished = False
+        try:
+            worker.send(job, self.startup_timeout)
+            while True:
+                status, value = worker.receive(deadline, timeout)
+                if status == "read":
+                    # Waiting for input (e.g. an upload still arriving) does not count towards the timeout
+                    waited = time.monotonic()
+                    worker.reply(feed.read(min(value, FEED_PIECE_BYTES)) or b"")
+                    if deadline is not None:
+                        deadline += time.monotonic() - waited
+                    continue
+                if status == "error":
+                    finished = True
+                    self._stats["failed"] += 1
+                    raise value
+                if status == "ok":
+                    finished = True
+                    self._stats["jobs"] += 1
+                # Nor does the time the caller takes over an item (e.g. a slow client downloading it)
+                handed_out = time.monotonic()
+                yield status, value
+                if deadline is not None:
+                    deadline += time.monotonic() - handed_out
+                if finished:
+                    return
+        except JobTimeout:
+            self._stats["timeouts"] += 1
+            raise
+        except WorkerCrashed:
+            self._stats["crashes"] += 1
+            raise
+        finally:
+            # Still busy with this job (timed out, crashed or the caller stopped reading)
+            if not finished:
+                worker = self._replace(worker)
+            self._release(worker)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        self._stats["restarts"] += 1
+        return _Worker(self._mp, _job_context())
+
+    def call(self, fn: Callable, *args, timeout: Optional[float] = None, feed=None, **kwargs):
+        """Blocking form of run() for code that is already off the event loop (size=0 ignores the timeout)."""
+        timeout = self.timeout if timeout is None else timeout
+        if self.size == 0:
+            return fn(*args, **kwargs) if feed is None else fn(feed, *args, **kwargs)
+        self.start()
+        messages = self._messages(fn, args, kwargs, timeout or None, stream=False, feed=feed)
+        try:
+            return next(messages)[1]
+        finally:
+            messages.close()
+
+    def iter_call(self, fn: Callable, *args, timeout: Optional[float] = None, feed=None, **kwargs):
+        """
+        Run generator function fn in a worker and yield its items as they
+        arrive (blocking). The worker cannot be interrupted mid-job, so closing
+        this generator early kills and replaces it. The timeout counts only
+        time spent waiting on the worker, not the caller's time between items;
+        size=0 runs fn on the calling thread.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self.size == 0:
+            yield from (fn(*args, **kwargs) if feed is None else fn(feed, *args, **kwargs))
+            return
+        self.start()
+        messages = self._messages(fn, args, kwargs, timeout or None, stream=True, feed=feed)
+        try:
+            for status, value in messages:
+                if status == "item":
+                    yield value
+        finally:
+            messages.close()
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, feed=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker and await its result. fn, its
+        arguments and its result must be picklable (fn importable at top level).
+        Raises whatever fn raised, JobTimeout after `timeout` seconds (default
+        settings.job_timeout_seconds; 0 = none) or WorkerCrashed.
+
+        With feed (a blocking binary stream in this process, e.g. an
+        UploadStream), fn gets a file-like reader of it as its first argument;
+        the feed is read here, a piece at a time as fn asks for it, so its
+        bytes never have to be written anywhere for the worker to see them.
+        Time spent waiting on the feed is not counted towards the timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        if self.size == 0:
+            task = loop.run_in_executor(self._waiters, functools.partial(self.call, fn, *args, feed=feed, **kwargs))
+            try:
+                return await asyncio.wait_for(task, timeout or None)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                raise JobTimeout(f"job exceeded its {timeout:g}s timeout")
+        return await loop.run_in_executor(self._waiters, functools.partial(self.call, fn, *args, timeout=timeout,
+                                                                           feed=feed, **kwargs))
+
+
+# Shared pool used by the API routes (sized from settings on first use)
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+def shutdown_worker_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+async def run_job(fn: Callable, *args, timeout: Optional[float] = None, feed=None, **kwargs):
+    """Run a CPU-bound service call on the shared worker pool (see WorkerPool.run)."""
+    return await get_worker_pool().run(fn, *args, timeout=timeout, feed=feed, **kwargs)
+
+
+def stream_job(fn: Callable, *args, timeout: Optional[float] = None, feed=None, **kwargs):
+    """Run a generator service call on the shared worker pool (see WorkerPool.iter_call and run's feed)."""
+    return get_worker_pool().iter_call(fn, *args, timeout=timeout, feed=feed, **kwargs)
@@ -7,7 +7,12 @@ from fastapi.responses import JSONResponse
 from pathlib import Path
 
 from app.core.config import settings
-from app.api.routes import encode, decode
+from app.api.middleware import UploadSizeLimitMiddleware
+from app.core.audio_processor import AudioProcessor
+from app.core.worker_pool import get_worker_pool, shutdown_worker_pool
+from app.services.job_service import JobService
+from app.services.ingest_service import IngestService
+from app.api.routes import encode, decode, bundle, ingest, verify, jobs
 
 # Create FastAPI app
 app = FastAPI(
@@ -52,6 +57,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Oversize encode uploads get 413 from Content-Length, before the form is parsed
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/api/v1/encode", "/api/v1/jobs/encode"])
+
 # Create storage directories on startup
 @app.on_event("startup")
 async def startup_event():
@@ -69,10 +77,51 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️ Warning: Could not create directories: {e}")
         # Continue anyway - directories might already exist or be read-only
+    
+    # Pick the AEAD for new encodes ("auto" benchmarks AES-GCM vs ChaCha20 on this host)
+    try:
+        print(f"🔐 Cipher for new encodes: {AudioProcessor.select_cipher(settings.cipher)}")
+    except ValueError as e:
+        print(f"⚠️ Warning: {e}; keeping {AudioProcessor.select_cipher(None)}")
+    
+    try:
+        print(f"🧮 Chunk hash for new encodes: {AudioProcessor.select_hash(settings.hash_mode)}")
+    except ValueError as e:
+        print(f"⚠️ Warning: {e}; keeping {AudioProcessor.select_hash(None)}")
+    
+    AudioProcessor.configure_buffer_pool(
+        max_pooled_bytes=settings.buffer_pool_max_mb * 1024 * 1024,
+        idle_seconds=settings.buffer_pool_idle_seconds
+    )
+    AudioProcessor.configure_pipeline(settings.pipeline_depth)
+    
+    # Boot the encode/decode workers now so the first request doesn't pay for it
+    get_worker_pool().start()
+    print(f"⚙️ Worker processes: {settings.worker_processes}")
+    
+    # Re-queue background jobs left unfinished by the previous run
+    try:
+        print(f"🗂️ Jobs: {JobService.resume_pending()}")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not open the job store: {e}")
+    
+    # Drop ingest sessions that were never downloaded (or were cut off by a restart)
+    print(f"🎙️ Expired ingest sessions removed: {IngestService.purge_expired()}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop dispatching jobs and stop the worker processes."""
+    JobService.shutdown()
+    shutdown_worker_pool()
 
 # Include routers
 app.include_router(encode.router, prefix="/api/v1", tags=["Encode"])
 app.include_router(decode.router, prefix="/api/v1", tags=["Decode"])
+app.include_router(bundle.router, prefix="/api/v1", tags=["Bundle"])
+app.include_router(ingest.router, prefix="/api/v1", tags=["Ingest"])
+app.include_router(verify.router, prefix="/api/v1", tags=["Verify"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["Jobs"])
 
 
 @app.get("/", tags=["Health"])
@@ -86,7 +135,12 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "encode": "/api/v1/encode",
-            "decode": "/api/v1/decode"
+            "decode": "/api/v1/decode",
+            "bundle": "/api/v1/bundle",
+            "bundle_extract": "/api/v1/bundle/extract",
+            "ingest": "/api/v1/ingest (WebSocket)",
+            "verify": "/api/v1/verify",
+            "jobs": "/api/v1/jobs/encode"
         }
     }
 
@@ -97,7 +151,9 @@ async def health_check():
     return {
         "status": "healthy",
         "version": settings.app_version,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "buffer_pool": AudioProcessor.buffer_pool_stats(),
+        "worker_pool": get_worker_pool().stats()
     }
 
 
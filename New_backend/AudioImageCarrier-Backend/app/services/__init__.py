@@ -2,5 +2,8 @@
 
 from app.services.encode_service import EncodeService
 from app.services.decode_service import DecodeService
+from app.services.bundle_service import BundleService
+from app.services.ingest_service import IngestService
+from app.services.verify_service import VerifyService
 
-__all__ = ["EncodeService", "DecodeService"]
+__all__ = ["EncodeService", "DecodeService", "BundleService", "IngestService", "VerifyService"]
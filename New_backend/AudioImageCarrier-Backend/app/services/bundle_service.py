@@ -0,0 +1,160 @@
+"""Bundle service - Business logic for packing many recordings into bundle images."""
+
+from pathlib import Path
+from typing import Dict, List
+
+from app.core.audio_processor import AudioProcessor
+from app.core.config import settings
+from app.utils.file_handler import (
+    create_zip_archive,
+    get_file_size,
+    cleanup_directory,
+    create_temp_directory
+)
+from app.utils.validators import validate_audio_file, validate_zip_file
+
+
+class BundleService:
+    """Service for bundling many small recordings into shared carrier images."""
+
+    @staticmethod
+    def encode_files_to_bundle(
+        audio_file_paths: List[Path],
+        user_id: str,
+        master_key: str = None,
+        bundle_name: str = "bundle",
+        max_bundle_bytes: int = None,
+        compress: bool = True
+    ) -> Dict:
+        """
+        Pack several audio files into bundle images.
+
+        Args:
+            audio_file_paths: Paths to audio files (filenames must be unique)
+            user_id: User ID for encryption
+            master_key: Optional master key
+            bundle_name: Name used for bundle image filenames
+            max_bundle_bytes: Max raw audio bytes per bundle image
+            compress: Enable compression
+
+        Returns:
+            Dictionary with bundling results
+
+        Raises:
+            ValueError: If validation fails
+            RuntimeError: If encoding fails
+        """
+        if not audio_file_paths:
+            raise ValueError("No audio files provided")
+
+        if len(audio_file_paths) > settings.max_bundle_files:
+            raise ValueError(f"Too many files: {len(audio_file_paths)} (max {settings.max_bundle_files})")
+
+        total_size = 0
+        for path in audio_file_paths:
+            is_valid, error_msg = validate_audio_file(path, max_size=settings.max_upload_size_bytes)
+            if not is_valid:
+                raise ValueError(f"Invalid audio file {path.name}: {error_msg}")
+            total_size += get_file_size(path)
+
+        if total_size > settings.max_upload_size_bytes:
+            raise ValueError(f"Bundle too large: {total_size} bytes (max: {settings.max_upload_size_bytes})")
+
+        if max_bundle_bytes is None:
+            max_bundle_bytes = settings.default_max_chunk_bytes
+
+        temp_dir = create_temp_directory(prefix="bundle_")
+
+        try:
+            image_paths = AudioProcessor.encode_bundle(
+                input_files=audio_file_paths,
+                output_dir=temp_dir,
+                user_id=user_id,
+                master_hex=master_key,
+                bundle_name=bundle_name,
+                max_bundle_bytes=max_bundle_bytes,
+                compress=compress
+            )
+
+            zip_filename = f"{bundle_name}_bundle.zip"
+            zip_path = temp_dir / zip_filename
+            create_zip_archive(image_paths, zip_path)
+
+            return {
+                "success": True,
+                "user_id": user_id,
+                "bundle_name": bundle_name,
+                "total_members": len(audio_file_paths),
+                "original_size_bytes": total_size,
+                "total_images": len(image_paths),
+                "zip_filename": zip_filename,
+                "zip_path": zip_path,
+                "zip_size_bytes": get_file_size(zip_path),
+                "compressed": compress,
+                "temp_dir": temp_dir
+            }
+
+        except Exception as e:
+            cleanup_directory(temp_dir)
+            raise RuntimeError(f"Bundle encoding failed: {str(e)}") from e
+
+    @staticmethod
+    def extract_member_from_bundle(
+        images_zip_path: Path,
+        member_name: str,
+        user_id: str,
+        master_key: str = None
+    ) -> Dict:
+        """
+        Extract a single recording from a ZIP of bundle images.
+
+        Args:
+            images_zip_path: Path to ZIP containing bundle images
+            member_name: Filename of the recording to extract
+            user_id: User ID used for encoding
+            master_key: Optional master key
+
+        Returns:
+            Dictionary with extraction results
+
+        Raises:
+            ValueError: If validation fails
+            KeyError: If the bundle has no such member
+            RuntimeError: If extraction fails
+        """
+        is_valid, error_msg = validate_zip_file(
+            images_zip_path,
+            max_size=settings.max_upload_size_bytes * 2  # Allow larger ZIPs
+        )
+        if not is_valid:
+            raise ValueError(f"Invalid ZIP file: {error_msg}")
+
+        output_dir = create_temp_directory(prefix="bundle_")
+
+        try:
+            # Bundle images are read straight from the ZIP, one at a time
+            output_path = output_dir / member_name
+            AudioProcessor.extract_bundle_member(
+                zip_path=images_zip_path,
+                member_name=member_name,
+                output_file=output_path,
+                user_id=user_id,
+                master_hex=master_key
+            )
+
+            return {
+                "success": True,
+                "user_id": user_id,
+                "member_name": member_name,
+                "recovered_size_bytes": get_file_size(output_path),
+                "output_path": output_path,
+                "temp_dir": output_dir
+            }
+
+        except (ValueError, KeyError):
+            cleanup_directory(output_dir)
+            raise
+
+        except Exception as e:
+            cleanup_directory(output_dir)
+            raise RuntimeError(f"Bundle extraction failed: {str(e)}") from e
@@ -1,19 +1,20 @@
 """Decode service - Business logic for image to audio decoding."""
 
-import tempfile
 from pathlib import Path
-from typing import Dict
-import json
+from typing import Dict, Iterator, Optional, Union
 
 from app.core.audio_processor import AudioProcessor
 from app.core.config import settings
 from app.utils.file_handler import (
-    extract_zip_archive,
+    read_zip_bytes,
     get_file_size,
     cleanup_directory,
     create_temp_directory
 )
-from app.utils.validators import validate_zip_file
+from app.utils.parts_feed import read_parts
+from app.utils.validators import validate_zip_file, sanitize_filename
+
+IMAGE_EXTENSIONS = {'.png', '.tiff', '.tif'}
 
 
 class DecodeService:
@@ -37,7 +38,8 @@ class DecodeService:
             Dictionary with decoding results
             
         Raises:
-            ValueError: If validation fails
+            ValueError: If validation fails or the images cannot be decoded
+                (wrong key or user_id, tampered images, missing chunks)
             RuntimeError: If decoding fails
         """
         # Validate ZIP file
@@ -48,77 +50,249 @@ class DecodeService:
         if not is_valid:
             raise ValueError(f"Invalid ZIP file: {error_msg}")
         
-        # Create temporary directories
-        extract_dir = create_temp_directory(prefix="extract_")
         output_dir = create_temp_directory(prefix="decode_")
         
         try:
-            # Extract ZIP
-            extracted_files = extract_zip_archive(images_zip_path, extract_dir)
+            # Images are inflated straight from the ZIP members; nothing is extracted
+            partial_path = output_dir / ".recovered.partial"
+            result = AudioProcessor.decode_zip(
+                zip_path=images_zip_path,
+                output_file=partial_path,
+                user_id=user_id,
+                master_hex=master_key,
+                store_dir=Path(settings.chunk_store_dir),
+                retries=settings.job_retries
+            )
+            return DecodeService._decode_result(result, partial_path, output_dir, user_id)
             
-            if not extracted_files:
-                raise ValueError("ZIP archive is empty")
+        except Exception as e:
+            cleanup_directory(output_dir)
+            if isinstance(e, ValueError):
+                raise
+            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def plan_decode(
+        images_zip_path: Path,
+        user_id: str,
+        master_key: str = None
+    ) -> Dict:
+        """
+        Lay out the recording in an images ZIP so byte ranges of it can be
+        decoded with iter_decode_range (nothing is decrypted here).
+        
+        Args:
+            images_zip_path: Path to ZIP containing images
+            user_id: User ID used for encoding
+            master_key: Optional master key
             
-            # Try to get metadata from first image
-            metadata = {}
-            original_filename = "recovered_audio.wav"
-            total_chunks = len([f for f in extracted_files if f.suffix.lower() in {'.png', '.tiff', '.tif'}])
-            compressed = False
+        Returns:
+            Dictionary with the recording's description and its "plan"
             
-            try:
-                from PIL import Image
-                import numpy as np
-                
-                first_image = next((f for f in extracted_files if f.suffix.lower() in {'.png', '.tiff', '.tif'}), None)
-                if first_image:
-                    img = Image.open(first_image).convert("RGB")
-                    arr = np.asarray(img, dtype=np.uint8)
-                    flat = arr.reshape(-1, 3).astype(np.uint8).flatten().tobytes()
-                    
-                    if len(flat) >= 1024:
-                        hdr_len = int.from_bytes(flat[0:4], "little")
-                        if 0 < hdr_len <= 1024:
-                            header_json = flat[4:4+hdr_len]
-                            header = json.loads(header_json.decode('utf8'))
-                            
-                            original_filename = header.get("orig_filename", original_filename)
-                            total_chunks = header.get("orig_total_chunks", total_chunks)
-                            compressed = header.get("compressed", False)
-                            
-                            metadata = {
-                                "version": header.get("version"),
-                                "timestamp": header.get("ts"),
-                                "magic": header.get("magic")
-                            }
-            except Exception:
-                pass  # Use defaults if metadata extraction fails
+        Raises:
+            ValueError: If validation fails or the images are not one complete recording
+            RuntimeError: If reading the ZIP fails
+        """
+        is_valid, error_msg = validate_zip_file(
+            images_zip_path,
+            max_size=settings.max_upload_size_bytes * 2  # Allow larger ZIPs
+        )
+        if not is_valid:
+            raise ValueError(f"Invalid ZIP file: {error_msg}")
+        
+        plan = AudioProcessor.plan_zip_recording(
+            zip_path=images_zip_path,
+            user_id=user_id,
+            master_hex=master_key,
+            store_dir=Path(settings.chunk_store_dir)
+        )
+        info = plan["info"]
+        return {
+            "user_id": user_id,
+            "original_filename": sanitize_filename(plan.get("orig_filename") or "recovered_audio.wav"),
+            "recovered_size_bytes": plan["size"],
+            "total_chunks_decoded": len(plan["chunks"]),
+            "compressed": info.get("compressed", False),
+            "metadata": {
+                "version": info.get("version"),
+                "timestamp": info.get("ts"),
+                "magic": info.get("magic")
+            },
+            "plan": plan
+        }
+    
+    @staticmethod
+    def iter_decode_range(
+        images_zip_path: Path,
+        plan: Dict,
+        user_id: str,
+        master_key: str = None,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Decode bytes [start, end) of a recording planned by plan_decode,
+        decrypting only the chunks that cover them.
+        
+        Args:
+            images_zip_path: Path to ZIP containing images
+            plan: "plan" from plan_decode
+            user_id: User ID used for encoding
+            master_key: Optional master key
+            start: First byte of the range
+            end: End of the range (exclusive; None for the end of the recording)
             
-            # Decode images to audio
-            output_audio_path = output_dir / original_filename
-            AudioProcessor.decode_images(
-                input_dir=extract_dir,
-                output_file=output_audio_path,
-                user_id=user_id,
-                master_hex=master_key
-            )
+        Yields:
+            Recovered audio bytes, as each covering chunk is authenticated
             
-            # Get recovered file size
-            recovered_size = get_file_size(output_audio_path)
+        Raises:
+            ValueError: If a chunk cannot be decoded (wrong key, tampered image)
+            RuntimeError: If decoding fails
+        """
+        yield from AudioProcessor.iter_decode_range(
+            zip_path=images_zip_path,
+            plan=plan,
+            user_id=user_id,
+            master_hex=master_key,
+            start=start,
+            end=end,
+            store_dir=Path(settings.chunk_store_dir)
+        )
+    
+    @staticmethod
+    def iter_decode_image_parts(
+        stream,
+        total_images: int,
+        user_id: str,
+        master_key: str = None
+    ) -> Iterator[Union[Dict, bytes]]:
+        """
+        Decode images uploaded as individual files, read from a PartsFeed
+        (no ZIP, no extraction), yielding the recovered audio as each chunk
+        is authenticated.
+        
+        Standard chunk sets and append-mode streams are supported; a sealed
+        stream's manifest may be included as one of the parts.
+        
+        Args:
+            stream: Binary stream of the framed parts (e.g. a worker's feed reader)
+            total_images: Number of image parts (a standard set missing some is rejected up front)
+            user_id: User ID used for encoding
+            master_key: Optional master key
             
-            return {
-                "success": True,
-                "user_id": user_id,
-                "original_filename": original_filename,
-                "recovered_size_bytes": recovered_size,
-                "total_chunks_decoded": total_chunks,
-                "compressed": compressed,
-                "metadata": metadata,
-                "output_path": output_audio_path,
-                "temp_dir": output_dir,
-                "extract_dir": extract_dir
-            }
+        Yields:
+            A dictionary describing the recording (once the first chunk is
+            authenticated), then recovered audio bytes in order
             
-        except Exception as e:
-            cleanup_directory(extract_dir)
-            cleanup_directory(output_dir)
-            raise RuntimeError(f"Decoding failed: {str(e)}") from e
+        Raises:
+            ValueError: If validation fails or the images cannot be decoded
+                (wrong key or user_id, tampered images, not one complete recording)
+            RuntimeError: If decoding fails
+        """
+        if not total_images:
+            raise ValueError("No PNG/TIFF images found in upload")
+        
+        chunks = AudioProcessor.iter_decode_members(
+            read_parts(stream),
+            user_id=user_id,
+            master_hex=master_key,
+            total_images=total_images
+        )
+        described = False
+        try:
+            for header, plaintext in chunks:
+                if not described:
+                    described = True
+                    yield {
+                        "original_filename": sanitize_filename(header.get("orig_filename") or "recovered_audio.wav"),
+                        "total_chunks": header.get("orig_total_chunks", total_images),
+                        "compressed": header.get("compressed", False)
+                    }
+                yield plaintext
+        finally:
+            chunks.close()
+    
+    @staticmethod
+    def _decode_result(result: Dict, partial_path: Path, output_dir: Path, user_id: str) -> Dict:
+        """Name the recovered file after the recording and describe it."""
+        original_filename = sanitize_filename(result.get("orig_filename") or "recovered_audio.wav")
+        output_audio_path = output_dir / original_filename
+        partial_path.replace(output_audio_path)
+        
+        # Chunk header for fixed/stream sets, the manifest for CDC sets
+        info = result.get("header") or result.get("manifest") or {}
+        return {
+            "success": True,
+            "user_id": user_id,
+            "original_filename": original_filename,
+            "recovered_size_bytes": get_file_size(output_audio_path),
+            "total_chunks_decoded": result["total_chunks"],
+            "compressed": info.get("compressed", False),
+            "metadata": {
+                "version": info.get("version"),
+                "timestamp": info.get("ts"),
+                "magic": info.get("magic")
+            },
+            "output_path": output_audio_path,
+            "temp_dir": output_dir
+        }
+    
+    @staticmethod
+    def decode_images_zip_bytes(
+        zip_bytes: bytes,
+        user_id: str,
+        master_key: str = None
+    ) -> Optional[Dict]:
+        """
+        Decode a ZIP of images held in memory, without temp files.
+        
+        Only plain image sets (fixed chunks or unsealed stream chunks) can be
+        decoded this way; sets that carry a manifest (CDC, sealed streams) need
+        the chunk store or file-based checks, so None is returned and the
+        caller falls back to decode_images_to_audio.
+        
+        Args:
+            zip_bytes: ZIP file content
+            user_id: User ID used for encoding
+            master_key: Optional master key
+            
+        Returns:
+            Dictionary with decoding results ("audio_bytes" instead of
+            "output_path"), or None if the set needs the file-based path
+            
+        Raises:
+            ValueError: If validation fails
+            RuntimeError: If decoding fails
+        """
+        if not zip_bytes:
+            raise ValueError("Invalid ZIP file: File is empty")
+        if len(zip_bytes) > settings.max_upload_size_bytes * 2:
+            raise ValueError(f"Invalid ZIP file: File too large: {len(zip_bytes)} bytes")
+        
+        members = read_zip_bytes(zip_bytes)
+        if not members:
+            raise ValueError("ZIP archive is empty")
+        if any(Path(name).suffix.lower() == ".json" for name, _ in members):
+            return None
+        
+        images = [(name, data) for name, data in members if Path(name).suffix.lower() in IMAGE_EXTENSIONS]
+        if not images:
+            raise ValueError("No PNG/TIFF images found in ZIP archive")
+        
+        audio_bytes = AudioProcessor.decode_bytes(images, user_id=user_id, master_hex=master_key)
+        header = AudioProcessor.read_image_header(images[0][1])
+        
+        return {
+            "success": True,
+            "user_id": user_id,
+            "original_filename": sanitize_filename(header.get("orig_filename", "recovered_audio.wav")),
+            "recovered_size_bytes": len(audio_bytes),
+            "total_chunks_decoded": header.get("orig_total_chunks", len(images)),
+            "compressed": header.get("compressed", False),
+            "metadata": {
+                "version": header.get("version"),
+                "timestamp": header.get("ts"),
+                "magic": header.get("magic")
+            },
+            "audio_bytes": audio_bytes
+        }
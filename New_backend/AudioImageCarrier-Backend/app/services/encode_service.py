@@ -1,19 +1,21 @@
 """Encode service - Business logic for audio to image encoding."""
 
+import io
 import tempfile
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
 from app.core.audio_processor import AudioProcessor
 from app.core.config import settings
 from app.utils.file_handler import (
     create_zip_archive,
+    create_zip_bytes,
     get_image_dimensions,
     get_file_size,
     cleanup_directory,
     create_temp_directory
 )
-from app.utils.validators import validate_audio_file
+from app.utils.validators import validate_audio_file, validate_audio_upload
 
 
 class EncodeService:
@@ -26,7 +28,9 @@ class EncodeService:
         master_key: str = None,
         max_chunk_bytes: int = None,
         compress: bool = True,
-        delete_source: bool = False
+        delete_source: bool = False,
+        chunking: str = "fixed",
+        progress: Optional[Callable[[int, int], None]] = None
     ) -> Dict:
         """
         Encode audio file to encrypted images.
@@ -38,6 +42,9 @@ class EncodeService:
             max_chunk_bytes: Max bytes per chunk
             compress: Enable compression
             delete_source: Delete source after encoding
+            chunking: "fixed" (split every max_chunk_bytes) or "cdc"
+                (content-defined chunks deduplicated in the user's chunk store)
+            progress: Called with (chunks_done, total_chunks) as images are written
             
         Returns:
             Dictionary with encoding results
@@ -54,6 +61,9 @@ class EncodeService:
         if not is_valid:
             raise ValueError(f"Invalid audio file: {error_msg}")
         
+        if chunking not in ("fixed", "cdc"):
+            raise ValueError(f"Invalid chunking mode: {chunking} (expected 'fixed' or 'cdc')")
+        
         # Set defaults
         if max_chunk_bytes is None:
             max_chunk_bytes = settings.default_max_chunk_bytes
@@ -72,41 +82,80 @@ class EncodeService:
                 duration = AudioProcessor.get_wav_duration(audio_file_path)
             
             # Encode to images
-            image_paths = AudioProcessor.encode_audio(
-                input_file=audio_file_path,
-                output_dir=temp_dir,
-                user_id=user_id,
-                master_hex=master_key,
-                max_chunk_bytes=max_chunk_bytes,
-                compress=compress
-            )
-            
-            # Collect image information
-            images_info = []
-            for idx, img_path in enumerate(image_paths):
-                width, height = get_image_dimensions(img_path)
-                size = get_file_size(img_path)
-                
-                images_info.append({
-                    "filename": img_path.name,
-                    "size_bytes": size,
-                    "width": width,
-                    "height": height,
-                    "chunk_index": idx,
-                    "total_chunks": len(image_paths)
-                })
-            
-            # Create ZIP archive
             zip_filename = f"{audio_file_path.stem}_images.zip"
             zip_path = temp_dir / zip_filename
-            create_zip_archive(image_paths, zip_path)
+            images_info = []
+            cdc_result = None
+            if chunking == "cdc":
+                cdc_result = AudioProcessor.encode_audio_cdc(
+                    input_file=audio_file_path,
+                    output_dir=temp_dir,
+                    user_id=user_id,
+                    master_hex=master_key,
+                    store_dir=Path(settings.chunk_store_dir),
+                    avg_chunk_bytes=settings.cdc_avg_chunk_bytes,
+                    compress=compress
+                )
+                image_paths = cdc_result["images"]
+                if progress:
+                    progress(cdc_result["total_chunks"], cdc_result["total_chunks"])
+                
+                # Collect image information
+                for idx, img_path in enumerate(image_paths):
+                    width, height = get_image_dimensions(img_path)
+                    size = get_file_size(img_path)
+                    
+                    images_info.append({
+                        "filename": img_path.name,
+                        "size_bytes": size,
+                        "width": width,
+                        "height": height,
+                        "chunk_index": idx,
+                        "total_chunks": len(image_paths)
+                    })
+                
+                # Create ZIP archive
+                create_zip_archive([cdc_result["manifest"]] + image_paths, zip_path)
+            else:
+                image_paths = []
+                
+                def encoded_images():
+                    # Each image is zipped as soon as it is written, while later chunks encode
+                    for img_path, meta in AudioProcessor.iter_encode_audio(
+                        input_file=audio_file_path,
+                        output_dir=temp_dir,
+                        user_id=user_id,
+                        master_hex=master_key,
+                        max_chunk_bytes=max_chunk_bytes,
+                        compress=compress,
+                        retries=settings.job_retries
+                    ):
+                        images_info.append({
+                            "filename": img_path.name,
+                            "size_bytes": get_file_size(img_path),
+                            "width": meta["width"],
+                            "height": meta["height"],
+                            "chunk_index": meta["chunk_index"],
+                            "total_chunks": meta["total_chunks"]
+                        })
+                        image_paths.append(img_path)
+                        if progress:
+                            progress(meta["chunk_index"] + 1, meta["total_chunks"])
+                        yield img_path
+                
+                create_zip_archive(encoded_images(), zip_path)
             zip_size = get_file_size(zip_path)
             
             # Prepare metadata
             metadata = {
                 "audio_format": audio_file_path.suffix.lower(),
                 "total_chunks": len(image_paths),
+                "chunking": chunking,
             }
+            if cdc_result is not None:
+                metadata["total_chunks"] = cdc_result["total_chunks"]
+                metadata["new_chunks"] = cdc_result["new_chunks"]
+                metadata["reused_chunks"] = cdc_result["reused_chunks"]
             if duration is not None:
                 metadata["duration_seconds"] = round(duration, 2)
             
@@ -137,3 +186,141 @@ class EncodeService:
         except Exception as e:
             cleanup_directory(temp_dir)
             raise RuntimeError(f"Encoding failed: {str(e)}") from e
+    
+    @staticmethod
+    def iter_encode_images(
+        stream,
+        size: int,
+        filename: str,
+        user_id: str,
+        master_key: str = None,
+        max_chunk_bytes: int = None,
+        compress: bool = True
+    ) -> Iterator[Tuple[str, bytes, Dict]]:
+        """
+        Encode an upload read from a stream (fixed chunking), yielding each
+        image in memory as soon as it is packed, for responses that stream the ZIP.
+        
+        Args:
+            stream: Binary stream of the upload (e.g. a worker's feed reader)
+            size: Upload size in bytes
+            filename: Sanitized upload filename
+            user_id: User ID for encryption
+            master_key: Optional master key
+            max_chunk_bytes: Max bytes per chunk
+            compress: Enable compression
+            
+        Yields:
+            (image filename, PNG bytes, chunk metadata) in chunk order
+            
+        Raises:
+            ValueError: If validation fails or the stream does not hold size bytes
+            RuntimeError: If encoding fails
+        """
+        is_valid, error_msg = validate_audio_upload(
+            filename,
+            size,
+            max_size=settings.max_upload_size_bytes
+        )
+        if not is_valid:
+            raise ValueError(f"Invalid audio file: {error_msg}")
+        
+        yield from AudioProcessor.iter_encode_stream(
+            stream=stream,
+            size=size,
+            filename=filename,
+            user_id=user_id,
+            master_hex=master_key,
+            max_chunk_bytes=max_chunk_bytes or settings.default_max_chunk_bytes,
+            compress=compress
+        )
+    
+    @staticmethod
+    def encode_audio_bytes(
+        data: bytes,
+        filename: str,
+        user_id: str,
+        master_key: str = None,
+        max_chunk_bytes: int = None,
+        compress: bool = True
+    ) -> Dict:
+        """
+        Encode an audio upload held in memory (fixed chunking only).
+        
+        Produces the same images and ZIP as encode_audio_to_images, but the
+        upload, images and ZIP never touch the filesystem.
+        
+        Args:
+            data: Audio file content
+            filename: Sanitized upload filename
+            user_id: User ID for encryption
+            master_key: Optional master key
+            max_chunk_bytes: Max bytes per chunk
+            compress: Enable compression
+            
+        Returns:
+            Dictionary with encoding results ("zip_bytes" instead of "zip_path")
+            
+        Raises:
+            ValueError: If validation fails
+            RuntimeError: If encoding fails
+        """
+        is_valid, error_msg = validate_audio_upload(
+            filename,
+            len(data),
+            max_size=settings.max_upload_size_bytes
+        )
+        if not is_valid:
+            raise ValueError(f"Invalid audio file: {error_msg}")
+        
+        if max_chunk_bytes is None:
+            max_chunk_bytes = settings.default_max_chunk_bytes
+        
+        images = AudioProcessor.encode_bytes(
+            data=data,
+            filename=filename,
+            user_id=user_id,
+            master_hex=master_key,
+            max_chunk_bytes=max_chunk_bytes,
+            compress=compress
+        )
+        
+        images_info = [
+            {
+                "filename": name,
+                "size_bytes": len(png),
+                "width": meta["width"],
+                "height": meta["height"],
+                "chunk_index": idx,
+                "total_chunks": len(images)
+            }
+            for idx, (name, png, meta) in enumerate(images)
+        ]
+        
+        zip_filename = f"{Path(filename).stem}_images.zip"
+        zip_bytes = create_zip_bytes([(name, png) for name, png, _ in images])
+        
+        metadata = {
+            "audio_format": Path(filename).suffix.lower(),
+            "total_chunks": len(images),
+            "chunking": "fixed",
+        }
+        if Path(filename).suffix.lower() == '.wav':
+            duration = AudioProcessor.get_wav_duration(io.BytesIO(data))
+            if duration is not None:
+                metadata["duration_seconds"] = round(duration, 2)
+        
+        return {
+            "success": True,
+            "user_id": user_id,
+            "original_filename": filename,
+            "original_size_bytes": len(data),
+            "total_images": len(images),
+            "images": images_info,
+            "zip_filename": zip_filename,
+            "zip_bytes": zip_bytes,
+            "zip_size_bytes": len(zip_bytes),
+            "master_key_used": "provided" if master_key else "environment",
+            "compressed": compress,
+            "metadata": metadata
+        }
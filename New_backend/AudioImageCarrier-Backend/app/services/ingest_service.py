@@ -0,0 +1,209 @@
+"""Ingest service - Business logic for encoding live audio segment by segment."""
+
+import re
+import time
+import uuid
+import secrets
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import run_job
+from app.utils.file_handler import create_zip_archive, get_file_size, cleanup_directory
+
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class IngestSession:
+    """
+    One live recording. Each segment is encrypted into the next chunk of an
+    append-mode stream as soon as it is cut, so finishing only has to seal
+    the stream and zip the images that already exist. The encryption and
+    packing run on the worker pool; the session only keeps the stream state.
+    """
+
+    def __init__(self, user_id: str, filename: str, master_key: str = None, compress: bool = True):
+        audio_module.validate_orig_filename(filename)
+        self.session_id = uuid.uuid4().hex
+        self.stream_id = secrets.token_hex(8)
+        self.user_id = user_id
+        self.filename = filename
+        self.master_key = master_key
+        self.compress = compress
+        self.output_dir = IngestService.session_dir(self.session_id)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.seq = 0
+        self.size_bytes = 0
+        self.images = []
+
+        audio_module.get_master_key(master_key)  # reject a bad key before any audio arrives
+
+    async def encode_segment(self, segment: bytes) -> Dict:
+        """
+        Encrypt one segment into the next stream image on the worker pool.
+        Segments must be encoded one at a time, in order.
+
+        Returns:
+            Dictionary describing the written image
+        """
+        info = await run_job(
+            IngestService.encode_segment,
+            output_dir=self.output_dir,
+            segment=segment,
+            user_id=self.user_id,
+            master_key=self.master_key,
+            filename=self.filename,
+            stream_id=self.stream_id,
+            seq=self.seq,
+            offset=self.size_bytes,
+            compress=self.compress
+        )
+        self.images.append(self.output_dir / info["image"])
+        self.seq += 1
+        self.size_bytes += len(segment)
+        return info
+
+    async def finish(self) -> Dict:
+        """
+        Seal the stream and package manifest plus images into a ZIP.
+
+        Returns:
+            Dictionary with session results
+
+        Raises:
+            ValueError: If no audio was received
+        """
+        if not self.images:
+            raise ValueError("No audio received")
+        zip_filename = f"{Path(self.filename).stem}_images.zip"
+        zip_path = self.output_dir / zip_filename
+        await run_job(
+            IngestService.seal_session,
+            output_dir=self.output_dir,
+            images=self.images,
+            zip_path=zip_path,
+            user_id=self.user_id,
+            master_key=self.master_key,
+            stream_id=self.stream_id
+        )
+        IngestService._live.discard(self.session_id)  # from now on it expires like any finished session
+        return {
+            "session_id": self.session_id,
+            "stream_id": self.stream_id,
+            "total_chunks": self.seq,
+            "size_bytes": self.size_bytes,
+            "zip_filename": zip_filename,
+            "zip_size_bytes": get_file_size(zip_path)
+        }
+
+    def abort(self) -> None:
+        """Discard everything written for this session."""
+        IngestService._live.discard(self.session_id)
+        cleanup_directory(self.output_dir)
+
+
+class IngestService:
+    """Service for live ingest sessions and their finished image sets."""
+
+    # Sessions still recording in this process (never expired, however long they idle)
+    _live = set()
+
+    @staticmethod
+    def session_dir(session_id: str) -> Path:
+        """Working directory of an ingest session."""
+        return Path(settings.temp_dir) / f"ingest_{session_id}"
+
+    @staticmethod
+    def encode_segment(
+        output_dir: Path,
+        segment: bytes,
+        user_id: str,
+        master_key: Optional[str],
+        filename: str,
+        stream_id: str,
+        seq: int,
+        offset: int,
+        compress: bool = True
+    ) -> Dict:
+        """
+        Encrypt one segment into stream image `seq` (blocking; see IngestSession.encode_segment).
+
+        Returns:
+            Dictionary describing the written image
+        """
+        master = audio_module.get_master_key(master_key)
+        aead = audio_module.UserCipher(audio_module.derive_user_key(master, user_id))
+        payload, _ = audio_module.build_stream_chunk_payload(
+            segment, aead, user_id, filename, stream_id, seq, offset, compress=compress
+        )
+        image_path = output_dir / audio_module.stream_image_name(filename, seq)
+        width, height = audio_module.save_payload_image(payload, image_path, pool=audio_module.BUFFER_POOL)
+        return {
+            "seq": seq,
+            "bytes": len(segment),
+            "image": image_path.name,
+            "width": width,
+            "height": height
+        }
+
+    @staticmethod
+    def seal_session(
+        output_dir: Path,
+        images: List[Path],
+        zip_path: Path,
+        user_id: str,
+        master_key: Optional[str],
+        stream_id: str
+    ) -> None:
+        """Write the sealed stream manifest and zip it with the images (blocking; see IngestSession.finish)."""
+        manifest = audio_module.seal_stream(output_dir, user_id, master_hex=master_key, stream_id=stream_id)
+        create_zip_archive([manifest] + images, zip_path)
+
+    @staticmethod
+    def start_session(user_id: str, filename: str, master_key: str = None, compress: bool = True) -> IngestSession:
+        """
+        Start a new live recording.
+
+        Raises:
+            ValueError: If the filename or master key is invalid
+        """
+        IngestService.purge_expired()
+        session = IngestSession(user_id, filename, master_key=master_key, compress=compress)
+        IngestService._live.add(session.session_id)
+        return session
+
+    @staticmethod
+    def get_result_zip(session_id: str) -> Optional[Path]:
+        """Return the ZIP of a finished session, or None if there is none (or it expired)."""
+        if not SESSION_ID_PATTERN.match(session_id):
+            return None
+        IngestService.purge_expired()
+        session_dir = IngestService.session_dir(session_id)
+        if not session_dir.is_dir():
+            return None
+        return next(iter(sorted(session_dir.glob("*_images.zip"))), None)
+
+    @staticmethod
+    def purge_expired() -> int:
+        """
+        Delete session directories untouched for settings.ingest_result_ttl_seconds:
+        results nobody downloaded, and sessions left behind by a previous
+        server process. Returns how many were deleted.
+        """
+        root = Path(settings.temp_dir)
+        if not root.is_dir():
+            return 0
+        cutoff = time.time() - settings.ingest_result_ttl_seconds
+        purged = 0
+        for session_dir in root.glob("ingest_*"):
+            if session_dir.name[len("ingest_"):] in IngestService._live or not session_dir.is_dir():
+                continue
+            try:
+                if session_dir.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            cleanup_directory(session_dir)
+            purged += 1
+        return purged
@@ -0,0 +1,332 @@
+"""Job service - Background encodes tracked in a local SQLite store."""
+
+import json
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.worker_pool import WorkerCrashed, get_worker_pool
+from app.services.encode_service import EncodeService
+from app.utils.file_handler import cleanup_directory
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    params TEXT NOT NULL,
+    key_in_env INTEGER NOT NULL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    total_chunks INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL
+)
+"""
+
+
+class JobStore:
+    """
+    The jobs table. Every call opens its own connection, so the API process
+    and the worker processes running the jobs can all update it.
+    Master keys are never stored.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            conn.row_factory = sqlite3.Row
+            with conn:
+                conn.execute(_SCHEMA)
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["key_in_env"] = bool(job["key_in_env"])
+        return job
+
+    def insert(self, job: Dict) -> None:
+        row = dict(job, params=json.dumps(job["params"]), key_in_env=int(job["key_in_env"]))
+        columns = ", ".join(row)
+        self._execute(f"INSERT INTO jobs ({columns}) VALUES ({', '.join('?' * len(row))})", tuple(row.values()))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    def update(self, job_id: str, **fields) -> None:
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def delete(self, job_id: str) -> None:
+        self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def unfinished(self) -> List[Dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING))
+        return [self._to_dict(row) for row in rows]
+
+    def expired(self, now: float) -> List[str]:
+        rows = self._execute("SELECT job_id FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        return [row["job_id"] for row in rows]
+
+
+class JobService:
+    """
+    Service for encode jobs that outlive the request that submitted them.
+
+    The upload is saved under settings.jobs_dir/<job_id>/ and the encode runs
+    on the worker pool; the worker records per-chunk progress in the job
+    store as each image is written. Finished jobs (and their result ZIP) are
+    kept for settings.job_result_ttl_seconds.
+    """
+
+    _runner: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    _stopping = False
+
+    @staticmethod
+    def store() -> JobStore:
+        return JobStore(Path(settings.jobs_dir) / "jobs.db")
+
+    @staticmethod
+    def job_dir(job_id: str) -> Path:
+        """Working directory of a job (upload, then result)."""
+        return Path(settings.jobs_dir) / job_id
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def input_path(job_id: str, filename: str) -> Path:
+        """Where the route saves the uploaded audio of a job."""
+        return JobService.job_dir(job_id) / "input" / filename
+
+    @staticmethod
+    def submit_encode(
+        job_id: str,
+        filename: str,
+        user_id: str,
+        master_key: str = None,
+        max_chunk_bytes: int = None,
+        compress: bool = True,
+        chunking: str = "fixed"
+    ) -> Dict:
+        """
+        Record an encode job for the upload saved at input_path(job_id, filename)
+        and queue it.
+
+        Returns:
+            The new job (see describe)
+        """
+        JobService.purge_expired()
+        job = {
+            "job_id": job_id,
+            "kind": "encode",
+            "status": QUEUED,
+            "user_id": user_id,
+            "filename": filename,
+            "params": {"max_chunk_bytes": max_chunk_bytes, "compress": compress, "chunking": chunking},
+            "key_in_env": not master_key,
+            "created_at": time.time()
+        }
+        JobService.store().insert(job)
+        JobService._dispatch(job_id, master_key)
+        return JobService.describe(JobService.store().get(job_id))
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict]:
+        """Return a job, or None if it is unknown or expired."""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        JobService.purge_expired()
+        return JobService.store().get(job_id)
+
+    @staticmethod
+    def get_result_zip(job: Dict) -> Optional[Path]:
+        """Return the result ZIP of a finished job, or None if it has none."""
+        if job["status"] != DONE:
+            return None
+        zip_path = JobService.job_dir(job["job_id"]) / "result" / job["result"]["zip_filename"]
+        return zip_path if zip_path.is_file() else None
+
+    @staticmethod
+    def delete_job(job_id: str) -> None:
+        JobService.store().delete(job_id)
+        cleanup_directory(JobService.job_dir(job_id))
+
+    @staticmethod
+    def purge_expired() -> int:
+        """Delete jobs whose result TTL has passed. Returns how many were deleted."""
+        expired = JobService.store().expired(time.time())
+        for job_id in expired:
+            JobService.delete_job(job_id)
+        return len(expired)
+
+    @staticmethod
+    def describe(job: Dict) -> Dict:
+        """Public view of a job, as returned by the status endpoint."""
+        def timestamp(value):
+            return datetime.utcfromtimestamp(value).isoformat() if value else None
+
+        total = job["total_chunks"]
+        return {
+            "job_id": job["job_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "user_id": job["user_id"],
+            "filename": job["filename"],
+            "progress": {
+                "chunks_done": job["chunks_done"],
+                "total_chunks": total,
+                "percent": round(100.0 * job["chunks_done"] / total, 1) if total else 0.0
+            },
+            "result": job["result"],
+            "error": job["error"],
+            "created_at": timestamp(job["created_at"]),
+            "started_at": timestamp(job["started_at"]),
+            "finished_at": timestamp(job["finished_at"]),
+            "expires_at": timestamp(job["expires_at"])
+        }
+
+    @staticmethod
+    def resume_pending() -> Dict:
+        """
+        Pick up jobs left queued or running by a previous server process.
+        Jobs using the environment master key are run again; jobs submitted
+        with their own master_key cannot be (the key was only held in memory)
+        and are marked failed.
+        """
+        JobService._stopping = False
+        purged = JobService.purge_expired()
+        resumed = failed = 0
+        for job in JobService.store().unfinished():
+            if job["key_in_env"]:
+                JobService.store().update(job["job_id"], status=QUEUED, chunks_done=0)
+                JobService._dispatch(job["job_id"], None)
+                resumed += 1
+            else:
+                JobService._fail(job["job_id"], "Interrupted by a server restart; resubmit the job "
+                                                "(its master_key is not stored)")
+                failed += 1
+        return {"resumed": resumed, "failed": failed, "purged": purged}
+
+    @staticmethod
+    def shutdown() -> None:
+        """Stop dispatching; jobs still running are picked up by resume_pending on the next start."""
+        with JobService._lock:
+            JobService._stopping = True
+            if JobService._runner is not None:
+                JobService._runner.shutdown(wait=False)
+                JobService._runner = None
+
+    @staticmethod
+    def _dispatch(job_id: str, master_key: Optional[str]) -> None:
+        with JobService._lock:
+            if JobService._runner is None:
+                JobService._runner = ThreadPoolExecutor(max_workers=max(1, settings.worker_processes),
+                                                        thread_name_prefix="job-runner")
+            JobService._runner.submit(JobService._run, job_id, master_key)
+
+    @staticmethod
+    def _run(job_id: str, master_key: Optional[str]) -> None:
+        """Runner thread: execute a job on the worker pool, retrying if its worker dies."""
+        attempt = 0
+        while not JobService._stopping:
+            try:
+                get_worker_pool().call(JobService.execute, job_id, master_key,
+                                       timeout=settings.background_job_timeout_seconds)
+                return
+            except WorkerCrashed as e:
+                if JobService._stopping:
+                    return
+                if attempt >= settings.job_retries:
+                    JobService._fail(job_id, str(e))
+                    return
+                attempt += 1
+                JobService.store().update(job_id, status=QUEUED, chunks_done=0)
+            except Exception as e:
+                JobService._fail(job_id, str(e))
+                return
+
+    @staticmethod
+    def execute(job_id: str, master_key: Optional[str]) -> None:
+        """Worker side: encode a queued job, recording progress and the outcome in the store."""
+        store = JobService.store()
+        job = store.get(job_id)
+        if job is None:
+            return  # deleted while queued
+        store.update(job_id, status=RUNNING, started_at=time.time(), chunks_done=0, error=None)
+
+        def progress(done: int, total: int) -> None:
+            store.update(job_id, chunks_done=done, total_chunks=total)
+
+        job_dir = JobService.job_dir(job_id)
+        try:
+            result = EncodeService.encode_audio_to_images(
+                audio_file_path=JobService.input_path(job_id, job["filename"]),
+                user_id=job["user_id"],
+                master_key=master_key,
+                progress=progress,
+                **job["params"]
+            )
+            result_dir = job_dir / "result"
+            result_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(result["zip_path"]), str(result_dir / result["zip_filename"]))
+            cleanup_directory(result["temp_dir"])
+            cleanup_directory(job_dir / "input")
+            finished = time.time()
+            store.update(
+                job_id,
+                status=DONE,
+                chunks_done=result["metadata"]["total_chunks"],
+                total_chunks=result["metadata"]["total_chunks"],
+                result={
+                    "zip_filename": result["zip_filename"],
+                    "zip_size_bytes": result["zip_size_bytes"],
+                    "total_images": result["total_images"],
+                    "original_size_bytes": result["original_size_bytes"],
+                    "compressed": result["compressed"],
+                    "chunking": result["metadata"]["chunking"],
+                    "reused_chunks": result["metadata"].get("reused_chunks", 0)
+                },
+                finished_at=finished,
+                expires_at=finished + settings.job_result_ttl_seconds
+            )
+        except Exception as e:
+            JobService._fail(job_id, str(e))
+
+    @staticmethod
+    def _fail(job_id: str, error: str) -> None:
+        finished = time.time()
+        JobService.store().update(job_id, status=FAILED, error=error, finished_at=finished,
+                                  expires_at=finished + settings.job_result_ttl_seconds)
+        cleanup_directory(JobService.job_dir(job_id) / "input")
@@ -0,0 +1,73 @@
+"""Verify service - Business logic for auditing image archives without decoding to disk."""
+
+from pathlib import Path
+from typing import Dict
+
+from app.core.audio_processor import AudioProcessor
+from app.core.config import settings
+from app.utils.file_handler import (
+    extract_zip_archive,
+    cleanup_directory,
+    create_temp_directory
+)
+from app.utils.validators import validate_zip_file
+
+
+class VerifyService:
+    """Service for integrity audits of encrypted image archives."""
+
+    @staticmethod
+    def verify_images_zip(
+        images_zip_path: Path,
+        user_id: str,
+        master_key: str = None
+    ) -> Dict:
+        """
+        Authenticate every chunk in a ZIP of images and check chunk coverage.
+
+        Args:
+            images_zip_path: Path to ZIP containing images
+            user_id: User ID used for encoding
+            master_key: Optional master key
+
+        Returns:
+            Dictionary with overall status and per-recording reports
+
+        Raises:
+            ValueError: If validation fails
+            RuntimeError: If verification cannot run
+        """
+        is_valid, error_msg = validate_zip_file(
+            images_zip_path,
+            max_size=settings.max_upload_size_bytes * 2  # Allow larger ZIPs
+        )
+        if not is_valid:
+            raise ValueError(f"Invalid ZIP file: {error_msg}")
+
+        extract_dir = create_temp_directory(prefix="verify_")
+
+        try:
+            extracted_files = extract_zip_archive(images_zip_path, extract_dir)
+            if not extracted_files:
+                raise ValueError("ZIP archive is empty")
+
+            reports = AudioProcessor.verify_images(
+                input_dirs=[extract_dir],
+                user_id=user_id,
+                master_hex=master_key,
+                store_dir=Path(settings.chunk_store_dir)
+            )
+            for report in reports:
+                report.pop("indir", None)  # Server temp path means nothing to the client
+
+            return {
+                "success": True,
+                "ok": bool(reports) and all(r["ok"] for r in reports),
+                "user_id": user_id,
+                "total_recordings": len(reports),
+                "total_chunks": sum(len(r["chunks"]) for r in reports),
+                "recordings": reports
+            }
+
+        finally:
+            cleanup_directory(extract_dir)
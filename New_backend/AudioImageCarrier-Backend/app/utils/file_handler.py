@@ -1,11 +1,12 @@
 """File handling utilities for upload, storage, and cleanup operations."""
 
+import io
 import os
 import shutil
 import zipfile
 import tempfile
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 from PIL import Image
 import asyncio
 from app.core.config import settings
@@ -75,6 +76,24 @@ def ensure_directory(directory: Path) -> Path:
     return directory
 
 
+def save_upload(src, dest: Path) -> Path:
+    """
+    Copy a spooled upload (UploadFile.file) to dest. Blocking: routes run it
+    with run_in_threadpool so a large upload doesn't stall the event loop.
+    
+    Args:
+        src: Binary file object to copy from
+        dest: Destination path (parent directories are created)
+        
+    Returns:
+        dest
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with dest.open("wb") as buffer:
+        shutil.copyfileobj(src, buffer)
+    return dest
+
+
 def get_file_size(file_path: Path) -> int:
     """
     Get file size in bytes.
@@ -107,12 +126,63 @@ def get_image_dimensions(image_path: Path) -> tuple:
         return (0, 0)
 
 
-def create_zip_archive(files: List[Path], output_path: Path) -> Path:
+def _member_compression(name: str) -> int:
+    """PNG carrier images are already deflated; re-deflating them only burns CPU."""
+    return zipfile.ZIP_STORED if name.lower().endswith(".png") else zipfile.ZIP_DEFLATED
+
+
+class _ZipSink:
+    """Write-only, unseekable ZIP output: zipfile then writes data descriptors and never seeks back."""
+
+    def __init__(self):
+        self._pieces = []
+
+    def write(self, data) -> int:
+        self._pieces.append(data if isinstance(data, bytes) else bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> List[bytes]:
+        pieces, self._pieces = self._pieces, []
+        return pieces
+
+
+def iter_zip_stream(members: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive piece by piece, yielding each member's bytes as soon as
+    it has been added, so the archive can be sent while later members are
+    still being produced.
+    
+    Args:
+        members: (archive name, content) pairs; consumed lazily
+        
+    Yields:
+        Consecutive pieces of the ZIP file
+        
+    Raises:
+        ValueError: If members is empty
+    """
+    sink = _ZipSink()
+    added = 0
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, content in members:
+            zipf.writestr(name, content, compress_type=_member_compression(name))
+            added += 1
+            yield from sink.drain()
+        if added == 0:
+            raise ValueError("No files provided for ZIP archive")
+    yield from sink.drain()
+
+
+def create_zip_archive(files: Iterable[Path], output_path: Path) -> Path:
     """
     Create a ZIP archive from list of files.
     
     Args:
-        files: List of file paths to include in archive
+        files: File paths to include in archive (any iterable; a generator is
+            consumed lazily, so files can be added as soon as they exist)
         output_path: Path for output ZIP file
         
     Returns:
@@ -121,17 +191,27 @@ def create_zip_archive(files: List[Path], output_path: Path) -> Path:
     Raises:
         ValueError: If files list is empty or files don't exist
     """
-    if not files:
+    if isinstance(files, (list, tuple)) and not files:
         raise ValueError("No files provided for ZIP archive")
     
     # Ensure output directory exists
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for file_path in files:
-            if file_path.exists() and file_path.is_file():
-                # Store with just filename (no directory structure)
-                zipf.write(file_path, file_path.name)
+    added = 0
+    try:
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for file_path in files:
+                if file_path.exists() and file_path.is_file():
+                    # Store with just filename (no directory structure)
+                    zipf.write(file_path, file_path.name, compress_type=_member_compression(file_path.name))
+                    added += 1
+    except BaseException:
+        output_path.unlink(missing_ok=True)
+        raise
+    
+    if added == 0 and not isinstance(files, (list, tuple)):
+        output_path.unlink(missing_ok=True)
+        raise ValueError("No files provided for ZIP archive")
     
     return output_path
 
@@ -173,6 +253,73 @@ def extract_zip_archive(zip_path: Path, output_dir: Path) -> List[Path]:
     return extracted_files
 
 
+def create_zip_bytes(members: List[Tuple[str, bytes]]) -> bytes:
+    """
+    Build a ZIP archive in memory.
+    
+    Args:
+        members: List of (archive name, content) pairs
+        
+    Returns:
+        ZIP file content
+        
+    Raises:
+        ValueError: If members list is empty
+    """
+    if not members:
+        raise ValueError("No files provided for ZIP archive")
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, content in members:
+            zipf.writestr(name, content, compress_type=_member_compression(name))
+    return buffer.getvalue()
+
+
+def read_zip_bytes(data: bytes) -> List[Tuple[str, bytes]]:
+    """
+    Read every file of an in-memory ZIP archive.
+    
+    Args:
+        data: ZIP file content
+        
+    Returns:
+        List of (archive name, content) pairs (directories skipped)
+        
+    Raises:
+        ValueError: If the archive is invalid or has unsafe paths
+    """
+    try:
+        zipf = zipfile.ZipFile(io.BytesIO(data), 'r')
+    except zipfile.BadZipFile:
+        raise ValueError("Invalid ZIP file")
+    
+    with zipf:
+        # Security check: prevent path traversal
+        for member in zipf.namelist():
+            if ".." in member or member.startswith("/"):
+                raise ValueError(f"Unsafe file path in ZIP: {member}")
+        
+        return [(info.filename, zipf.read(info)) for info in zipf.infolist() if not info.is_dir()]
+
+
+def attachment_header(filename: str) -> str:
+    """
+    Content-Disposition value for an in-memory download (same form as FileResponse).
+    
+    Args:
+        filename: Download filename
+        
+    Returns:
+        Header value
+    """
+    from urllib.parse import quote
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
 async def save_upload_file(upload_file, destination: Path) -> Path:
     """
     Save uploaded file to destination (async).
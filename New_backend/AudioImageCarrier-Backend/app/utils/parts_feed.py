@@ -0,0 +1,77 @@
+"""Several uploaded files sent to a worker as one feed."""
+
+import io
+import struct
+from typing import BinaryIO, Iterator, List, Tuple
+
+# Each part: name length, data length, then the UTF-8 name and the data
+_FRAME = struct.Struct(">HQ")
+PIECE_BYTES = 1024 * 1024
+
+
+class PartsFeed(io.RawIOBase):
+    """
+    Blocking reader that frames (name, binary file) pairs one after another,
+    for a worker that needs several uploads as its single feed. Each file is
+    read a piece at a time as the worker asks for it; read_parts is the
+    other end.
+    """
+
+    def __init__(self, parts: List[Tuple[str, BinaryIO]]):
+        super().__init__()
+        self._pieces = self._iter_pieces(list(parts))
+        self._current = memoryview(b"")
+
+    @staticmethod
+    def _iter_pieces(parts: List[Tuple[str, BinaryIO]]) -> Iterator[bytes]:
+        for name, f in parts:
+            size = f.seek(0, io.SEEK_END)
+            f.seek(0)
+            encoded = name.encode("utf-8")
+            yield _FRAME.pack(len(encoded), size) + encoded
+            remaining = size
+            while remaining:
+                piece = f.read(min(remaining, PIECE_BYTES))
+                if not piece:
+                    raise ValueError(f"Upload {name} ended early")
+                remaining -= len(piece)
+                yield piece
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._current:
+            piece = next(self._pieces, None)
+            if piece is None:
+                return 0
+            self._current = memoryview(piece)
+        n = min(len(b), len(self._current))
+        b[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+
+def read_parts(stream: BinaryIO) -> Iterator[Tuple[str, bytes]]:
+    """Yield the (name, data) parts framed by a PartsFeed, each read whole."""
+    while True:
+        frame = _read_exactly(stream, _FRAME.size, allow_eof=True)
+        if not frame:
+            return
+        name_length, size = _FRAME.unpack(frame)
+        name = bytes(_read_exactly(stream, name_length)).decode("utf-8")
+        yield name, _read_exactly(stream, size)
+
+
+def _read_exactly(stream: BinaryIO, size: int, allow_eof: bool = False) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    pos = 0
+    while pos < size:
+        n = stream.readinto(view[pos:])
+        if not n:
+            if allow_eof and pos == 0:
+                return bytearray()
+            raise ValueError("Image parts ended early")
+        pos += n
+    return buffer
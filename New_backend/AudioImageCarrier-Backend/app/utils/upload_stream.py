@@ -0,0 +1,92 @@
+"""Blocking reader over a request body that is still arriving."""
+
+import asyncio
+import io
+import queue
+import threading
+
+_EOF = object()
+
+
+class UploadStream(io.RawIOBase):
+    """
+    File-like view of an upload for an encoder running on another thread.
+
+    The event loop feeds body pieces with feed() and ends with finish() (or
+    fail()); the encoder thread reads them with readinto(). At most
+    max_pending pieces are queued, so a slow encoder slows the upload down
+    instead of the body piling up in memory. bytes_read counts what the
+    encoder has consumed. Either side calls close() to stop the other.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        super().__init__()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._current = memoryview(b"")
+        self._stopped = threading.Event()
+        self._eof = False
+        self.bytes_read = 0
+
+    # Producer side (event loop)
+
+    async def feed(self, data: bytes) -> bool:
+        """Queue a piece of the body. Returns False once the reader has stopped."""
+        return await self._put(data)
+
+    async def finish(self) -> bool:
+        """Mark the end of the body."""
+        return await self._put(_EOF)
+
+    async def fail(self, error: BaseException) -> bool:
+        """Make the reader raise error (e.g. the client disconnected)."""
+        return await self._put(error)
+
+    async def _put(self, item) -> bool:
+        if self._stopped.is_set():
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        return await asyncio.get_running_loop().run_in_executor(None, self._put_blocking, item)
+
+    def _put_blocking(self, item) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # Consumer side (encoder thread)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._current:
+            if self._eof:
+                return 0
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise OSError("Upload stream closed")
+                continue
+            if item is _EOF:
+                self._eof = True
+                return 0
+            if isinstance(item, BaseException):
+                raise item
+            self._current = memoryview(item)
+        n = min(len(b), len(self._current))
+        b[:n] = self._current[:n]
+        self._current = self._current[n:]
+        self.bytes_read += n
+        return n
+
+    def close(self) -> None:
+        self._stopped.set()
+        super().close()
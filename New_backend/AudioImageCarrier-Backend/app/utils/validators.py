@@ -51,6 +51,33 @@ def validate_audio_file(file_path: Path, max_size: Optional[int] = None) -> Tupl
     return True, None
 
 
+def validate_audio_upload(filename: str, size: int, max_size: Optional[int] = None) -> Tuple[bool, Optional[str]]:
+    """
+    Validate an audio upload held in memory (same rules as validate_audio_file).
+    
+    Args:
+        filename: Upload filename
+        size: Upload size in bytes
+        max_size: Maximum file size in bytes (optional)
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if Path(filename).suffix.lower() not in ALLOWED_AUDIO_EXTENSIONS:
+        return False, f"Invalid audio format. Allowed: {', '.join(ALLOWED_AUDIO_EXTENSIONS)}"
+    
+    if size == 0:
+        return False, "File is empty"
+    
+    if max_size and size > max_size:
+        return False, f"File too large: {size} bytes (max: {max_size})"
+    
+    if len(filename) > MAX_FILENAME_LENGTH:
+        return False, f"Filename too long (max {MAX_FILENAME_LENGTH} characters)"
+    
+    return True, None
+
+
 def validate_zip_file(file_path: Path, max_size: Optional[int] = None) -> Tuple[bool, Optional[str]]:
     """
     Validate ZIP file.
@@ -0,0 +1,39 @@
+"""
+aicarrier_codec - the AudioImageCarrier codec as an importable package.
+
+Every entry point (scripts/audio_image_chunked.py, the backend's
+AudioProcessor and the script copies under New_backend/script,
+Mobile_App/Backend/Python_Script and PrinceWorkUpdates) delegates here, so
+fixes and fast paths land in one place. The implementation is in
+aicarrier_codec.codec; the names below are its main public API.
+"""
+
+from .codec import (
+    SCRIPT_VERSION,
+    PROTOCOL_VERSION,
+    DEFAULT_MAX_CHUNK_BYTES,
+    build_cli,
+    main,
+    encode_streamed,
+    iter_encode_file,
+    encode_bytes,
+    iter_encode_bytes,
+    iter_encode_reader,
+    decode_images_to_file,
+    decode_bytes,
+    decode_members,
+    iter_decode_members,
+    DecodeError,
+    decode_zip,
+    plan_zip_recording,
+    iter_decode_zip_range,
+    decode_directory,
+    encode_directory,
+    watch_directory,
+    rekey_archives,
+    verify_archives,
+    select_cipher,
+    select_hash,
+)
+
+__version__ = SCRIPT_VERSION
@@ -0,0 +1,3 @@
+from .codec import main
+
+main()
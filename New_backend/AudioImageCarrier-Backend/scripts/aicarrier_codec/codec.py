@@ -0,0 +1,5118 @@
+# filepath: AudioImageCarrier-Backend/scripts/aicarrier_codec/codec.py
+#!/usr/bin/env python3
+"""
+aicarrier_codec.codec - Secure Audio-to-Image Steganography with AES-GCM Encryption
+===================================================================================
+
+Version: 2.0.0 (Security Hardened)
+Author: AudioImageCarrier Team
+License: MIT
+Last Updated: November 20, 2025
+
+DESCRIPTION:
+-----------
+This module provides secure encoding and decoding of audio files into encrypted PNG images
+using military-grade AES-256-GCM encryption with user-specific key derivation.
+
+SECURITY FEATURES:
+-----------------
+✓ AES-256-GCM authenticated encryption (NIST approved)
+✓ ChaCha20-Poly1305 alternative for hosts without AES acceleration (--cipher)
+✓ HKDF key derivation (RFC 5869) for user-specific keys
+✓ SHA-256 integrity verification on decryption
+✓ Authenticated Additional Data (AAD) prevents metadata tampering
+✓ Cryptographically secure random nonce generation
+✓ Optional zstd compression to reduce payload size
+✓ Input validation and sanitization
+✓ Constant-time operations where applicable
+✓ Encrypted header protection via AAD mechanism
+
+IMPORTANT SECURITY NOTES:
+------------------------
+1. **Master Key Security:**
+   - Each user MUST have a unique master key (64 hex characters = 32 bytes)
+   - NEVER share master keys between users
+   - Store master keys in secure vault (e.g., AWS Secrets Manager, HashiCorp Vault)
+   - Rotate master keys periodically (recommended: every 90 days)
+
+2. **User ID Security:**
+   - user_id is used for key derivation and stored in image metadata
+   - Same user_id + master_key = same encryption key
+   - NEVER reuse user_id across different master keys
+   - Validate and sanitize user_id to prevent injection attacks
+
+3. **Metadata Privacy:**
+   - Header is stored in PLAINTEXT (protected by AAD)
+   - Header contains: user_id, filename, timestamp, chunk info
+   - Consider this metadata public - do not include sensitive info in filenames
+   - Future versions may support encrypted headers
+
+4. **Key Derivation:**
+   - Uses HKDF-SHA256 with static salt (info=b"AUDIO-IMG-V1")
+   - Derived key = HKDF(master_key || user_id)
+   - WARNING: Changing the info parameter breaks backward compatibility
+
+VULNERABILITY MITIGATIONS:
+-------------------------
+✓ FIXED: Shared master key vulnerability (now requires per-user keys via API)
+✓ FIXED: Metadata tampering (AAD verification prevents modification)
+✓ FIXED: Replay attacks (nonce is unique per encryption)
+✓ FIXED: Padding oracle (GCM mode provides authentication)
+✓ FIXED: Timing attacks (constant-time comparisons in crypto library)
+⚠ PARTIAL: User enumeration (user_id visible in header - consider hashing in v3.0)
+⚠ PARTIAL: Metadata disclosure (header plaintext - encrypt in future version)
+
+CHANGELOG:
+---------
+v2.0.0 (2025-11-20):
+  + Added comprehensive security documentation
+  + Enhanced input validation
+  + Added security warnings for shared keys
+  + Improved error messages
+  + Added HMAC signature verification option (optional)
+  + Better constant-time operations
+
+v1.1.0 (Previous):
+  + Avoid chunking for WAV files shorter than 8 hours
+  + Fixed SHA field name mismatch (header now includes "sha256")
+  + Added 8-byte sentinel after ciphertext (AIMGEND1)
+  + More robust ciphertext extraction
+  + Improved logging
+
+USAGE:
+-----
+# scripts/audio_image_chunked.py (and the copies under New_backend/script,
+# Mobile_App/Backend/Python_Script and PrinceWorkUpdates) are entry points
+# that run this module's CLI:
+# Encoding (requires unique master key per user):
+python audio_image_chunked.py encode \\
+    --input audio.wav \\
+    --outdir ./output \\
+    --user alice \\
+    --master ALICE_UNIQUE_64_HEX_KEY
+
+# On hosts without AES acceleration, pick the faster AEAD automatically
+# (decode always follows the cipher recorded in each image):
+python audio_image_chunked.py encode \\
+    --input audio.wav \\
+    --outdir ./output \\
+    --user alice \\
+    --cipher auto
+
+# Decoding (must use same user_id and master key):
+python audio_image_chunked.py decode \\
+    --indir ./output \\
+    --out recovered.wav \\
+    --user alice \\
+    --master ALICE_UNIQUE_64_HEX_KEY
+
+# Content-defined chunking with a per-user dedup store (re-uploads reuse chunks):
+python audio_image_chunked.py encode \\
+    --input audio.wav \\
+    --outdir ./output \\
+    --user alice \\
+    --chunking cdc \\
+    --store ./chunk_store
+
+# Append mode for ongoing recordings (re-run as the file grows; --seal when done):
+python audio_image_chunked.py encode \\
+    --input live.aac \\
+    --outdir ./output \\
+    --user alice \\
+    --append
+
+# Drop-folder daemon (inotify or polling; SIGTERM to stop; backlog in <outdir>/.watch-status.json):
+python audio_image_chunked.py watch \\
+    --indir ./incoming \\
+    --outdir ./archive \\
+    --user alice
+
+# Rotating the master key of stored sets (chunks are re-encrypted, never decoded to audio):
+AICARRIER_NEW_MASTER_KEY_HEX=<new-key> python audio_image_chunked.py rekey \\
+    --indir ./archive1 ./archive2 \\
+    --outdir ./rekeyed \\
+    --user alice
+
+# Auditing stored image sets (no audio is written; exit status 1 on any failure):
+python audio_image_chunked.py verify \\
+    --indir ./archive1 ./archive2 ./archive3 \\
+    --user alice
+
+# Bundling many short clips into shared images (encrypted table of contents):
+python audio_image_chunked.py bundle \\
+    --inputs clip1.m4a clip2.m4a clip3.m4a \\
+    --outdir ./bundles \\
+    --user alice
+
+# Extracting one clip (only the TOC and that clip are decrypted):
+python audio_image_chunked.py extract \\
+    --indir ./bundles \\
+    --member clip2.m4a \\
+    --outdir ./recovered \\
+    --user alice
+
+SECURITY BEST PRACTICES:
+-----------------------
+1. Generate strong master keys:
+   python -c "import secrets; print(secrets.token_hex(32))"
+
+2. Use environment variables instead of command-line args:
+   export AICARRIER_MASTER_KEY_HEX=<your-key>
+   python audio_image_chunked.py encode --input audio.wav --user alice
+
+3. Implement key rotation:
+   - `rekey` re-encrypts stored sets with the new key (chunk by chunk, in memory)
+   - Verify the new sets (`verify` with the new key)
+   - Securely delete old encrypted data
+
+4. Validate inputs:
+   - Check file types before processing
+   - Limit file sizes to prevent DoS
+   - Sanitize user_id (no path traversal characters)
+
+5. Secure deployment:
+   - Run in isolated container
+   - Use read-only file systems where possible
+   - Implement rate limiting at API level
+   - Monitor for suspicious activity
+
+LIMITATIONS:
+-----------
+- Duration detection only works for WAV files (uses wave module)
+- Other formats (MP3, FLAC, M4A) require external libs (ffprobe/pydub)
+- Sentinel collision probability: ~1 in 2^64 (negligible but non-zero)
+- Maximum file size: Limited by available memory for single-chunk files
+- Header size: Fixed 1024 bytes (may be excessive for small files)
+
+FUTURE IMPROVEMENTS:
+-------------------
+- [ ] Encrypt header metadata for privacy
+- [ ] Add HMAC signature for file ownership verification
+- [ ] Support for external KMS (AWS KMS, Azure Key Vault)
+- [ ] Streaming encryption for large files (reduce memory usage)
+- [ ] Multi-threaded chunk processing
+- [ ] Support for other image formats (JPEG, WebP with steganography)
+- [ ] Key rotation without re-encryption
+- [ ] Audit logging integration
+
+FOR MORE INFORMATION:
+-------------------
+See: docs/SECURITY.md for detailed security analysis
+See: docs/API_DOCUMENTATION.md for API integration
+See: docs/WORKFLOW.md for process flow diagrams
+"""
+
+import argparse
+import contextlib
+import functools
+import os
+import sys
+import math
+import mmap
+import json
+import time
+import binascii
+import hashlib
+import hmac
+import io
+import queue
+import secrets
+import shutil
+import struct
+import tarfile
+import threading
+import wave
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives import hashes
+
+from PIL import Image
+import numpy as np
+
+# Try optional zstd
+try:
+    import zstandard as zstd
+    HAVE_ZSTD = True
+except Exception:
+    HAVE_ZSTD = False
+
+# ===========================
+# SECURITY CONFIGURATION
+# ===========================
+
+# Header Configuration
+HEADER_LEN = 1024  # Bytes reserved for JSON metadata header
+                   # Contains: magic, version, user_id, filename, timestamps, chunk info
+                   # ⚠️ WARNING: Header is stored in PLAINTEXT (protected by AAD)
+
+# Image Configuration  
+MAX_WIDTH = 8192   # Maximum image width in pixels
+                   # Larger values = fewer but larger images
+                   # Smaller values = more but smaller images
+
+# Encryption Configuration
+AESGCM_TAG_LEN = 16  # AES-GCM authentication tag length (128 bits)
+                      # DO NOT MODIFY - required by AES-GCM spec
+                      # (ChaCha20-Poly1305 uses the same 16-byte tag)
+
+# Cipher agility: every new header names its AEAD in "cipher"; headers without
+# the field were written by older versions and are AES-256-GCM
+CIPHER_AESGCM = "aes-256-gcm"
+CIPHER_CHACHA20 = "chacha20-poly1305"
+SUPPORTED_CIPHERS = (CIPHER_AESGCM, CIPHER_CHACHA20)
+DEFAULT_CIPHER = CIPHER_AESGCM
+
+# Chunk integrity hash: "sha256" hashes each plaintext chunk in one serial pass;
+# "merkle" hashes fixed-size leaves in parallel and stores the tree root in the
+# header plus the leaf digests after the sentinel (for partial verification)
+HASH_SHA256 = "sha256"
+HASH_MERKLE = "merkle"
+SUPPORTED_HASHES = (HASH_SHA256, HASH_MERKLE)
+DEFAULT_HASH = HASH_SHA256
+MERKLE_LEAF_BYTES = 1024 * 1024  # Plaintext bytes per Merkle leaf (1 MB)
+MERKLE_WORKERS = int(os.environ.get("AICARRIER_HASH_WORKERS", str(min(8, os.cpu_count() or 1))))
+                                 # Threads hashing leaves (hashlib releases the GIL)
+DECODE_SYNC_BYTES = 256 * 1024 * 1024  # Decoded bytes between fsyncs of the output and its journal
+
+# Chunking Configuration
+DEFAULT_MAX_CHUNK_BYTES = 50 * 1024 * 1024  # 50 MB per image chunk
+                                             # Adjust based on your needs:
+                                             # - Smaller: More images, faster processing
+                                             # - Larger: Fewer images, more memory usage
+
+# Content-Defined Chunking (dedup mode)
+CDC_AVG_CHUNK_BYTES = 1024 * 1024  # Target average chunk size (1 MB)
+                                   # Min/max are derived as avg/4 and avg*4
+CDC_WINDOW = 48                    # Rolling-hash window in bytes
+
+# Batch encoding (encode-dir): files picked up when walking a directory tree
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".m4a", ".aac", ".ogg", ".opus", ".wma", ".aiff", ".ape")
+
+# Processing Configuration
+PIXEL_BYTES = 3            # RGB color model (3 bytes per pixel)
+PIPELINE_DEPTH = int(os.environ.get("AICARRIER_PIPELINE_DEPTH", "2"))
+                           # Chunks queued between encode/decode stages (0 = run stages inline)
+EIGHT_HOURS_SECONDS = 8 * 3600  # Threshold for WAV auto-chunking decision
+
+# Security Markers
+SENTINEL = b'AIMGEND1'  # 8-byte end-of-data marker
+                        # Prevents accidental truncation of ciphertext
+                        # Stored UNENCRYPTED after ciphertext
+                        # ⚠️ Collision probability: ~1 in 2^64
+MERKLE_TRAILER = b'AIMGLEAF'  # Follows SENTINEL in "merkle" mode: 32-byte leaf
+                              # digests (unencrypted; checked against the header root)
+
+# Version Control
+SCRIPT_VERSION = "2.0.0"
+PROTOCOL_VERSION = 1
+MAGIC_HEADER = "AUDIO-IMG-V1"  # Magic string for file format identification
+BUNDLE_MAGIC = "AUDIO-IMG-BUNDLE-V1"  # Magic for multi-recording bundle images
+                                      # (ignored by the single-recording decoder)
+CHUNK_MAGIC = "AUDIO-IMG-CHUNK-V1"        # Magic for content-addressed dedup chunks
+MANIFEST_MAGIC = "AUDIO-IMG-MANIFEST-V1"  # Magic for JSON manifests listing chunk ids
+STREAM_MAGIC = "AUDIO-IMG-STREAM-V1"      # Magic for append-mode chunks (stream_id + seq,
+                                          # no fixed total; a sealed manifest records it)
+
+# Validation Limits
+MAX_USER_ID_LENGTH = 255       # Maximum allowed user_id length
+MAX_FILENAME_LENGTH = 255      # Maximum allowed filename length
+MIN_MASTER_KEY_LENGTH = 64     # Minimum hex characters (32 bytes)
+MAX_MASTER_KEY_LENGTH = 64     # Maximum hex characters (32 bytes)
+DANGEROUS_CHARS = ['/', '\\', '..', '\x00', '<', '>', ':', '"', '|', '?', '*']
+
+# ===========================
+# CRYPTOGRAPHIC FUNCTIONS
+# ===========================
+
+def validate_master_key(master_hex: str) -> None:
+    """
+    Validate master key format and strength.
+    
+    Security Checks:
+    --------------
+    1. Length validation (must be exactly 64 hex characters = 32 bytes)
+    2. Hexadecimal format validation
+    3. Weak key detection (all zeros, repeating patterns)
+    
+    Args:
+        master_hex: Master encryption key in hexadecimal format
+        
+    Raises:
+        ValueError: If master key is invalid or weak
+        
+    Security Notes:
+    --------------
+    - Master key MUST be 256 bits (32 bytes) for AES-256
+    - Key should be cryptographically random
+    - Avoid patterns like "00000..." or "AAAAA..."
+    - Generate with: secrets.token_hex(32)
+    """
+    if not master_hex:
+        raise ValueError("Master key cannot be empty")
+    
+    # Length validation
+    if len(master_hex) != MIN_MASTER_KEY_LENGTH:
+        raise ValueError(
+            f"Master key must be exactly {MIN_MASTER_KEY_LENGTH} hexadecimal characters "
+            f"(got {len(master_hex)}). Generate with: python -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    
+    # Hexadecimal format validation
+    try:
+        key_bytes = binascii.unhexlify(master_hex)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Master key must be valid hexadecimal: {e}")
+    
+    # Weak key detection
+    if key_bytes == b'\x00' * 32:
+        raise ValueError("⚠️ SECURITY WARNING: Master key is all zeros - this is insecure!")
+    
+    if len(set(key_bytes)) < 16:  # Less than 16 unique bytes suggests pattern
+        raise ValueError(
+            "⚠️ SECURITY WARNING: Master key appears to have repeating patterns. "
+            "Use cryptographically random key."
+        )
+
+
+def validate_user_id(user_id: str) -> str:
+    """
+    Validate and sanitize user_id to prevent security vulnerabilities.
+    
+    Security Checks:
+    --------------
+    1. Length validation
+    2. Path traversal prevention (no ../, ..\, etc.)
+    3. Null byte injection prevention
+    4. Special character filtering
+    
+    Args:
+        user_id: User identifier string
+        
+    Returns:
+        Sanitized user_id
+        
+    Raises:
+        ValueError: If user_id is invalid or contains dangerous characters
+        
+    Security Notes:
+    --------------
+    - user_id is used for key derivation AND stored in plaintext header
+    - Different user_ids produce different encryption keys
+    - Prevents path traversal: "../../../etc/passwd"
+    - Prevents null byte injection: "alice\x00admin"
+    """
+    if not user_id or not user_id.strip():
+        raise ValueError("user_id cannot be empty")
+    
+    # Length validation
+    if len(user_id) > MAX_USER_ID_LENGTH:
+        raise ValueError(f"user_id too long (max {MAX_USER_ID_LENGTH} characters)")
+    
+    # Check for dangerous characters
+    for char in DANGEROUS_CHARS:
+        if char in user_id:
+            raise ValueError(
+                f"user_id contains forbidden character: '{char}'. "
+                f"Forbidden characters: {DANGEROUS_CHARS}"
+            )
+    
+    # Check for control characters
+    if any(ord(c) < 32 for c in user_id):
+        raise ValueError("user_id contains control characters")
+    
+    return user_id.strip()
+
+
+def get_master_key(master_hex: Optional[str]) -> bytes:
+    """
+    Retrieve and validate master encryption key from parameter or environment.
+    
+    Priority:
+    --------
+    1. Provided master_hex parameter (command-line or API)
+    2. AICARRIER_MASTER_KEY_HEX environment variable
+    3. Error if neither available
+    
+    Args:
+        master_hex: Optional hexadecimal master key string
+        
+    Returns:
+        Master key as bytes (32 bytes for AES-256)
+        
+    Raises:
+        RuntimeError: If no master key available
+        ValueError: If master key format is invalid
+        
+    Security Notes:
+    --------------
+    - Environment variable preferred (not visible in process list)
+    - Command-line args visible in `ps` output (less secure)
+    - Consider using secrets management service in production
+    
+    Example:
+    -------
+    # Secure (environment variable):
+    export AICARRIER_MASTER_KEY_HEX=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python script.py encode --user alice
+    
+    # Less secure (command-line):
+    python script.py encode --user alice --master DEADBEEF...
+    """
+    # Try provided parameter first
+    if master_hex:
+        validate_master_key(master_hex)
+        return binascii.unhexlify(master_hex)
+    
+    # Try environment variable
+    env_key = os.environ.get("AICARRIER_MASTER_KEY_HEX")
+    if env_key:
+        validate_master_key(env_key)
+        return binascii.unhexlify(env_key)
+    
+    # No key available
+    raise RuntimeError(
+        "❌ Master key required but not provided.\n\n"
+        "Options:\n"
+        "  1. Set environment variable:\n"
+        "     export AICARRIER_MASTER_KEY_HEX=$(python -c \"import secrets; print(secrets.token_hex(32))\")\n\n"
+        "  2. Pass via command-line (less secure):\n"
+        "     --master YOUR_64_HEX_CHAR_KEY\n\n"
+        "⚠️  WARNING: Each user MUST have a unique master key for security!"
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def derive_user_key(master_key: bytes, user_id: str) -> bytes:
+    """
+    Derive user-specific encryption key from master key and user ID using HKDF.
+    
+    Algorithm:
+    ---------
+    HKDF-SHA256(
+        IKM = master_key || user_id,  # Input Key Material
+        salt = None,                   # No salt (master_key provides randomness)
+        info = b"AUDIO-IMG-V1",        # Context/purpose identifier
+        length = 32                    # Output 256 bits for AES-256
+    )
+    
+    Args:
+        master_key: Master encryption key (32 bytes)
+        user_id: User identifier string
+        
+    Returns:
+        Derived user key (32 bytes)
+        
+    Security Properties:
+    ------------------
+    1. **Key Isolation**: Different user_ids → different keys
+       - User "alice" cannot decrypt files for user "bob"
+       - Even with same master_key
+       
+    2. **One-Way Function**: Cannot reverse to get master_key
+       - Knowing user_key + user_id does NOT reveal master_key
+       
+    3. **Deterministic**: Same inputs always produce same output
+       - Required for decryption
+       - user_id must match exactly (case-sensitive)
+       
+    4. **Collision Resistant**: Computationally infeasible to find:
+       - Two user_ids that produce same key
+       - A user_id that produces a specific target key
+    
+    Example:
+    -------
+    master = b"..." # 32 bytes
+    
+    # Alice's files
+    alice_key = derive_user_key(master, "alice")  # → Unique key
+    
+    # Bob's files  
+    bob_key = derive_user_key(master, "bob")      # → Different key
+    
+    # Alice can't decrypt Bob's files even with same master_key
+    
+    Security Notes:
+    --------------
+    - user_id is case-sensitive: "Alice" ≠ "alice"
+    - Changing info parameter breaks backward compatibility
+    - No salt used (master_key provides sufficient entropy)
+    - Uses SHA-256 as HMAC hash function (NIST approved)
+    - Results are memoized per (master_key, user_id), so long-running
+      processes derive each user key once
+    
+    References:
+    ----------
+    - RFC 5869: HMAC-based Extract-and-Expand Key Derivation Function (HKDF)
+    - NIST SP 800-56C Rev. 2: Key Derivation Methods
+    """
+    # Validate user_id before key derivation
+    user_id = validate_user_id(user_id)
+    
+    # HKDF key derivation
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,  # AES-256 requires 32 bytes
+        salt=None,  # No salt needed (master_key has entropy)
+        info=b"AUDIO-IMG-V1"  # Context binding
+    )
+    
+    # Derive key from master_key + user_id
+    input_key_material = master_key + user_id.encode("utf8")
+    derived_key = hkdf.derive(input_key_material)
+    
+    return derived_key
+
+
+def derive_subkey(user_key: bytes, info: bytes) -> bytes:
+    """Derive a purpose-specific 32-byte key from the user key (HKDF-SHA256)."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info).derive(user_key)
+
+
+# Cipher used for new encodes; see select_cipher()
+_preferred_cipher = os.environ.get("AICARRIER_CIPHER", DEFAULT_CIPHER)
+if _preferred_cipher not in SUPPORTED_CIPHERS:
+    _preferred_cipher = DEFAULT_CIPHER
+
+# Chunk hash used for new encodes; see select_hash()
+_preferred_hash = os.environ.get("AICARRIER_HASH", DEFAULT_HASH)
+if _preferred_hash not in SUPPORTED_HASHES:
+    _preferred_hash = DEFAULT_HASH
+
+
+class UserCipher:
+    """
+    AEAD keyring for one user key. New payloads are sealed with `name`;
+    existing payloads are opened with whichever cipher their header names.
+    AES-256-GCM uses the user key itself (as in every earlier version);
+    ChaCha20-Poly1305 gets its own HKDF subkey so no key serves two algorithms.
+    """
+    
+    def __init__(self, user_key: bytes, cipher: Optional[str] = None):
+        self.name = cipher or _preferred_cipher
+        if self.name not in SUPPORTED_CIPHERS:
+            raise ValueError(f"Unsupported cipher: {self.name} (expected one of {', '.join(SUPPORTED_CIPHERS)})")
+        self._user_key = user_key
+        self._aeads = {}
+    
+    def aead(self, cipher: Optional[str] = None):
+        """Return the AEAD instance for `cipher` (default: the sealing cipher)."""
+        cipher = cipher or self.name
+        if cipher not in self._aeads:
+            if cipher == CIPHER_AESGCM:
+                self._aeads[cipher] = AESGCM(self._user_key)
+            elif cipher == CIPHER_CHACHA20:
+                self._aeads[cipher] = ChaCha20Poly1305(derive_subkey(self._user_key, b"AUDIO-IMG-CHACHA20-V1"))
+            else:
+                raise ValueError(f"Unsupported cipher: {cipher}")
+        return self._aeads[cipher]
+    
+    def encrypt(self, nonce: bytes, data: bytes, associated_data: Optional[bytes]) -> bytes:
+        return self.aead().encrypt(nonce, data, associated_data)
+    
+    def decrypt(self, nonce: bytes, data: bytes, associated_data: Optional[bytes],
+                cipher: Optional[str] = None) -> bytes:
+        return self.aead(cipher or DEFAULT_CIPHER).decrypt(nonce, data, associated_data)
+
+
+def benchmark_ciphers(sample_bytes: int = 4 * 1024 * 1024, rounds: int = 3) -> dict:
+    """Measure encrypt throughput (MB/s, best of `rounds`) of every supported cipher on this host."""
+    key = os.urandom(32)
+    data = os.urandom(sample_bytes)
+    results = {}
+    for name in SUPPORTED_CIPHERS:
+        aead = UserCipher(key, name).aead()
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            aead.encrypt(os.urandom(12), data, None)
+            best = min(best, time.perf_counter() - start)
+        results[name] = sample_bytes / (1024 * 1024) / max(best, 1e-9)
+    return results
+
+
+def select_cipher(cipher: Optional[str] = None) -> str:
+    """
+    Set the cipher used for new encodes. "auto" runs benchmark_ciphers() and
+    picks the fastest; None keeps the current choice. Returns the active cipher.
+    Decoding is unaffected: it always follows the cipher named in each header.
+    """
+    global _preferred_cipher
+    if cipher == "auto":
+        speeds = benchmark_ciphers()
+        cipher = max(speeds, key=speeds.get)
+        print("[+] Cipher benchmark: " + ", ".join(f"{k} {v:.0f} MB/s" for k, v in speeds.items())
+              + f" -> using {cipher}")
+    if cipher is not None:
+        if cipher not in SUPPORTED_CIPHERS:
+            raise ValueError(f"Unsupported cipher: {cipher} (expected one of {', '.join(SUPPORTED_CIPHERS)} or auto)")
+        _preferred_cipher = cipher
+    return _preferred_cipher
+
+
+def sha256_hex(b: bytes) -> str:
+    """
+    Compute SHA-256 hash of bytes and return as hexadecimal string.
+    
+    Args:
+        b: Input bytes to hash
+        
+    Returns:
+        SHA-256 hash as 64-character hexadecimal string
+        
+    Security Notes:
+    --------------
+    - Used for data integrity verification (not encryption)
+    - Collision resistance: ~2^256 (computationally infeasible)
+    - Pre-image resistance: Cannot reverse hash to get original data
+    - Deterministic: Same input always produces same hash
+    
+    Example:
+    -------
+    >>> sha256_hex(b"Hello, World!")
+    'dffd6021bb2bd5b0af676290809ec3a53191dd81c7f70a4b28688a362182986f'
+    """
+    return hashlib.sha256(b).hexdigest()
+
+
+def select_hash(mode: Optional[str] = None) -> str:
+    """
+    Set the chunk hash used for new encodes ("sha256" or "merkle"); None keeps
+    the current choice. Returns the active mode. Decoding follows each header.
+    """
+    global _preferred_hash
+    if mode is not None:
+        if mode not in SUPPORTED_HASHES:
+            raise ValueError(f"Unsupported hash mode: {mode} (expected one of {', '.join(SUPPORTED_HASHES)})")
+        _preferred_hash = mode
+    return _preferred_hash
+
+
+_merkle_pool = None
+_merkle_pool_lock = threading.Lock()
+
+
+def _merkle_executor():
+    global _merkle_pool
+    with _merkle_pool_lock:
+        if _merkle_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _merkle_pool = ThreadPoolExecutor(max_workers=MERKLE_WORKERS, thread_name_prefix="merkle")
+        return _merkle_pool
+
+
+def _merkle_leaf(leaf) -> bytes:
+    h = hashlib.sha256(b"\x00")  # leaf/node prefixes keep a leaf from posing as an inner node
+    h.update(leaf)
+    return h.digest()
+
+
+def merkle_leaf_digests(data, leaf_bytes: int = MERKLE_LEAF_BYTES) -> List[bytes]:
+    """SHA-256 digests of data's fixed-size leaves (the last may be short), hashed in parallel."""
+    view = memoryview(data)
+    leaves = [view[i:i + leaf_bytes] for i in range(0, max(len(view), 1), leaf_bytes)]
+    if len(leaves) < 2 or MERKLE_WORKERS < 2:
+        return [_merkle_leaf(leaf) for leaf in leaves]
+    return list(_merkle_executor().map(_merkle_leaf, leaves))
+
+
+def merkle_root(digests: List[bytes]) -> str:
+    """Hex root of the binary tree over digests (an odd node is carried up unchanged)."""
+    level = list(digests)
+    if not level:
+        raise ValueError("merkle_root needs at least one digest")
+    while len(level) > 1:
+        parents = [hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0].hex()
+
+
+def chunk_digest(entry: dict) -> Optional[str]:
+    """The integrity hash recorded in a header or manifest entry (Merkle root or SHA-256)."""
+    return entry.get("merkle_root") or entry.get("sha256")
+
+
+def digest_fields(entry: dict) -> dict:
+    """The hash fields of a header, for copying into metadata and manifest entries."""
+    if "merkle_root" in entry:
+        return {"merkle_root": entry["merkle_root"], "merkle_leaf_bytes": entry["merkle_leaf_bytes"]}
+    return {"sha256": entry.get("sha256")}
+
+
+def hash_chunk(data, like: dict) -> str:
+    """Hash data the way the chunk described by `like` was hashed; compare with chunk_digest(like)."""
+    if "merkle_root" in like:
+        return merkle_root(merkle_leaf_digests(data, like["merkle_leaf_bytes"]))
+    return sha256_hex(data)
+
+
+def file_merkle_root(entries: List[dict]) -> Optional[str]:
+    """Root over the chunk roots of a whole recording, or None unless every chunk is in "merkle" mode."""
+    if not entries or not all("merkle_root" in e for e in entries):
+        return None
+    return merkle_root([bytes.fromhex(e["merkle_root"]) for e in entries])
+
+
+def read_merkle_leaves(flat: bytes, header: dict) -> Optional[List[bytes]]:
+    """
+    Leaf digests stored after the sentinel of a "merkle" payload, once they
+    reproduce the authenticated header root; None if absent or not matching.
+    """
+    if "merkle_root" not in header:
+        return None
+    count = ceil_div(max(header.get("orig_chunk_size", 0), 1), header["merkle_leaf_bytes"])
+    idx = flat.find(SENTINEL + MERKLE_TRAILER, HEADER_LEN)
+    if idx == -1:
+        return None
+    start = idx + len(SENTINEL) + len(MERKLE_TRAILER)
+    table = bytes(flat[start:start + 32 * count])
+    if len(table) != 32 * count:
+        return None
+    leaves = [table[i:i + 32] for i in range(0, len(table), 32)]
+    return leaves if merkle_root(leaves) == header["merkle_root"] else None
+
+
+def verify_leaf_range(header: dict, leaves: List[bytes], offset: int, data) -> bool:
+    """
+    Check plaintext bytes `data` found at `offset` of a chunk against its leaf
+    digests (from read_merkle_leaves) without the rest of the chunk. offset must
+    be leaf-aligned and data must end on a leaf boundary or at the chunk end.
+    """
+    leaf_bytes = header["merkle_leaf_bytes"]
+    end = offset + len(data)
+    if offset % leaf_bytes or (end % leaf_bytes and end != header["orig_chunk_size"]):
+        raise ValueError("range must cover whole Merkle leaves")
+    first = offset // leaf_bytes
+    digests = merkle_leaf_digests(data, leaf_bytes)
+    return digests == leaves[first:first + len(digests)]
+
+# -------------------- IO & packing helpers --------------------
+def ceil_div(a:int,b:int)->int:
+    return -(-a//b)
+
+
+class BufferPool:
+    """
+    Size-classed pool of reusable bytearrays for chunk-sized allocations
+    (read buffers, payload/pixel buffers), so long-lived workers reuse the
+    same few large blocks instead of churning the allocator on every chunk.
+
+    - Sizes are rounded up to a power of two (min_pooled_bytes at least);
+      smaller requests are plain allocations and are never pooled.
+    - At most max_per_class idle buffers per size class and max_pooled_bytes
+      in total are kept; anything beyond is dropped on release.
+    - Buffers idle longer than idle_seconds are dropped on the next
+      acquire/release; trim() drops them immediately.
+    Buffers are handed out with stale contents: callers overwrite what they use.
+    """
+
+    def __init__(self, max_pooled_bytes: int = 256 * 1024 * 1024, max_per_class: int = 4,
+                 min_pooled_bytes: int = 64 * 1024, idle_seconds: float = 60.0):
+        self._lock = threading.Lock()
+        self._free = {}  # size class -> [(bytearray, released_at)]
+        self._lent = set()  # ids of pooled buffers currently handed out
+        self._pooled_bytes = 0
+        self._outstanding = 0
+        self.configure(max_pooled_bytes, max_per_class, min_pooled_bytes, idle_seconds)
+        self._counters = {"hits": 0, "misses": 0, "unpooled": 0, "dropped": 0, "trimmed_bytes": 0}
+
+    def configure(self, max_pooled_bytes: Optional[int] = None, max_per_class: Optional[int] = None,
+                  min_pooled_bytes: Optional[int] = None, idle_seconds: Optional[float] = None) -> None:
+        """Change pool limits; idle buffers over the new caps are released on the next trim."""
+        if max_pooled_bytes is not None:
+            self.max_pooled_bytes = max(0, int(max_pooled_bytes))
+        if max_per_class is not None:
+            self.max_per_class = max(0, int(max_per_class))
+        if min_pooled_bytes is not None:
+            self.min_pooled_bytes = max(1, int(min_pooled_bytes))
+        if idle_seconds is not None:
+            self.idle_seconds = float(idle_seconds)
+
+    def _size_class(self, nbytes: int) -> int:
+        return 1 << (max(nbytes, self.min_pooled_bytes) - 1).bit_length()
+
+    def acquire(self, nbytes: int) -> bytearray:
+        """Return a bytearray of at least nbytes (len() is its size class)."""
+        if nbytes < self.min_pooled_bytes:
+            with self._lock:
+                self._counters["unpooled"] += 1
+            return bytearray(nbytes)
+        size = self._size_class(nbytes)
+        with self._lock:
+            self._expire(time.monotonic())
+            free = self._free.get(size)
+            if free:
+                buf, _ = free.pop()
+                self._pooled_bytes -= size
+                self._counters["hits"] += 1
+            else:
+                buf = None
+                self._counters["misses"] += 1
+            self._outstanding += size
+            if buf is None:
+                buf = bytearray(size)
+            self._lent.add(id(buf))
+        return buf
+
+    def owns(self, buf) -> bool:
+        """True if buf was handed out by acquire() and not released yet."""
+        with self._lock:
+            return id(buf) in self._lent
+
+    def release(self, buf) -> None:
+        """Give a buffer from acquire() back. The caller must not use it (or views of it) afterwards."""
+        size = len(buf)
+        with self._lock:
+            if id(buf) not in self._lent:
+                return
+            self._lent.discard(id(buf))
+            self._outstanding -= size
+            now = time.monotonic()
+            self._expire(now)
+            free = self._free.setdefault(size, [])
+            if len(free) >= self.max_per_class or self._pooled_bytes + size > self.max_pooled_bytes:
+                self._counters["dropped"] += 1
+                return
+            free.append((buf, now))
+            self._pooled_bytes += size
+
+    def _expire(self, now: float, max_idle: Optional[float] = None) -> None:
+        max_idle = self.idle_seconds if max_idle is None else max_idle
+        for size, free in self._free.items():
+            keep = [(b, t) for b, t in free if now - t < max_idle]
+            if len(keep) > self.max_per_class:
+                keep = keep[-self.max_per_class:]
+            freed = (len(free) - len(keep)) * size
+            if freed:
+                self._free[size] = keep
+                self._pooled_bytes -= freed
+                self._counters["trimmed_bytes"] += freed
+        while self._pooled_bytes > self.max_pooled_bytes:
+            size = max(s for s, free in self._free.items() if free)
+            self._free[size].pop(0)
+            self._pooled_bytes -= size
+            self._counters["trimmed_bytes"] += size
+
+    def trim(self, max_idle: float = 0.0) -> int:
+        """Drop idle buffers older than max_idle seconds (default: all). Returns bytes freed."""
+        with self._lock:
+            before = self._pooled_bytes
+            self._expire(time.monotonic() + 1e-9, max_idle)
+            return before - self._pooled_bytes
+
+    def stats(self) -> dict:
+        """Reuse counters plus current pooled (idle) and outstanding (in use) bytes."""
+        with self._lock:
+            return {
+                **self._counters,
+                "pooled_bytes": self._pooled_bytes,
+                "pooled_buffers": sum(len(f) for f in self._free.values()),
+                "outstanding_bytes": self._outstanding,
+                "max_pooled_bytes": self.max_pooled_bytes,
+            }
+
+
+# Shared pool for the encode/decode pipeline (cap via AICARRIER_POOL_MAX_MB)
+BUFFER_POOL = BufferPool(max_pooled_bytes=int(os.environ.get("AICARRIER_POOL_MAX_MB", "256")) * 1024 * 1024)
+
+
+class ChunkReader:
+    """
+    Reads an input file as chunk-sized buffers without copying it into the process.
+
+    Regular files are memory-mapped and chunks are memoryview slices of the
+    map, so compression/encryption read straight from the page cache. Pipes,
+    empty files and anything else mmap refuses fall back to buffered reads into
+    (pooled) buffers, as does an already open binary file passed instead of a
+    path (e.g. sys.stdin.buffer; it is read from its current position and
+    left open). Either way a yielded chunk is only valid until the next
+    one is requested: copy it (bytes(chunk)) to keep it. With owned=True each
+    chunk stays valid until it is handed back with release(), so chunks can be
+    passed on to other threads.
+
+        with ChunkReader(path) as reader:
+            for chunk in reader.chunks(max_chunk_bytes):
+                ...
+    """
+
+    def __init__(self, path, pool: Optional[BufferPool] = BUFFER_POOL):
+        self._source = path if hasattr(path, "readinto") else None
+        self.path = Path(path) if self._source is None else None
+        self.pool = pool
+        self._file = None
+        self._map = None
+
+    def __enter__(self) -> "ChunkReader":
+        if self._source is not None:
+            self._file = self._source
+            return self
+        self._file = self.path.open("rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._map = None  # empty file, pipe or device: buffered reads
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a caller kept a chunk view; the map is freed with it
+            self._map = None
+        if self._source is None:
+            self._file.close()
+
+    @property
+    def mapped(self) -> bool:
+        return self._map is not None
+
+    def chunks(self, chunk_bytes: int, start: int = 0, owned: bool = False):
+        """Yield consecutive chunks of up to chunk_bytes, starting at byte offset start."""
+        if chunk_bytes <= 0:
+            raise ValueError("chunk_bytes must be positive")
+        if self._map is not None:
+            view = memoryview(self._map)
+            try:
+                for pos in range(start, len(self._map), chunk_bytes):
+                    chunk = view[pos:pos + chunk_bytes]
+                    if owned:
+                        yield chunk
+                        continue
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+            finally:
+                view.release()
+            return
+
+        if start:
+            self._file.seek(start, os.SEEK_CUR if self._source is not None else os.SEEK_SET)
+        buf = None
+        try:
+            while True:
+                if buf is None:
+                    buf = self.pool.acquire(chunk_bytes) if self.pool is not None else bytearray(chunk_bytes)
+                view = memoryview(buf)
+                n = self._fill(view[:chunk_bytes])
+                chunk = view[:n]
+                view.release()
+                if not n:
+                    return
+                if owned:
+                    buf = None  # now belongs to the consumer until release()
+                    yield chunk
+                else:
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+                if n < chunk_bytes:
+                    return
+        finally:
+            if buf is not None and self.pool is not None:
+                self.pool.release(buf)
+
+    def release(self, chunk) -> None:
+        """Hand back a chunk obtained with owned=True (or from read_all())."""
+        if not isinstance(chunk, memoryview):
+            return
+        owner = chunk.obj
+        chunk.release()
+        if self.pool is not None and owner is not self._map:
+            self.pool.release(owner)
+
+    def read_all(self):
+        """The whole input: a view of the map, or bytes when the input is not mappable."""
+        if self._map is not None:
+            return memoryview(self._map)
+        return self._file.read()
+
+    def _fill(self, view: memoryview) -> int:
+        # Pipes return short reads; keep reading so chunk boundaries do not depend on them
+        total = 0
+        while total < len(view):
+            n = self._file.readinto(view[total:])
+            if not n:
+                break
+            total += n
+        return total
+
+
+_PIPELINE_END = object()
+
+
+def run_pipeline(source, stages, depth: Optional[int] = None, discard=None):
+    """
+    Run a staged pipeline and yield the results of the last stage, in order.
+
+    source is an iterable consumed on a reader thread; each function in stages
+    runs on its own thread and maps one item to the next; the caller's loop is
+    the final (writer) stage. Neighbouring stages are connected by queues
+    holding at most depth items, so a slow stage applies back-pressure instead
+    of letting chunks pile up, while I/O in one stage overlaps with
+    compression/encryption/deflate in the others. depth 0 runs everything
+    inline on the caller's thread.
+
+    The first exception raised by any stage stops the pipeline and is re-raised
+    to the caller; items still queued (or finished by a stage after the stop)
+    are passed to discard so their buffers can be released.
+    """
+    depth = PIPELINE_DEPTH if depth is None else depth
+    if depth <= 0:
+        for item in source:
+            for fn in stages:
+                item = fn(item)
+            yield item
+        return
+
+    stop = threading.Event()
+    errors = []
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+
+    def put(q, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        if item is not _PIPELINE_END and discard is not None:
+            discard(item)
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _PIPELINE_END
+
+    def run_source():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(queues[0], _PIPELINE_END)
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    def run_stage(fn, inq, outq):
+        try:
+            while True:
+                item = get(inq)
+                if item is _PIPELINE_END:
+                    break
+                if not put(outq, fn(item)):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(outq, _PIPELINE_END)
+
+    threads = [threading.Thread(target=run_source, name="pipeline-reader", daemon=True)]
+    for i, fn in enumerate(stages):
+        threads.append(threading.Thread(target=run_stage, args=(fn, queues[i], queues[i + 1]),
+                                        name=f"pipeline-stage{i + 1}", daemon=True))
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _PIPELINE_END:
+                break
+            yield item
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        for q in queues:
+            while True:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _PIPELINE_END and discard is not None:
+                    discard(item)
+    if errors:
+        raise errors[0]
+
+
+class ProgressJournal:
+    """
+    Append-only JSON-lines journal of a long encode/decode job, so a crashed or
+    recycled run can resume from the last completed chunk.
+
+    The first line describes the job (input identity and parameters); every
+    following line records one completed chunk and is fsync'ed before the next
+    chunk starts (unless the caller batches syncs, see record). A torn last
+    line from a crash is ignored on load.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+
+    def load(self, job: dict) -> List[dict]:
+        """Entries of an existing journal for the same job ([] if missing or for a different job)."""
+        try:
+            lines = self.path.read_text(encoding="utf8").splitlines()
+        except (OSError, UnicodeDecodeError):
+            return []
+        entries = []
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if i == 0:
+                if record != job:
+                    return []
+                continue
+            entries.append(record)
+        return entries
+
+    def start(self, job: dict, entries: Optional[List[dict]] = None) -> None:
+        """(Re)write the journal with the job line and the entries that are still valid."""
+        self.close()
+        lines = [json.dumps(job, sort_keys=True)] + [json.dumps(e, sort_keys=True) for e in entries or []]
+        write_file_atomic(self.path, ("\n".join(lines) + "\n").encode("utf8"))
+        self._file = self.path.open("a", encoding="utf8")
+
+    def record(self, entry: dict, sync: bool = True) -> None:
+        """Append one completed-chunk entry; durably unless sync=False (then it only reaches the OS)."""
+        self._file.write(json.dumps(entry, sort_keys=True) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Drop the journal once the job has completed."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def payload_image_shape(payload_len: int, max_width: int = MAX_WIDTH) -> Tuple[int, int]:
+    """Return (width, height) of the near-square RGB image that holds payload_len bytes."""
+    pixels_needed = ceil_div(payload_len, PIXEL_BYTES)
+    width = int(min(max_width, math.ceil(math.sqrt(pixels_needed))))
+    height = int(ceil_div(pixels_needed, width))
+    return width, height
+
+
+def bytes_to_image_pixels(payload: bytes, max_width: int = MAX_WIDTH) -> Tuple[np.ndarray,int,int]:
+    """
+    Pack payload bytes into RGB image pixels (3 bytes per pixel).
+    Returns (arr, width, height) where arr is HxWx3 uint8 numpy array.
+    """
+    width, height = payload_image_shape(len(payload), max_width)
+    arr = np.zeros(height * width * 3, dtype=np.uint8)
+    arr[:len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+    return arr.reshape(height, width, 3), width, height
+
+
+def save_payload_image(payload, out_path: Path, pool: Optional[BufferPool] = None) -> Tuple[int, int]:
+    """
+    Pack a payload into a PNG, writing via a temp file so readers never see a
+    partial image. With a pool, the pixel buffer comes from (and returns to) the
+    pool; a memoryview payload from seal_payload(..., pool=pool) is packed in
+    place and its buffer released, so the payload must not be used afterwards.
+    """
+    png, w, h = pack_payload_png(payload, pool=pool)
+    write_file_atomic(out_path, png)
+    return w, h
+
+
+def pack_payload_png(payload, pool: Optional[BufferPool] = None) -> Tuple[bytes, int, int]:
+    """
+    Pack a payload into pixels and deflate them into PNG file bytes (no disk I/O).
+    Buffer handling is the same as save_payload_image. Returns (png_bytes, width, height).
+    """
+    w, h = payload_image_shape(len(payload))
+    size = w * h * PIXEL_BYTES
+    owner = getattr(payload, "obj", None)
+    if pool is not None and owner is not None and pool.owns(owner) and len(owner) >= size:
+        buf = owner
+    else:
+        buf = pool.acquire(size) if pool is not None else bytearray(size)
+        buf[:len(payload)] = payload
+    buf[len(payload):size] = bytes(size - len(payload))
+    out = io.BytesIO()
+    try:
+        arr = np.frombuffer(buf, dtype=np.uint8, count=size).reshape(h, w, PIXEL_BYTES)
+        Image.fromarray(arr, mode="RGB").save(out, format="PNG", compress_level=9)
+        del arr
+    finally:
+        if pool is not None:
+            if isinstance(payload, memoryview):
+                payload.release()
+            pool.release(buf)
+    return out.getvalue(), w, h
+
+
+def write_file_atomic(out_path: Path, data: bytes) -> None:
+    """Write data via a temp file in the same directory, then rename it into place."""
+    out_path = Path(out_path)
+    tmp = out_path.with_name(f".{out_path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{out_path.suffix}")
+    try:
+        with tmp.open("wb") as f:
+            f.write(data)
+        os.replace(tmp, out_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def image_pixels_to_bytes(img_path: Path, expected_payload_len: Optional[int]=None) -> bytes:
+    """
+    Read an RGB image and convert the pixel bytes back to a bytes buffer (row-major R,G,B).
+    If expected_payload_len is provided, slice exactly that many bytes from the flattened pixel stream.
+    """
+    try:
+        with Image.open(img_path) as img:
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            # Row-major R,G,B is PIL's raw RGB layout: one copy, no numpy round trip
+            flat = img.tobytes()
+    except (OSError, Image.DecompressionBombError) as e:
+        if getattr(e, "errno", None) is not None:
+            raise  # a real I/O error (callers may retry), not a broken image
+        raise DecodeError(f"Not a readable image: {e}") from e
+    if expected_payload_len is not None:
+        if len(flat) < expected_payload_len:
+            raise DecodeError(f"Image payload too small: need {expected_payload_len} bytes, got {len(flat)}")
+        return flat[:expected_payload_len]
+    return flat
+
+
+def parse_payload_header(flat: bytes) -> Tuple[dict, bytes]:
+    """
+    Split the length-prefixed JSON header off an embedded payload.
+    Returns (header, header_json) where header_json is the exact AAD bytes.
+    Raises ValueError if the payload does not start with a valid header.
+    """
+    if len(flat) < HEADER_LEN:
+        raise ValueError("payload too small")
+    hdr_len = int.from_bytes(flat[0:4], "little")
+    if hdr_len <= 0 or hdr_len > HEADER_LEN - 4:
+        raise ValueError(f"invalid header length {hdr_len}")
+    header_json = bytes(flat[4:4+hdr_len])
+    return json.loads(header_json.decode('utf8')), header_json
+
+
+def _unfilter_png_rows(raw: bytes, stride: int, rows: int) -> bytes:
+    """Undo PNG per-row filters (RGB, 8-bit: 3 bytes per pixel) for the first `rows` rows."""
+    out = bytearray()
+    prev = np.zeros(stride, dtype=np.uint8)
+    for r in range(rows):
+        ftype = raw[r * (stride + 1)]
+        line = np.frombuffer(raw, dtype=np.uint8, count=stride, offset=r * (stride + 1) + 1)
+        if ftype == 0:
+            cur = line.copy()
+        elif ftype == 1:
+            cur = np.cumsum(line.reshape(-1, PIXEL_BYTES), axis=0, dtype=np.uint8).reshape(-1)
+        elif ftype == 2:
+            cur = line + prev
+        elif ftype in (3, 4):
+            cur = bytearray(stride)
+            up = prev.tolist()
+            for i, x in enumerate(line.tolist()):
+                a = cur[i - PIXEL_BYTES] if i >= PIXEL_BYTES else 0
+                b = up[i]
+                if ftype == 3:
+                    cur[i] = (x + ((a + b) >> 1)) & 0xFF
+                else:
+                    c = up[i - PIXEL_BYTES] if i >= PIXEL_BYTES else 0
+                    p = a + b - c
+                    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                    pred = a if (pa <= pb and pa <= pc) else (b if pb <= pc else c)
+                    cur[i] = (x + pred) & 0xFF
+            cur = np.frombuffer(bytes(cur), dtype=np.uint8)
+        else:
+            raise ValueError(f"bad PNG filter type {ftype}")
+        out += cur.tobytes()
+        prev = cur
+    return bytes(out)
+
+
+def _open_image_source(img):
+    """Binary file object for an image path, in-memory image bytes or an open (seekable) file, left open."""
+    if isinstance(img, (bytes, bytearray, memoryview)):
+        return io.BytesIO(img)
+    if hasattr(img, "read"):
+        img.seek(0)
+        return contextlib.nullcontext(img)
+    return Path(img).open("rb")
+
+
+def read_png_prefix(img_path: Path, nbytes: int) -> Optional[bytes]:
+    """
+    Return the first nbytes of the pixel stream of an 8-bit RGB PNG by inflating
+    only the rows that hold them. Returns None for other formats/layouts so the
+    caller can fall back to a full decode. img_path may also be PNG bytes.
+    """
+    need = None
+    raw = b""
+    dec = zlib.decompressobj()
+    with _open_image_source(img_path) as f:
+        if f.read(8) != b"\x89PNG\r\n\x1a\n":
+            return None
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                return None
+            length, ctype = struct.unpack(">I4s", head)
+            data = f.read(length)
+            f.read(4)  # CRC (full decode verifies it; this is only a peek)
+            if ctype == b"IHDR":
+                width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", data)
+                if depth != 8 or color != 2 or interlace:
+                    return None
+                stride = width * PIXEL_BYTES
+                rows = min(height, ceil_div(nbytes, stride))
+                need = rows * (stride + 1)
+            elif ctype == b"IDAT" and need is not None:
+                raw += dec.decompress(dec.unconsumed_tail + data, need - len(raw))
+                if len(raw) >= need:
+                    return _unfilter_png_rows(raw, stride, rows)[:nbytes]
+            elif ctype == b"IEND":
+                return None
+
+
+def read_image_header(img_path: Path) -> dict:
+    """
+    Return only the (unauthenticated) payload header of an image (path, bytes
+    or seekable binary file). PNGs are peeked without decoding the whole
+    image; anything else is fully decoded.
+    """
+    try:
+        prefix = read_png_prefix(img_path, HEADER_LEN)
+    except (ValueError, zlib.error, struct.error):
+        prefix = None
+    if prefix is None:
+        with _open_image_source(img_path) as f:
+            prefix = image_pixels_to_bytes(f)
+    header, _ = parse_payload_header(prefix)
+    return header
+
+
+def validate_orig_filename(name: str) -> None:
+    """Reject filenames that are too long or contain path/control characters."""
+    if len(name) > MAX_FILENAME_LENGTH:
+        raise ValueError(f"Filename too long (max {MAX_FILENAME_LENGTH} characters)")
+    for char in DANGEROUS_CHARS:
+        if char in name:
+            raise ValueError(f"Filename contains forbidden character: '{char}'")
+
+# -------------------- Duration helper (WAV only) --------------------
+def get_wav_duration_seconds(path: Path) -> Optional[float]:
+    try:
+        # Path or an open binary file object (e.g. io.BytesIO of an upload)
+        with wave.open(path if hasattr(path, "read") else str(path), 'rb') as wf:
+            frames = wf.getnframes()
+            rate = wf.getframerate()
+            return frames / float(rate)
+    except Exception:
+        return None
+
+# ===========================
+# ENCODING FUNCTIONS
+# ===========================
+
+# zstd contexts are reused per thread (a context must not be shared between threads)
+_zstd_contexts = threading.local()
+
+
+def zstd_compressor():
+    """Cached level-3 ZstdCompressor for the calling thread."""
+    cctx = getattr(_zstd_contexts, "cctx", None)
+    if cctx is None:
+        cctx = _zstd_contexts.cctx = zstd.ZstdCompressor(level=3)  # Level 3: fast with good ratio
+    return cctx
+
+
+def zstd_decompressor():
+    """Cached ZstdDecompressor for the calling thread."""
+    dctx = getattr(_zstd_contexts, "dctx", None)
+    if dctx is None:
+        dctx = _zstd_contexts.dctx = zstd.ZstdDecompressor()
+    return dctx
+
+
+def maybe_compress(data: bytes, compress: bool = True) -> Tuple[bytes, bool]:
+    """
+    Compress data with zstd (level 3) when enabled and available.
+    Returns (payload, compressed_flag); the compressed form is only used
+    if it is actually smaller than the input.
+    """
+    if compress and HAVE_ZSTD:
+        try:
+            compressed = zstd_compressor().compress(data)
+            if len(compressed) < len(data):
+                return compressed, True
+        except Exception as e:
+            print(f"    [Warning] Compression failed: {e}, using uncompressed")
+    return data, False
+
+
+def seal_payload(header: dict, chunk_bytes: bytes, aead: UserCipher,
+                 compress: bool = True, pool: Optional[BufferPool] = None) -> Tuple[bytes, dict]:
+    """
+    Compress, hash, encrypt and assemble one chunk into the embedded payload layout.
+    
+    The header dict is completed in place with "compressed" and the chunk hash
+    ("sha256", or "merkle_root"/"merkle_leaf_bytes" in "merkle" mode, see
+    select_hash) and then serialized as the AAD, so every field in it is
+    authenticated. Returns
+    (payload_bytes, info) where info holds the sizes needed for chunk metadata.
+    
+    With a pool, the payload is assembled in a pooled buffer already padded to
+    its pixel layout and returned as a memoryview; hand it to
+    save_payload_image(..., pool=pool), which packs it in place and releases it.
+    """
+    # ============================================
+    # Optional Compression
+    # ============================================
+    
+    payload_plain, compressed_flag = maybe_compress(chunk_bytes, compress)
+    if compressed_flag:
+        compression_ratio = len(payload_plain) / len(chunk_bytes)
+        print(f"    [Compression] {len(chunk_bytes)} → {len(payload_plain)} bytes "
+              f"({compression_ratio:.1%})")
+    
+    header["compressed"] = bool(compressed_flag)
+    
+    # ============================================
+    # Compute SHA-256 (or Merkle root) for Integrity
+    # ============================================
+    
+    # Hash of ORIGINAL chunk (before compression)
+    # Used for verification on decryption
+    trailer = b""
+    if _preferred_hash == HASH_MERKLE:
+        leaves = merkle_leaf_digests(chunk_bytes, MERKLE_LEAF_BYTES)
+        header["merkle_leaf_bytes"] = MERKLE_LEAF_BYTES
+        header["merkle_root"] = merkle_root(leaves)
+        trailer = MERKLE_TRAILER + b"".join(leaves)
+    else:
+        header["sha256"] = sha256_hex(chunk_bytes)
+    
+    # Name the AEAD so decoders follow it (covered by the AAD like every field)
+    header["cipher"] = aead.name
+    
+    # ============================================
+    # Serialize Header to JSON
+    # ============================================
+    
+    # Compact JSON (no whitespace) for smaller size
+    header_json = json.dumps(
+        header,
+        separators=(",", ":"),  # No spaces
+        sort_keys=True          # Deterministic ordering
+    ).encode("utf8")
+    
+    if len(header_json) > HEADER_LEN - 4:
+        raise ValueError(
+            f"Header JSON too large: {len(header_json)} bytes "
+            f"(max {HEADER_LEN - 4})"
+        )
+    
+    # ============================================
+    # AEAD Encryption with AAD (AES-256-GCM or ChaCha20-Poly1305)
+    # ============================================
+    
+    # CRITICAL: Nonce MUST be unique for each encryption with same key
+    # Using os.urandom() which uses /dev/urandom or CryptGenRandom
+    # 12 bytes = 96 bits is the standard nonce size for both ciphers
+    nonce = os.urandom(12)
+    
+    # CRITICAL: header_json is used as Additional Authenticated Data (AAD)
+    # This binds the header to the ciphertext
+    # Any modification to header → authentication tag verification fails
+    # This prevents "metadata replacement attacks"
+    ciphertext = aead.encrypt(
+        nonce=nonce,
+        data=payload_plain,
+        associated_data=header_json  # ← AAD protection
+    )
+    
+    # ciphertext includes 16-byte authentication tag at the end
+    
+    # ============================================
+    # Assemble Final Payload
+    # ============================================
+    
+    if pool is not None:
+        payload_len = HEADER_LEN + len(nonce) + len(ciphertext) + len(SENTINEL) + len(trailer)
+        width, height = payload_image_shape(payload_len)
+        buf = pool.acquire(width * height * PIXEL_BYTES)
+        payload = memoryview(buf)[:payload_len]
+        pos = 0
+        for part in (len(header_json).to_bytes(4, "little"), header_json,
+                     bytes(HEADER_LEN - 4 - len(header_json)), nonce, ciphertext, SENTINEL, trailer):
+            payload[pos:pos + len(part)] = part
+            pos += len(part)
+    else:
+        payload = bytearray()
+        
+        # [0:4] Header length (4 bytes, little-endian)
+        payload.extend(len(header_json).to_bytes(4, "little"))
+        
+        # [4:HEADER_LEN] Header JSON (padded with zeros)
+        payload.extend(header_json)
+        if len(payload) < HEADER_LEN:
+            payload.extend(b'\x00' * (HEADER_LEN - len(payload)))
+        
+        # [HEADER_LEN:HEADER_LEN+12] Nonce (12 bytes)
+        payload.extend(nonce)
+        
+        # [HEADER_LEN+12:...] Ciphertext + auth tag
+        payload.extend(ciphertext)
+        
+        # [...:-8] Sentinel marker (8 bytes)
+        # Helps identify end of ciphertext reliably
+        payload.extend(SENTINEL)
+        
+        # [...] Merkle leaf digests ("merkle" mode only)
+        payload.extend(trailer)
+    
+    info = {
+        "header_json_len": len(header_json),
+        "compressed": compressed_flag,
+        "encrypted_size": len(ciphertext),
+        "compression_ratio": len(payload_plain) / len(chunk_bytes) if compressed_flag else 1.0
+    }
+    return (payload if pool is not None else bytes(payload)), info
+
+
+def build_payload_for_chunk(
+    chunk_bytes: bytes,
+    master_hex: Optional[str],
+    user_id: str,
+    orig_filename: str,
+    chunk_index: int,
+    total_chunks: int,
+    compress: bool = True,
+    pool: Optional[BufferPool] = None,
+    set_id: Optional[str] = None,
+    aead: Optional[UserCipher] = None
+) -> Tuple[bytes, dict]:
+    """
+    Build encrypted payload for a single audio chunk.
+    
+    Payload Structure:
+    -----------------
+    [0:4]           → Header length (4 bytes, little-endian)
+    [4:HEADER_LEN]  → JSON metadata header (plaintext, AAD-protected)
+    [HEADER_LEN:]   → Encrypted section:
+                      [0:12]      → Nonce (12 bytes, random)
+                      [12:-8]     → Ciphertext + auth tag (variable)
+                      [-8:]       → Sentinel marker (8 bytes)
+    
+    Encryption Process:
+    ------------------
+    1. Validate inputs (user_id, master_key, filename)
+    2. Derive user-specific key: HKDF(master_key || user_id)
+    3. Optional: Compress chunk with zstd (level 3)
+    4. Generate cryptographically secure 12-byte nonce
+    5. Build JSON metadata header
+    6. Encrypt: AES-256-GCM(key, nonce, data, AAD=header)
+    7. Assemble payload: header + nonce + ciphertext + sentinel
+    
+    Args:
+        chunk_bytes: Raw audio data for this chunk
+        master_hex: Master encryption key (64 hex chars) or None for env var
+        user_id: User identifier for key derivation
+        orig_filename: Original audio filename (stored in metadata)
+        chunk_index: Zero-based index of this chunk
+        total_chunks: Total number of chunks in the file
+        compress: Enable zstd compression (recommended)
+        set_id: Random id shared by all chunks of one encode, so several
+            recordings can share a directory (see scan_recordings)
+        aead: Cipher for the user's key, built once per encode by callers
+            sealing many chunks; derived from master_hex/user_id if None
+        
+    Returns:
+        Tuple of:
+        - payload_bytes: Complete encrypted payload ready for image embedding
+        - metadata: Dictionary with chunk statistics
+        
+    Raises:
+        ValueError: If inputs are invalid
+        RuntimeError: If encryption fails
+        
+    Security Guarantees:
+    -------------------
+    1. **Confidentiality**: Audio data encrypted with AES-256-GCM
+    2. **Integrity**: Authentication tag prevents tampering
+    3. **Authenticity**: AAD binding prevents header replacement attacks
+    4. **Freshness**: Unique random nonce per encryption
+    
+    Metadata Header (Plaintext):
+    ---------------------------
+    {
+        "magic": "AUDIO-IMG-V1",        // Format identifier
+        "version": 1,                    // Protocol version
+        "user_id": "alice",              // ⚠️ VISIBLE - used for key derivation
+        "orig_filename": "audio.wav",    // ⚠️ VISIBLE - original filename
+        "orig_chunk_index": 0,           // Chunk sequence number
+        "orig_total_chunks": 3,          // Total chunks for reassembly
+        "orig_chunk_size": 52428800,     // Original chunk size (bytes)
+        "set_id": "9f86d081884c7d65",    // Encode job id (absent in older images)
+        "compressed": true,              // Compression flag
+        "sha256": "abc123...",           // SHA-256 of plaintext chunk ("merkle"
+                                         // mode: merkle_root + merkle_leaf_bytes)
+        "ts": 1700000000                 // Unix timestamp
+    }
+    
+    ⚠️ SECURITY WARNING:
+    Header is stored in PLAINTEXT (not encrypted). However:
+    - Header is protected by AES-GCM's AAD mechanism
+    - Any modification to header causes decryption to fail
+    - Do NOT include sensitive data in filename or user_id
+    
+    Compression Benefits:
+    --------------------
+    - Typical reduction: 30-60% for audio files
+    - zstd level 3: Good balance of speed/ratio
+    - Only applied if compressed size < original size
+    - Decompression is automatic on decode
+    
+    Example:
+    -------
+    >>> chunk = Path("audio.wav").read_bytes()[:50000000]
+    >>> payload, meta = build_payload_for_chunk(
+    ...     chunk_bytes=chunk,
+    ...     master_hex="DEADBEEF" * 8,
+    ...     user_id="alice",
+    ...     orig_filename="audio.wav",
+    ...     chunk_index=0,
+    ...     total_chunks=1,
+    ...     compress=True
+    ... )
+    >>> print(f"Payload size: {len(payload)} bytes")
+    >>> print(f"Compressed: {meta['compressed']}")
+    """
+    # ============================================
+    # STEP 1: Input Validation
+    # ============================================
+    
+    if not chunk_bytes:
+        raise ValueError("chunk_bytes cannot be empty")
+    
+    if len(chunk_bytes) > DEFAULT_MAX_CHUNK_BYTES * 10:  # 10x safety limit
+        raise ValueError(f"Chunk too large: {len(chunk_bytes)} bytes")
+    
+    if chunk_index < 0:
+        raise ValueError("chunk_index must be >= 0")
+    
+    if total_chunks < 1:
+        raise ValueError("total_chunks must be >= 1")
+    
+    if chunk_index >= total_chunks:
+        raise ValueError(f"chunk_index {chunk_index} >= total_chunks {total_chunks}")
+    
+    # Sanitize filename
+    validate_orig_filename(orig_filename)
+
+    # ============================================
+    # STEP 2: Key Derivation
+    # ============================================
+    
+    if aead is None:
+        master = get_master_key(master_hex)  # Validates and retrieves master key
+        user_key = derive_user_key(master, user_id)  # Validates user_id, derives key
+        aead = UserCipher(user_key)  # Initialize the AEAD (cipher from select_cipher)
+    
+    # ============================================
+    # STEP 3: Build Metadata Header
+    # ============================================
+    
+    header = {
+        "magic": MAGIC_HEADER,
+        "version": PROTOCOL_VERSION,
+        "user_id": user_id,
+        "orig_filename": orig_filename,
+        "orig_chunk_index": chunk_index,
+        "orig_total_chunks": total_chunks,
+        "orig_chunk_size": len(chunk_bytes),
+        "ts": int(time.time()),
+    }
+    if set_id is not None:
+        header["set_id"] = set_id
+    
+    # ============================================
+    # STEP 4: Compress, Hash, Encrypt and Assemble
+    # ============================================
+    
+    payload, sealed = seal_payload(header, chunk_bytes, aead, compress=compress, pool=pool)
+    
+    # ============================================
+    # STEP 5: Return Payload and Metadata
+    # ============================================
+    
+    metadata = {
+        "chunk_index": chunk_index,
+        "total_chunks": total_chunks,
+        "header_json_len": sealed["header_json_len"],
+        "payload_len": len(payload),
+        "set_id": set_id,
+        **digest_fields(header),
+        "compressed": sealed["compressed"],
+        "original_size": len(chunk_bytes),
+        "encrypted_size": sealed["encrypted_size"],
+        "compression_ratio": sealed["compression_ratio"]
+    }
+    
+    return payload, metadata
+
+
+def carrier_image_name(orig_filename: str, chunk_index: int, total_chunks: int) -> str:
+    """Filename of one chunk image: {basename}_part{index:04d}_of_{total:04d}.png (1-based index)."""
+    return f"{Path(orig_filename).stem}_part{chunk_index+1:04d}_of_{total_chunks:04d}.png"
+
+
+def _encode_chunks(chunks, release, orig_filename: str, total_chunks: int, user_id: str,
+                   master_hex: Optional[str], compress: bool, pool: Optional[BufferPool],
+                   pipeline_depth: Optional[int], set_id: str):
+    """
+    Shared encode pipeline: (index, chunk) pairs -> compress/encrypt -> pixel pack
+    + PNG deflate. Yields (image_name, png_bytes, metadata) in chunk order;
+    release(chunk) is called once a chunk has been sealed (or dropped).
+    metadata is build_payload_for_chunk's plus the image width/height.
+    """
+    aead = UserCipher(derive_user_key(get_master_key(master_hex), user_id))  # once per encode, not per chunk
+
+    def seal_chunk(item):
+        idx, chunk = item
+        try:
+            payload, meta = build_payload_for_chunk(chunk, master_hex, user_id, orig_filename, idx,
+                                                    total_chunks, compress=compress, pool=pool, set_id=set_id,
+                                                    aead=aead)
+        finally:
+            release(chunk)
+        return idx, payload, meta
+
+    def pack_chunk(item):
+        # pack into pixels (a pooled payload is packed in place and released)
+        idx, payload, meta = item
+        png, w, h = pack_payload_png(payload, pool=pool)
+        return carrier_image_name(orig_filename, idx, total_chunks), png, {**meta, "width": w, "height": h}
+
+    def discard(item):
+        # Items dropped when the pipeline stops: (idx, chunk) not sealed yet, or
+        # (idx, payload, meta) not packed yet; finished PNGs are plain bytes
+        if len(item) == 2:
+            release(item[1])
+        elif isinstance(item[0], int):
+            payload = item[1]
+            owner = getattr(payload, "obj", None)
+            if isinstance(payload, memoryview):
+                payload.release()
+            if pool is not None and owner is not None and pool.owns(owner):
+                pool.release(owner)
+
+    stages = run_pipeline(chunks, [seal_chunk, pack_chunk], depth=pipeline_depth, discard=discard)
+    try:
+        yield from stages
+    finally:
+        stages.close()
+
+
+def _release_view(chunk) -> None:
+    if isinstance(chunk, memoryview):
+        chunk.release()
+
+
+def iter_encode_bytes(data: bytes, orig_filename: str, user_id: str,
+                      max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                      master_hex: Optional[str] = None, compress: bool = True,
+                      pool: Optional[BufferPool] = BUFFER_POOL,
+                      pipeline_depth: Optional[int] = None):
+    """
+    Generator form of encode_bytes: yields (image_name, png_bytes, metadata) as
+    soon as each chunk's image is ready, in chunk order.
+    """
+    view = memoryview(data)
+    duration = get_wav_duration_seconds(io.BytesIO(data)) if orig_filename.lower().endswith(".wav") else None
+    if duration is not None and duration < EIGHT_HOURS_SECONDS:
+        max_chunk_bytes = max(len(view), 1)
+    total_chunks = ceil_div(len(view), max_chunk_bytes)
+    chunks = ((idx, view[idx * max_chunk_bytes:(idx + 1) * max_chunk_bytes]) for idx in range(total_chunks))
+    stages = _encode_chunks(chunks, _release_view, orig_filename, total_chunks, user_id,
+                            master_hex, compress, pool, pipeline_depth, secrets.token_hex(8))
+    try:
+        yield from stages
+    finally:
+        stages.close()
+        view.release()
+
+
+def encode_bytes(data: bytes, orig_filename: str, user_id: str,
+                 max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                 master_hex: Optional[str] = None, compress: bool = True,
+                 pool: Optional[BufferPool] = BUFFER_POOL,
+                 pipeline_depth: Optional[int] = None) -> List[Tuple[str, bytes, dict]]:
+    """
+    In-memory counterpart of encode_streamed: nothing touches the filesystem.
+    Chunking follows the same rules (a WAV under 8 hours stays one chunk), so the
+    images are interchangeable with the ones encode_streamed writes.
+    Returns [(image_name, png_bytes, metadata)] in chunk order.
+    """
+    return list(iter_encode_bytes(data, orig_filename, user_id, max_chunk_bytes=max_chunk_bytes,
+                                  master_hex=master_hex, compress=compress, pool=pool,
+                                  pipeline_depth=pipeline_depth))
+
+
+WAV_HEADER_PEEK_BYTES = 64 * 1024  # enough for the fmt/LIST chunks ahead of a WAV's data chunk
+
+
+class _PrefixedReader(io.RawIOBase):
+    """Binary reader that returns prefix first, then the rest of src."""
+
+    def __init__(self, prefix: bytes, src):
+        self._prefix = memoryview(prefix)
+        self._src = src
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        return self._src.readinto(b)
+
+
+def iter_encode_reader(src, size: int, orig_filename: str, user_id: str,
+                       max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                       master_hex: Optional[str] = None, compress: bool = True,
+                       pool: Optional[BufferPool] = BUFFER_POOL,
+                       pipeline_depth: Optional[int] = None):
+    """
+    Encode size bytes read from a binary stream (anything with readinto, e.g. a
+    request body that is still arriving) as a standard chunk set. Each chunk is
+    read only when the pipeline has room for it, so encoding overlaps with the
+    transfer and at most pipeline_depth chunks are held. Yields
+    (image_name, png_bytes, metadata) in chunk order; the images are the ones
+    encode_bytes makes of the same data (a WAV under 8 hours stays one chunk).
+    Raises ValueError if the stream holds fewer or more than size bytes.
+    """
+    validate_orig_filename(orig_filename)
+    if size <= 0:
+        raise ValueError("No input data to encode")
+    if orig_filename.lower().endswith(".wav"):
+        head = bytearray(min(size, WAV_HEADER_PEEK_BYTES))
+        got = 0
+        while got < len(head):
+            n = src.readinto(memoryview(head)[got:])
+            if not n:
+                break
+            got += n
+        duration = get_wav_duration_seconds(io.BytesIO(head[:got]))
+        if duration is not None and duration < EIGHT_HOURS_SECONDS:
+            max_chunk_bytes = size
+        src = _PrefixedReader(bytes(head[:got]), src)
+    total_chunks = ceil_div(size, max_chunk_bytes)
+
+    with ChunkReader(src, pool=pool) as reader:
+
+        def read_chunks():
+            received = 0
+            for idx, chunk in enumerate(reader.chunks(max_chunk_bytes, owned=True)):
+                received += len(chunk)
+                if idx >= total_chunks:
+                    reader.release(chunk)
+                    raise ValueError(f"Input is longer than the announced {size} bytes")
+                yield idx, chunk
+            if received != size:
+                raise ValueError(f"Input ended after {received} of {size} bytes")
+
+        stages = _encode_chunks(read_chunks(), reader.release, orig_filename, total_chunks, user_id,
+                                master_hex, compress, pool, pipeline_depth, secrets.token_hex(8))
+        try:
+            yield from stages
+        finally:
+            stages.close()
+
+
+def encode_journal_path(out_dir: Path, input_file: Path) -> Path:
+    """Checkpoint journal of an encode of input_file into out_dir."""
+    return Path(out_dir) / f".{Path(input_file).stem}.encode.journal"
+
+
+def _resume_encode(journal: ProgressJournal, job: dict, out_dir: Path) -> List[dict]:
+    """Journal entries whose images are still on disk and intact (a gap-free prefix)."""
+    intact = []
+    for entry in journal.load(job):
+        image = out_dir / entry.get("image", "")
+        if entry.get("index") != len(intact) or entry["image"] != carrier_image_name(job["input"], len(intact), job["total_chunks"]):
+            break
+        try:
+            if sha256_hex(image.read_bytes()) != entry.get("sha256"):
+                print(f"[!] {image.name} changed since it was written; re-encoding from chunk {len(intact)+1}")
+                break
+        except OSError:
+            break
+        intact.append(entry)
+    return intact
+
+
+def iter_encode_file(input_file: Path, user_id: str, out_dir: Optional[Path] = None,
+                     max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                     master_hex: Optional[str] = None, compress: bool = True,
+                     pool: Optional[BufferPool] = BUFFER_POOL,
+                     pipeline_depth: Optional[int] = None, resume: bool = False):
+    """
+    Generator form of encode_streamed: yields (image_name, image, metadata) for
+    each chunk as soon as its image is finished, in chunk order, so callers can
+    zip, upload or report progress while later chunks are still being encoded.
+    image is the written Path when out_dir is given, else the PNG bytes.
+    metadata is build_payload_for_chunk's plus the image width/height.
+    Closing the generator early stops the pipeline.
+
+    With out_dir, completed chunks (image name, PNG hash, input offset) are
+    recorded in a journal next to the images. resume=True continues an
+    interrupted run of the same job after the last chunk whose image is still
+    intact; those chunks are yielded first without being re-encoded.
+    """
+    input_file = Path(input_file)
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+    stat = input_file.stat()
+    file_size = stat.st_size
+
+    # Try to detect duration for WAV files and avoid chunking if under 8 hours
+    duration = get_wav_duration_seconds(input_file) if input_file.suffix.lower() == ".wav" else None
+    if duration is not None:
+        print(f"[+] Detected WAV duration: {duration:.1f}s")
+        if duration < EIGHT_HOURS_SECONDS:
+            print("[+] Duration < 8 hours: encoding as single chunk (no split)")
+            total_chunks = 1
+            single = True
+        else:
+            total_chunks = ceil_div(file_size, max_chunk_bytes)
+            single = False
+    else:
+        total_chunks = ceil_div(file_size, max_chunk_bytes)
+        single = False
+
+    produced = 0
+    offset = 0
+    set_id = secrets.token_hex(8)
+    journal = None
+    if out_dir is not None:
+        journal = ProgressJournal(encode_journal_path(out_dir, input_file))
+        job = {
+            "kind": "encode",
+            "input": input_file.name,
+            "size": file_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "user_id": user_id,
+            "max_chunk_bytes": None if single else max_chunk_bytes,
+            "total_chunks": total_chunks,
+            "compress": compress,
+        }
+        done = _resume_encode(journal, job, out_dir) if resume else []
+        if resume:
+            print(f"[+] Resuming: {len(done)}/{total_chunks} chunks already encoded" if done
+                  else "[+] Nothing to resume; encoding from the start")
+        journal.start(job, done)
+        if done:
+            set_id = done[0]["meta"].get("set_id")  # resumed images keep their set
+        for entry in done:
+            produced += 1
+            offset += entry["meta"]["original_size"]
+            yield entry["image"], out_dir / entry["image"], entry["meta"]
+    first = produced
+
+    # Chunks are zero-copy views of the memory-mapped input (buffered reads if it cannot be mapped)
+    with ChunkReader(input_file, pool=pool) as reader:
+
+        def read_chunks():
+            if single:
+                if first == 0:
+                    yield 0, reader.read_all()
+                return
+            for idx, chunk in enumerate(reader.chunks(max_chunk_bytes, start=offset, owned=True), start=first):
+                if idx >= total_chunks:
+                    reader.release(chunk)
+                    raise RuntimeError(f"{input_file.name} grew while encoding; use --append for growing recordings")
+                print(f"[+] Reading chunk {idx+1}/{total_chunks} ...")
+                yield idx, chunk
+
+        stages = _encode_chunks(read_chunks(), reader.release, input_file.name, total_chunks,
+                                user_id, master_hex, compress, pool, pipeline_depth, set_id)
+        try:
+            for name, png, meta in stages:
+                produced += 1
+                if out_dir is None:
+                    yield name, png, meta
+                    continue
+                out_name = out_dir / name
+                write_file_atomic(out_name, png)
+                journal.record({"index": meta["chunk_index"], "image": name, "sha256": sha256_hex(png),
+                                "offset": offset, "meta": meta})
+                offset += meta["original_size"]
+                print(f"    -> wrote image: {out_name}  (payload {meta['payload_len']} bytes, image {meta['width']}x{meta['height']})")
+                yield name, out_name, meta
+        finally:
+            stages.close()
+            if journal is not None:
+                journal.close()
+        if produced != total_chunks:
+            raise RuntimeError(f"{input_file.name} shrank while encoding")
+    if journal is not None:
+        journal.remove()
+
+
+def encode_streamed(input_file: Path, out_dir: Path, user_id: str,
+                    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                    master_hex: Optional[str]=None, compress: bool=True,
+                    pool: Optional[BufferPool] = BUFFER_POOL,
+                    pipeline_depth: Optional[int] = None, resume: bool = False):
+    """
+    Stream input_file, split into raw chunks (max_chunk_bytes), and for each chunk:
+      - optionally compress,
+      - encrypt,
+      - pack into image and save as PNG.
+    Reading, compress/encrypt, pixel packing/deflate and writing run as
+    overlapped pipeline stages (see run_pipeline; pipeline_depth chunks are
+    queued between stages, default PIPELINE_DEPTH).
+    Output filenames: {basename}_part{index:04d}_of_{total:04d}.png
+    Read, payload and pixel buffers come from pool (None: plain allocations).
+    Progress is journaled; resume=True continues an interrupted run (see iter_encode_file).
+    Returns list of generated image paths (see iter_encode_file to get each
+    image as soon as it is written).
+    """
+    generated = [path for _, path, _ in iter_encode_file(input_file, user_id, out_dir=out_dir,
+                                                         max_chunk_bytes=max_chunk_bytes, master_hex=master_hex,
+                                                         compress=compress, pool=pool,
+                                                         pipeline_depth=pipeline_depth, resume=resume)]
+    print(f"[+] Done. Generated {len(generated)} images in {out_dir}")
+    return generated
+
+# ===========================
+# DECODING FUNCTIONS
+# ===========================
+
+class DecodeError(RuntimeError):
+    """
+    The images themselves cannot be decoded: wrong key or user_id, tampered
+    or foreign images, missing or duplicate chunks. Other errors while
+    decoding are the system's (I/O, missing codecs).
+    """
+
+
+def open_payload(flat: bytes, aead: UserCipher, label: str = "chunk") -> Tuple[dict, bytes]:
+    """
+    Inverse of seal_payload: locate the ciphertext after the header, decrypt it
+    with the header JSON as AAD, decompress and verify the SHA-256 (or Merkle root).
+    Returns (header, plaintext). Raises DecodeError on any integrity failure.
+    """
+    header, header_json = parse_payload_header(flat)
+    if len(flat) < HEADER_LEN + 12:
+        raise DecodeError(f"Insufficient payload after header in {label}")
+    # Slice through a memoryview so the (chunk-sized) ciphertext is not copied
+    view = memoryview(flat)
+    nonce = bytes(view[HEADER_LEN:HEADER_LEN + 12])
+    start = HEADER_LEN + 12
+    # try to find sentinel to determine ciphertext boundary
+    sentinel_idx = flat.find(SENTINEL, HEADER_LEN)
+    if sentinel_idx != -1:
+        ciphertext = view[start:max(start, sentinel_idx)]
+    else:
+        # fallback: trim trailing zeros conservatively
+        end = len(flat.rstrip(b"\x00"))
+        ciphertext = view[start:max(start, end)] if end > start else view[start:]
+
+    try:
+        plaintext = aead.decrypt(nonce, ciphertext, header_json, cipher=header.get("cipher"))
+    except Exception as e:
+        raise DecodeError(f"Decryption failed for {label}: {e}")
+    if header.get("compressed", False):
+        if not HAVE_ZSTD:
+            raise RuntimeError("Chunk is compressed but python zstandard not available for decompression")
+        plaintext = zstd_decompressor().decompress(plaintext)
+    # verify sha
+    if hash_chunk(plaintext, header) != chunk_digest(header):
+        raise DecodeError(f"SHA mismatch for {label}")
+    return header, plaintext
+
+
+def decode_journal_path(out_file: Path) -> Path:
+    """Checkpoint journal of a decode into out_file."""
+    out_file = Path(out_file)
+    return out_file.with_name(f".{out_file.name}.decode.journal")
+
+
+def _resume_decode(journal: ProgressJournal, job: dict, parts_sorted: List[tuple], out_file: Path) -> List[dict]:
+    """Journal entries whose bytes are still intact in out_file (a gap-free prefix)."""
+    intact = []
+    flushed = 0
+    try:
+        with out_file.open("rb") as f:
+            for entry in journal.load(job):
+                idx = len(intact)
+                header = parts_sorted[idx][1] if idx < len(parts_sorted) else None
+                if header is None or entry.get("index") != idx or entry.get("flushed") != flushed + header["orig_chunk_size"]:
+                    break
+                f.seek(flushed)
+                if hash_chunk(f.read(header["orig_chunk_size"]), header) != chunk_digest(header):
+                    print(f"[!] Output changed after chunk {idx}; decoding again from there")
+                    break
+                flushed = entry["flushed"]
+                intact.append(entry)
+    except OSError:
+        return []
+    return intact
+
+
+def _image_paths(indir: Path) -> List[Path]:
+    return sorted(p for p in Path(indir).iterdir()
+                  if p.suffix.lower() in (".png", ".tiff", ".tif") and not p.name.startswith("."))
+
+
+def _file_set_key(header: dict):
+    """Which standard chunk set an image belongs to: its set_id, or filename and chunk count for older encoders."""
+    return header.get("set_id") or (header.get("orig_filename"), header.get("orig_total_chunks"))
+
+
+def scan_recordings(indir: Path) -> List[dict]:
+    """
+    Group the images in indir into recordings by peeking their headers (nothing
+    is decrypted). Standard chunk sets are told apart by set_id (by filename and
+    chunk count for images from older encoders), streams by stream_id, and CDC
+    recordings by their manifests; bundle images are not recordings.
+    Returns one dict per recording:
+      {"kind": "file"|"stream"|"cdc", "indir", "name", "orig_filename",
+       "parts": [(path, header, None)] in chunk order, "manifest",
+       "total", "missing": [...], "problems": [...]}
+    "problems" is empty when the recording can be decoded.
+    """
+    indir = Path(indir)
+    files = {}
+    streams = {}
+    for p in _image_paths(indir):
+        try:
+            header = read_image_header(p)
+        except Exception as e:
+            print(f"[!] skipping {p} ({e})")
+            continue
+        if header.get("magic") == MAGIC_HEADER:
+            files.setdefault(_file_set_key(header), []).append((p, header, None))
+        elif header.get("magic") == STREAM_MAGIC:
+            streams.setdefault(header.get("stream_id"), []).append((p, header, None))
+
+    recordings = []
+    for key, parts in files.items():
+        parts.sort(key=lambda part: part[1]["orig_chunk_index"])
+        first = parts[0][1]
+        total = first.get("orig_total_chunks")
+        indices = [h["orig_chunk_index"] for _, h, _ in parts]
+        problems = []
+        missing = sorted(set(range(total)) - set(indices)) if isinstance(total, int) else []
+        if missing:
+            problems.append(f"missing chunk {', '.join(str(i + 1) for i in missing[:20])}"
+                            + (" ..." if len(missing) > 20 else "") + f" of {total}")
+        if len(set(indices)) != len(indices):
+            problems.append("duplicate chunk indexes")
+        if any(h.get("orig_total_chunks") != total for _, h, _ in parts):
+            problems.append("inconsistent orig_total_chunks")
+        recordings.append({"kind": "file", "indir": indir, "name": first.get("set_id") or first.get("orig_filename"),
+                           "orig_filename": first.get("orig_filename"), "parts": parts, "manifest": None,
+                           "total": total, "missing": missing, "problems": problems})
+    for stream_id, parts in streams.items():
+        problems = []
+        try:
+            state = _select_stream(parts, stream_id=stream_id)
+            parts = state["chunks"]
+        except RuntimeError as e:
+            problems.append(str(e))
+        manifest = _stream_manifest(indir, stream_id)
+        count, _ = _contiguous_prefix(parts)
+        total = None
+        if manifest is not None:
+            total = json.loads(manifest.read_text(encoding="utf8")).get("total_chunks")
+        missing = sorted(set(range(total if total is not None else count)) - {h["seq"] for _, h, _ in parts})
+        if manifest is not None and count < total:
+            problems.append(f"sealed stream is missing chunk seq {', '.join(map(str, missing[:20]))}")
+        recordings.append({"kind": "stream", "indir": indir, "name": stream_id,
+                           "orig_filename": parts[0][1].get("orig_filename"), "parts": parts, "manifest": manifest,
+                           "total": total, "missing": missing, "problems": problems})
+    for m in find_manifests(indir, kind="cdc"):
+        manifest = json.loads(m.read_text(encoding="utf8"))
+        recordings.append({"kind": "cdc", "indir": indir, "name": m.name, "orig_filename": manifest.get("orig_filename"),
+                           "parts": [], "manifest": m, "total": len(manifest.get("chunks", [])), "missing": [],
+                           "problems": []})
+    return recordings
+
+
+def decode_recording(recording: dict, out_file: Path, user_id: str, master_hex: Optional[str] = None,
+                     store_dir: Optional[Path] = None, pipeline_depth: Optional[int] = None,
+                     resume: bool = False) -> Path:
+    """Decode one recording found by scan_recordings to out_file."""
+    if recording["problems"]:
+        raise DecodeError(f"Incomplete chunk set {recording['orig_filename']}: {'; '.join(recording['problems'])}")
+    if recording["kind"] == "cdc":
+        return decode_cdc(recording["manifest"], out_file, user_id, master_hex=master_hex, store_dir=store_dir)
+    if recording["kind"] == "stream":
+        return decode_stream(recording["indir"], out_file, user_id, master_hex=master_hex,
+                             stream_id=recording["name"], parts=recording["parts"], pipeline_depth=pipeline_depth)
+    _decode_chunk_set(recording["parts"], out_file, user_id, master_hex, pipeline_depth, resume)
+    return Path(out_file)
+
+
+def decode_images_to_file(indir: Path, out_file: Path, user_id: str, master_hex: Optional[str]=None,
+                          store_dir: Optional[Path]=None, pipeline_depth: Optional[int]=None,
+                          resume: bool = False):
+    """
+    Find all image files in indir that match pattern *_partXXXX_of_YYYY.png,
+    sort by part index, extract payload bytes, decrypt each chunk and write to out_file in order.
+    Headers are peeked to order the parts; reading/inflating, decrypting and
+    writing then run as overlapped pipeline stages (see run_pipeline).
+    Every chunk is journaled next to out_file (output and journal are fsync'ed
+    every DECODE_SYNC_BYTES and at the end); resume=True continues an
+    interrupted decode of the same images after the last chunk whose bytes in
+    out_file are still intact.
+    If indir holds a CDC manifest instead, the recording is rebuilt from the
+    chunks it references (see decode_cdc); append-mode stream chunks are handed
+    to decode_stream.
+    indir must hold exactly one recording; see decode_directory for folders
+    holding several.
+    """
+    recordings = scan_recordings(indir)
+    if not recordings:
+        if not _image_paths(indir):
+            raise DecodeError("No PNG/TIFF images found in input directory")
+        raise DecodeError("No valid audio-image files found in directory")
+    if len(recordings) > 1:
+        names = ", ".join(sorted({str(r["orig_filename"]) for r in recordings}))
+        raise DecodeError(f"Found {len(recordings)} recordings in input directory ({names}); "
+                           "decode them all with decode_directory (CLI: decode --all)")
+    return decode_recording(recordings[0], out_file, user_id, master_hex=master_hex, store_dir=store_dir,
+                            pipeline_depth=pipeline_depth, resume=resume)
+
+
+def decode_directory(indir: Path, out_dir: Path, user_id: str, master_hex: Optional[str] = None,
+                     store_dir: Optional[Path] = None, workers: Optional[int] = None,
+                     pipeline_depth: Optional[int] = None, resume: bool = False) -> List[dict]:
+    """
+    Decode every recording in indir (see scan_recordings) into out_dir, several
+    at a time. Each is written as out_dir/<orig_filename>; recordings sharing a
+    filename get their set id appended to the stem. Incomplete or failing
+    recordings are reported rather than aborting the others.
+    Returns one report per recording:
+      {"set", "kind", "orig_filename", "ok", "output", "chunks", "missing", "error"}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    recordings = scan_recordings(indir)
+    names = [Path(str(r["orig_filename"])).name for r in recordings]
+
+    def output_for(recording):
+        name = Path(str(recording["orig_filename"])).name
+        validate_orig_filename(name)
+        if names.count(name) > 1:
+            tag = str(recording["name"]).replace(".", "_")[:16]
+            name = f"{Path(name).stem}.{tag}{Path(name).suffix}"
+        return out_dir / name
+
+    def decode(recording):
+        report = {"set": recording["name"], "kind": recording["kind"], "orig_filename": recording["orig_filename"],
+                  "ok": False, "output": None, "chunks": len(recording["parts"]) or recording["total"],
+                  "missing": recording["missing"], "error": None}
+        try:
+            out_file = output_for(recording)
+            decode_recording(recording, out_file, user_id, master_hex=master_hex, store_dir=store_dir,
+                             pipeline_depth=pipeline_depth, resume=resume)
+            report.update(ok=True, output=out_file)
+        except Exception as e:
+            report["error"] = str(e)
+        return report
+
+    with ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1)) as pool:
+        reports = list(pool.map(decode, recordings))
+    failed = sum(not r["ok"] for r in reports)
+    print(f"[+] Decoded {len(reports) - failed}/{len(reports)} recordings into {out_dir}")
+    return reports
+
+
+def _decode_chunk_set(parts_sorted: List[tuple], out_file: Path, user_id: str, master_hex: Optional[str],
+                      pipeline_depth: Optional[int], resume: bool) -> None:
+    """Decode a complete standard chunk set (in chunk order) to out_file; see decode_images_to_file."""
+    master = get_master_key(master_hex)
+    aead = UserCipher(derive_user_key(master, user_id))
+
+    def read_part(part):
+        p, header, flat = part
+        return p, header, (flat if flat is not None else image_pixels_to_bytes(p))
+
+    def open_part(part):
+        p, header, flat = part
+        print(f"[+] Decoding chunk {header['orig_chunk_index']+1}/{header['orig_total_chunks']} from {p.name}")
+        _, plaintext = open_payload(flat, aead, label=f"chunk {header['orig_chunk_index']}")
+        return plaintext
+
+    out_file = Path(out_file)
+    journal = ProgressJournal(decode_journal_path(out_file))
+    job = {
+        "kind": "decode",
+        "user_id": user_id,
+        "parts": [[p.name, chunk_digest(header)] for p, header, _ in parts_sorted],
+    }
+    done = _resume_decode(journal, job, parts_sorted, out_file) if resume else []
+    flushed = done[-1]["flushed"] if done else 0
+    if resume:
+        print(f"[+] Resuming: {len(done)}/{len(parts_sorted)} chunks already written ({flushed} bytes)" if done
+              else "[+] Nothing to resume; decoding from the start")
+    journal.start(job, done)
+
+    try:
+        with out_file.open("r+b" if done else "wb") as outf:
+            outf.truncate(flushed)
+            outf.seek(flushed)
+            stages = run_pipeline(parts_sorted[len(done):], [read_part, open_part], depth=pipeline_depth)
+            try:
+                unsynced = 0
+                for idx, plaintext in enumerate(stages, start=len(done)):
+                    # Syncs are batched: resume re-hashes every journaled chunk against
+                    # out_file, so an entry whose bytes never reached the disk is caught
+                    outf.write(plaintext)
+                    outf.flush()
+                    flushed += len(plaintext)
+                    unsynced += len(plaintext)
+                    sync = unsynced >= DECODE_SYNC_BYTES
+                    if sync:
+                        os.fsync(outf.fileno())
+                        unsynced = 0
+                    journal.record({"index": idx, "flushed": flushed}, sync=sync)
+                    print(f"    wrote {len(plaintext)} bytes")
+                os.fsync(outf.fileno())
+            finally:
+                stages.close()
+    finally:
+        journal.close()
+    journal.remove()
+    print(f"[+] Reconstructed audio to {out_file} (size {out_file.stat().st_size} bytes)")
+
+
+def decode_bytes(images, user_id: str, master_hex: Optional[str] = None,
+                 pipeline_depth: Optional[int] = None) -> bytes:
+    """
+    In-memory counterpart of decode_images_to_file for one recording: images are
+    PNG bytes or (name, png_bytes, ...) tuples such as encode_bytes returns, in
+    any order. Standard chunk sets must be complete; append-mode stream chunks
+    decode their contiguous run from seq 0 (an open stream, since a sealed
+    stream's manifest is a file). Nothing touches the filesystem.
+    Returns the recovered audio bytes.
+    """
+    named = [(img[0], img[1]) if isinstance(img, tuple) else (f"image {i}", img) for i, img in enumerate(images)]
+
+    def inflate(item):
+        name, png = item
+        flat = image_pixels_to_bytes(io.BytesIO(png))
+        header, _ = parse_payload_header(flat)
+        return Path(name), header, flat
+
+    parts = list(run_pipeline(named, [inflate], depth=pipeline_depth))
+    if not parts:
+        raise ValueError("No images given")
+    magics = {header.get("magic") for _, header, _ in parts}
+    if magics == {STREAM_MAGIC}:
+        state = _select_stream(parts)
+        count, _ = _contiguous_prefix(state["chunks"])
+        if count < len(state["chunks"]):
+            print(f"[!] Gap after seq {count - 1}; decoding the first {count} chunks only")
+        parts, field, labels = state["chunks"][:count], "seq", "stream chunk"
+    elif magics == {MAGIC_HEADER}:
+        field, labels = "orig_chunk_index", "chunk"
+        parts.sort(key=lambda part: part[1][field])
+        total = parts[0][1]["orig_total_chunks"]
+        if [part[1][field] for part in parts] != list(range(total)) \
+                or any(part[1]["orig_total_chunks"] != total for part in parts):
+            raise DecodeError(f"Incomplete chunk set: got {len(parts)} images, header says {total}")
+    else:
+        raise ValueError("Images are not a single chunked recording (bundle, CDC or mixed sets need the file-based decoders)")
+
+    master = get_master_key(master_hex)
+    aead = UserCipher(derive_user_key(master, user_id))
+
+    def open_part(part):
+        path, header, flat = part
+        return open_payload(flat, aead, label=f"{labels} {header[field]} ({path.name})")
+
+    out = []
+    written = 0
+    for header, plaintext in run_pipeline(parts, [open_part], depth=pipeline_depth):
+        if field == "seq" and header.get("offset") != written:
+            raise DecodeError(f"Stream chunk {header['seq']} out of place")
+        out.append(plaintext)
+        written += len(plaintext)
+    return b"".join(out)
+
+# ===========================
+# BUNDLE FUNCTIONS
+# ===========================
+
+def build_bundle_payload(
+    members: List[Tuple[str, bytes]],
+    master_hex: Optional[str],
+    user_id: str,
+    bundle_name: str,
+    bundle_index: int = 0,
+    bundle_total: int = 1,
+    compress: bool = True
+) -> Tuple[bytes, dict]:
+    """
+    Build one encrypted payload that carries several small recordings.
+    
+    Payload Structure:
+    -----------------
+    [0:4]           → Header length (4 bytes, little-endian)
+    [4:HEADER_LEN]  → JSON bundle header (plaintext, AAD for the TOC)
+    [HEADER_LEN:]   → Encrypted table of contents:
+                      [0:12]      → TOC nonce (12 bytes, random)
+                      [12:12+N]   → TOC ciphertext + auth tag (N = header["toc_len"])
+    ...             → One section per member: nonce (12 bytes) + ciphertext + tag
+    [-8:]           → Sentinel marker (8 bytes)
+    
+    The TOC records each member's name, original size, sha256, compression flag
+    and the offset/length of its section (relative to the end of the TOC).
+    Each member is sealed separately with AAD = "{bundle_id}:{index}:{name}",
+    so a single member can be recovered by decrypting only the TOC and that
+    member's section.
+    
+    Args:
+        members: List of (filename, raw audio bytes) pairs
+        master_hex: Master encryption key (64 hex chars) or None for env var
+        user_id: User identifier for key derivation
+        bundle_name: Name of the bundle set (stored in header)
+        bundle_index: Zero-based index of this bundle image in the set
+        bundle_total: Total number of bundle images in the set
+        compress: Enable zstd compression per member
+        
+    Returns:
+        Tuple of (payload_bytes, metadata)
+        
+    Raises:
+        ValueError: If inputs are invalid
+    """
+    if not members:
+        raise ValueError("Bundle must contain at least one member")
+    
+    if bundle_total < 1 or not 0 <= bundle_index < bundle_total:
+        raise ValueError(f"bundle_index {bundle_index} out of range for bundle_total {bundle_total}")
+    
+    validate_orig_filename(bundle_name)
+    seen = set()
+    for name, data in members:
+        validate_orig_filename(name)
+        if name in seen:
+            raise ValueError(f"Duplicate bundle member name: {name}")
+        seen.add(name)
+        if not data:
+            raise ValueError(f"Bundle member is empty: {name}")
+    
+    master = get_master_key(master_hex)
+    user_key = derive_user_key(master, user_id)
+    aead = UserCipher(user_key)
+    bundle_id = binascii.hexlify(os.urandom(16)).decode("ascii")
+    
+    # Seal every member independently
+    sections = []
+    toc_members = []
+    offset = 0
+    raw_total = 0
+    for idx, (name, data) in enumerate(members):
+        plain, compressed_flag = maybe_compress(data, compress)
+        nonce = os.urandom(12)
+        aad = f"{bundle_id}:{idx}:{name}".encode("utf8")
+        ciphertext = aead.encrypt(nonce, plain, aad)
+        toc_members.append({
+            "index": idx,
+            "name": name,
+            "offset": offset,
+            "length": 12 + len(ciphertext),
+            "orig_size": len(data),
+            "compressed": compressed_flag,
+            "sha256": sha256_hex(data),
+        })
+        sections.append((nonce, ciphertext))
+        offset += 12 + len(ciphertext)
+        raw_total += len(data)
+    
+    toc_json = json.dumps({"members": toc_members}, separators=(",", ":"), sort_keys=True).encode("utf8")
+    
+    header = {
+        "magic": BUNDLE_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "user_id": user_id,
+        "bundle_id": bundle_id,
+        "bundle_name": bundle_name,
+        "bundle_index": bundle_index,
+        "bundle_total": bundle_total,
+        "member_count": len(members),
+        "toc_len": len(toc_json) + AESGCM_TAG_LEN,
+        "cipher": aead.name,
+        "ts": int(time.time()),
+    }
+    header_json = json.dumps(header, separators=(",", ":"), sort_keys=True).encode("utf8")
+    if len(header_json) > HEADER_LEN - 4:
+        raise ValueError(f"Header JSON too large: {len(header_json)} bytes (max {HEADER_LEN - 4})")
+    
+    # The TOC is bound to the plaintext header, so header tampering is detected
+    # before any member is touched
+    toc_nonce = os.urandom(12)
+    toc_ciphertext = aead.encrypt(toc_nonce, toc_json, header_json)
+    
+    payload = bytearray()
+    payload.extend(len(header_json).to_bytes(4, "little"))
+    payload.extend(header_json)
+    payload.extend(b'\x00' * (HEADER_LEN - len(payload)))
+    payload.extend(toc_nonce)
+    payload.extend(toc_ciphertext)
+    for nonce, ciphertext in sections:
+        payload.extend(nonce)
+        payload.extend(ciphertext)
+    payload.extend(SENTINEL)
+    
+    metadata = {
+        "bundle_id": bundle_id,
+        "bundle_index": bundle_index,
+        "bundle_total": bundle_total,
+        "member_count": len(members),
+        "payload_len": len(payload),
+        "original_size": raw_total,
+        "toc_len": header["toc_len"],
+    }
+    
+    return bytes(payload), metadata
+
+
+def read_bundle_toc(flat: bytes, user_id: str, master_hex: Optional[str] = None) -> Tuple[dict, List[dict], int]:
+    """
+    Decrypt the table of contents of a bundle payload.
+    Returns (header, members, members_start) where members_start is the payload
+    offset that the TOC entry offsets are relative to.
+    Raises ValueError if the payload is not a bundle, RuntimeError if the TOC
+    cannot be authenticated.
+    """
+    header, header_json = parse_payload_header(flat)
+    if header.get("magic") != BUNDLE_MAGIC:
+        raise ValueError("not a bundle image")
+    toc_len = int(header["toc_len"])
+    toc_start = HEADER_LEN + 12
+    if len(flat) < toc_start + toc_len:
+        raise RuntimeError("Bundle payload truncated inside table of contents")
+    
+    master = get_master_key(master_hex)
+    aead = UserCipher(derive_user_key(master, user_id))
+    try:
+        toc_json = aead.decrypt(bytes(flat[HEADER_LEN:toc_start]), bytes(flat[toc_start:toc_start + toc_len]), header_json,
+                                cipher=header.get("cipher"))
+    except Exception as e:
+        raise RuntimeError(f"Bundle TOC decryption failed for bundle {header.get('bundle_index')}: {e}")
+    return header, json.loads(toc_json.decode("utf8"))["members"], toc_start + toc_len
+
+
+def decrypt_bundle_member(flat: bytes, header: dict, entry: dict, members_start: int,
+                          user_id: str, master_hex: Optional[str] = None) -> bytes:
+    """
+    Decrypt, decompress and verify a single bundle member described by a TOC entry.
+    Only that member's section of the payload is decrypted.
+    """
+    start = members_start + int(entry["offset"])
+    end = start + int(entry["length"])
+    if len(flat) < end:
+        raise RuntimeError(f"Bundle payload truncated inside member {entry['name']}")
+    
+    master = get_master_key(master_hex)
+    aead = UserCipher(derive_user_key(master, user_id))
+    aad = f"{header['bundle_id']}:{entry['index']}:{entry['name']}".encode("utf8")
+    try:
+        plaintext = aead.decrypt(bytes(flat[start:start + 12]), bytes(flat[start + 12:end]), aad,
+                                 cipher=header.get("cipher"))
+    except Exception as e:
+        raise RuntimeError(f"Decryption failed for bundle member {entry['name']}: {e}")
+    if entry.get("compressed", False):
+        if not HAVE_ZSTD:
+            raise RuntimeError("Member is compressed but python zstandard not available for decompression")
+        plaintext = zstd_decompressor().decompress(plaintext)
+    if sha256_hex(plaintext) != entry.get("sha256"):
+        raise RuntimeError(f"SHA mismatch for bundle member {entry['name']}")
+    return plaintext
+
+
+def encode_bundle(input_files: List[Path], out_dir: Path, user_id: str, bundle_name: str = "bundle",
+                  max_bundle_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
+                  master_hex: Optional[str] = None, compress: bool = True) -> List[Path]:
+    """
+    Pack many small recordings into as few carrier images as possible.
+    Files are grouped in the given order so that each image holds at most
+    max_bundle_bytes of raw audio (a larger file gets an image to itself).
+    Output filenames: {bundle_name}_bundle{index:04d}_of_{total:04d}.png
+    Returns list of generated image paths.
+    """
+    if not input_files:
+        raise ValueError("No input files provided for bundle")
+    names = [Path(f).name for f in input_files]
+    if len(set(names)) != len(names):
+        raise ValueError("Bundle member filenames must be unique")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    
+    groups = []
+    current, current_size = [], 0
+    for f in input_files:
+        size = Path(f).stat().st_size
+        if current and current_size + size > max_bundle_bytes:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(Path(f))
+        current_size += size
+    if current:
+        groups.append(current)
+    
+    total = len(groups)
+    generated = []
+    for idx, group in enumerate(groups):
+        print(f"[+] Packing bundle {idx+1}/{total} ({len(group)} recordings) ...")
+        members = [(f.name, f.read_bytes()) for f in group]
+        payload, meta = build_bundle_payload(members, master_hex, user_id, bundle_name, idx, total, compress=compress)
+        out_name = out_dir / f"{bundle_name}_bundle{idx+1:04d}_of_{total:04d}.png"
+        w, h = save_payload_image(payload, out_name, pool=BUFFER_POOL)
+        print(f"    -> wrote image: {out_name}  (payload {len(payload)} bytes, image {w}x{h})")
+        generated.append(out_name)
+    print(f"[+] Done. Packed {len(input_files)} recordings into {len(generated)} images in {out_dir}")
+    return generated
+
+
+def _iter_bundle_tocs(indir: Path, user_id: str, master_hex: Optional[str]):
+    """Yield (image_path, flat, header, members, members_start) for every bundle image in indir."""
+    imgs = sorted([p for p in Path(indir).iterdir() if p.suffix.lower() in (".png",".tiff",".tif")])
+    yield from _bundle_tocs(((p, p) for p in imgs), user_id, master_hex)
+
+
+def _bundle_tocs(images, user_id: str, master_hex: Optional[str]):
+    """As _iter_bundle_tocs, for images given as (name, path or binary file object) pairs."""
+    for name, src in images:
+        try:
+            flat = image_pixels_to_bytes(src, expected_payload_len=None)
+            header, members, members_start = read_bundle_toc(flat, user_id, master_hex)
+        except ValueError:
+            continue
+        yield name, flat, header, members, members_start
+
+
+def list_bundle_members(indir: Path, user_id: str, master_hex: Optional[str] = None) -> List[dict]:
+    """
+    List the recordings stored in the bundle images of indir.
+    Only the (small) tables of contents are decrypted.
+    """
+    listing = []
+    for p, _, header, members, _ in _iter_bundle_tocs(indir, user_id, master_hex):
+        for entry in members:
+            listing.append({
+                "name": entry["name"],
+                "orig_size": entry["orig_size"],
+                "compressed": entry["compressed"],
+                "sha256": entry["sha256"],
+                "image": p.name,
+                "bundle_name": header.get("bundle_name"),
+                "bundle_index": header.get("bundle_index"),
+            })
+    return listing
+
+
+def extract_bundle_members(indir: Path, out_dir: Path, user_id: str, master_hex: Optional[str] = None,
+                           names: Optional[List[str]] = None) -> List[Path]:
+    """
+    Extract recordings from the bundle images in indir into out_dir.
+    If names is given only those members are decrypted; everything else in the
+    bundle stays sealed. Returns list of written file paths.
+    """
+    wanted = set(names) if names else None
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    found = set()
+    for p, flat, header, members, members_start in _iter_bundle_tocs(indir, user_id, master_hex):
+        for entry in members:
+            if wanted is not None and entry["name"] not in wanted:
+                continue
+            print(f"[+] Extracting {entry['name']} from {p.name}")
+            validate_orig_filename(entry["name"])
+            data = decrypt_bundle_member(flat, header, entry, members_start, user_id, master_hex)
+            out_file = out_dir / entry["name"]
+            out_file.write_bytes(data)
+            print(f"    wrote {len(data)} bytes")
+            written.append(out_file)
+            found.add(entry["name"])
+        if wanted is not None and found >= wanted:
+            break
+    if wanted is not None and wanted - found:
+        raise RuntimeError(f"Bundle member(s) not found: {', '.join(sorted(wanted - found))}")
+    if not written:
+        raise RuntimeError("No bundle images found in input directory")
+    return written
+
+
+def extract_bundle_member(indir: Path, member_name: str, out_file: Path, user_id: str,
+                          master_hex: Optional[str] = None) -> Path:
+    """
+    Extract a single recording from a bundle set to out_file without
+    decrypting any other member. Raises KeyError if no image holds it.
+    """
+    return _extract_bundle_member(_iter_bundle_tocs(indir, user_id, master_hex), member_name, out_file,
+                                  user_id, master_hex)
+
+
+def extract_bundle_member_zip(src, member_name: str, out_file: Path, user_id: str,
+                              master_hex: Optional[str] = None) -> Path:
+    """
+    extract_bundle_member for a ZIP of bundle images (a path or seekable
+    binary stream): images are read straight from the archive members, one at
+    a time, without extracting it.
+    """
+    with zipfile.ZipFile(src) as archive:
+        infos = _zip_member_infos(archive)
+
+        def images():
+            for name in sorted(infos):
+                if Path(name).suffix.lower() in (".png", ".tiff", ".tif"):
+                    with archive.open(infos[name]) as f:
+                        yield Path(name), f
+
+        return _extract_bundle_member(_bundle_tocs(images(), user_id, master_hex), member_name, out_file,
+                                      user_id, master_hex)
+
+
+def _extract_bundle_member(tocs, member_name: str, out_file: Path, user_id: str,
+                           master_hex: Optional[str]) -> Path:
+    for p, flat, header, members, members_start in tocs:
+        for entry in members:
+            if entry["name"] == member_name:
+                data = decrypt_bundle_member(flat, header, entry, members_start, user_id, master_hex)
+                out_file = Path(out_file)
+                out_file.write_bytes(data)
+                print(f"[+] Extracted {member_name} from {p.name} ({len(data)} bytes)")
+                return out_file
+    raise KeyError(f"Bundle member not found: {member_name}")
+
+# ===========================
+# CONTENT-DEFINED CHUNKING & DEDUP
+# ===========================
+
+# Gear table and odd multiplier for the polynomial rolling hash (fixed forever:
+# changing them moves every chunk boundary and defeats deduplication)
+_CDC_GEAR = np.frombuffer(hashlib.shake_128(b"AUDIO-IMG-CDC-GEAR-V1").digest(256 * 8), dtype="<u8")
+_CDC_PRIME = 0x100000001B3
+_CDC_PRIME_INV = pow(_CDC_PRIME, -1, 1 << 64)
+_CDC_BLOCK = 1 << 20  # Bytes hashed per vectorized step (bounds temporary memory)
+_cdc_powers_cache: dict = {}
+
+
+def cdc_params(avg_chunk_bytes: int = CDC_AVG_CHUNK_BYTES) -> Tuple[int, int, int]:
+    """Return (min, avg, max) chunk sizes for a target average chunk size."""
+    if avg_chunk_bytes < 4 * CDC_WINDOW:
+        raise ValueError(f"avg_chunk_bytes must be >= {4 * CDC_WINDOW}")
+    return avg_chunk_bytes // 4, avg_chunk_bytes, avg_chunk_bytes * 4
+
+
+def _cdc_powers(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """P^i and P^-i (mod 2^64) for i in 0..n-1, cached across calls."""
+    cached = _cdc_powers_cache.get("powers")
+    if cached is None or len(cached[0]) < n:
+        size = max(n, _CDC_BLOCK + CDC_WINDOW)
+        pw = np.empty(size, dtype=np.uint64)
+        pinv = np.empty(size, dtype=np.uint64)
+        pw[0] = pinv[0] = 1
+        pw[1:] = np.cumprod(np.full(size - 1, _CDC_PRIME, dtype=np.uint64), dtype=np.uint64)
+        pinv[1:] = np.cumprod(np.full(size - 1, _CDC_PRIME_INV, dtype=np.uint64), dtype=np.uint64)
+        cached = _cdc_powers_cache["powers"] = (pw, pinv)
+    return cached[0][:n], cached[1][:n]
+
+
+def _cdc_candidates(data: bytes, mask_bits: int) -> np.ndarray:
+    """
+    Return the sorted end offsets i+1 at which the rolling hash of the window
+    data[i-CDC_WINDOW+1:i+1] has its top mask_bits bits clear.
+    
+    The window hash H_i = sum(G[b_j] * P^(i-j)) is computed without a Python
+    loop via prefix sums: H_i = P^i * (T_i - T_(i-w)) with T_i = sum(G[b_j] * P^-j).
+    """
+    arr = np.frombuffer(data, dtype=np.uint8)
+    n = len(arr)
+    w = CDC_WINDOW
+    found = []
+    for block_start in range(0, n, _CDC_BLOCK):
+        lo = max(0, block_start - w + 1)
+        x = arr[lo:min(n, block_start + _CDC_BLOCK)]
+        pw, pinv = _cdc_powers(len(x))
+        t = np.cumsum(_CDC_GEAR[x] * pinv, dtype=np.uint64)
+        window = t.copy()
+        window[w:] -= t[:-w]
+        h = window * pw
+        hits = np.flatnonzero((h >> np.uint64(64 - mask_bits)) == 0)
+        # Keep positions owned by this block whose window is complete
+        hits = hits[(hits + lo >= block_start) & (hits >= w - 1)]
+        found.append(hits + lo + 1)
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def cdc_cut_points(data: bytes, avg_chunk_bytes: int = CDC_AVG_CHUNK_BYTES) -> List[int]:
+    """
+    Split data at content-defined boundaries.
+    Returns the end offset of every chunk (the last one is len(data)). Chunks
+    are at least avg/4 bytes (except the final one) and at most avg*4 bytes.
+    """
+    n = len(data)
+    if n == 0:
+        return []
+    min_size, avg_size, max_size = cdc_params(avg_chunk_bytes)
+    mask_bits = max(1, int(round(math.log2(avg_size - min_size))))
+    candidates = _cdc_candidates(data, mask_bits)
+    
+    cuts = []
+    start = 0
+    while start < n:
+        lo = start + min_size
+        if lo >= n:
+            cuts.append(n)
+            break
+        k = int(np.searchsorted(candidates, lo))
+        end = int(candidates[k]) if k < len(candidates) else n
+        end = min(end, start + max_size, n)
+        cuts.append(end)
+        start = end
+    return cuts
+
+
+def iter_cdc_chunks(f, avg_chunk_bytes: int = CDC_AVG_CHUNK_BYTES):
+    """
+    Yield content-defined chunks from a binary file object.
+    Boundaries are identical to cdc_cut_points() over the whole stream, but only
+    a few max-size chunks are held in memory at a time.
+    """
+    _, _, max_size = cdc_params(avg_chunk_bytes)
+    buf = b""
+    while True:
+        block = f.read(max_size * 2)
+        if block:
+            buf += block
+        if not buf:
+            return
+        cuts = cdc_cut_points(buf, avg_chunk_bytes)
+        # The final cut may still move once more data arrives
+        emit = cuts[:-1] if block else cuts
+        start = 0
+        for end in emit:
+            yield buf[start:end]
+            start = end
+        buf = buf[start:]
+        if not block:
+            return
+
+
+def chunk_id_for(dedup_key: bytes, data: bytes) -> str:
+    """
+    Content address of a dedup chunk: HMAC-SHA256 keyed per user, so chunk ids
+    reveal nothing about the audio and never collide across users.
+    """
+    return hmac.new(dedup_key, data, hashlib.sha256).hexdigest()
+
+
+def chunk_store_path(store_dir: Path, user_id: str, chunk_id: str) -> Path:
+    """Location of a chunk image inside the per-user chunk store."""
+    return Path(store_dir) / validate_user_id(user_id) / chunk_id[:2] / f"{chunk_id}.png"
+
+
+def _manifest_mac(body: dict, user_key: bytes) -> str:
+    canonical = json.dumps(body, separators=(",", ":"), sort_keys=True).encode("utf8")
+    return hmac.new(derive_subkey(user_key, MANIFEST_MAGIC.encode()), canonical, hashlib.sha256).hexdigest()
+
+
+def manifest_bytes(manifest: dict, user_key: bytes) -> bytes:
+    """Serialize a manifest with an HMAC over its canonical form."""
+    body = {k: v for k, v in manifest.items() if k != "mac"}
+    body["mac"] = _manifest_mac(body, user_key)
+    return json.dumps(body, indent=2, sort_keys=True).encode("utf8")
+
+
+def write_manifest(path: Path, manifest: dict, user_key: bytes) -> Path:
+    """Write a manifest JSON file with an HMAC over its canonical form."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(manifest_bytes(manifest, user_key))
+    os.replace(tmp, path)
+    return path
+
+
+def parse_manifest(data: bytes, user_key: bytes, label: str = "manifest") -> dict:
+    """Parse manifest JSON and verify its HMAC. Raises RuntimeError if it was modified."""
+    manifest = json.loads(data)
+    if manifest.get("magic") != MANIFEST_MAGIC:
+        raise ValueError(f"not a manifest: {label}")
+    body = {k: v for k, v in manifest.items() if k != "mac"}
+    if not hmac.compare_digest(_manifest_mac(body, user_key), str(manifest.get("mac", ""))):
+        raise DecodeError(f"Manifest authentication failed: {label}")
+    return manifest
+
+
+def read_manifest(path: Path, user_key: bytes) -> dict:
+    """Load a manifest and verify its HMAC. Raises RuntimeError if it was modified."""
+    return parse_manifest(Path(path).read_bytes(), user_key, label=str(path))
+
+
+def find_manifests(indir: Path, kind: Optional[str] = None) -> List[Path]:
+    """List *_manifest.json files in indir, optionally filtered by manifest kind (unverified peek)."""
+    found = []
+    for p in sorted(Path(indir).glob("*_manifest.json")):
+        try:
+            manifest = json.loads(p.read_text(encoding="utf8"))
+        except Exception:
+            continue
+        if manifest.get("magic") == MANIFEST_MAGIC and (kind is None or manifest.get("kind") == kind):
+            found.append(p)
+    return found
+
+
+def build_cdc_chunk_payload(chunk_bytes: bytes, aead: UserCipher, user_id: str, chunk_id: str,
+                            compress: bool = True) -> Tuple[bytes, dict]:
+    """
+    Build the payload for a content-addressed chunk. The header carries no
+    filename or position, so one chunk image can be shared by many recordings.
+    """
+    header = {
+        "magic": CHUNK_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "user_id": user_id,
+        "chunk_id": chunk_id,
+        "orig_chunk_size": len(chunk_bytes),
+        "ts": int(time.time()),
+    }
+    return seal_payload(header, chunk_bytes, aead, compress=compress)
+
+
+def encode_cdc(input_file: Path, out_dir: Path, user_id: str, store_dir: Path,
+               master_hex: Optional[str] = None, compress: bool = True,
+               avg_chunk_bytes: int = CDC_AVG_CHUNK_BYTES, copy_chunks: bool = True) -> dict:
+    """
+    Encode input_file with content-defined chunking into the per-user chunk store.
+    Chunks already in the store (same keyed hash) are reused as-is: they are not
+    compressed, encrypted or PNG-packed again.
+    Writes {basename}_manifest.json to out_dir and, if copy_chunks is set, links
+    every referenced chunk image next to it so out_dir is self-contained.
+    Returns dict with "manifest", "images", "total_chunks", "new_chunks", "reused_chunks".
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    validate_orig_filename(input_file.name)
+    master = get_master_key(master_hex)
+    user_key = derive_user_key(master, user_id)
+    aead = UserCipher(user_key)
+    dedup_key = derive_subkey(user_key, b"AUDIO-IMG-DEDUP-V1")
+    
+    chunks = []
+    images = []
+    headers = []  # chunk headers, peeked for the file-level Merkle root
+    new_chunks = 0
+    file_hash = hashlib.sha256()
+    total_size = 0
+    with input_file.open("rb") as f:
+        for idx, chunk in enumerate(iter_cdc_chunks(f, avg_chunk_bytes)):
+            file_hash.update(chunk)
+            total_size += len(chunk)
+            cid = chunk_id_for(dedup_key, chunk)
+            store_path = chunk_store_path(store_dir, user_id, cid)
+            if store_path.exists():
+                print(f"[+] Chunk {idx+1}: reused {cid[:12]} ({len(chunk)} bytes)")
+            else:
+                payload, _ = build_cdc_chunk_payload(chunk, aead, user_id, cid, compress=compress)
+                store_path.parent.mkdir(parents=True, exist_ok=True)
+                w, h = save_payload_image(payload, store_path, pool=BUFFER_POOL)
+                new_chunks += 1
+                print(f"[+] Chunk {idx+1}: stored {cid[:12]} ({len(chunk)} bytes, image {w}x{h})")
+            chunks.append({"id": cid, "size": len(chunk)})
+            if _preferred_hash == HASH_MERKLE:
+                headers.append(read_image_header(store_path))
+            if copy_chunks:
+                local = out_dir / f"{cid}.png"
+                if not local.exists():
+                    try:
+                        os.link(store_path, local)
+                    except OSError:
+                        shutil.copyfile(store_path, local)
+                    images.append(local)
+    
+    manifest = {
+        "magic": MANIFEST_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "kind": "cdc",
+        "user_id": user_id,
+        "orig_filename": input_file.name,
+        "orig_size": total_size,
+        "sha256": file_hash.hexdigest(),
+        "avg_chunk_bytes": avg_chunk_bytes,
+        "chunks": chunks,
+        "ts": int(time.time()),
+    }
+    root = file_merkle_root(headers)
+    if root is not None:
+        manifest["merkle_root"] = root
+    manifest_path = write_manifest(out_dir / f"{input_file.stem}_manifest.json", manifest, user_key)
+    reused = len(chunks) - new_chunks
+    print(f"[+] Done. {len(chunks)} chunks ({new_chunks} new, {reused} reused); manifest {manifest_path}")
+    return {
+        "manifest": manifest_path,
+        "images": images,
+        "total_chunks": len(chunks),
+        "new_chunks": new_chunks,
+        "reused_chunks": reused,
+    }
+
+
+def decode_cdc(manifest_path: Path, out_file: Path, user_id: str, master_hex: Optional[str] = None,
+               store_dir: Optional[Path] = None) -> Path:
+    """
+    Rebuild a recording from a CDC manifest. Chunk images are looked up next to
+    the manifest first, then in the per-user chunk store.
+    """
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    manifest = read_manifest(manifest_path, user_key)
+    folder = Path(manifest_path).parent
+
+    def locate(cid):
+        candidates = [folder / f"{cid}.png"]
+        if store_dir is not None:
+            candidates.append(chunk_store_path(store_dir, user_id, cid))
+        return next((c for c in candidates if c.exists()), None)
+
+    out_file = Path(out_file)
+    with out_file.open("wb") as outf:
+        _decode_cdc_manifest(manifest, locate, outf, user_key, label=str(manifest_path))
+    print(f"[+] Reconstructed audio to {out_file} (size {out_file.stat().st_size} bytes)")
+    return out_file
+
+
+def _decode_cdc_manifest(manifest: dict, locate, outf, user_key: bytes, label: str = "manifest") -> int:
+    """
+    Write the recording of an authenticated CDC manifest to outf. locate(chunk_id)
+    returns the chunk's image (a path, PNG bytes or a binary file object, which
+    is closed after reading) or None. Returns the number of bytes written.
+    """
+    if manifest.get("kind") != "cdc":
+        raise ValueError(f"not a CDC manifest: {label}")
+    aead = UserCipher(user_key)
+    dedup_key = derive_subkey(user_key, b"AUDIO-IMG-DEDUP-V1")
+    file_hash = hashlib.sha256()
+    headers = []
+    written = 0
+    total = len(manifest["chunks"])
+    for idx, entry in enumerate(manifest["chunks"]):
+        cid = entry["id"]
+        image = locate(cid)
+        if image is None:
+            raise DecodeError(f"Missing chunk {cid} (chunk {idx+1}/{total})")
+        print(f"[+] Decoding chunk {idx+1}/{total} from {cid}.png")
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            image = io.BytesIO(image)
+        with (image if hasattr(image, "read") else contextlib.nullcontext(image)) as src:
+            flat = image_pixels_to_bytes(src)
+        header, plaintext = open_payload(flat, aead, label=f"chunk {cid[:12]}")
+        if header.get("magic") != CHUNK_MAGIC or header.get("chunk_id") != cid \
+                or not hmac.compare_digest(chunk_id_for(dedup_key, plaintext), cid):
+            raise DecodeError(f"Chunk image does not match its content address: {cid}.png")
+        headers.append(header)
+        file_hash.update(plaintext)
+        outf.write(plaintext)
+        written += len(plaintext)
+    if file_hash.hexdigest() != manifest["sha256"]:
+        raise DecodeError("SHA mismatch for reconstructed file")
+    if "merkle_root" in manifest and file_merkle_root(headers) != manifest["merkle_root"]:
+        raise DecodeError("Merkle root mismatch for reconstructed file")
+    return written
+
+# ===========================
+# APPEND-MODE STREAMS
+# ===========================
+#
+# Stream chunks carry (stream_id, seq, offset) instead of a fixed total, so a
+# recording can keep growing: each append only encodes the new tail. Sealing
+# writes an authenticated manifest with the final chunk list; decode accepts a
+# sealed stream (all chunks required) or an open one (contiguous prefix).
+
+def build_stream_chunk_payload(chunk_bytes: bytes, aead: UserCipher, user_id: str, orig_filename: str,
+                               stream_id: str, seq: int, offset: int,
+                               compress: bool = True, pool: Optional[BufferPool] = None) -> Tuple[bytes, dict]:
+    """Build the payload for one append-mode chunk (position bound via AAD)."""
+    if not chunk_bytes:
+        raise ValueError("chunk_bytes cannot be empty")
+    validate_orig_filename(orig_filename)
+    header = {
+        "magic": STREAM_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "user_id": user_id,
+        "orig_filename": orig_filename,
+        "stream_id": stream_id,
+        "seq": seq,
+        "offset": offset,
+        "orig_chunk_size": len(chunk_bytes),
+        "ts": int(time.time()),
+    }
+    return seal_payload(header, chunk_bytes, aead, compress=compress, pool=pool)
+
+
+def stream_image_name(orig_filename: str, seq: int) -> str:
+    """Output filename for stream chunk `seq` (0-based)."""
+    return f"{Path(orig_filename).stem}_seq{seq:06d}.png"
+
+
+def _select_stream(parts: List[tuple], stream_id: Optional[str] = None,
+                   orig_filename: Optional[str] = None) -> Optional[dict]:
+    """
+    Pick one stream out of (path, header, flat_or_None) tuples and sort it by seq.
+    Returns None if no chunk matches; raises ValueError if the choice is ambiguous.
+    """
+    streams = {}
+    for part in parts:
+        header = part[1]
+        if stream_id is not None and header.get("stream_id") != stream_id:
+            continue
+        if orig_filename is not None and header.get("orig_filename") != orig_filename:
+            continue
+        streams.setdefault(header.get("stream_id"), []).append(part)
+    if not streams:
+        return None
+    if len(streams) > 1:
+        raise ValueError(f"Multiple streams found ({', '.join(sorted(streams))}); choose one with stream_id")
+    (sid, chunks), = streams.items()
+    chunks.sort(key=lambda c: c[1]["seq"])
+    for a, b in zip(chunks, chunks[1:]):
+        if a[1]["seq"] == b[1]["seq"]:
+            raise DecodeError(f"Duplicate stream chunk seq {a[1]['seq']}: {a[0].name}, {b[0].name}")
+    return {"stream_id": sid, "orig_filename": chunks[0][1]["orig_filename"], "chunks": chunks}
+
+
+def _contiguous_prefix(chunks: List[tuple]) -> Tuple[int, int]:
+    """Return (count, byte_length) of the gap-free run of chunks starting at seq 0."""
+    count = offset = 0
+    for _, header, _ in chunks:
+        if header["seq"] != count or header["offset"] != offset:
+            break
+        count += 1
+        offset += header["orig_chunk_size"]
+    return count, offset
+
+
+def _stream_manifest(indir: Path, stream_id: str) -> Optional[Path]:
+    """Path of the sealed manifest for stream_id in indir, if any (unverified peek)."""
+    for m in find_manifests(indir, kind="stream"):
+        if json.loads(m.read_text(encoding="utf8")).get("stream_id") == stream_id:
+            return m
+    return None
+
+
+def scan_stream(indir: Path, stream_id: Optional[str] = None,
+                orig_filename: Optional[str] = None) -> Optional[dict]:
+    """
+    Peek the headers of the stream chunk images in indir (nothing is decrypted).
+    Returns {"stream_id", "orig_filename", "chunks", "manifest"} or None when
+    indir holds no matching stream. "manifest" is the sealed manifest path or None.
+    """
+    indir = Path(indir)
+    if not indir.is_dir():
+        return None
+    parts = []
+    for p in sorted(indir.iterdir()):
+        if p.suffix.lower() not in (".png", ".tiff", ".tif") or p.name.startswith("."):
+            continue
+        try:
+            header = read_image_header(p)
+        except Exception:
+            continue
+        if header.get("magic") == STREAM_MAGIC:
+            parts.append((p, header, None))
+    state = _select_stream(parts, stream_id=stream_id, orig_filename=orig_filename)
+    if state is None:
+        return None
+    state["manifest"] = _stream_manifest(indir, state["stream_id"])
+    return state
+
+
+def seal_stream(out_dir: Path, user_id: str, master_hex: Optional[str] = None,
+                stream_id: Optional[str] = None, orig_filename: Optional[str] = None) -> Path:
+    """
+    Close a stream: write {basename}_manifest.json recording the final chunk
+    count, size and per-chunk hashes. A sealed stream refuses further appends.
+    """
+    state = scan_stream(out_dir, stream_id=stream_id, orig_filename=orig_filename)
+    if state is None:
+        raise RuntimeError(f"No stream found in {out_dir}")
+    if state["manifest"] is not None:
+        raise RuntimeError(f"Stream {state['stream_id']} is already sealed")
+    count, size = _contiguous_prefix(state["chunks"])
+    if count != len(state["chunks"]):
+        raise RuntimeError(f"Stream {state['stream_id']} has a gap after seq {count - 1}; cannot seal")
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    manifest = build_stream_manifest(user_id, state["orig_filename"], state["stream_id"],
+                                     [h for _, h, _ in state["chunks"]])
+    path = write_manifest(stream_manifest_name(state["orig_filename"], Path(out_dir)), manifest, user_key)
+    print(f"[+] Sealed stream {state['stream_id']}: {count} chunks, {size} bytes -> {path}")
+    return path
+
+
+def stream_manifest_name(orig_filename: str, out_dir: Path) -> Path:
+    """Path of the sealed manifest of a stream written to out_dir."""
+    return out_dir / f"{Path(orig_filename).stem}_manifest.json"
+
+
+def build_stream_manifest(user_id: str, orig_filename: str, stream_id: str, headers: List[dict]) -> dict:
+    """Manifest body sealing a stream whose chunk headers (in seq order, gap-free) are given."""
+    manifest = {
+        "magic": MANIFEST_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "kind": "stream",
+        "user_id": user_id,
+        "orig_filename": orig_filename,
+        "stream_id": stream_id,
+        "total_chunks": len(headers),
+        "orig_size": sum(h["orig_chunk_size"] for h in headers),
+        "chunks": [{"seq": h["seq"], "size": h["orig_chunk_size"], **digest_fields(h)} for h in headers],
+        "ts": int(time.time()),
+    }
+    root = file_merkle_root(headers)
+    if root is not None:
+        manifest["merkle_root"] = root
+    return manifest
+
+
+def encode_append(input_file: Path, out_dir: Path, user_id: str,
+                  max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES, master_hex: Optional[str] = None,
+                  compress: bool = True, seal: bool = False) -> dict:
+    """
+    Encode only the part of a growing recording that out_dir does not hold yet.
+    The first call starts a new stream; later calls resume at the end of the
+    existing chunks. The recording must only grow at the end: the last encoded
+    chunk is re-hashed against the input to catch a replaced or rewritten file.
+    Output filenames: {basename}_seq{seq:06d}.png
+    Returns dict with "stream_id", "images" (new), "new_chunks", "total_chunks",
+    "appended_bytes" and "manifest" (set when seal is requested).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    validate_orig_filename(input_file.name)
+    aead = UserCipher(derive_user_key(get_master_key(master_hex), user_id))
+
+    state = scan_stream(out_dir, orig_filename=input_file.name)
+    if state is None:
+        stream_id, seq, offset = secrets.token_hex(8), 0, 0
+        print(f"[+] Starting stream {stream_id} for {input_file.name}")
+    else:
+        if state["manifest"] is not None:
+            raise RuntimeError(f"Stream {state['stream_id']} is sealed; start a new output directory")
+        stream_id = state["stream_id"]
+        seq, offset = _contiguous_prefix(state["chunks"])
+        if seq != len(state["chunks"]):
+            raise RuntimeError(f"Stream {stream_id} has a gap after seq {seq - 1}; cannot append")
+        last = state["chunks"][-1][1]
+        with input_file.open("rb") as f:
+            f.seek(last["offset"])
+            tail = f.read(last["orig_chunk_size"])
+        if hash_chunk(tail, last) != chunk_digest(last):
+            raise RuntimeError("Input does not match the encoded stream (file replaced or rewritten?)")
+        print(f"[+] Appending to stream {stream_id} at seq {seq}, offset {offset}")
+    start_offset = offset
+
+    images = []
+    with ChunkReader(input_file) as reader:
+        for chunk in reader.chunks(max_chunk_bytes, start=offset):
+            payload, _ = build_stream_chunk_payload(chunk, aead, user_id, input_file.name,
+                                                    stream_id, seq, offset, compress=compress)
+            out_name = out_dir / stream_image_name(input_file.name, seq)
+            w, h = save_payload_image(payload, out_name, pool=BUFFER_POOL)
+            print(f"    -> wrote image: {out_name}  (seq {seq}, {len(chunk)} bytes, image {w}x{h})")
+            images.append(out_name)
+            seq += 1
+            offset += len(chunk)
+
+    appended = offset - start_offset
+    print(f"[+] Done. Appended {len(images)} chunks ({appended} bytes); stream has {seq} chunks")
+    manifest = seal_stream(out_dir, user_id, master_hex=master_hex, stream_id=stream_id) if seal else None
+    return {
+        "stream_id": stream_id,
+        "images": images,
+        "new_chunks": len(images),
+        "total_chunks": seq,
+        "appended_bytes": appended,
+        "manifest": manifest,
+    }
+
+
+def decode_stream(indir: Path, out_file: Path, user_id: str, master_hex: Optional[str] = None,
+                  stream_id: Optional[str] = None, parts: Optional[List[tuple]] = None,
+                  pipeline_depth: Optional[int] = None) -> Path:
+    """
+    Rebuild a stream. A sealed stream must be complete and match its manifest;
+    an open stream decodes the contiguous run of chunks received so far.
+    parts may carry already-read (path, header, flat) tuples to avoid re-reading images.
+    Reading, decrypting and writing overlap as in decode_images_to_file.
+    """
+    if parts is None:
+        state = scan_stream(indir, stream_id=stream_id)
+    else:
+        state = _select_stream(parts, stream_id=stream_id)
+        if state is not None:
+            state["manifest"] = _stream_manifest(indir, state["stream_id"])
+    if state is None:
+        raise DecodeError("No stream images found in input directory")
+
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    aead = UserCipher(user_key)
+    chunks = state["chunks"]
+    count, _ = _contiguous_prefix(chunks)
+    manifest = None
+    if state["manifest"] is not None:
+        manifest = read_manifest(state["manifest"], user_key)
+        if manifest.get("kind") != "stream" or manifest.get("stream_id") != state["stream_id"]:
+            raise DecodeError(f"Manifest does not describe stream {state['stream_id']}")
+        total = manifest["total_chunks"]
+        if count < total:
+            raise DecodeError(f"Sealed stream is missing chunk seq {count} (have {count}/{total})")
+        if len(chunks) > total:
+            print(f"[!] Ignoring {len(chunks) - total} chunks past the sealed end of the stream")
+        chunks = chunks[:total]
+        print(f"[+] Decoding sealed stream {state['stream_id']} ({total} chunks)")
+    else:
+        if count < len(chunks):
+            print(f"[!] Gap after seq {count - 1}; decoding the first {count} chunks only")
+        chunks = chunks[:count]
+        print(f"[+] Decoding open stream {state['stream_id']} ({count} chunks received so far)")
+
+    def read_chunk(item):
+        idx, (p, peek, flat) = item
+        return idx, p, (flat if flat is not None else image_pixels_to_bytes(p))
+
+    def open_chunk(item):
+        idx, p, flat = item
+        header, plaintext = open_payload(flat, aead, label=f"stream chunk {idx}")
+        return idx, p, header, plaintext
+
+    out_file = Path(out_file)
+    written = 0
+    with out_file.open("wb") as outf:
+        stages = run_pipeline(enumerate(chunks), [read_chunk, open_chunk], depth=pipeline_depth)
+        try:
+            for idx, p, header, plaintext in stages:
+                if header.get("stream_id") != state["stream_id"] or header.get("seq") != idx \
+                        or header.get("offset") != written:
+                    raise DecodeError(f"Stream chunk out of place: {p.name}")
+                if manifest is not None and (chunk_digest(manifest["chunks"][idx]) != chunk_digest(header)
+                                             or manifest["chunks"][idx]["size"] != len(plaintext)):
+                    raise DecodeError(f"Stream chunk {idx} does not match the sealed manifest")
+                outf.write(plaintext)
+                written += len(plaintext)
+        finally:
+            stages.close()
+    if manifest is not None and written != manifest["orig_size"]:
+        raise DecodeError("Size mismatch for reconstructed stream")
+    if manifest is not None and "merkle_root" in manifest and \
+            file_merkle_root(manifest["chunks"]) != manifest["merkle_root"]:
+        raise DecodeError("Merkle root mismatch for reconstructed stream")
+    print(f"[+] Reconstructed audio to {out_file} (size {written} bytes)")
+    return out_file
+
+# ===========================
+# PIPES (stdin/stdout)
+# ===========================
+#
+# Inputs of unknown length are encoded as an append-mode stream (no fixed total)
+# whose images and sealed manifest are written as a tar or zip stream, so
+# `ffmpeg ... | encode -i - -o - | upload` runs in constant memory without a
+# scratch directory. Decode reads such an archive back in member order.
+
+class ArchiveWriter:
+    """Write members to a (possibly non-seekable) binary stream as tar or zip."""
+
+    def __init__(self, dst, fmt: str = "tar"):
+        if fmt == "tar":
+            self._tar = tarfile.open(fileobj=dst, mode="w|")
+            self._zip = None
+        elif fmt == "zip":
+            self._tar = None
+            self._zip = zipfile.ZipFile(dst, "w", compression=zipfile.ZIP_STORED)  # PNGs are already deflated
+        else:
+            raise ValueError(f"Unsupported archive format: {fmt} (expected tar or zip)")
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, name: str, data: bytes) -> None:
+        if self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+        else:
+            self._zip.writestr(name, data)
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+        else:
+            self._zip.close()
+
+
+def iter_archive_members(src):
+    """
+    Yield (name, data) for the regular files of an image archive, in archive
+    order. src is a directory (files in name order), or a binary stream holding
+    a tar (plain or compressed, read sequentially so pipes work) or a zip (the
+    stream must then be seekable, e.g. a redirected file rather than a pipe).
+    """
+    if isinstance(src, (str, os.PathLike)):
+        for p in sorted(Path(src).iterdir()):
+            if p.is_file() and not p.name.startswith("."):
+                yield p.name, p.read_bytes()
+        return
+    if not hasattr(src, "peek"):
+        src = io.BufferedReader(src)
+    if src.peek(4)[:4] == b"PK\x03\x04":
+        if not src.seekable():
+            raise ValueError("ZIP input must be seekable (redirect a file instead of piping, or use tar)")
+        with zipfile.ZipFile(src) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield Path(info.filename).name, archive.read(info)
+        return
+    with tarfile.open(fileobj=src, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield Path(member.name).name, archive.extractfile(member).read()
+
+
+def encode_pipe(src, dst, user_id: str, orig_filename: str = "stdin.bin",
+                max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES, master_hex: Optional[str] = None,
+                compress: bool = True, archive_format: str = "tar",
+                pool: Optional[BufferPool] = BUFFER_POOL, pipeline_depth: Optional[int] = None) -> dict:
+    """
+    Encode audio of unknown length as a sealed stream. src is a path or a binary
+    stream (e.g. sys.stdin.buffer); dst is an output directory, or a binary
+    stream that receives a tar/zip archive of the images and the manifest.
+    Chunks are read, sealed, packed and written as they arrive, with at most
+    pipeline_depth chunks in flight.
+    Returns dict with "stream_id", "total_chunks" and "orig_size".
+    """
+    validate_orig_filename(orig_filename)
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    aead = UserCipher(user_key)
+    stream_id = secrets.token_hex(8)
+    out_dir = Path(dst) if isinstance(dst, (str, os.PathLike)) else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    print(f"[+] Starting stream {stream_id} for {orig_filename}")
+
+    headers = []
+    with ChunkReader(src, pool=pool) as reader, \
+            (contextlib.nullcontext() if out_dir is not None else ArchiveWriter(dst, archive_format)) as archive:
+
+        def read_chunks():
+            offset = 0
+            for seq, chunk in enumerate(reader.chunks(max_chunk_bytes, owned=True)):
+                yield seq, offset, chunk
+                offset += len(chunk)
+
+        def seal_chunk(item):
+            seq, offset, chunk = item
+            try:
+                payload, _ = build_stream_chunk_payload(chunk, aead, user_id, orig_filename, stream_id,
+                                                        seq, offset, compress=compress, pool=pool)
+            finally:
+                reader.release(chunk)
+            header, _ = parse_payload_header(payload[:HEADER_LEN])
+            return seq, header, payload
+
+        def pack_chunk(item):
+            seq, header, payload = item
+            png, w, h = pack_payload_png(payload, pool=pool)
+            return seq, header, png, w, h
+
+        def discard(item):
+            for part in item:
+                reader.release(part)
+
+        def emit(name, data):
+            if out_dir is not None:
+                write_file_atomic(out_dir / name, data)
+            else:
+                archive.add(name, data)
+
+        stages = run_pipeline(read_chunks(), [seal_chunk, pack_chunk], depth=pipeline_depth, discard=discard)
+        try:
+            for seq, header, png, w, h in stages:
+                name = stream_image_name(orig_filename, seq)
+                emit(name, png)
+                headers.append(header)
+                print(f"    -> wrote image: {name}  (seq {seq}, {header['orig_chunk_size']} bytes, image {w}x{h})")
+        finally:
+            stages.close()
+        if not headers:
+            raise ValueError("No input data to encode")
+        manifest = build_stream_manifest(user_id, orig_filename, stream_id, headers)
+        emit(stream_manifest_name(orig_filename, Path()).name, manifest_bytes(manifest, user_key))
+
+    print(f"[+] Sealed stream {stream_id}: {len(headers)} chunks, {manifest['orig_size']} bytes")
+    return {"stream_id": stream_id, "total_chunks": len(headers), "orig_size": manifest["orig_size"]}
+
+
+def decode_pipe(src, dst, user_id: str, master_hex: Optional[str] = None,
+                pipeline_depth: Optional[int] = None) -> dict:
+    """
+    Decode an image archive (see iter_archive_members) of one recording with
+    decode_members: each chunk is written to dst (a path or binary stream,
+    e.g. sys.stdout.buffer) as soon as it and all earlier chunks are
+    authenticated.
+    Returns dict with "kind", "orig_filename", "total_chunks" and "size".
+    """
+    result = decode_members(iter_archive_members(src), dst, user_id, master_hex=master_hex,
+                            pipeline_depth=pipeline_depth)
+    result.pop("header")
+    return result
+
+
+def decode_members(members, dst, user_id: str, master_hex: Optional[str] = None,
+                   pipeline_depth: Optional[int] = None) -> dict:
+    """
+    Decode the images of one recording straight from their sources: members
+    yields (name, data) where data is the file's bytes or a binary file object
+    (e.g. from zipfile.ZipFile.open or an uploaded part), read and closed by the
+    pipeline. The recording is a stream (checked against its manifest when one
+    is among the members) or a standard chunk set (which must be complete).
+    Each chunk is written to dst (a path or binary stream) as soon as it and
+    all earlier chunks are authenticated (see iter_decode_members).
+    Returns dict with "kind", "orig_filename", "total_chunks", "size" and
+    "header" (the first chunk's authenticated header).
+    """
+    first = None
+    count = written = 0
+    out = Path(dst).open("wb") if isinstance(dst, (str, os.PathLike)) else contextlib.nullcontext(dst)
+    with out as outf:
+        for header, plaintext in iter_decode_members(members, user_id, master_hex=master_hex,
+                                                     pipeline_depth=pipeline_depth):
+            first = first or header
+            outf.write(plaintext)
+            count += 1
+            written += len(plaintext)
+        outf.flush()
+
+    kind = "file" if first["magic"] == MAGIC_HEADER else "stream"
+    print(f"[+] Decoded {kind} {first['orig_filename']}: {count} chunks, {written} bytes")
+    return {"kind": kind, "orig_filename": first["orig_filename"], "total_chunks": count, "size": written,
+            "header": first}
+
+
+def iter_decode_members(members, user_id: str, master_hex: Optional[str] = None,
+                        pipeline_depth: Optional[int] = None, total_images: Optional[int] = None):
+    """
+    Decode the images of one recording from members as decode_members does,
+    yielding (header, plaintext) for each chunk in order as soon as it and
+    all earlier chunks are authenticated. Chunks arriving early are held until
+    their turn, so members in chunk order decode in constant memory.
+    Completeness is checked after the last chunk; when the number of images
+    is known up front (total_images), a standard chunk set with fewer images
+    than its first header announces is rejected before anything is yielded.
+    """
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    aead = UserCipher(user_key)
+    manifests = []
+
+    def read_members():
+        for name, data in members:
+            if name.lower().endswith(".json"):
+                manifests.append((name, _member_bytes(data)))
+            elif Path(name).suffix.lower() in (".png", ".tiff", ".tif"):
+                yield name, data
+            elif hasattr(data, "close"):
+                data.close()
+
+    def inflate(item):
+        name, data = item
+        with (io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data) as f:
+            return name, image_pixels_to_bytes(f)
+
+    def open_part(item):
+        name, flat = item
+        header, plaintext = open_payload(flat, aead, label=name)
+        return name, header, plaintext
+
+    first = None
+    count = written = 0
+    digests = []
+    pending = {}  # position -> (name, header, plaintext) received ahead of its turn
+    stages = run_pipeline(read_members(), [inflate, open_part], depth=pipeline_depth)
+    try:
+        for name, header, plaintext in stages:
+            if first is None:
+                first = header
+                if header.get("magic") not in (MAGIC_HEADER, STREAM_MAGIC):
+                    raise DecodeError(f"Unsupported image in archive: {name}")
+                if header["magic"] == MAGIC_HEADER and total_images is not None \
+                        and total_images < header.get("orig_total_chunks", 0):
+                    raise DecodeError(f"Incomplete chunk set: got {total_images} images, "
+                                      f"header says {header['orig_total_chunks']}")
+            if header.get("magic") == STREAM_MAGIC:
+                same = header.get("stream_id") == first.get("stream_id")
+                pos = header.get("seq")
+            else:
+                same = header.get("orig_filename") == first.get("orig_filename") \
+                    and header.get("orig_total_chunks") == first.get("orig_total_chunks")
+                pos = header.get("orig_chunk_index")
+            if header.get("magic") != first.get("magic") or not same:
+                raise DecodeError(f"Archive member from another recording: {name}")
+            if not isinstance(pos, int) or pos < count or pos in pending:
+                raise DecodeError(f"Duplicate chunk in archive: {name}")
+            pending[pos] = (name, header, plaintext)
+            while count in pending:
+                name, header, plaintext = pending.pop(count)
+                if header.get("magic") == STREAM_MAGIC and header.get("offset") != written:
+                    raise DecodeError(f"Stream chunk out of place: {name}")
+                yield header, plaintext
+                digests.append(chunk_digest(header))
+                count += 1
+                written += len(plaintext)
+    finally:
+        stages.close()
+
+    if first is None:
+        raise DecodeError("No images found in archive")
+    if first["magic"] == MAGIC_HEADER:
+        if count != first["orig_total_chunks"]:
+            raise DecodeError(f"Incomplete chunk set: have {count}/{first['orig_total_chunks']} chunks")
+    else:
+        manifest = None
+        for name, data in manifests:
+            candidate = parse_manifest(data, user_key, label=name)
+            if candidate.get("kind") == "stream" and candidate.get("stream_id") == first["stream_id"]:
+                manifest = candidate
+        if manifest is None:
+            gap = f" up to the gap after seq {count - 1}" if pending else ""
+            print(f"[!] No sealed manifest for stream {first['stream_id']}; decoded the {count} chunks received{gap}")
+        elif manifest["total_chunks"] != count or manifest["orig_size"] != written:
+            raise DecodeError(f"Sealed stream is incomplete: have {count}/{manifest['total_chunks']} chunks")
+        elif [chunk_digest(e) for e in manifest["chunks"]] != digests:
+            raise DecodeError("Stream chunks do not match the sealed manifest")
+
+
+def _member_bytes(data) -> bytes:
+    """Content of a member given as bytes or as a binary file object (closed after reading)."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    with data:
+        return data.read()
+
+
+def decode_zip(src, dst, user_id: str, master_hex: Optional[str] = None, store_dir: Optional[Path] = None,
+               pipeline_depth: Optional[int] = None) -> dict:
+    """
+    Decode a ZIP of one recording (a path or seekable binary stream) without
+    extracting it: images are inflated straight from the archive members.
+    Standard chunk sets and streams go through decode_members (members in name
+    order, which is chunk order for the encoder's filenames); a CDC manifest in
+    the archive is rebuilt from the chunk images in the archive, then from the
+    per-user chunk store. dst is a path or binary stream.
+    Returns dict as decode_members ("manifest" instead of "header" for CDC).
+    """
+    with zipfile.ZipFile(src) as archive:
+        infos = _zip_member_infos(archive)
+        cdc = _zip_manifests(archive, infos, kind="cdc")
+        if len(cdc) > 1:
+            raise DecodeError(f"Found {len(cdc)} recordings in archive ({', '.join(cdc)})")
+        if not cdc:
+            members = ((name, archive.open(infos[name])) for name in sorted(infos))
+            return decode_members(members, dst, user_id, master_hex=master_hex, pipeline_depth=pipeline_depth)
+
+        user_key = derive_user_key(get_master_key(master_hex), user_id)
+        manifest = parse_manifest(archive.read(infos[cdc[0]]), user_key, label=cdc[0])
+
+        def locate(cid):
+            return _zip_chunk_source(archive, infos, f"{cid}.png", user_id, store_dir)
+
+        out = Path(dst).open("wb") if isinstance(dst, (str, os.PathLike)) else contextlib.nullcontext(dst)
+        with out as outf:
+            size = _decode_cdc_manifest(manifest, locate, outf, user_key, label=cdc[0])
+            outf.flush()
+    print(f"[+] Decoded cdc {manifest.get('orig_filename')}: {len(manifest['chunks'])} chunks, {size} bytes")
+    return {"kind": "cdc", "orig_filename": manifest.get("orig_filename"), "total_chunks": len(manifest["chunks"]),
+            "size": size, "manifest": manifest}
+
+
+def _zip_member_infos(archive: zipfile.ZipFile) -> dict:
+    """Files of an archive by base name; raises ValueError on path traversal."""
+    infos = {}
+    for info in archive.infolist():
+        if ".." in info.filename or info.filename.startswith("/"):
+            raise ValueError(f"Unsafe file path in ZIP: {info.filename}")
+        if not info.is_dir():
+            infos[Path(info.filename).name] = info
+    return infos
+
+
+def _zip_manifests(archive: zipfile.ZipFile, infos: dict, kind: str) -> List[str]:
+    """Names of the *_manifest.json members of the given kind (unverified peek)."""
+    found = []
+    for name, info in infos.items():
+        if name.endswith("_manifest.json"):
+            try:
+                peek = json.loads(archive.read(info))
+            except ValueError:
+                continue
+            if isinstance(peek, dict) and peek.get("magic") == MANIFEST_MAGIC and peek.get("kind") == kind:
+                found.append(name)
+    return found
+
+
+def _zip_chunk_source(archive: zipfile.ZipFile, infos: dict, name: str,
+                      user_id: str, store_dir: Optional[Path]):
+    """Open archive member `name`, else its CDC chunk store path; None if neither exists."""
+    info = infos.get(name)
+    if info is not None:
+        return archive.open(info)
+    if store_dir is not None and name.endswith(".png"):
+        stored = chunk_store_path(store_dir, user_id, name[:-len(".png")])
+        if stored.exists():
+            return stored
+    return None
+
+
+def plan_zip_recording(src, user_id: str, master_hex: Optional[str] = None,
+                       store_dir: Optional[Path] = None) -> dict:
+    """
+    Lay out the recording in a ZIP (path or seekable binary stream) without
+    decrypting it, so byte ranges can be decoded with iter_decode_zip_range.
+    Standard chunk sets must be complete; a stream must match its sealed
+    manifest when one is in the archive (else its gap-free run from seq 0 is
+    used); a CDC set is laid out from its authenticated manifest, with chunks
+    in the archive or the chunk store. Chunk headers are only peeked here;
+    iter_decode_zip_range authenticates each one it decodes.
+    Returns {"kind", "orig_filename", "size", "info" (first chunk header or
+    CDC manifest), "chunks": [{"image", "offset", "size", "header"}]}, all
+    plain data so the plan can be passed between processes.
+    """
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    with zipfile.ZipFile(src) as archive:
+        infos = _zip_member_infos(archive)
+        cdc = _zip_manifests(archive, infos, kind="cdc")
+        if len(cdc) > 1:
+            raise DecodeError(f"Found {len(cdc)} recordings in archive ({', '.join(cdc)})")
+        if cdc:
+            manifest = parse_manifest(archive.read(infos[cdc[0]]), user_key, label=cdc[0])
+            chunks = []
+            offset = 0
+            for entry in manifest["chunks"]:
+                if _zip_chunk_source(archive, infos, f"{entry['id']}.png", user_id, store_dir) is None:
+                    raise DecodeError(f"Missing chunk {entry['id']} (chunk {len(chunks) + 1}/{len(manifest['chunks'])})")
+                chunks.append({"image": f"{entry['id']}.png", "offset": offset, "size": entry["size"], "header": None})
+                offset += entry["size"]
+            return {"kind": "cdc", "orig_filename": manifest.get("orig_filename"), "size": offset,
+                    "info": manifest, "chunks": chunks}
+
+        parts = []
+        for name in sorted(infos):
+            if Path(name).suffix.lower() in (".png", ".tiff", ".tif"):
+                with archive.open(infos[name]) as f:
+                    parts.append((Path(name), read_image_header(f), None))
+        if not parts:
+            raise DecodeError("No images found in archive")
+        magics = {header.get("magic") for _, header, _ in parts}
+        if magics == {STREAM_MAGIC}:
+            state = _select_stream(parts)
+            count, _ = _contiguous_prefix(state["chunks"])
+            parts = state["chunks"][:count]
+            sealed = [parse_manifest(archive.read(infos[m]), user_key, label=m)
+                      for m in _zip_manifests(archive, infos, kind="stream")]
+            manifest = next((m for m in sealed if m.get("stream_id") == state["stream_id"]), None)
+            if manifest is not None and [chunk_digest(e) for e in manifest["chunks"]] \
+                    != [chunk_digest(h) for _, h, _ in parts]:
+                raise DecodeError(f"Sealed stream is incomplete: have {count}/{manifest['total_chunks']} chunks")
+            kind = "stream"
+        elif magics == {MAGIC_HEADER}:
+            parts.sort(key=lambda part: part[1]["orig_chunk_index"])
+            total = parts[0][1]["orig_total_chunks"]
+            if [h["orig_chunk_index"] for _, h, _ in parts] != list(range(total)) \
+                    or any(h["orig_total_chunks"] != total for _, h, _ in parts):
+                raise DecodeError(f"Incomplete chunk set: got {len(parts)} images, header says {total}")
+            kind = "file"
+        else:
+            raise DecodeError("Archive is not a single chunked recording")
+
+    chunks = []
+    offset = 0
+    for path, header, _ in parts:
+        chunks.append({"image": path.name, "offset": offset, "size": header["orig_chunk_size"], "header": header})
+        offset += header["orig_chunk_size"]
+    return {"kind": kind, "orig_filename": parts[0][1].get("orig_filename"), "size": offset,
+            "info": parts[0][1], "chunks": chunks}
+
+
+def iter_decode_zip_range(src, plan: dict, user_id: str, master_hex: Optional[str] = None,
+                          store_dir: Optional[Path] = None, start: int = 0, end: Optional[int] = None,
+                          pipeline_depth: Optional[int] = None):
+    """
+    Yield bytes [start, end) of the recording laid out by plan_zip_recording,
+    decoding only the chunks that overlap the range. Every chunk is
+    authenticated (and must carry the header it was planned with, or its
+    content address for CDC) before any of it is yielded; chunks are read and
+    decrypted as overlapped pipeline stages.
+    """
+    size = plan["size"]
+    end = size if end is None else min(end, size)
+    if not 0 <= start <= end:
+        raise ValueError(f"Invalid byte range {start}-{end} of {size}")
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    aead = UserCipher(user_key)
+    dedup_key = derive_subkey(user_key, b"AUDIO-IMG-DEDUP-V1")
+    wanted = [c for c in plan["chunks"] if c["offset"] < end and c["offset"] + c["size"] > start]
+
+    with zipfile.ZipFile(src) as archive:
+        infos = _zip_member_infos(archive)
+
+        def read_chunk(chunk):
+            source = _zip_chunk_source(archive, infos, chunk["image"], user_id, store_dir)
+            if source is None:
+                raise DecodeError(f"Missing chunk image {chunk['image']}")
+            with (source if hasattr(source, "read") else contextlib.nullcontext(source)) as f:
+                return chunk, image_pixels_to_bytes(f)
+
+        def open_chunk(item):
+            chunk, flat = item
+            header, plaintext = open_payload(flat, aead, label=chunk["image"])
+            if chunk["header"] is None:
+                cid = chunk["image"][:-len(".png")]
+                ok = header.get("magic") == CHUNK_MAGIC and header.get("chunk_id") == cid \
+                    and hmac.compare_digest(chunk_id_for(dedup_key, plaintext), cid)
+            else:
+                ok = header == chunk["header"]
+            if not ok or len(plaintext) != chunk["size"]:
+                raise DecodeError(f"Chunk image does not match the recording: {chunk['image']}")
+            return chunk, plaintext
+
+        stages = run_pipeline(wanted, [read_chunk, open_chunk], depth=pipeline_depth)
+        try:
+            for chunk, plaintext in stages:
+                lo = max(start - chunk["offset"], 0)
+                hi = min(end - chunk["offset"], chunk["size"])
+                yield plaintext if (lo, hi) == (0, len(plaintext)) else plaintext[lo:hi]
+        finally:
+            stages.close()
+
+# ===========================
+# VERIFICATION
+# ===========================
+
+def _verify_image(img_path: Path, aead: UserCipher, user_id: str, master_hex: Optional[str],
+                  dedup_key: bytes) -> dict:
+    """
+    Authenticate one image end to end (decrypt, decompress, hash) and drop the
+    plaintext. Returns the authenticated header and plaintext size.
+    """
+    flat = image_pixels_to_bytes(img_path)
+    header, _ = parse_payload_header(flat)
+    if header.get("magic") == BUNDLE_MAGIC:
+        header, members, members_start = read_bundle_toc(flat, user_id, master_hex)
+        size = sum(len(decrypt_bundle_member(flat, header, entry, members_start, user_id, master_hex))
+                   for entry in members)
+        return {"header": header, "size": size, "members": len(members)}
+    header, plaintext = open_payload(flat, aead, label=img_path.name)
+    if header.get("magic") == CHUNK_MAGIC and \
+            not hmac.compare_digest(chunk_id_for(dedup_key, plaintext), str(header.get("chunk_id"))):
+        raise RuntimeError("chunk content does not match its content address")
+    return {"header": header, "size": len(plaintext)}
+
+
+def _check_positions(rows: List[dict], field: str, total: Optional[int]) -> List[str]:
+    """Coverage problems for rows whose authenticated headers carry a 0-based position `field`."""
+    problems = []
+    seen = {}
+    for row in rows:
+        if row["ok"]:
+            pos = row["header"].get(field)
+            if pos in seen:
+                problems.append(f"duplicate {field} {pos}: {seen[pos]}, {row['image']}")
+            seen[pos] = row["image"]
+    if total is not None:
+        missing = sorted(set(range(total)) - set(seen))
+        if missing:
+            problems.append(f"missing {field} {', '.join(map(str, missing[:20]))}"
+                            + (" ..." if len(missing) > 20 else ""))
+    return problems
+
+
+def verify_archives(indirs: List[Path], user_id: str, master_hex: Optional[str] = None,
+                    store_dir: Optional[Path] = None, workers: Optional[int] = None) -> List[dict]:
+    """
+    Audit image sets without writing any plaintext: every chunk is decrypted and
+    authenticated (in parallel across all directories), then each recording is
+    checked for coverage against its headers or manifest.
+    Returns one report per recording:
+      {"indir", "set", "kind", "ok", "problems": [...], "merkle_root",
+       "chunks": [{"image", "ok", "size", "error"}]}
+    "merkle_root" is the file-level root over the authenticated chunk roots
+    (None unless every chunk was encoded in "merkle" mode); a root recorded in
+    a manifest must match it.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    master = get_master_key(master_hex)
+    user_key = derive_user_key(master, user_id)
+    aead = UserCipher(user_key)
+    dedup_key = derive_subkey(user_key, b"AUDIO-IMG-DEDUP-V1")
+
+    # Pass 1: peek headers (cheap) to find every image and manifest
+    targets = []  # (indir, path, peeked header or None, peek error)
+    manifests = []
+    for indir in map(Path, indirs):
+        if not indir.is_dir():
+            raise RuntimeError(f"Not a directory: {indir}")
+        for p in sorted(indir.iterdir()):
+            if p.suffix.lower() not in (".png", ".tiff", ".tif") or p.name.startswith("."):
+                continue
+            try:
+                targets.append((indir, p, read_image_header(p), None))
+            except Exception as e:
+                targets.append((indir, p, None, str(e)))
+        for m in find_manifests(indir):
+            manifests.append((indir, m))
+
+    # CDC chunks missing next to their manifest are verified in the chunk store
+    local = {p for _, p, _, _ in targets}
+    cdc_manifests = []
+    for indir, m in manifests:
+        try:
+            manifest = read_manifest(m, user_key)
+        except Exception as e:
+            cdc_manifests.append((indir, m, None, str(e)))
+            continue
+        if manifest.get("kind") != "cdc":
+            continue
+        cdc_manifests.append((indir, m, manifest, None))
+        for entry in manifest["chunks"]:
+            path = indir / f"{entry['id']}.png"
+            if path not in local and store_dir is not None:
+                path = chunk_store_path(store_dir, user_id, entry["id"])
+                if path.exists() and path not in local:
+                    local.add(path)
+                    targets.append((indir, path, {"magic": CHUNK_MAGIC, "chunk_id": entry["id"]}, None))
+
+    # Pass 2: authenticate every image in parallel
+    def check(target):
+        indir, p, peek, error = target
+        row = {"image": p.name, "ok": False, "size": 0, "header": peek or {}}
+        if error is not None:
+            row["error"] = error
+            return row
+        try:
+            row.update(_verify_image(p, aead, user_id, master_hex, dedup_key))
+            row["ok"] = True
+        except Exception as e:
+            row["error"] = str(e)
+        return row
+
+    with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1)) as pool:
+        rows = list(pool.map(check, targets))
+
+    # Pass 3: group into recordings (by peeked header) and check coverage
+    groups = {}
+    chunk_rows = {}
+    for (indir, p, peek, _), row in zip(targets, rows):
+        magic = (peek or {}).get("magic")
+        if magic == MAGIC_HEADER:
+            key = (indir, "file", _file_set_key(peek))
+        elif magic == STREAM_MAGIC:
+            key = (indir, "stream", peek.get("stream_id"))
+        elif magic == BUNDLE_MAGIC:
+            key = (indir, "bundle", peek.get("bundle_name"))
+        elif magic == CHUNK_MAGIC:
+            chunk_rows[(indir, peek.get("chunk_id"))] = row
+            continue
+        else:
+            key = (indir, "unknown", p.name)
+            row.setdefault("error", "not an audio-image file")
+        groups.setdefault(key, []).append(row)
+
+    def set_root(rows, field=None):
+        if not rows or not all(r["ok"] for r in rows):
+            return None
+        if field is not None:
+            rows = sorted(rows, key=lambda r: r["header"].get(field, -1))
+        return file_merkle_root([r["header"] for r in rows])
+
+    reports = []
+    for (indir, kind, name), group in groups.items():
+        if kind == "file":
+            name = group[0]["header"].get("set_id") or group[0]["header"].get("orig_filename")
+        problems = []
+        sealed = None
+        root = None
+        if kind == "file":
+            totals = {r["header"].get("orig_total_chunks") for r in group if r["ok"]}
+            if len(totals) > 1:
+                problems.append(f"inconsistent orig_total_chunks {sorted(totals)}")
+            problems += _check_positions(group, "orig_chunk_index", max(totals) if totals else None)
+            root = set_root(group, "orig_chunk_index")
+        elif kind == "bundle":
+            totals = {r["header"].get("bundle_total") for r in group if r["ok"]}
+            problems += _check_positions(group, "bundle_index", max(totals) if totals else None)
+        elif kind == "stream":
+            group.sort(key=lambda r: r["header"].get("seq", -1))
+            manifest_path = _stream_manifest(indir, name)
+            manifest = None
+            if manifest_path is not None:
+                try:
+                    manifest = read_manifest(manifest_path, user_key)
+                except Exception as e:
+                    problems.append(str(e))
+            problems += _check_positions(group, "seq", manifest["total_chunks"] if manifest else None)
+            offset = 0
+            for r in (r for r in group if r["ok"]):
+                if r["header"]["offset"] != offset:
+                    problems.append(f"offset gap before seq {r['header']['seq']}")
+                    break
+                offset += r["size"]
+            if manifest is not None:
+                for r in group:
+                    seq = r["header"].get("seq")
+                    if r["ok"] and seq < manifest["total_chunks"] and \
+                            chunk_digest(manifest["chunks"][seq]) != chunk_digest(r["header"]):
+                        problems.append(f"seq {seq} does not match the sealed manifest")
+            root = set_root(group, "seq")
+            if manifest is not None and "merkle_root" in manifest and root != manifest["merkle_root"]:
+                problems.append("file Merkle root does not match the sealed manifest")
+            sealed = manifest is not None
+        elif kind == "unknown":
+            problems.append("unrecognised image")
+        ok = not problems and all(r["ok"] for r in group)
+        reports.append({"indir": str(indir), "set": name, "kind": kind, "ok": ok,
+                        "sealed": sealed, "merkle_root": root,
+                        "problems": problems, "chunks": group})
+
+    for indir, m, manifest, error in cdc_manifests:
+        problems = [error] if error else []
+        group = []
+        if manifest is not None:
+            for idx, entry in enumerate(manifest["chunks"]):
+                row = chunk_rows.get((indir, entry["id"]))
+                if row is None:
+                    problems.append(f"missing chunk {entry['id']} (chunk {idx})")
+                    continue
+                if row["ok"] and row["size"] != entry["size"]:
+                    problems.append(f"chunk {entry['id']} has size {row['size']}, manifest says {entry['size']}")
+                group.append(row)
+            root = set_root(group) if len(group) == len(manifest["chunks"]) else None
+            if "merkle_root" in manifest and root != manifest["merkle_root"]:
+                problems.append("file Merkle root does not match the manifest")
+        reports.append({"indir": str(indir), "set": manifest["orig_filename"] if manifest else m.name,
+                        "kind": "cdc", "ok": not problems and all(r["ok"] for r in group), "sealed": None,
+                        "merkle_root": root if manifest else None,
+                        "problems": problems, "chunks": group})
+
+    for report in reports:
+        report["chunks"] = [{k: v for k, v in r.items() if k != "header"} for r in report["chunks"]]
+    return reports
+
+
+def peek_merkle_roots(indir: Path) -> List[dict]:
+    """
+    File-level Merkle roots of the recordings in indir from image headers and
+    manifests alone (nothing is decrypted or authenticated): compare them across
+    copies of an archive to find the sets that differ, then verify those.
+    Returns [{"set", "kind", "merkle_root"}]; the root is None for sets that are
+    incomplete or were not encoded in "merkle" mode.
+    """
+    indir = Path(indir)
+    groups = {}
+    for p in sorted(indir.iterdir()):
+        if p.suffix.lower() not in (".png", ".tiff", ".tif") or p.name.startswith("."):
+            continue
+        try:
+            header = read_image_header(p)
+        except Exception:
+            continue
+        if header.get("magic") == MAGIC_HEADER:
+            groups.setdefault(("file", _file_set_key(header)), []).append((header.get("orig_chunk_index"), header))
+        elif header.get("magic") == STREAM_MAGIC:
+            groups.setdefault(("stream", header.get("stream_id")), []).append((header.get("seq"), header))
+    roots = []
+    for (kind, name), items in groups.items():
+        items.sort(key=lambda item: item[0])
+        headers = [h for _, h in items]
+        complete = [pos for pos, _ in items] == list(range(len(items)))
+        if kind == "file":
+            complete = complete and headers[0].get("orig_total_chunks") == len(items)
+            name = headers[0].get("set_id") or headers[0].get("orig_filename")
+        roots.append({"set": name, "kind": kind, "merkle_root": file_merkle_root(headers) if complete else None})
+    for m in find_manifests(indir, kind="cdc"):
+        manifest = json.loads(m.read_text(encoding="utf8"))
+        roots.append({"set": manifest.get("orig_filename"), "kind": "cdc", "merkle_root": manifest.get("merkle_root")})
+    return roots
+
+# ===========================
+# BATCH ENCODING
+# ===========================
+#
+# encode-dir encodes a whole tree of recordings in worker processes (one
+# interpreter start for the batch). Each recording gets its own output
+# directory holding its images and a signed "file" manifest; a recording whose
+# manifest still matches its size and mtime is skipped, and one interrupted
+# mid-encode resumes from its checkpoint journal.
+
+def file_manifest_path(out_dir: Path, input_file: Path) -> Path:
+    """Manifest written next to the images of a batch-encoded recording."""
+    return Path(out_dir) / f"{Path(input_file).stem}_manifest.json"
+
+
+def _batch_output_dir(in_root: Path, out_root: Path, input_file: Path) -> Path:
+    # Mirror the input tree; one directory per recording, named like the recording
+    return out_root / input_file.relative_to(in_root)
+
+
+def _file_manifest_matches(manifest_path: Path, input_file: Path, user_key: bytes) -> bool:
+    try:
+        manifest = read_manifest(manifest_path, user_key)
+    except (OSError, ValueError, RuntimeError):
+        return False
+    st = input_file.stat()
+    return manifest.get("kind") == "file" and manifest.get("orig_filename") == input_file.name \
+        and manifest.get("orig_size") == st.st_size and manifest.get("mtime_ns") == st.st_mtime_ns
+
+
+def _walk_recordings(in_root: Path, out_root: Path, extensions):
+    """Yield recordings under in_root, skipping hidden entries and the output tree."""
+    extensions = {(e if e.startswith(".") else "." + e).lower() for e in extensions}
+    out_resolved = out_root.resolve()
+    for dirpath, dirnames, filenames in os.walk(in_root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".")
+                             and Path(dirpath, d).resolve() != out_resolved)
+        for name in sorted(filenames):
+            if not name.startswith(".") and Path(name).suffix.lower() in extensions:
+                yield Path(dirpath) / name
+
+
+def _encode_dir_init(cipher: str, hash_mode: str, master_hex: Optional[str] = None,
+                     user_id: Optional[str] = None) -> None:
+    # Runs once per worker process: later jobs reuse the cached user key and zstd context
+    select_cipher(cipher)
+    select_hash(hash_mode)
+    if user_id is not None:
+        derive_user_key(get_master_key(master_hex), user_id)
+    if HAVE_ZSTD:
+        zstd_compressor()
+
+
+def _encode_dir_job(input_file: Path, out_dir: Path, user_id: str, master_hex: Optional[str],
+                    max_chunk_bytes: int, compress: bool) -> dict:
+    """Encode one recording (in a worker process) and seal it with a "file" manifest."""
+    start = time.perf_counter()
+    st = input_file.stat()
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        metas = [meta for _, _, meta in iter_encode_file(input_file, user_id, out_dir=out_dir,
+                                                          max_chunk_bytes=max_chunk_bytes, master_hex=master_hex,
+                                                          compress=compress, resume=True)]
+    manifest = {
+        "magic": MANIFEST_MAGIC,
+        "version": PROTOCOL_VERSION,
+        "kind": "file",
+        "user_id": user_id,
+        "orig_filename": input_file.name,
+        "orig_size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "set_id": metas[0].get("set_id"),
+        "total_chunks": len(metas),
+        "chunks": [{"image": carrier_image_name(input_file.name, m["chunk_index"], m["total_chunks"]),
+                    "size": m["original_size"], **digest_fields(m)} for m in metas],
+        "ts": int(time.time()),
+    }
+    root = file_merkle_root(metas)
+    if root is not None:
+        manifest["merkle_root"] = root
+    # Images left over from an earlier encode of a since-changed input would form a second set
+    current = {entry["image"] for entry in manifest["chunks"]}
+    for stale in out_dir.glob(f"{input_file.stem}_part*_of_*.png"):
+        if stale.name not in current:
+            stale.unlink()
+    write_manifest(file_manifest_path(out_dir, input_file), manifest,
+                   derive_user_key(get_master_key(master_hex), user_id))
+    return {"images": len(metas), "seconds": time.perf_counter() - start}
+
+
+def encode_directory(in_root: Path, out_root: Path, user_id: str, master_hex: Optional[str] = None,
+                     max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES, compress: bool = True,
+                     workers: Optional[int] = None, extensions=AUDIO_EXTENSIONS) -> dict:
+    """
+    Encode every recording under in_root (files with one of `extensions`) into
+    out_root/<relative path>/ with a pool of worker processes, largest files
+    first. Recordings whose manifest matches the input are skipped; interrupted
+    ones resume. workers=0 encodes in this process.
+    Returns dict with "encoded", "skipped" and "failed" ({path: error}) input
+    paths, "bytes" encoded and "seconds".
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    in_root, out_root = Path(in_root), Path(out_root)
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    inputs = []
+    skipped = []
+    for path in _walk_recordings(in_root, out_root, extensions):
+        out_dir = _batch_output_dir(in_root, out_root, path)
+        if _file_manifest_matches(file_manifest_path(out_dir, path), path, user_key):
+            skipped.append(path)
+        else:
+            inputs.append((path.stat().st_size, path, out_dir))
+    inputs.sort(key=lambda item: (-item[0], str(item[1])))  # largest first keeps the tail of the batch short
+    total_bytes = sum(size for size, _, _ in inputs)
+    print(f"[+] {len(inputs)} recordings to encode ({total_bytes / 1e6:.1f} MB), {len(skipped)} already encoded")
+
+    encoded, failed = [], {}
+    done_bytes = 0
+    start = time.perf_counter()
+
+    def finished(path, size, result=None, error=None):
+        nonlocal done_bytes
+        if error is not None:
+            failed[path] = error
+            print(f"[!] [{len(encoded) + len(failed)}/{len(inputs)}] {path}: {error}")
+            return
+        encoded.append(path)
+        done_bytes += size
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"[+] [{len(encoded) + len(failed)}/{len(inputs)}] {path.relative_to(in_root)}: "
+              f"{result['images']} images, {size / 1e6:.1f} MB in {result['seconds']:.1f}s | "
+              f"{done_bytes / 1e6:.1f}/{total_bytes / 1e6:.1f} MB at {done_bytes / 1e6 / elapsed:.1f} MB/s")
+
+    if workers == 0:
+        for size, path, out_dir in inputs:
+            try:
+                finished(path, size, _encode_dir_job(path, out_dir, user_id, master_hex, max_chunk_bytes, compress))
+            except Exception as e:
+                finished(path, size, error=str(e))
+    elif inputs:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_encode_dir_init,
+                                 initargs=(select_cipher(None), select_hash(None), master_hex, user_id)) as pool:
+            futures = {pool.submit(_encode_dir_job, path, out_dir, user_id, master_hex, max_chunk_bytes,
+                                   compress): (size, path) for size, path, out_dir in inputs}
+            for future in as_completed(futures):
+                size, path = futures[future]
+                try:
+                    finished(path, size, future.result())
+                except Exception as e:
+                    finished(path, size, error=str(e))
+
+    seconds = time.perf_counter() - start
+    print(f"[+] Done. Encoded {len(encoded)}, skipped {len(skipped)}, failed {len(failed)} "
+          f"({done_bytes / 1e6:.1f} MB in {seconds:.1f}s, {done_bytes / 1e6 / max(seconds, 1e-9):.1f} MB/s)")
+    return {"encoded": encoded, "skipped": skipped, "failed": failed, "bytes": done_bytes, "seconds": seconds}
+
+# ===========================
+# WATCH FOLDER
+# ===========================
+#
+# watch keeps one process (and one warm worker pool) alive and encodes
+# recordings as they land in a drop folder. New files are reported by inotify
+# on Linux, or found by a stat-only rescan every poll interval elsewhere, and
+# are only encoded once their size and mtime have stopped changing for
+# settle_seconds. Each recording is encoded into a hidden staging directory
+# under the output root and renamed into place when complete, so readers
+# never see a half-written set. A status file in the output root reports the
+# backlog.
+
+WATCH_STAGING_DIR = ".watch-staging"
+WATCH_STATUS_FILE = ".watch-status.json"
+
+
+class _PollingWatcher:
+    """Fallback watcher: every wait() ends in a full (stat-only) rescan."""
+
+    name = "poll"
+
+    def __init__(self, stop: threading.Event):
+        self._stop = stop
+
+    def wait(self, timeout: float):
+        self._stop.wait(timeout)
+        return None  # None = caller rescans the tree
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyWatcher:
+    """Recursive inotify watch (Linux, via libc) reporting files closed after writing or moved in."""
+
+    name = "inotify"
+    IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x8, 0x80, 0x100
+    IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path, skip_dir):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._skip_dir = skip_dir
+        self._dirs = {}
+        self.watch_tree(root)
+
+    def watch_tree(self, root: Path) -> List[Path]:
+        """Watch root and its subdirectories; returns the files already inside them."""
+        found = []
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not self._skip_dir(Path(dirpath, d))]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), mask)
+            if wd >= 0:
+                self._dirs[wd] = Path(dirpath)
+            found.extend(Path(dirpath, name) for name in filenames)
+        return found
+
+    def wait(self, timeout: float):
+        import select
+
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = self._EVENT.unpack_from(buf, offset)
+                name = buf[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+                offset += self._EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    return None  # events were dropped; rescan
+                if mask & self.IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                base = self._dirs.get(wd)
+                if base is None or not name:
+                    continue
+                path = base / os.fsdecode(name)
+                if mask & self.IN_ISDIR:
+                    if not self._skip_dir(path):
+                        changed.update(self.watch_tree(path))
+                elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                    changed.add(path)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _open_watcher(in_root: Path, skip_dir, backend: str, stop: threading.Event):
+    if backend not in ("auto", "inotify", "poll"):
+        raise ValueError(f"Unknown watch backend: {backend} (expected auto, inotify or poll)")
+    if backend != "poll" and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(in_root, skip_dir)
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            print(f"[!] inotify unavailable ({e}); polling instead")
+    elif backend == "inotify":
+        raise OSError("inotify is only available on Linux")
+    return _PollingWatcher(stop)
+
+
+def _watch_stage_dir(out_root: Path, rel: Path) -> Path:
+    # Stable per recording, so an interrupted encode resumes from its journal after a restart
+    return out_root / WATCH_STAGING_DIR / hashlib.sha256(str(rel).encode("utf8")).hexdigest()[:16]
+
+
+def _move_into_place(stage_dir: Path, final_dir: Path) -> None:
+    """Rename a finished staging directory over final_dir (same filesystem)."""
+    final_dir.parent.mkdir(parents=True, exist_ok=True)
+    old = stage_dir.with_name(stage_dir.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if final_dir.exists():
+        os.replace(final_dir, old)
+    os.replace(stage_dir, final_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _watch_job(input_file: Path, stage_dir: Path, final_dir: Path, user_id: str, master_hex: Optional[str],
+               max_chunk_bytes: int, compress: bool) -> dict:
+    """Encode one recording into its staging directory (in a worker process), then publish it."""
+    result = _encode_dir_job(input_file, stage_dir, user_id, master_hex, max_chunk_bytes, compress)
+    _move_into_place(stage_dir, final_dir)
+    return result
+
+
+def watch_directory(in_root: Path, out_root: Path, user_id: str, master_hex: Optional[str] = None,
+                    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES, compress: bool = True,
+                    workers: Optional[int] = None, extensions=AUDIO_EXTENSIONS, settle_seconds: float = 2.0,
+                    poll_interval: float = 1.0, backend: str = "auto", status_file: Optional[Path] = None,
+                    stop: Optional[threading.Event] = None, until_idle: bool = False) -> dict:
+    """
+    Encode recordings dropped into in_root until `stop` is set (or, with
+    until_idle, until nothing is waiting). Output layout and manifests match
+    encode_directory, and recordings already encoded are not redone. Files
+    are encoded once unchanged for settle_seconds; a file that changes again
+    later is re-encoded. backend is "auto" (inotify where available), "inotify"
+    or "poll". workers=0 encodes in this process.
+    Returns dict with "encoded" and "failed" ({path: error}) input paths and "bytes".
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor
+    from concurrent.futures import wait as wait_futures
+    from concurrent.futures.process import BrokenProcessPool
+
+    in_root, out_root = Path(in_root), Path(out_root)
+    out_root.mkdir(parents=True, exist_ok=True)
+    user_key = derive_user_key(get_master_key(master_hex), user_id)
+    status_path = Path(status_file) if status_file else out_root / WATCH_STATUS_FILE
+    stop = stop or threading.Event()
+    extensions = {(e if e.startswith(".") else "." + e).lower() for e in extensions}
+    out_resolved = out_root.resolve()
+
+    def skip_dir(path: Path) -> bool:
+        return path.name.startswith(".") or path.resolve() == out_resolved
+
+    def wanted(path: Path) -> bool:
+        if path.name.startswith(".") or path.suffix.lower() not in extensions:
+            return False
+        try:
+            rel = path.relative_to(in_root)
+        except ValueError:
+            return False
+        return not any(skip_dir(in_root.joinpath(*rel.parts[:i])) for i in range(1, len(rel.parts)))
+
+    settling = {}  # path -> (size, mtime_ns, first seen with this size/mtime)
+    handled = {}   # path -> (size, mtime_ns) last encoded (or failed); not retried until it changes
+    running = {}   # future -> (path, size, (size, mtime_ns))
+    encoded, failed = [], {}
+    done_bytes = 0
+    started = time.time()
+
+    def consider(path: Path) -> None:
+        try:
+            st = path.stat()
+        except OSError:
+            settling.pop(path, None)
+            return
+        state = (st.st_size, st.st_mtime_ns)
+        if handled.get(path) == state or any(p == path and s == state for p, _, s in running.values()):
+            settling.pop(path, None)
+            return
+        previous = settling.get(path)
+        if previous is None or previous[:2] != state:
+            settling[path] = (*state, time.monotonic())
+
+    for path in _walk_recordings(in_root, out_root, extensions):
+        out_dir = _batch_output_dir(in_root, out_root, path)
+        if _file_manifest_matches(file_manifest_path(out_dir, path), path, user_key):
+            st = path.stat()
+            handled[path] = (st.st_size, st.st_mtime_ns)
+        else:
+            consider(path)
+
+    pool = None
+    if workers != 0:
+        def new_pool():
+            return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_encode_dir_init,
+                                       initargs=(select_cipher(None), select_hash(None), master_hex, user_id))
+        pool = new_pool()
+    watcher = _open_watcher(in_root, skip_dir, backend, stop)
+    print(f"[+] Watching {in_root} ({watcher.name}) -> {out_root}; {len(settling)} waiting, "
+          f"{len(handled)} already encoded")
+
+    last_status = None
+
+    def write_status() -> None:
+        nonlocal last_status
+        busy = [str(p) for p, _, _ in running.values()]
+        status = {
+            "pid": os.getpid(),
+            "backend": watcher.name,
+            "in_root": str(in_root),
+            "out_root": str(out_root),
+            "started": int(started),
+            "settling": sorted(str(p) for p in settling),
+            "encoding": sorted(busy),
+            "backlog_files": len(settling) + len(running),
+            "backlog_bytes": sum(s[0] for s in settling.values()) + sum(size for _, size, _ in running.values()),
+            "encoded": len(encoded),
+            "encoded_bytes": done_bytes,
+            "failed": {str(p): e for p, e in failed.items()},
+        }
+        if status != last_status:
+            last_status = status
+            write_file_atomic(status_path, json.dumps({**status, "updated": int(time.time())}, indent=2).encode("utf8"))
+
+    def finished(path: Path, size: int, state: tuple, result=None, error=None) -> None:
+        nonlocal done_bytes
+        handled[path] = state
+        if error is not None:
+            failed[path] = error
+            print(f"[!] {path}: {error}")
+            return
+        failed.pop(path, None)
+        encoded.append(path)
+        done_bytes += size
+        print(f"[+] {path.relative_to(in_root)}: {result['images']} images, {size / 1e6:.1f} MB in "
+              f"{result['seconds']:.1f}s | backlog {len(settling) + len(running)} files")
+
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            busy = {p for p, _, _ in running.values()}
+            for path, (size, mtime_ns, since) in list(settling.items()):
+                consider(path)
+                if settling.get(path) != (size, mtime_ns, since) or now - since < settle_seconds or path in busy:
+                    continue
+                del settling[path]
+                rel = path.relative_to(in_root)
+                args = (path, _watch_stage_dir(out_root, rel), out_root / rel, user_id, master_hex,
+                        max_chunk_bytes, compress)
+                if pool is None:
+                    try:
+                        finished(path, size, (size, mtime_ns), _watch_job(*args))
+                    except Exception as e:
+                        finished(path, size, (size, mtime_ns), error=str(e))
+                else:
+                    running[pool.submit(_watch_job, *args)] = (path, size, (size, mtime_ns))
+
+            if running:
+                done, _ = wait_futures(list(running), timeout=0, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    path, size, state = running.pop(future)
+                    try:
+                        finished(path, size, state, future.result())
+                    except BrokenProcessPool:
+                        broken = True
+                        consider(path)
+                    except Exception as e:
+                        finished(path, size, state, error=str(e))
+                if broken:
+                    # A worker died: requeue everything it held and carry on with a fresh pool
+                    print("[!] Worker pool crashed; restarting it")
+                    for path, _, _ in running.values():
+                        consider(path)
+                    running.clear()
+                    pool.shutdown(wait=False)
+                    pool = new_pool()
+
+            write_status()
+            if until_idle and not settling and not running:
+                break
+            timeout = poll_interval
+            if settling:
+                timeout = min(timeout, max(settle_seconds / 4, 0.05))
+            if running:
+                timeout = min(timeout, 0.25)
+            changed = watcher.wait(timeout)
+            if changed is None:
+                for path in _walk_recordings(in_root, out_root, extensions):
+                    consider(path)
+            else:
+                for path in changed:
+                    if wanted(path):
+                        consider(path)
+    finally:
+        watcher.close()
+        if pool is not None:
+            for future in running:
+                future.cancel()  # queued jobs only; running ones finish (shutdown's cancel_futures needs 3.9)
+            pool.shutdown(wait=True)
+            for future, (path, size, state) in running.items():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    finished(path, size, state, future.result())
+            running.clear()
+        write_status()
+
+    print(f"[+] Watch stopped. Encoded {len(encoded)}, failed {len(failed)} ({done_bytes / 1e6:.1f} MB)")
+    return {"encoded": encoded, "failed": failed, "bytes": done_bytes}
+
+# ===========================
+# KEY ROTATION & MIGRATION
+# ===========================
+#
+# rekey re-encrypts existing image sets under a new master key (migrate does
+# the same under the current key, e.g. to move sets to another cipher or bring
+# old headers up to the current container). Each chunk is authenticated with
+# the old key and its ciphertext payload -- still zstd-compressed -- is sealed
+# again as-is: nothing is recompressed and no plaintext is written to disk.
+# Only CDC chunks are decompressed (in memory), because their content address
+# is keyed and must be recomputed. Manifests are re-signed with the new key.
+
+def _serialize_header(header: dict) -> bytes:
+    header_json = json.dumps(header, separators=(",", ":"), sort_keys=True).encode("utf8")
+    if len(header_json) > HEADER_LEN - 4:
+        raise ValueError(f"Header JSON too large: {len(header_json)} bytes (max {HEADER_LEN - 4})")
+    return header_json
+
+
+def reseal_payload(flat: bytes, old: UserCipher, new: UserCipher, label: str = "chunk",
+                   update=None) -> Tuple[bytes, dict]:
+    """
+    Move one chunk payload (seal_payload layout) from the `old` keyring to `new`.
+    The decrypted payload is re-encrypted without being decompressed; the
+    header gets the new cipher and the current protocol version, plus any
+    fields returned by update(header, payload). Returns (payload, header).
+    """
+    header, header_json = parse_payload_header(flat)
+    nonce = bytes(flat[HEADER_LEN:HEADER_LEN + 12])
+    sentinel_idx = flat.find(SENTINEL, HEADER_LEN)
+    if sentinel_idx == -1:
+        raise RuntimeError(f"No end marker in {label}")
+    try:
+        inner = old.decrypt(nonce, memoryview(flat)[HEADER_LEN + 12:sentinel_idx], header_json,
+                            cipher=header.get("cipher"))
+    except Exception as e:
+        raise RuntimeError(f"Decryption failed for {label}: {e}")
+    trailer = b""
+    if header.get("merkle_root") is not None:
+        leaves = read_merkle_leaves(flat, header)
+        if leaves is None:
+            raise RuntimeError(f"Merkle leaf table of {label} does not match its root")
+        trailer = MERKLE_TRAILER + b"".join(leaves)
+
+    header = {**header, "cipher": new.name, "version": max(int(header.get("version", 1)), PROTOCOL_VERSION)}
+    if update is not None:
+        header.update(update(header, inner))
+    header_json = _serialize_header(header)
+    nonce = os.urandom(12)
+    ciphertext = new.encrypt(nonce, inner, header_json)
+    payload = b"".join((len(header_json).to_bytes(4, "little"), header_json,
+                        bytes(HEADER_LEN - 4 - len(header_json)), nonce, ciphertext, SENTINEL, trailer))
+    return payload, header
+
+
+def reseal_bundle_payload(flat: bytes, old: UserCipher, new: UserCipher, label: str = "bundle") -> bytes:
+    """
+    Move a bundle payload to the `new` keyring: the TOC and every member
+    section are decrypted and sealed again in place. Tags are the same size
+    for every supported cipher, so the TOC offsets stay valid.
+    """
+    header, header_json = parse_payload_header(flat)
+    old_cipher = header.get("cipher")
+    toc_start = HEADER_LEN + 12
+    toc_end = toc_start + int(header["toc_len"])
+    try:
+        toc_json = old.decrypt(bytes(flat[HEADER_LEN:toc_start]), bytes(flat[toc_start:toc_end]), header_json,
+                               cipher=old_cipher)
+    except Exception as e:
+        raise RuntimeError(f"Bundle TOC decryption failed for {label}: {e}")
+    members = json.loads(toc_json.decode("utf8"))["members"]
+
+    header = {**header, "cipher": new.name, "version": max(int(header.get("version", 1)), PROTOCOL_VERSION)}
+    header_json = _serialize_header(header)
+    toc_nonce = os.urandom(12)
+    parts = [len(header_json).to_bytes(4, "little"), header_json, bytes(HEADER_LEN - 4 - len(header_json)),
+             toc_nonce, new.encrypt(toc_nonce, toc_json, header_json)]
+    for entry in members:
+        start = toc_end + int(entry["offset"])
+        end = start + int(entry["length"])
+        aad = f"{header['bundle_id']}:{entry['index']}:{entry['name']}".encode("utf8")
+        try:
+            inner = old.decrypt(bytes(flat[start:start + 12]), bytes(flat[start + 12:end]), aad, cipher=old_cipher)
+        except Exception as e:
+            raise RuntimeError(f"Decryption failed for bundle member {entry['name']}: {e}")
+        nonce = os.urandom(12)
+        parts += [nonce, new.encrypt(nonce, inner, aad)]
+    parts.append(SENTINEL)
+    return b"".join(parts)
+
+
+def _rekey_image(img_path: Path, out_dir: Path, old: UserCipher, new: UserCipher, new_dedup_key: bytes) -> dict:
+    """Re-seal one image into out_dir. Returns {"image", "output", "chunk_id" (old, new) for CDC chunks}."""
+    flat = image_pixels_to_bytes(img_path)
+    header, _ = parse_payload_header(flat)
+    renamed = None
+    if header.get("magic") == BUNDLE_MAGIC:
+        payload = reseal_bundle_payload(flat, old, new, label=img_path.name)
+    elif header.get("magic") == CHUNK_MAGIC:
+        def readdress(header, inner):
+            plain = zstd_decompressor().decompress(inner) if header.get("compressed") else inner
+            return {"chunk_id": chunk_id_for(new_dedup_key, plain)}
+        payload, new_header = reseal_payload(flat, old, new, label=img_path.name, update=readdress)
+        renamed = (header.get("chunk_id"), new_header["chunk_id"])
+    else:
+        payload, _ = reseal_payload(flat, old, new, label=img_path.name)
+    del flat
+    png, _, _ = pack_payload_png(payload)
+    out_path = out_dir / (f"{renamed[1]}.png" if renamed else Path(img_path.name).with_suffix(".png").name)
+    write_file_atomic(out_path, png)
+    return {"image": img_path.name, "output": out_path, "chunk_id": renamed}
+
+
+def rekey_archives(indirs: List[Path], out_root: Path, user_id: str, master_hex: Optional[str] = None,
+                   new_master_hex: Optional[str] = None, cipher: Optional[str] = None,
+                   store_dir: Optional[Path] = None, workers: Optional[int] = None) -> List[dict]:
+    """
+    Re-encrypt every image set in `indirs` into out_root/<indir name>/ under
+    new_master_hex (None keeps the current key: a migration) with `cipher`
+    (default: the cipher selected for new encodes). Images of all sets are processed in parallel threads; CDC
+    chunks referenced by a manifest but not present in the directory are read
+    from store_dir. Returns one report per directory:
+      {"indir", "output", "images", "manifests", "ok", "errors": [...], "seconds"}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    indirs = [Path(d) for d in indirs]
+    names = [d.name for d in indirs]
+    if len(set(names)) != len(names):
+        raise ValueError("Input directories must have distinct names (outputs are out_root/<name>)")
+    old_key = derive_user_key(get_master_key(master_hex), user_id)
+    new_key = derive_user_key(get_master_key(new_master_hex), user_id) if new_master_hex else old_key
+    old, new = UserCipher(old_key), UserCipher(new_key, cipher)
+    new_dedup_key = derive_subkey(new_key, b"AUDIO-IMG-DEDUP-V1")
+    out_root = Path(out_root)
+
+    jobs = []  # (report, image path)
+    reports = []
+    for indir in indirs:
+        if not indir.is_dir():
+            raise RuntimeError(f"Not a directory: {indir}")
+        out_dir = out_root / indir.name
+        if out_dir.resolve() == indir.resolve():
+            raise ValueError(f"Output directory must differ from the input: {indir}")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        report = {"indir": indir, "output": out_dir, "images": 0, "manifests": 0, "ok": True, "errors": [],
+                  "_manifests": [], "_chunk_ids": {}, "_start": time.perf_counter()}
+        reports.append(report)
+        images = _image_paths(indir)
+        local = {p.name for p in images}
+        for m in find_manifests(indir):
+            try:
+                manifest = read_manifest(m, old_key)
+            except Exception as e:
+                report["errors"].append(f"{m.name}: {e}")
+                continue
+            report["_manifests"].append((m, manifest))
+            if manifest.get("kind") == "cdc":
+                for entry in manifest["chunks"]:
+                    if f"{entry['id']}.png" in local:
+                        continue
+                    stored = chunk_store_path(store_dir, user_id, entry["id"]) if store_dir else None
+                    if stored is None or not stored.exists():
+                        report["errors"].append(f"{m.name}: chunk {entry['id'][:12]} not found")
+                        continue
+                    images.append(stored)
+                    local.add(stored.name)
+        jobs.extend((report, p) for p in images)
+
+    def run(job):
+        report, img = job
+        try:
+            return report, _rekey_image(img, report["output"], old, new, new_dedup_key), None
+        except Exception as e:
+            return report, None, f"{img.name}: {e}"
+
+    n_workers = workers or min(4, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        for report, result, error in pool.map(run, jobs):
+            if error is not None:
+                report["errors"].append(error)
+                continue
+            report["images"] += 1
+            if result["chunk_id"]:
+                report["_chunk_ids"][result["chunk_id"][0]] = result["chunk_id"][1]
+            print(f"[+] {report['indir'].name}/{result['image']} -> {result['output'].name}")
+
+    for report in reports:
+        for path, manifest in report.pop("_manifests"):
+            if manifest.get("kind") == "cdc":
+                try:
+                    manifest["chunks"] = [{**e, "id": report["_chunk_ids"][e["id"]]} for e in manifest["chunks"]]
+                except KeyError as e:
+                    report["errors"].append(f"{path.name}: chunk {str(e)[:14]} was not re-encrypted")
+                    continue
+            write_manifest(report["output"] / path.name, {**manifest, "version": PROTOCOL_VERSION}, new_key)
+            report["manifests"] += 1
+        del report["_chunk_ids"]
+        report["seconds"] = time.perf_counter() - report.pop("_start")
+        report["ok"] = not report["errors"]
+        print(f"[+] {'Re-encrypted' if report['ok'] else 'FAILED'} {report['indir']} -> {report['output']}: "
+              f"{report['images']} images, {report['manifests']} manifests in {report['seconds']:.1f}s")
+    return reports
+
+# -------------------- CLI --------------------
+def build_cli():
+    p = argparse.ArgumentParser(prog="audio_image_chunked")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    enc = sub.add_parser("encode")
+    enc.add_argument("--input","-i", required=True, help="Input audio file ('-' = stdin)")
+    enc.add_argument("--outdir","-o", required=True, help="Output directory for images ('-' = tar/zip stream on stdout)")
+    enc.add_argument("--user","-u", required=True, help="User id (binds key)")
+    enc.add_argument("--max-chunk-bytes", type=int, default=DEFAULT_MAX_CHUNK_BYTES, help="Max raw audio bytes per image (default 50MB)")
+    enc.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    enc.add_argument("--no-compress", action="store_true", help="Disable zstd compression for chunks")
+    enc.add_argument("--delete", action="store_true", help="Delete source audio after successful encode")
+    enc.add_argument("--chunking", choices=["fixed", "cdc"], default="fixed", help="fixed: split every --max-chunk-bytes; cdc: content-defined chunks deduplicated in --store")
+    enc.add_argument("--store", default=os.environ.get("AICARRIER_CHUNK_STORE", "chunk_store"), help="Per-user chunk store directory for --chunking cdc")
+    enc.add_argument("--cipher", choices=list(SUPPORTED_CIPHERS) + ["auto"], default=None, help="AEAD for new chunks (default: $AICARRIER_CIPHER or aes-256-gcm; auto = benchmark and pick the fastest)")
+    enc.add_argument("--append", action="store_true", help="Append-mode stream: encode only audio added since the last run into --outdir")
+    enc.add_argument("--seal", action="store_true", help="With --append: seal the stream (write the final manifest) after encoding")
+    enc.add_argument("--cdc-avg-bytes", type=int, default=CDC_AVG_CHUNK_BYTES, help="Target average chunk size for --chunking cdc (default 1MB)")
+    enc.add_argument("--pipeline-depth", type=int, default=None, help="Chunks queued between read/encrypt/pack/write stages (default: $AICARRIER_PIPELINE_DEPTH or 2; 0 = no overlap)")
+    enc.add_argument("--resume", action="store_true", help="Continue an interrupted encode after the last intact image in --outdir")
+    enc.add_argument("--name", default="stdin.bin", help="Recording filename stored in the headers when reading stdin")
+    enc.add_argument("--format", choices=["tar", "zip"], default="tar", help="Archive written to stdout with -o - (default tar)")
+    enc.add_argument("--hash", choices=list(SUPPORTED_HASHES), default=None, help="Chunk integrity hash (default: $AICARRIER_HASH or sha256; merkle = parallel leaf hashing with per-chunk roots)")
+
+    dec = sub.add_parser("decode")
+    dec.add_argument("--indir","-i", required=True, help="Input directory containing images produced by encode ('-' = tar/zip on stdin)")
+    dec.add_argument("--out","-o", required=True, help="Recovered output audio file ('-' = stdout)")
+    dec.add_argument("--user","-u", required=True, help="User id used for encryption")
+    dec.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    dec.add_argument("--store", default=os.environ.get("AICARRIER_CHUNK_STORE"), help="Chunk store to search for chunks referenced by a CDC manifest")
+    dec.add_argument("--pipeline-depth", type=int, default=None, help="Chunks queued between read/decrypt/write stages (default: $AICARRIER_PIPELINE_DEPTH or 2; 0 = no overlap)")
+    dec.add_argument("--resume", action="store_true", help="Continue an interrupted decode after the last intact chunk in --out")
+    dec.add_argument("--all", action="store_true", help="Decode every recording in --indir into the --out directory")
+    dec.add_argument("--workers", type=int, default=None, help="With --all: recordings decoded at once (default: min(4, CPUs))")
+
+    bun = sub.add_parser("bundle", help="Pack many small recordings into bundle images")
+    bun.add_argument("--inputs","-i", nargs="+", required=True, help="Input audio files to pack")
+    bun.add_argument("--outdir","-o", required=True, help="Output directory for bundle images")
+    bun.add_argument("--user","-u", required=True, help="User id (binds key)")
+    bun.add_argument("--name","-n", default="bundle", help="Bundle name used for output filenames")
+    bun.add_argument("--max-bundle-bytes", type=int, default=DEFAULT_MAX_CHUNK_BYTES, help="Max raw audio bytes per bundle image (default 50MB)")
+    bun.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    bun.add_argument("--no-compress", action="store_true", help="Disable zstd compression for members")
+    bun.add_argument("--cipher", choices=list(SUPPORTED_CIPHERS) + ["auto"], default=None, help="AEAD for new bundles (auto = benchmark and pick the fastest)")
+
+    ext = sub.add_parser("extract", help="List or extract recordings from bundle images")
+    ext.add_argument("--indir","-i", required=True, help="Input directory containing bundle images")
+    ext.add_argument("--outdir","-o", required=False, help="Output directory for extracted recordings")
+    ext.add_argument("--member", action="append", help="Member filename to extract (repeatable; default: all)")
+    ext.add_argument("--list", action="store_true", help="Only list bundle members (decrypts the TOC only)")
+    ext.add_argument("--user","-u", required=True, help="User id used for encryption")
+    ext.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+
+    edir = sub.add_parser("encode-dir", help="Encode every recording under a directory tree with a process pool")
+    edir.add_argument("--indir","-i", required=True, help="Directory tree holding the recordings")
+    edir.add_argument("--outdir","-o", required=True, help="Output root; each recording gets <outdir>/<relative path>/")
+    edir.add_argument("--user","-u", required=True, help="User id (binds key)")
+    edir.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    edir.add_argument("--max-chunk-bytes", type=int, default=DEFAULT_MAX_CHUNK_BYTES, help="Max raw audio bytes per image (default 50MB)")
+    edir.add_argument("--no-compress", action="store_true", help="Disable zstd compression for chunks")
+    edir.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs; 0 = encode in this process)")
+    edir.add_argument("--ext", action="append", help=f"File extension to encode (repeatable; default: {' '.join(AUDIO_EXTENSIONS)})")
+    edir.add_argument("--cipher", choices=list(SUPPORTED_CIPHERS) + ["auto"], default=None, help="AEAD for new chunks (auto = benchmark and pick the fastest)")
+    edir.add_argument("--hash", choices=list(SUPPORTED_HASHES), default=None, help="Chunk integrity hash (default: $AICARRIER_HASH or sha256)")
+
+    wat = sub.add_parser("watch", help="Keep encoding recordings as they are dropped into a directory")
+    wat.add_argument("--indir","-i", required=True, help="Drop folder to watch (subdirectories included)")
+    wat.add_argument("--outdir","-o", required=True, help="Output root; each recording gets <outdir>/<relative path>/")
+    wat.add_argument("--user","-u", required=True, help="User id (binds key)")
+    wat.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    wat.add_argument("--max-chunk-bytes", type=int, default=DEFAULT_MAX_CHUNK_BYTES, help="Max raw audio bytes per image (default 50MB)")
+    wat.add_argument("--no-compress", action="store_true", help="Disable zstd compression for chunks")
+    wat.add_argument("--workers", type=int, default=None, help="Worker processes kept warm (default: CPUs; 0 = encode in this process)")
+    wat.add_argument("--ext", action="append", help=f"File extension to encode (repeatable; default: {' '.join(AUDIO_EXTENSIONS)})")
+    wat.add_argument("--cipher", choices=list(SUPPORTED_CIPHERS) + ["auto"], default=None, help="AEAD for new chunks (auto = benchmark and pick the fastest)")
+    wat.add_argument("--hash", choices=list(SUPPORTED_HASHES), default=None, help="Chunk integrity hash (default: $AICARRIER_HASH or sha256)")
+    wat.add_argument("--settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it is encoded (default 2)")
+    wat.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between rescans when polling (default 1)")
+    wat.add_argument("--backend", choices=["auto", "inotify", "poll"], default="auto", help="Change detection (default: inotify where available, else polling)")
+    wat.add_argument("--status-file", default=None, help=f"Backlog status JSON (default: <outdir>/{WATCH_STATUS_FILE})")
+    wat.add_argument("--once", action="store_true", help="Exit once the current backlog is encoded")
+
+    for name, help_text in (("rekey", "Re-encrypt image sets under a new master key (no decode to audio)"),
+                            ("migrate", "Re-seal image sets with the current container and --cipher (same key)")):
+        rk = sub.add_parser(name, help=help_text)
+        rk.add_argument("--indir","-i", nargs="+", required=True, help="Directories holding image sets")
+        rk.add_argument("--outdir","-o", required=True, help="Output root; each set is written to <outdir>/<indir name>/")
+        rk.add_argument("--user","-u", required=True, help="User id used for encryption")
+        rk.add_argument("--master","-m", required=False, help="Current master key hex (optional; prefer env var)")
+        if name == "rekey":
+            rk.add_argument("--new-master", required=False, help="New master key hex (optional; prefer $AICARRIER_NEW_MASTER_KEY_HEX)")
+        rk.add_argument("--cipher", choices=list(SUPPORTED_CIPHERS) + ["auto"], default=None, help="AEAD for the re-sealed chunks (default: $AICARRIER_CIPHER or aes-256-gcm)")
+        rk.add_argument("--store", default=os.environ.get("AICARRIER_CHUNK_STORE"), help="Chunk store to search for chunks referenced by a CDC manifest")
+        rk.add_argument("--workers", type=int, default=None, help="Parallel threads across all images (default: min(4, CPUs))")
+
+    ver = sub.add_parser("verify", help="Authenticate every chunk of one or more image sets without writing audio")
+    ver.add_argument("--indir","-i", nargs="+", required=True, help="Directories holding image sets to audit")
+    ver.add_argument("--user","-u", required=True, help="User id used for encryption")
+    ver.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
+    ver.add_argument("--store", default=os.environ.get("AICARRIER_CHUNK_STORE"), help="Chunk store to search for chunks referenced by a CDC manifest")
+    ver.add_argument("--workers", type=int, default=None, help="Parallel verification threads (default: min(8, CPUs))")
+    ver.add_argument("--json", action="store_true", help="Print the full per-chunk report as JSON")
+    ver.add_argument("--roots", action="store_true", help="Only print file-level Merkle roots from headers and manifests (nothing is decrypted)")
+
+    return p
+
+
+def main(argv=None):
+    p = build_cli()
+    args = p.parse_args(argv)
+
+    if args.cmd in ("encode", "bundle", "encode-dir", "watch", "rekey", "migrate"):
+        select_cipher(args.cipher)
+    if args.cmd in ("encode", "encode-dir", "watch"):
+        select_hash(args.hash)
+
+    if args.cmd == "encode" and "-" in (args.input, args.outdir):
+        if args.append or args.chunking == "cdc" or args.resume or args.delete:
+            p.error("--append, --chunking cdc, --resume and --delete need real files (not '-')")
+        stdout = sys.stdout.buffer
+        src = sys.stdin.buffer if args.input == "-" else Path(args.input)
+        name = args.name if args.input == "-" else Path(args.input).name
+        with contextlib.redirect_stdout(sys.stderr):  # keep progress out of the archive
+            encode_pipe(src, stdout if args.outdir == "-" else Path(args.outdir), args.user, orig_filename=name,
+                        max_chunk_bytes=args.max_chunk_bytes, master_hex=args.master,
+                        compress=not args.no_compress, archive_format=args.format,
+                        pipeline_depth=args.pipeline_depth)
+
+    elif args.cmd == "encode":
+        in_file = Path(args.input)
+        out_dir = Path(args.outdir)
+        compress = not bool(args.no_compress)
+        if args.seal and not args.append:
+            p.error("--seal requires --append")
+        if args.append:
+            encode_append(in_file, out_dir, args.user, max_chunk_bytes=args.max_chunk_bytes, master_hex=args.master,
+                          compress=compress, seal=args.seal)
+        elif args.chunking == "cdc":
+            encode_cdc(in_file, out_dir, args.user, Path(args.store), master_hex=args.master, compress=compress,
+                       avg_chunk_bytes=args.cdc_avg_bytes)
+        else:
+            images = encode_streamed(in_file, out_dir, args.user, max_chunk_bytes=args.max_chunk_bytes, master_hex=args.master, compress=compress,
+                                     pipeline_depth=args.pipeline_depth, resume=args.resume)
+        if args.delete:
+            try:
+                in_file.unlink()
+                print("[*] Deleted source file.")
+            except Exception as e:
+                print("[!] Could not delete source:", e)
+
+    elif args.cmd == "decode" and "-" in (args.indir, args.out):
+        if args.resume or args.all:
+            p.error("--resume and --all need real files (not '-')")
+        stdout = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):  # keep progress out of the audio
+            decode_pipe(sys.stdin.buffer if args.indir == "-" else Path(args.indir),
+                        stdout if args.out == "-" else Path(args.out), args.user, master_hex=args.master,
+                        pipeline_depth=args.pipeline_depth)
+
+    elif args.cmd == "decode" and args.all:
+        reports = decode_directory(Path(args.indir), Path(args.out), args.user, master_hex=args.master,
+                                   store_dir=Path(args.store) if args.store else None, workers=args.workers,
+                                   pipeline_depth=args.pipeline_depth, resume=args.resume)
+        for report in reports:
+            if report["ok"]:
+                print(f"OK   {report['kind']} {report['orig_filename']} -> {report['output']}")
+            else:
+                print(f"FAIL {report['kind']} {report['orig_filename']} ({report['set']}): {report['error']}")
+        sys.exit(1 if any(not r["ok"] for r in reports) else 0)
+
+    elif args.cmd == "decode":
+        decode_images_to_file(Path(args.indir), Path(args.out), args.user, master_hex=args.master,
+                              store_dir=Path(args.store) if args.store else None, pipeline_depth=args.pipeline_depth,
+                              resume=args.resume)
+
+    elif args.cmd == "encode-dir":
+        result = encode_directory(Path(args.indir), Path(args.outdir), args.user, master_hex=args.master,
+                                  max_chunk_bytes=args.max_chunk_bytes, compress=not args.no_compress,
+                                  workers=args.workers, extensions=args.ext or AUDIO_EXTENSIONS)
+        sys.exit(1 if result["failed"] else 0)
+
+    elif args.cmd == "watch":
+        import signal
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        result = watch_directory(Path(args.indir), Path(args.outdir), args.user, master_hex=args.master,
+                                 max_chunk_bytes=args.max_chunk_bytes, compress=not args.no_compress,
+                                 workers=args.workers, extensions=args.ext or AUDIO_EXTENSIONS,
+                                 settle_seconds=args.settle, poll_interval=args.poll_interval, backend=args.backend,
+                                 status_file=Path(args.status_file) if args.status_file else None, stop=stop,
+                                 until_idle=args.once)
+        sys.exit(1 if result["failed"] else 0)
+
+    elif args.cmd in ("rekey", "migrate"):
+        new_master = None
+        if args.cmd == "rekey":
+            new_master = args.new_master or os.environ.get("AICARRIER_NEW_MASTER_KEY_HEX")
+            if not new_master:
+                p.error("rekey needs --new-master or $AICARRIER_NEW_MASTER_KEY_HEX")
+        reports = rekey_archives([Path(d) for d in args.indir], Path(args.outdir), args.user,
+                                 master_hex=args.master, new_master_hex=new_master,
+                                 store_dir=Path(args.store) if args.store else None, workers=args.workers)
+        for report in reports:
+            for error in report["errors"]:
+                print(f"       ! {report['indir']}: {error}")
+        sys.exit(1 if any(not r["ok"] for r in reports) else 0)
+
+    elif args.cmd == "bundle":
+        encode_bundle([Path(f) for f in args.inputs], Path(args.outdir), args.user, bundle_name=args.name,
+                      max_bundle_bytes=args.max_bundle_bytes, master_hex=args.master, compress=not args.no_compress)
+
+    elif args.cmd == "extract":
+        if args.list:
+            for entry in list_bundle_members(Path(args.indir), args.user, master_hex=args.master):
+                print(f"{entry['name']}\t{entry['orig_size']} bytes\t{entry['image']}")
+        else:
+            if not args.outdir:
+                p.error("extract requires --outdir unless --list is given")
+            extract_bundle_members(Path(args.indir), Path(args.outdir), args.user, master_hex=args.master, names=args.member)
+
+    elif args.cmd == "verify" and args.roots:
+        for indir in args.indir:
+            for entry in peek_merkle_roots(Path(indir)):
+                print(f"{entry['merkle_root'] or '-':64} {indir}: {entry['kind']} {entry['set']}")
+
+    elif args.cmd == "verify":
+        reports = verify_archives([Path(d) for d in args.indir], args.user, master_hex=args.master,
+                                  store_dir=Path(args.store) if args.store else None, workers=args.workers)
+        if args.json:
+            print(json.dumps(reports, indent=2))
+        else:
+            for report in reports:
+                status = "OK  " if report["ok"] else "FAIL"
+                print(f"{status} {report['indir']}: {report['kind']} {report['set']} ({len(report['chunks'])} chunks)")
+                for problem in report["problems"]:
+                    print(f"       ! {problem}")
+                for row in report["chunks"]:
+                    if not row["ok"]:
+                        print(f"       ! {row['image']}: {row.get('error')}")
+        failed = sum(not r["ok"] for r in reports)
+        print(f"[+] Verified {len(reports)} recordings: {len(reports) - failed} ok, {failed} failed", file=sys.stderr)
+        sys.exit(1 if failed or not reports else 0)
+
+    else:
+        p.print_help()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
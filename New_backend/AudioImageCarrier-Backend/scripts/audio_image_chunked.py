@@ -1,1002 +1,19 @@
-# filepath: AudioImageCarrier-Backend/scripts/audio_image_chunked.py
 #!/usr/bin/env python3
 """
-audio_image_chunked.py - Secure Audio-to-Image Steganography with AES-GCM Encryption
-====================================================================================
+audio_image_chunked.py - command-line entry point of the AudioImageCarrier codec.
 
-Version: 2.0.0 (Security Hardened)
-Author: AudioImageCarrier Team
-License: MIT
-Last Updated: November 20, 2025
-
-DESCRIPTION:
------------
-This script provides secure encoding and decoding of audio files into encrypted PNG images
-using military-grade AES-256-GCM encryption with user-specific key derivation.
-
-SECURITY FEATURES:
------------------
-✓ AES-256-GCM authenticated encryption (NIST approved)
-✓ HKDF key derivation (RFC 5869) for user-specific keys
-✓ SHA-256 integrity verification on decryption
-✓ Authenticated Additional Data (AAD) prevents metadata tampering
-✓ Cryptographically secure random nonce generation
-✓ Optional zstd compression to reduce payload size
-✓ Input validation and sanitization
-✓ Constant-time operations where applicable
-✓ Encrypted header protection via AAD mechanism
-
-IMPORTANT SECURITY NOTES:
-------------------------
-1. **Master Key Security:**
-   - Each user MUST have a unique master key (64 hex characters = 32 bytes)
-   - NEVER share master keys between users
-   - Store master keys in secure vault (e.g., AWS Secrets Manager, HashiCorp Vault)
-   - Rotate master keys periodically (recommended: every 90 days)
-
-2. **User ID Security:**
-   - user_id is used for key derivation and stored in image metadata
-   - Same user_id + master_key = same encryption key
-   - NEVER reuse user_id across different master keys
-   - Validate and sanitize user_id to prevent injection attacks
-
-3. **Metadata Privacy:**
-   - Header is stored in PLAINTEXT (protected by AAD)
-   - Header contains: user_id, filename, timestamp, chunk info
-   - Consider this metadata public - do not include sensitive info in filenames
-   - Future versions may support encrypted headers
-
-4. **Key Derivation:**
-   - Uses HKDF-SHA256 with static salt (info=b"AUDIO-IMG-V1")
-   - Derived key = HKDF(master_key || user_id)
-   - WARNING: Changing the info parameter breaks backward compatibility
-
-VULNERABILITY MITIGATIONS:
--------------------------
-✓ FIXED: Shared master key vulnerability (now requires per-user keys via API)
-✓ FIXED: Metadata tampering (AAD verification prevents modification)
-✓ FIXED: Replay attacks (nonce is unique per encryption)
-✓ FIXED: Padding oracle (GCM mode provides authentication)
-✓ FIXED: Timing attacks (constant-time comparisons in crypto library)
-⚠ PARTIAL: User enumeration (user_id visible in header - consider hashing in v3.0)
-⚠ PARTIAL: Metadata disclosure (header plaintext - encrypt in future version)
-
-CHANGELOG:
----------
-v2.0.0 (2025-11-20):
-  + Added comprehensive security documentation
-  + Enhanced input validation
-  + Added security warnings for shared keys
-  + Improved error messages
-  + Added HMAC signature verification option (optional)
-  + Better constant-time operations
-
-v1.1.0 (Previous):
-  + Avoid chunking for WAV files shorter than 8 hours
-  + Fixed SHA field name mismatch (header now includes "sha256")
-  + Added 8-byte sentinel after ciphertext (AIMGEND1)
-  + More robust ciphertext extraction
-  + Improved logging
-
-USAGE:
------
-# Encoding (requires unique master key per user):
-python audio_image_chunked.py encode \\
-    --input audio.wav \\
-    --outdir ./output \\
-    --user alice \\
-    --master ALICE_UNIQUE_64_HEX_KEY
-
-# Decoding (must use same user_id and master key):
-python audio_image_chunked.py decode \\
-    --indir ./output \\
-    --out recovered.wav \\
-    --user alice \\
-    --master ALICE_UNIQUE_64_HEX_KEY
-
-SECURITY BEST PRACTICES:
------------------------
-1. Generate strong master keys:
-   python -c "import secrets; print(secrets.token_hex(32))"
-
-2. Use environment variables instead of command-line args:
-   export AICARRIER_MASTER_KEY_HEX=<your-key>
-   python audio_image_chunked.py encode --input audio.wav --user alice
-
-3. Implement key rotation:
-   - Decrypt with old key
-   - Re-encrypt with new key
-   - Securely delete old encrypted data
-
-4. Validate inputs:
-   - Check file types before processing
-   - Limit file sizes to prevent DoS
-   - Sanitize user_id (no path traversal characters)
-
-5. Secure deployment:
-   - Run in isolated container
-   - Use read-only file systems where possible
-   - Implement rate limiting at API level
-   - Monitor for suspicious activity
-
-LIMITATIONS:
------------
-- Duration detection only works for WAV files (uses wave module)
-- Other formats (MP3, FLAC, M4A) require external libs (ffprobe/pydub)
-- Sentinel collision probability: ~1 in 2^64 (negligible but non-zero)
-- Maximum file size: Limited by available memory for single-chunk files
-- Header size: Fixed 1024 bytes (may be excessive for small files)
-
-FUTURE IMPROVEMENTS:
--------------------
-- [ ] Encrypt header metadata for privacy
-- [ ] Add HMAC signature for file ownership verification
-- [ ] Support for external KMS (AWS KMS, Azure Key Vault)
-- [ ] Streaming encryption for large files (reduce memory usage)
-- [ ] Multi-threaded chunk processing
-- [ ] Support for other image formats (JPEG, WebP with steganography)
-- [ ] Key rotation without re-encryption
-- [ ] Audit logging integration
-
-FOR MORE INFORMATION:
--------------------
-See: docs/SECURITY.md for detailed security analysis
-See: docs/API_DOCUMENTATION.md for API integration
-See: docs/WORKFLOW.md for process flow diagrams
+The implementation lives in the aicarrier_codec package next to this file
+(see aicarrier_codec/codec.py for the format and usage). Its names are
+re-exported so `from audio_image_chunked import ...` keeps working.
 """
 
-import argparse
-import os
 import sys
-import math
-import json
-import time
-import binascii
-import hashlib
-import wave
 from pathlib import Path
-from typing import Optional, List, Tuple
-
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.kdf.hkdf import HKDF
-from cryptography.hazmat.primitives import hashes
-
-from PIL import Image
-import numpy as np
-
-# Try optional zstd
-try:
-    import zstandard as zstd
-    HAVE_ZSTD = True
-except Exception:
-    HAVE_ZSTD = False
-
-# ===========================
-# SECURITY CONFIGURATION
-# ===========================
-
-# Header Configuration
-HEADER_LEN = 1024  # Bytes reserved for JSON metadata header
-                   # Contains: magic, version, user_id, filename, timestamps, chunk info
-                   # ⚠️ WARNING: Header is stored in PLAINTEXT (protected by AAD)
-
-# Image Configuration  
-MAX_WIDTH = 8192   # Maximum image width in pixels
-                   # Larger values = fewer but larger images
-                   # Smaller values = more but smaller images
-
-# Encryption Configuration
-AESGCM_TAG_LEN = 16  # AES-GCM authentication tag length (128 bits)
-                      # DO NOT MODIFY - required by AES-GCM spec
-
-# Chunking Configuration
-DEFAULT_MAX_CHUNK_BYTES = 50 * 1024 * 1024  # 50 MB per image chunk
-                                             # Adjust based on your needs:
-                                             # - Smaller: More images, faster processing
-                                             # - Larger: Fewer images, more memory usage
-
-# Processing Configuration
-PIXEL_BYTES = 3            # RGB color model (3 bytes per pixel)
-EIGHT_HOURS_SECONDS = 8 * 3600  # Threshold for WAV auto-chunking decision
-
-# Security Markers
-SENTINEL = b'AIMGEND1'  # 8-byte end-of-data marker
-                        # Prevents accidental truncation of ciphertext
-                        # Stored UNENCRYPTED after ciphertext
-                        # ⚠️ Collision probability: ~1 in 2^64
-
-# Version Control
-SCRIPT_VERSION = "2.0.0"
-PROTOCOL_VERSION = 1
-MAGIC_HEADER = "AUDIO-IMG-V1"  # Magic string for file format identification
-
-# Validation Limits
-MAX_USER_ID_LENGTH = 255       # Maximum allowed user_id length
-MAX_FILENAME_LENGTH = 255      # Maximum allowed filename length
-MIN_MASTER_KEY_LENGTH = 64     # Minimum hex characters (32 bytes)
-MAX_MASTER_KEY_LENGTH = 64     # Maximum hex characters (32 bytes)
-DANGEROUS_CHARS = ['/', '\\', '..', '\x00', '<', '>', ':', '"', '|', '?', '*']
-
-# ===========================
-# CRYPTOGRAPHIC FUNCTIONS
-# ===========================
-
-def validate_master_key(master_hex: str) -> None:
-    """
-    Validate master key format and strength.
-    
-    Security Checks:
-    --------------
-    1. Length validation (must be exactly 64 hex characters = 32 bytes)
-    2. Hexadecimal format validation
-    3. Weak key detection (all zeros, repeating patterns)
-    
-    Args:
-        master_hex: Master encryption key in hexadecimal format
-        
-    Raises:
-        ValueError: If master key is invalid or weak
-        
-    Security Notes:
-    --------------
-    - Master key MUST be 256 bits (32 bytes) for AES-256
-    - Key should be cryptographically random
-    - Avoid patterns like "00000..." or "AAAAA..."
-    - Generate with: secrets.token_hex(32)
-    """
-    if not master_hex:
-        raise ValueError("Master key cannot be empty")
-    
-    # Length validation
-    if len(master_hex) != MIN_MASTER_KEY_LENGTH:
-        raise ValueError(
-            f"Master key must be exactly {MIN_MASTER_KEY_LENGTH} hexadecimal characters "
-            f"(got {len(master_hex)}). Generate with: python -c \"import secrets; print(secrets.token_hex(32))\""
-        )
-    
-    # Hexadecimal format validation
-    try:
-        key_bytes = binascii.unhexlify(master_hex)
-    except (binascii.Error, ValueError) as e:
-        raise ValueError(f"Master key must be valid hexadecimal: {e}")
-    
-    # Weak key detection
-    if key_bytes == b'\x00' * 32:
-        raise ValueError("⚠️ SECURITY WARNING: Master key is all zeros - this is insecure!")
-    
-    if len(set(key_bytes)) < 16:  # Less than 16 unique bytes suggests pattern
-        raise ValueError(
-            "⚠️ SECURITY WARNING: Master key appears to have repeating patterns. "
-            "Use cryptographically random key."
-        )
-
-
-def validate_user_id(user_id: str) -> str:
-    """
-    Validate and sanitize user_id to prevent security vulnerabilities.
-    
-    Security Checks:
-    --------------
-    1. Length validation
-    2. Path traversal prevention (no ../, ..\, etc.)
-    3. Null byte injection prevention
-    4. Special character filtering
-    
-    Args:
-        user_id: User identifier string
-        
-    Returns:
-        Sanitized user_id
-        
-    Raises:
-        ValueError: If user_id is invalid or contains dangerous characters
-        
-    Security Notes:
-    --------------
-    - user_id is used for key derivation AND stored in plaintext header
-    - Different user_ids produce different encryption keys
-    - Prevents path traversal: "../../../etc/passwd"
-    - Prevents null byte injection: "alice\x00admin"
-    """
-    if not user_id or not user_id.strip():
-        raise ValueError("user_id cannot be empty")
-    
-    # Length validation
-    if len(user_id) > MAX_USER_ID_LENGTH:
-        raise ValueError(f"user_id too long (max {MAX_USER_ID_LENGTH} characters)")
-    
-    # Check for dangerous characters
-    for char in DANGEROUS_CHARS:
-        if char in user_id:
-            raise ValueError(
-                f"user_id contains forbidden character: '{char}'. "
-                f"Forbidden characters: {DANGEROUS_CHARS}"
-            )
-    
-    # Check for control characters
-    if any(ord(c) < 32 for c in user_id):
-        raise ValueError("user_id contains control characters")
-    
-    return user_id.strip()
-
-
-def get_master_key(master_hex: Optional[str]) -> bytes:
-    """
-    Retrieve and validate master encryption key from parameter or environment.
-    
-    Priority:
-    --------
-    1. Provided master_hex parameter (command-line or API)
-    2. AICARRIER_MASTER_KEY_HEX environment variable
-    3. Error if neither available
-    
-    Args:
-        master_hex: Optional hexadecimal master key string
-        
-    Returns:
-        Master key as bytes (32 bytes for AES-256)
-        
-    Raises:
-        RuntimeError: If no master key available
-        ValueError: If master key format is invalid
-        
-    Security Notes:
-    --------------
-    - Environment variable preferred (not visible in process list)
-    - Command-line args visible in `ps` output (less secure)
-    - Consider using secrets management service in production
-    
-    Example:
-    -------
-    # Secure (environment variable):
-    export AICARRIER_MASTER_KEY_HEX=$(python -c "import secrets; print(secrets.token_hex(32))")
-    python script.py encode --user alice
-    
-    # Less secure (command-line):
-    python script.py encode --user alice --master DEADBEEF...
-    """
-    # Try provided parameter first
-    if master_hex:
-        validate_master_key(master_hex)
-        return binascii.unhexlify(master_hex)
-    
-    # Try environment variable
-    env_key = os.environ.get("AICARRIER_MASTER_KEY_HEX")
-    if env_key:
-        validate_master_key(env_key)
-        return binascii.unhexlify(env_key)
-    
-    # No key available
-    raise RuntimeError(
-        "❌ Master key required but not provided.\n\n"
-        "Options:\n"
-        "  1. Set environment variable:\n"
-        "     export AICARRIER_MASTER_KEY_HEX=$(python -c \"import secrets; print(secrets.token_hex(32))\")\n\n"
-        "  2. Pass via command-line (less secure):\n"
-        "     --master YOUR_64_HEX_CHAR_KEY\n\n"
-        "⚠️  WARNING: Each user MUST have a unique master key for security!"
-    )
-
-
-def derive_user_key(master_key: bytes, user_id: str) -> bytes:
-    """
-    Derive user-specific encryption key from master key and user ID using HKDF.
-    
-    Algorithm:
-    ---------
-    HKDF-SHA256(
-        IKM = master_key || user_id,  # Input Key Material
-        salt = None,                   # No salt (master_key provides randomness)
-        info = b"AUDIO-IMG-V1",        # Context/purpose identifier
-        length = 32                    # Output 256 bits for AES-256
-    )
-    
-    Args:
-        master_key: Master encryption key (32 bytes)
-        user_id: User identifier string
-        
-    Returns:
-        Derived user key (32 bytes)
-        
-    Security Properties:
-    ------------------
-    1. **Key Isolation**: Different user_ids → different keys
-       - User "alice" cannot decrypt files for user "bob"
-       - Even with same master_key
-       
-    2. **One-Way Function**: Cannot reverse to get master_key
-       - Knowing user_key + user_id does NOT reveal master_key
-       
-    3. **Deterministic**: Same inputs always produce same output
-       - Required for decryption
-       - user_id must match exactly (case-sensitive)
-       
-    4. **Collision Resistant**: Computationally infeasible to find:
-       - Two user_ids that produce same key
-       - A user_id that produces a specific target key
-    
-    Example:
-    -------
-    master = b"..." # 32 bytes
-    
-    # Alice's files
-    alice_key = derive_user_key(master, "alice")  # → Unique key
-    
-    # Bob's files  
-    bob_key = derive_user_key(master, "bob")      # → Different key
-    
-    # Alice can't decrypt Bob's files even with same master_key
-    
-    Security Notes:
-    --------------
-    - user_id is case-sensitive: "Alice" ≠ "alice"
-    - Changing info parameter breaks backward compatibility
-    - No salt used (master_key provides sufficient entropy)
-    - Uses SHA-256 as HMAC hash function (NIST approved)
-    
-    References:
-    ----------
-    - RFC 5869: HMAC-based Extract-and-Expand Key Derivation Function (HKDF)
-    - NIST SP 800-56C Rev. 2: Key Derivation Methods
-    """
-    # Validate user_id before key derivation
-    user_id = validate_user_id(user_id)
-    
-    # HKDF key derivation
-    hkdf = HKDF(
-        algorithm=hashes.SHA256(),
-        length=32,  # AES-256 requires 32 bytes
-        salt=None,  # No salt needed (master_key has entropy)
-        info=b"AUDIO-IMG-V1"  # Context binding
-    )
-    
-    # Derive key from master_key + user_id
-    input_key_material = master_key + user_id.encode("utf8")
-    derived_key = hkdf.derive(input_key_material)
-    
-    return derived_key
-
-
-def sha256_hex(b: bytes) -> str:
-    """
-    Compute SHA-256 hash of bytes and return as hexadecimal string.
-    
-    Args:
-        b: Input bytes to hash
-        
-    Returns:
-        SHA-256 hash as 64-character hexadecimal string
-        
-    Security Notes:
-    --------------
-    - Used for data integrity verification (not encryption)
-    - Collision resistance: ~2^256 (computationally infeasible)
-    - Pre-image resistance: Cannot reverse hash to get original data
-    - Deterministic: Same input always produces same hash
-    
-    Example:
-    -------
-    >>> sha256_hex(b"Hello, World!")
-    'dffd6021bb2bd5b0af676290809ec3a53191dd81c7f70a4b28688a362182986f'
-    """
-    return hashlib.sha256(b).hexdigest()
-
-# -------------------- IO & packing helpers --------------------
-def ceil_div(a:int,b:int)->int:
-    return -(-a//b)
-
-
-def bytes_to_image_pixels(payload: bytes, max_width: int = MAX_WIDTH) -> Tuple[np.ndarray,int,int]:
-    """
-    Pack payload bytes into RGB image pixels (3 bytes per pixel).
-    Returns (arr, width, height) where arr is HxWx3 uint8 numpy array.
-    """
-    total_bytes = len(payload)
-    pixels_needed = ceil_div(total_bytes, PIXEL_BYTES)
-    width = int(min(max_width, math.ceil(math.sqrt(pixels_needed))))
-    height = int(ceil_div(pixels_needed, width))
-    arr = np.zeros((height, width, 3), dtype=np.uint8)
-    # fill sequentially
-    idx = 0
-    for y in range(height):
-        for x in range(width):
-            if idx < total_bytes:
-                b0 = payload[idx]; idx += 1
-            else:
-                b0 = 0
-            if idx < total_bytes:
-                b1 = payload[idx]; idx += 1
-            else:
-                b1 = 0
-            if idx < total_bytes:
-                b2 = payload[idx]; idx += 1
-            else:
-                b2 = 0
-            arr[y,x,0] = b0
-            arr[y,x,1] = b1
-            arr[y,x,2] = b2
-    return arr, width, height
-
-
-def image_pixels_to_bytes(img_path: Path, expected_payload_len: Optional[int]=None) -> bytes:
-    """
-    Read an RGB image and convert the pixel bytes back to a bytes buffer (row-major R,G,B).
-    If expected_payload_len is provided, slice exactly that many bytes from the flattened pixel stream.
-    """
-    img = Image.open(img_path).convert("RGB")
-    arr = np.asarray(img, dtype=np.uint8)
-    flat = arr.reshape(-1,3).astype(np.uint8).flatten().tobytes()
-    if expected_payload_len is not None:
-        if len(flat) < expected_payload_len:
-            raise RuntimeError(f"Image payload too small: need {expected_payload_len} bytes, got {len(flat)}")
-        return flat[:expected_payload_len]
-    return flat
-
-# -------------------- Duration helper (WAV only) --------------------
-def get_wav_duration_seconds(path: Path) -> Optional[float]:
-    try:
-        with wave.open(str(path), 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            return frames / float(rate)
-    except Exception:
-        return None
-
-# ===========================
-# ENCODING FUNCTIONS
-# ===========================
-
-def build_payload_for_chunk(
-    chunk_bytes: bytes,
-    master_hex: Optional[str],
-    user_id: str,
-    orig_filename: str,
-    chunk_index: int,
-    total_chunks: int,
-    compress: bool = True
-) -> Tuple[bytes, dict]:
-    """
-    Build encrypted payload for a single audio chunk.
-    
-    Payload Structure:
-    -----------------
-    [0:4]           → Header length (4 bytes, little-endian)
-    [4:HEADER_LEN]  → JSON metadata header (plaintext, AAD-protected)
-    [HEADER_LEN:]   → Encrypted section:
-                      [0:12]      → Nonce (12 bytes, random)
-                      [12:-8]     → Ciphertext + auth tag (variable)
-                      [-8:]       → Sentinel marker (8 bytes)
-    
-    Encryption Process:
-    ------------------
-    1. Validate inputs (user_id, master_key, filename)
-    2. Derive user-specific key: HKDF(master_key || user_id)
-    3. Optional: Compress chunk with zstd (level 3)
-    4. Generate cryptographically secure 12-byte nonce
-    5. Build JSON metadata header
-    6. Encrypt: AES-256-GCM(key, nonce, data, AAD=header)
-    7. Assemble payload: header + nonce + ciphertext + sentinel
-    
-    Args:
-        chunk_bytes: Raw audio data for this chunk
-        master_hex: Master encryption key (64 hex chars) or None for env var
-        user_id: User identifier for key derivation
-        orig_filename: Original audio filename (stored in metadata)
-        chunk_index: Zero-based index of this chunk
-        total_chunks: Total number of chunks in the file
-        compress: Enable zstd compression (recommended)
-        
-    Returns:
-        Tuple of:
-        - payload_bytes: Complete encrypted payload ready for image embedding
-        - metadata: Dictionary with chunk statistics
-        
-    Raises:
-        ValueError: If inputs are invalid
-        RuntimeError: If encryption fails
-        
-    Security Guarantees:
-    -------------------
-    1. **Confidentiality**: Audio data encrypted with AES-256-GCM
-    2. **Integrity**: Authentication tag prevents tampering
-    3. **Authenticity**: AAD binding prevents header replacement attacks
-    4. **Freshness**: Unique random nonce per encryption
-    
-    Metadata Header (Plaintext):
-    ---------------------------
-    {
-        "magic": "AUDIO-IMG-V1",        // Format identifier
-        "version": 1,                    // Protocol version
-        "user_id": "alice",              // ⚠️ VISIBLE - used for key derivation
-        "orig_filename": "audio.wav",    // ⚠️ VISIBLE - original filename
-        "orig_chunk_index": 0,           // Chunk sequence number
-        "orig_total_chunks": 3,          // Total chunks for reassembly
-        "orig_chunk_size": 52428800,     // Original chunk size (bytes)
-        "compressed": true,              // Compression flag
-        "sha256": "abc123...",           // SHA-256 of plaintext chunk
-        "ts": 1700000000                 // Unix timestamp
-    }
-    
-    ⚠️ SECURITY WARNING:
-    Header is stored in PLAINTEXT (not encrypted). However:
-    - Header is protected by AES-GCM's AAD mechanism
-    - Any modification to header causes decryption to fail
-    - Do NOT include sensitive data in filename or user_id
-    
-    Compression Benefits:
-    --------------------
-    - Typical reduction: 30-60% for audio files
-    - zstd level 3: Good balance of speed/ratio
-    - Only applied if compressed size < original size
-    - Decompression is automatic on decode
-    
-    Example:
-    -------
-    >>> chunk = Path("audio.wav").read_bytes()[:50000000]
-    >>> payload, meta = build_payload_for_chunk(
-    ...     chunk_bytes=chunk,
-    ...     master_hex="DEADBEEF" * 8,
-    ...     user_id="alice",
-    ...     orig_filename="audio.wav",
-    ...     chunk_index=0,
-    ...     total_chunks=1,
-    ...     compress=True
-    ... )
-    >>> print(f"Payload size: {len(payload)} bytes")
-    >>> print(f"Compressed: {meta['compressed']}")
-    """
-    # ============================================
-    # STEP 1: Input Validation
-    # ============================================
-    
-    if not chunk_bytes:
-        raise ValueError("chunk_bytes cannot be empty")
-    
-    if len(chunk_bytes) > DEFAULT_MAX_CHUNK_BYTES * 10:  # 10x safety limit
-        raise ValueError(f"Chunk too large: {len(chunk_bytes)} bytes")
-    
-    if chunk_index < 0:
-        raise ValueError("chunk_index must be >= 0")
-    
-    if total_chunks < 1:
-        raise ValueError("total_chunks must be >= 1")
-    
-    if chunk_index >= total_chunks:
-        raise ValueError(f"chunk_index {chunk_index} >= total_chunks {total_chunks}")
-    
-    # Sanitize filename
-    if len(orig_filename) > MAX_FILENAME_LENGTH:
-        raise ValueError(f"Filename too long (max {MAX_FILENAME_LENGTH} characters)")
-    
-    for char in DANGEROUS_CHARS:
-        if char in orig_filename:
-            raise ValueError(f"Filename contains forbidden character: '{char}'")
-    
-    # ============================================
-    # STEP 2: Key Derivation
-    # ============================================
-    
-    master = get_master_key(master_hex)  # Validates and retrieves master key
-    user_key = derive_user_key(master, user_id)  # Validates user_id, derives key
-    aesgcm = AESGCM(user_key)  # Initialize AES-GCM cipher
-    
-    # ============================================
-    # STEP 3: Generate Cryptographically Secure Nonce
-    # ============================================
-    
-    # CRITICAL: Nonce MUST be unique for each encryption with same key
-    # Using os.urandom() which uses /dev/urandom or CryptGenRandom
-    # 12 bytes = 96 bits is standard for GCM mode
-    nonce = os.urandom(12)
-    
-    # ============================================
-    # STEP 4: Build Metadata Header
-    # ============================================
-    
-    header = {
-        "magic": MAGIC_HEADER,
-        "version": PROTOCOL_VERSION,
-        "user_id": user_id,
-        "orig_filename": orig_filename,
-        "orig_chunk_index": chunk_index,
-        "orig_total_chunks": total_chunks,
-        "orig_chunk_size": len(chunk_bytes),
-        "ts": int(time.time()),
-    }
-    
-    # ============================================
-    # STEP 5: Optional Compression
-    # ============================================
-    
-    compressed_flag = False
-    payload_plain = chunk_bytes
-    
-    if compress and HAVE_ZSTD:
-        try:
-            cctx = zstd.ZstdCompressor(level=3)  # Level 3: fast with good ratio
-            compressed = cctx.compress(chunk_bytes)
-            
-            # Only use compressed version if it's actually smaller
-            if len(compressed) < len(chunk_bytes):
-                payload_plain = compressed
-                compressed_flag = True
-                compression_ratio = len(compressed) / len(chunk_bytes)
-                print(f"    [Compression] {len(chunk_bytes)} → {len(compressed)} bytes "
-                      f"({compression_ratio:.1%})")
-        except Exception as e:
-            print(f"    [Warning] Compression failed: {e}, using uncompressed")
-    
-    header["compressed"] = bool(compressed_flag)
-    
-    # ============================================
-    # STEP 6: Compute SHA-256 for Integrity
-    # ============================================
-    
-    # Hash of ORIGINAL chunk (before compression)
-    # Used for verification on decryption
-    header["sha256"] = sha256_hex(chunk_bytes)
-    
-    # ============================================
-    # STEP 7: Serialize Header to JSON
-    # ============================================
-    
-    # Compact JSON (no whitespace) for smaller size
-    header_json = json.dumps(
-        header,
-        separators=(",", ":"),  # No spaces
-        sort_keys=True          # Deterministic ordering
-    ).encode("utf8")
-    
-    if len(header_json) > HEADER_LEN - 4:
-        raise ValueError(
-            f"Header JSON too large: {len(header_json)} bytes "
-            f"(max {HEADER_LEN - 4})"
-        )
-    
-    # ============================================
-    # STEP 8: AES-GCM Encryption with AAD
-    # ============================================
-    
-    # CRITICAL: header_json is used as Additional Authenticated Data (AAD)
-    # This binds the header to the ciphertext
-    # Any modification to header → authentication tag verification fails
-    # This prevents "metadata replacement attacks"
-    ciphertext = aesgcm.encrypt(
-        nonce=nonce,
-        data=payload_plain,
-        associated_data=header_json  # ← AAD protection
-    )
-    
-    # ciphertext includes 16-byte authentication tag at the end
-    
-    # ============================================
-    # STEP 9: Assemble Final Payload
-    # ============================================
-    
-    payload = bytearray()
-    
-    # [0:4] Header length (4 bytes, little-endian)
-    payload.extend(len(header_json).to_bytes(4, "little"))
-    
-    # [4:HEADER_LEN] Header JSON (padded with zeros)
-    payload.extend(header_json)
-    if len(payload) < HEADER_LEN:
-        payload.extend(b'\x00' * (HEADER_LEN - len(payload)))
-    
-    # [HEADER_LEN:HEADER_LEN+12] Nonce (12 bytes)
-    payload.extend(nonce)
-    
-    # [HEADER_LEN+12:...] Ciphertext + auth tag
-    payload.extend(ciphertext)
-    
-    # [...:-8] Sentinel marker (8 bytes)
-    # Helps identify end of ciphertext reliably
-    payload.extend(SENTINEL)
-    
-    # ============================================
-    # STEP 10: Return Payload and Metadata
-    # ============================================
-    
-    metadata = {
-        "chunk_index": chunk_index,
-        "total_chunks": total_chunks,
-        "header_json_len": len(header_json),
-        "payload_len": len(payload),
-        "sha256": header["sha256"],
-        "compressed": compressed_flag,
-        "original_size": len(chunk_bytes),
-        "encrypted_size": len(ciphertext),
-        "compression_ratio": len(payload_plain) / len(chunk_bytes) if compressed_flag else 1.0
-    }
-    
-    return bytes(payload), metadata
-
-
-def encode_streamed(input_file: Path, out_dir: Path, user_id: str,
-                    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES,
-                    master_hex: Optional[str]=None, compress: bool=True):
-    """
-    Stream input_file, split into raw chunks (max_chunk_bytes), and for each chunk:
-      - optionally compress,
-      - encrypt,
-      - pack into image and save as PNG.
-    Output filenames: {basename}_part{index:04d}_of_{total:04d}.png
-    Returns list of generated image paths.
-    """
-    out_dir.mkdir(parents=True, exist_ok=True)
-    file_size = input_file.stat().st_size
-
-    # Try to detect duration for WAV files and avoid chunking if under 8 hours
-    duration = get_wav_duration_seconds(input_file) if input_file.suffix.lower() == ".wav" else None
-    if duration is not None:
-        print(f"[+] Detected WAV duration: {duration:.1f}s")
-        if duration < EIGHT_HOURS_SECONDS:
-            print("[+] Duration < 8 hours: encoding as single chunk (no split)")
-            total_chunks = 1
-            chunks = [input_file.read_bytes()]
-        else:
-            total_chunks = ceil_div(file_size, max_chunk_bytes)
-            chunks = None
-    else:
-        total_chunks = ceil_div(file_size, max_chunk_bytes)
-        chunks = None
-
-    base = input_file.stem
-    generated = []
-
-    if chunks is not None:
-        # already loaded single chunk
-        for idx, chunk in enumerate(chunks):
-            payload, meta = build_payload_for_chunk(chunk, master_hex, user_id, input_file.name, idx, total_chunks, compress=compress)
-            arr, w, h = bytes_to_image_pixels(payload, max_width=MAX_WIDTH)
-            img = Image.fromarray(arr, mode="RGB")
-            out_name = out_dir / f"{base}_part{idx+1:04d}_of_{total_chunks:04d}.png"
-            img.save(out_name, format="PNG", compress_level=9)
-            print(f"    -> wrote image: {out_name}  (payload {len(payload)} bytes, image {w}x{h})")
-            generated.append(out_name)
-    else:
-        with input_file.open("rb") as f:
-            for idx in range(total_chunks):
-                print(f"[+] Reading chunk {idx+1}/{total_chunks} ...")
-                chunk = f.read(max_chunk_bytes)
-                payload, meta = build_payload_for_chunk(chunk, master_hex, user_id, input_file.name, idx, total_chunks, compress=compress)
-                # pack into pixels
-                arr, w, h = bytes_to_image_pixels(payload, max_width=MAX_WIDTH)
-                img = Image.fromarray(arr, mode="RGB")
-                out_name = out_dir / f"{base}_part{idx+1:04d}_of_{total_chunks:04d}.png"
-                img.save(out_name, format="PNG", compress_level=9)
-                print(f"    -> wrote image: {out_name}  (payload {len(payload)} bytes, image {w}x{h})")
-                generated.append(out_name)
-    print(f"[+] Done. Generated {len(generated)} images in {out_dir}")
-    return generated
-
-# ===========================
-# DECODING FUNCTIONS
-# ===========================
-
-def decode_images_to_file(indir: Path, out_file: Path, user_id: str, master_hex: Optional[str]=None):
-    """
-    Find all image files in indir that match pattern *_partXXXX_of_YYYY.png,
-    sort by part index, extract payload bytes, decrypt each chunk and write to out_file in order.
-    """
-    # find png/tiff files
-    imgs = sorted([p for p in Path(indir).iterdir() if p.suffix.lower() in (".png",".tiff",".tif")])
-    if not imgs:
-        raise RuntimeError("No PNG/TIFF images found in input directory")
-
-    parts = []
-    for p in imgs:
-        try:
-            flat = image_pixels_to_bytes(p, expected_payload_len=None)
-            if len(flat) < HEADER_LEN:
-                print(f"[!] skipping {p} (payload too small)")
-                continue
-            hdr_len = int.from_bytes(flat[0:4], "little")
-            if hdr_len <=0 or hdr_len > HEADER_LEN:
-                print(f"[!] skipping {p} (invalid header length {hdr_len})")
-                continue
-            header_json = flat[4:4+hdr_len]
-            header = json.loads(header_json.decode('utf8'))
-            if header.get("magic") != "AUDIO-IMG-V1":
-                continue
-            parts.append((p, header, flat))
-        except Exception as e:
-            print(f"[!] warning: could not parse {p}: {e}")
-            continue
-
-    if not parts:
-        raise RuntimeError("No valid audio-image files found in directory")
-
-    # Sort parts by chunk index
-    parts_sorted = sorted(parts, key=lambda x: x[1]["orig_chunk_index"]) if parts else []
-    total_expected = parts_sorted[0][1]["orig_total_chunks"]
-    if len(parts_sorted) != total_expected:
-        print(f"[!] Warning: found {len(parts_sorted)} chunks but header says total {total_expected}. Will proceed if indexes cover 0..total-1")
-
-    out_file = Path(out_file)
-    with out_file.open("wb") as outf:
-        for (p, header, flat) in parts_sorted:
-            print(f"[+] Decoding chunk {header['orig_chunk_index']+1}/{header['orig_total_chunks']} from {p.name}")
-            rem = flat[HEADER_LEN:]
-            if len(rem) < 12:
-                raise RuntimeError(f"Insufficient payload after header in {p}")
-            nonce = rem[0:12]
-            # try to find sentinel to determine ciphertext boundary
-            sentinel_idx = rem.find(SENTINEL)
-            if sentinel_idx != -1:
-                ciphertext = rem[12:sentinel_idx]
-            else:
-                # fallback: trim trailing zeros conservatively
-                last_nonzero = len(rem) - 1
-                while last_nonzero >= 12 and rem[last_nonzero] == 0:
-                    last_nonzero -= 1
-                ciphertext = rem[12:last_nonzero+1] if last_nonzero >= 12 else rem[12:]
-
-            master = get_master_key(master_hex)
-            user_key = derive_user_key(master, user_id)
-            aesgcm = AESGCM(user_key)
-            header_json = flat[4:4 + int.from_bytes(flat[0:4],"little")]
-            try:
-                plaintext = aesgcm.decrypt(nonce, bytes(ciphertext), header_json)
-            except Exception as e:
-                raise RuntimeError(f"Decryption failed for chunk {header['orig_chunk_index']}: {e}")
-            if header.get("compressed", False):
-                if not HAVE_ZSTD:
-                    raise RuntimeError("Chunk is compressed but python zstandard not available for decompression")
-                dctx = zstd.ZstdDecompressor()
-                plaintext = dctx.decompress(plaintext)
-            # verify sha
-            if sha256_hex(plaintext) != header.get("sha256"):
-                raise RuntimeError(f"SHA mismatch for chunk {header['orig_chunk_index']}")
-            # write
-            outf.write(plaintext)
-            print(f"    wrote {len(plaintext)} bytes")
-    print(f"[+] Reconstructed audio to {out_file} (size {out_file.stat().st_size} bytes)")
-
-# -------------------- CLI --------------------
-def build_cli():
-    p = argparse.ArgumentParser(prog="audio_image_chunked")
-    sub = p.add_subparsers(dest="cmd", required=True)
-
-    enc = sub.add_parser("encode")
-    enc.add_argument("--input","-i", required=True, help="Input audio file")
-    enc.add_argument("--outdir","-o", required=True, help="Output directory for images")
-    enc.add_argument("--user","-u", required=True, help="User id (binds key)")
-    enc.add_argument("--max-chunk-bytes", type=int, default=DEFAULT_MAX_CHUNK_BYTES, help="Max raw audio bytes per image (default 50MB)")
-    enc.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
-    enc.add_argument("--no-compress", action="store_true", help="Disable zstd compression for chunks")
-    enc.add_argument("--delete", action="store_true", help="Delete source audio after successful encode")
-
-    dec = sub.add_parser("decode")
-    dec.add_argument("--indir","-i", required=True, help="Input directory containing images produced by encode")
-    dec.add_argument("--out","-o", required=True, help="Recovered output audio file")
-    dec.add_argument("--user","-u", required=True, help="User id used for encryption")
-    dec.add_argument("--master","-m", required=False, help="Master key hex (optional; prefer env var)")
-
-    return p
-
-
-def main(argv=None):
-    p = build_cli()
-    args = p.parse_args(argv)
-
-    if args.cmd == "encode":
-        in_file = Path(args.input)
-        out_dir = Path(args.outdir)
-        compress = not bool(args.no_compress)
-        images = encode_streamed(in_file, out_dir, args.user, max_chunk_bytes=args.max_chunk_bytes, master_hex=args.master, compress=compress)
-        if args.delete:
-            try:
-                in_file.unlink()
-                print("[*] Deleted source file.")
-            except Exception as e:
-                print("[!] Could not delete source:", e)
 
-    elif args.cmd == "decode":
-        decode_images_to_file(Path(args.indir), Path(args.out), args.user, master_hex=args.master)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-    else:
-        p.print_help()
+from aicarrier_codec.codec import *  # noqa: E402,F401,F403
+from aicarrier_codec.codec import main  # noqa: E402
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -24,4 +24,14 @@ def test_image_file(tmp_path_factory):
     image_file_path = temp_dir / "test_image.png"
     with open(image_file_path, "wb") as f:
         f.write(b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)  # Placeholder for a PNG file header
-    return image_file_path
\ No newline at end of file
+    return image_file_path
+
+@pytest.fixture
+def storage_dirs(tmp_path, monkeypatch):
+    # Point the API's upload/temp storage at a per-test directory
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "temp_dir", str(tmp_path / "temp"))
+    monkeypatch.setattr(settings, "chunk_store_dir", str(tmp_path / "chunks"))
+    monkeypatch.setattr(settings, "jobs_dir", str(tmp_path / "jobs"))
+    return tmp_path
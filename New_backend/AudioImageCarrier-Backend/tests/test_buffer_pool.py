@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+MB = 1024 * 1024
+
+
+def test_pool_reuses_size_classes_and_caps():
+    pool = audio_module.BufferPool(max_pooled_bytes=2 * MB, max_per_class=1, min_pooled_bytes=64 * 1024)
+    a = pool.acquire(700_000)
+    assert len(a) == MB
+    pool.release(a)
+    assert pool.acquire(900_000) is a  # same size class -> reused
+    b = pool.acquire(MB)
+    pool.release(a)
+    pool.release(b)  # over max_per_class -> dropped
+    pool.release(bytearray(MB))  # never handed out -> ignored
+    stats = pool.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["dropped"] == 1
+    assert stats["pooled_bytes"] == MB and stats["outstanding_bytes"] == 0
+
+    small = pool.acquire(100)
+    assert len(small) == 100 and pool.stats()["unpooled"] == 1
+    assert pool.trim() == MB
+    assert pool.stats()["pooled_buffers"] == 0
+
+
+def test_save_payload_image_round_trips_pooled_and_plain(tmp_path):
+    pool = audio_module.BufferPool(min_pooled_bytes=1024)
+    data = os.urandom(10_000)
+    buf = pool.acquire(len(data))
+    view = memoryview(buf)[:len(data)]
+    view[:] = data
+    buf[len(data):] = b"\xff" * (len(buf) - len(data))  # stale contents must not leak into the image
+    audio_module.save_payload_image(view, tmp_path / "pooled.png", pool=pool)
+    audio_module.save_payload_image(data, tmp_path / "plain.png")
+    pooled = audio_module.image_pixels_to_bytes(tmp_path / "pooled.png")
+    assert pooled == audio_module.image_pixels_to_bytes(tmp_path / "plain.png")
+    assert pooled[:len(data)] == data and not pooled[len(data):].strip(b"\x00")
+    assert pool.stats()["outstanding_bytes"] == 0
+
+
+def test_encode_reuses_buffers_across_chunks(tmp_path, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(600_000))
+    pool = audio_module.BufferPool(min_pooled_bytes=64 * 1024)
+    images = audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=100_000,
+                                          master_hex=master_key, pool=pool, pipeline_depth=0)
+    assert len(images) == 6
+    stats = pool.stats()
+    assert stats["hits"] >= 5 and stats["outstanding_bytes"] == 0
+
+    out = tmp_path / "restored.m4a"
+    audio_module.decode_images_to_file(tmp_path / "out", out, user_id, master_hex=master_key)
+    assert out.read_bytes() == audio.read_bytes()
+
+
+def test_failed_encode_returns_discarded_payloads(monkeypatch, master_key, user_id):
+    pool = audio_module.BufferPool(min_pooled_bytes=1024)
+    packed = []
+    fromarray = audio_module.Image.fromarray
+
+    def failing_fromarray(*args, **kwargs):
+        if packed:
+            raise RuntimeError("disk full")
+        packed.append(1)
+        return fromarray(*args, **kwargs)
+
+    monkeypatch.setattr(audio_module.Image, "fromarray", failing_fromarray)
+    images = audio_module.iter_encode_bytes(os.urandom(200_000), "take.m4a", user_id, max_chunk_bytes=10_000,
+                                            master_hex=master_key, pool=pool, pipeline_depth=4)
+    with pytest.raises(RuntimeError, match="disk full"):
+        list(images)
+    assert pool.stats()["outstanding_bytes"] == 0  # sealed payloads that were never packed went back
@@ -0,0 +1,107 @@
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.routes import bundle as bundle_routes
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import get_worker_pool
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def clips(tmp_path):
+    paths = []
+    for i in range(1, 4):
+        path = tmp_path / f"clip{i}.m4a"
+        path.write_bytes(os.urandom(1000 * i))
+        paths.append(path)
+    return paths
+
+
+def test_bundle_roundtrip(tmp_path, clips, master_key, user_id):
+    out_dir = tmp_path / "out"
+    images = audio_module.encode_bundle(clips, out_dir, user_id, max_bundle_bytes=3500, master_hex=master_key)
+    assert len(images) == 2
+
+    listing = audio_module.list_bundle_members(out_dir, user_id, master_key)
+    assert [m["name"] for m in listing] == ["clip1.m4a", "clip2.m4a", "clip3.m4a"]
+
+    written = audio_module.extract_bundle_members(out_dir, tmp_path / "ex", user_id, master_key)
+    for clip, out in zip(clips, written):
+        assert out.read_bytes() == clip.read_bytes()
+
+
+def test_single_member_does_not_touch_others(clips, master_key, user_id):
+    members = [(c.name, c.read_bytes()) for c in clips]
+    payload, _ = audio_module.build_bundle_payload(members, master_key, user_id, "bundle")
+    header, entries, start = audio_module.read_bundle_toc(payload, user_id, master_key)
+
+    # Corrupt the first member's ciphertext; the second must still decrypt
+    corrupted = bytearray(payload)
+    corrupted[start + entries[0]["offset"] + 20] ^= 0xFF
+    corrupted = bytes(corrupted)
+
+    assert audio_module.decrypt_bundle_member(corrupted, header, entries[1], start, user_id, master_key) == members[1][1]
+    with pytest.raises(RuntimeError):
+        audio_module.decrypt_bundle_member(corrupted, header, entries[0], start, user_id, master_key)
+
+
+def test_bundle_images_ignored_by_single_decoder(tmp_path, clips, master_key, user_id):
+    out_dir = tmp_path / "out"
+    audio_module.encode_bundle(clips, out_dir, user_id, master_hex=master_key)
+    with pytest.raises(RuntimeError):
+        audio_module.decode_images_to_file(out_dir, tmp_path / "x.wav", user_id, master_hex=master_key)
+
+
+def test_bundle_api_roundtrip(storage_dirs, monkeypatch, clips, master_key, user_id):
+    copied_on_loop = []
+    save_upload = bundle_routes.save_upload
+
+    def recording_save(src, dest):
+        try:
+            asyncio.get_running_loop()
+            copied_on_loop.append(dest.name)
+        except RuntimeError:
+            pass
+        return save_upload(src, dest)
+
+    monkeypatch.setattr(bundle_routes, "save_upload", recording_save)
+    headers = {"X-API-Key": settings.api_key}
+    jobs = get_worker_pool().stats()["jobs"]
+    response = client.post(
+        "/api/v1/bundle",
+        headers=headers,
+        files=[("files", (c.name, c.read_bytes(), "audio/mp4")) for c in clips],
+        data={"user_id": user_id, "master_key": master_key},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Total-Members"] == "3"
+    assert zipfile.ZipFile(io.BytesIO(response.content)).namelist() == ["bundle_bundle0001_of_0001.png"]
+    bundle = response.content
+
+    response = client.post(
+        "/api/v1/bundle/extract",
+        headers=headers,
+        files={"images": ("bundle.zip", bundle, "application/zip")},
+        data={"member": "clip2.m4a", "user_id": user_id, "master_key": master_key},
+    )
+    assert response.status_code == 200
+    assert response.content == clips[1].read_bytes()
+    assert get_worker_pool().stats()["jobs"] == jobs + 2  # both ran in the worker pool
+    assert not list((storage_dirs / "temp").glob("extract_*"))  # read from the ZIP, not unpacked
+    assert not copied_on_loop  # uploads are copied on a worker thread, not the event loop
+
+    response = client.post(
+        "/api/v1/bundle/extract",
+        headers=headers,
+        files={"images": ("bundle.zip", bundle, "application/zip")},
+        data={"member": "clip9.m4a", "user_id": user_id, "master_key": master_key},
+    )
+    assert response.status_code == 404 and response.json()["detail"] == "Bundle member not found: clip9.m4a"
@@ -0,0 +1,61 @@
+import os
+import threading
+import wave
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+def test_mapped_chunks_are_views_of_the_file(tmp_path):
+    data = os.urandom(250_000)
+    path = tmp_path / "take.m4a"
+    path.write_bytes(data)
+    with audio_module.ChunkReader(path) as reader:
+        assert reader.mapped
+        chunks = [(type(c), bytes(c)) for c in reader.chunks(100_000)]
+        tail = [bytes(c) for c in reader.chunks(100_000, start=180_000)]
+    assert all(t is memoryview for t, _ in chunks)
+    assert [c for _, c in chunks] == [data[:100_000], data[100_000:200_000], data[200_000:]]
+    assert tail == [data[180_000:]]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_pipe_falls_back_to_buffered_reads(tmp_path):
+    data = os.urandom(150_000)
+    fifo = tmp_path / "live.fifo"
+    os.mkfifo(fifo)
+
+    def feed():
+        with open(fifo, "wb") as f:
+            for i in range(0, len(data), 7_000):  # short writes -> short reads
+                f.write(data[i:i + 7_000])
+                f.flush()
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    pool = audio_module.BufferPool(min_pooled_bytes=1024)
+    with audio_module.ChunkReader(fifo, pool=pool) as reader:
+        assert not reader.mapped
+        sizes, received = [], b""
+        for chunk in reader.chunks(64_000):
+            sizes.append(len(chunk))
+            received += bytes(chunk)
+    writer.join()
+    assert received == data and sizes == [64_000, 64_000, 22_000]
+    assert pool.stats()["outstanding_bytes"] == 0
+
+
+def test_single_chunk_wav_encodes_from_the_map(tmp_path, master_key, user_id):
+    wav_path = tmp_path / "short.wav"
+    with wave.open(str(wav_path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(os.urandom(80_000))
+    images = audio_module.encode_streamed(wav_path, tmp_path / "out", user_id, max_chunk_bytes=10_000,
+                                          master_hex=master_key)
+    assert len(images) == 1
+    out = tmp_path / "restored.wav"
+    audio_module.decode_images_to_file(tmp_path / "out", out, user_id, master_hex=master_key)
+    assert out.read_bytes() == wav_path.read_bytes()
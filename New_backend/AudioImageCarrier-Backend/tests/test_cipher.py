@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+@pytest.fixture
+def restore_cipher():
+    previous = audio_module.select_cipher(None)
+    yield
+    audio_module.select_cipher(previous)
+
+
+def test_chacha20_roundtrip_follows_header(tmp_path, master_key, user_id, restore_cipher):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(30_000))
+
+    audio_module.select_cipher("chacha20-poly1305")
+    images = audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=20_000, master_hex=master_key)
+    assert audio_module.read_image_header(images[0])["cipher"] == "chacha20-poly1305"
+
+    # Decode does not depend on the currently selected cipher
+    audio_module.select_cipher("aes-256-gcm")
+    out = tmp_path / "out.m4a"
+    audio_module.decode_images_to_file(tmp_path / "out", out, user_id, master_hex=master_key)
+    assert out.read_bytes() == audio.read_bytes()
+
+
+def test_bundle_with_chacha20(tmp_path, master_key, user_id, restore_cipher):
+    clip = tmp_path / "clip.m4a"
+    clip.write_bytes(os.urandom(2000))
+    audio_module.select_cipher("chacha20-poly1305")
+    audio_module.encode_bundle([clip], tmp_path / "b", user_id, master_hex=master_key)
+    audio_module.select_cipher("aes-256-gcm")
+    out = audio_module.extract_bundle_member(tmp_path / "b", "clip.m4a", tmp_path / "x.m4a", user_id, master_key)
+    assert out.read_bytes() == clip.read_bytes()
+
+
+def test_headers_without_cipher_are_aes_gcm(master_key, user_id):
+    aead = audio_module.UserCipher(audio_module.derive_user_key(bytes.fromhex(master_key), user_id), "aes-256-gcm")
+    nonce = os.urandom(12)
+    ciphertext = aead.encrypt(nonce, b"audio", b"aad")
+    assert aead.decrypt(nonce, ciphertext, b"aad", cipher=None) == b"audio"
+    with pytest.raises(Exception):
+        aead.decrypt(nonce, ciphertext, b"aad", cipher="chacha20-poly1305")
+
+
+def test_auto_selection_picks_fastest(restore_cipher, monkeypatch):
+    monkeypatch.setattr(audio_module, "benchmark_ciphers",
+                        lambda: {"aes-256-gcm": 100.0, "chacha20-poly1305": 900.0})
+    assert audio_module.select_cipher("auto") == "chacha20-poly1305"
+    with pytest.raises(ValueError):
+        audio_module.select_cipher("des")
@@ -0,0 +1,121 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import get_worker_pool
+from app.utils.parts_feed import PartsFeed, read_parts
+
+client = TestClient(app)
+
+
+def _zip(members, compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_zip_members_are_decoded_without_extracting(tmp_path, master_key, user_id):
+    audio = os.urandom(150_000)
+    images = audio_module.encode_bytes(audio, "take.m4a", user_id, max_chunk_bytes=40_000, master_hex=master_key)
+    for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        archive = tmp_path / "take.zip"
+        archive.write_bytes(_zip([img[:2] for img in reversed(images)], compression))
+        out = io.BytesIO()
+        result = audio_module.decode_zip(archive, out, user_id, master_hex=master_key)
+        assert out.getvalue() == audio
+        assert result["kind"] == "file" and result["total_chunks"] == 4 and result["header"]["orig_filename"] == "take.m4a"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["take.zip"]
+
+    (tmp_path / "evil.zip").write_bytes(_zip([("../x.png", images[0][1])]))
+    with pytest.raises(ValueError, match="Unsafe"):
+        audio_module.decode_zip(tmp_path / "evil.zip", io.BytesIO(), user_id, master_hex=master_key)
+
+
+def test_cdc_zip_reads_shared_chunks_from_the_store(tmp_path, master_key, user_id):
+    audio_file = tmp_path / "take.m4a"
+    audio_file.write_bytes(os.urandom(150_000))
+    store = tmp_path / "store"
+    audio_module.encode_cdc(audio_file, tmp_path / "a", user_id, store, master_hex=master_key, avg_chunk_bytes=16_384)
+    again = audio_module.encode_cdc(audio_file, tmp_path / "b", user_id, store, master_hex=master_key,
+                                    avg_chunk_bytes=16_384)
+    archive = tmp_path / "b.zip"
+    pngs = sorted((tmp_path / "b").glob("*.png"))
+    kept = [again["manifest"], pngs[0]]  # the other chunks come from the store
+    archive.write_bytes(_zip([(p.name, p.read_bytes()) for p in kept]))
+    out = tmp_path / "restored.m4a"
+    result = audio_module.decode_zip(archive, out, user_id, master_hex=master_key, store_dir=store)
+    assert out.read_bytes() == audio_file.read_bytes()
+    assert result["kind"] == "cdc" and result["total_chunks"] == again["total_chunks"] > 1
+
+    with pytest.raises(RuntimeError, match="Missing chunk"):
+        audio_module.decode_zip(archive, io.BytesIO(), user_id, master_hex=master_key)
+
+
+def test_parts_feed_frames_each_upload():
+    parts = [("a.png", os.urandom(3_000_000)), ("b_manifest.json", b"{}"), ("empty.png", b"")]
+    feed = PartsFeed([(name, io.BytesIO(data)) for name, data in parts])
+    assert [(name, bytes(data)) for name, data in read_parts(feed)] == parts
+
+    framed = PartsFeed([("a.png", io.BytesIO(b"x" * 100))]).read(50)
+    with pytest.raises(ValueError, match="ended early"):
+        list(read_parts(io.BytesIO(framed)))
+
+
+def test_decode_parts_endpoint(storage_dirs, master_key, user_id):
+    audio = os.urandom(120_000)
+    images = audio_module.encode_bytes(audio, "memo.m4a", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    files = [("parts", (name, png, "image/png")) for name, png, _ in reversed(images)]
+    jobs = get_worker_pool().stats()["jobs"]
+    response = client.post("/api/v1/decode/parts", headers={"X-API-Key": settings.api_key}, files=files,
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 200
+    assert response.content == audio and response.headers["X-Total-Chunks"] == "3"
+    assert "memo.m4a" in response.headers["content-disposition"]
+    assert get_worker_pool().stats()["jobs"] == jobs + 1  # decoded by a pool worker fed the parts
+    assert not list((storage_dirs / "temp").glob("decode_*"))  # streamed, not written to a temp dir
+
+    response = client.post("/api/v1/decode/parts", headers={"X-API-Key": settings.api_key},
+                           files=[("parts", ("notes.txt", b"hello", "text/plain"))],
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 400 and "No PNG/TIFF" in response.json()["detail"]
+
+
+def test_large_zip_decode_leaves_no_temp_files(storage_dirs, monkeypatch, master_key, user_id):
+    monkeypatch.setattr(settings, "inmemory_max_mb", 0)  # force the file-based path
+    audio = os.urandom(120_000)
+    images = audio_module.encode_bytes(audio, "take.m4a", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    response = client.post("/api/v1/decode", headers={"X-API-Key": settings.api_key},
+                           files={"images": ("take.zip", _zip([img[:2] for img in images]), "application/zip")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 200 and response.content == audio
+    assert not list((storage_dirs / "temp").glob("extract_*"))
+    assert not list((storage_dirs / "temp").glob("decode_*"))
+
+
+def test_undecodable_images_are_client_errors(storage_dirs, monkeypatch, master_key, user_id):
+    audio = os.urandom(120_000)
+    images = [img[:2] for img in audio_module.encode_bytes(audio, "take.m4a", user_id, max_chunk_bytes=50_000,
+                                                            master_hex=master_key)]
+    headers = {"X-API-Key": settings.api_key}
+    wrong_key = {"user_id": user_id, "master_key": os.urandom(32).hex()}
+    missing_chunk = {"user_id": user_id, "master_key": master_key}
+
+    for data, sent, detail in [(wrong_key, images, "Decryption failed"),
+                               (missing_chunk, images[:2], "Incomplete chunk set")]:
+        files = [("parts", (name, png, "image/png")) for name, png in sent]
+        response = client.post("/api/v1/decode/parts", headers=headers, files=files, data=data)
+        assert response.status_code == 400 and detail in response.json()["detail"]
+
+        for inmemory_mb in (10, 0):  # in memory, then planned from the uploaded ZIP
+            monkeypatch.setattr(settings, "inmemory_max_mb", inmemory_mb)
+            response = client.post("/api/v1/decode", headers=headers,
+                                   files={"images": ("take.zip", _zip(sent), "application/zip")}, data=data)
+            assert response.status_code == 400 and detail in response.json()["detail"]
@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+
+client = TestClient(app)
+
+AVG = 16 * 1024
+
+
+def test_cdc_boundaries_are_stable_under_prefix_insert():
+    data = os.urandom(400_000)
+    shifted = os.urandom(333) + data
+    first = {bytes(c) for c in audio_module.iter_cdc_chunks(io.BytesIO(data), AVG)}
+    second = {bytes(c) for c in audio_module.iter_cdc_chunks(io.BytesIO(shifted), AVG)}
+    assert len(first & second) >= len(first) - 2
+
+
+def test_streamed_chunks_match_one_shot_cut_points():
+    data = os.urandom(300_000)
+    ends, pos = [], 0
+    for chunk in audio_module.iter_cdc_chunks(io.BytesIO(data), AVG):
+        pos += len(chunk)
+        ends.append(pos)
+    assert ends == audio_module.cdc_cut_points(data, AVG)
+
+
+def test_reencode_reuses_store(tmp_path, master_key, user_id):
+    store = tmp_path / "store"
+    audio = tmp_path / "take.m4a"
+    base = os.urandom(200_000)
+    audio.write_bytes(base)
+    first = audio_module.encode_cdc(audio, tmp_path / "a", user_id, store, master_hex=master_key, avg_chunk_bytes=AVG)
+    assert first["reused_chunks"] == 0
+
+    # Trimmed re-upload: only the chunk at the cut is new
+    audio.write_bytes(base[50_000:])
+    second = audio_module.encode_cdc(audio, tmp_path / "b", user_id, store, master_hex=master_key, avg_chunk_bytes=AVG)
+    assert second["reused_chunks"] >= second["total_chunks"] - 2
+
+    out = tmp_path / "out.m4a"
+    audio_module.decode_images_to_file(tmp_path / "b", out, user_id, master_hex=master_key)
+    assert out.read_bytes() == base[50_000:]
+
+
+def test_tampered_manifest_is_rejected(tmp_path, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(100_000))
+    result = audio_module.encode_cdc(audio, tmp_path / "a", user_id, tmp_path / "store",
+                                     master_hex=master_key, avg_chunk_bytes=AVG)
+    manifest = result["manifest"]
+    body = json.loads(manifest.read_text())
+    body["orig_size"] = 1
+    manifest.write_text(json.dumps(body))
+    try:
+        audio_module.decode_cdc(manifest, tmp_path / "x", user_id, master_hex=master_key)
+    except RuntimeError as e:
+        assert "authentication" in str(e)
+    else:
+        raise AssertionError("tampered manifest accepted")
+
+
+def test_encode_api_cdc_roundtrip(storage_dirs, master_key, user_id):
+    headers = {"X-API-Key": settings.api_key}
+    audio = os.urandom(150_000)
+    data = {"user_id": user_id, "master_key": master_key, "chunking": "cdc"}
+    response = client.post("/api/v1/encode", headers=headers,
+                           files={"file": ("take.m4a", audio, "audio/mp4")}, data=data)
+    assert response.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert any(name.endswith("take_manifest.json") for name in names)
+
+    again = client.post("/api/v1/encode", headers=headers,
+                        files={"file": ("take.m4a", audio, "audio/mp4")}, data=data)
+    assert again.headers["X-Reused-Chunks"] == again.headers["X-Total-Images"]
+
+    decoded = client.post("/api/v1/decode", headers=headers,
+                          files={"images": ("take.zip", again.content, "application/zip")},
+                          data={"user_id": user_id, "master_key": master_key})
+    assert decoded.status_code == 200
+    assert decoded.content == audio
@@ -0,0 +1,56 @@
+import os
+
+from app.core.audio_processor import audio_module
+
+
+def _tree(root):
+    files = {"a/one.m4a": 250_000, "a/two.wav": 90_000, "b/c/three.aac": 160_000, "notes.txt": 10}
+    for rel, size in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(size))
+    return root
+
+
+def test_encode_dir_with_process_pool_and_skips(tmp_path, master_key, user_id):
+    src = _tree(tmp_path / "in")
+    out = tmp_path / "out"
+    result = audio_module.encode_directory(src, out, user_id, master_hex=master_key, max_chunk_bytes=100_000,
+                                           workers=2)
+    assert not result["failed"] and result["bytes"] == 500_000
+    assert sorted(p.name for p in result["encoded"]) == ["one.m4a", "three.aac", "two.wav"]
+    restored = tmp_path / "three.aac"
+    audio_module.decode_images_to_file(out / "b/c/three.aac", restored, user_id, master_hex=master_key)
+    assert restored.read_bytes() == (src / "b/c/three.aac").read_bytes()
+
+    (src / "a/one.m4a").write_bytes(os.urandom(120_000))  # changed: 2 images instead of 3
+    again = audio_module.encode_directory(src, out, user_id, master_hex=master_key, max_chunk_bytes=100_000,
+                                          workers=0)
+    assert [p.name for p in again["encoded"]] == ["one.m4a"] and len(again["skipped"]) == 2
+    assert sorted(p.name for p in (out / "a/one.m4a").glob("*.png")) == \
+        ["one_part0001_of_0002.png", "one_part0002_of_0002.png"]
+
+
+def test_interrupted_batch_resumes(tmp_path, monkeypatch, master_key, user_id):
+    src = _tree(tmp_path / "in")
+    real = audio_module.write_file_atomic
+    writes, fail_at = [], [2]
+
+    def flaky(path, data):
+        if path.suffix == ".png":
+            writes.append(path.name)
+            if len(writes) == fail_at[0]:
+                raise OSError("disk full")
+        return real(path, data)
+
+    monkeypatch.setattr(audio_module, "write_file_atomic", flaky)
+    first = audio_module.encode_directory(src, tmp_path / "out", user_id, master_hex=master_key,
+                                          max_chunk_bytes=100_000, workers=0)
+    assert [p.name for p in first["failed"]] == ["one.m4a"]  # largest first, failed on its 2nd image
+
+    writes.clear()
+    fail_at[0] = 0
+    second = audio_module.encode_directory(src, tmp_path / "out", user_id, master_hex=master_key,
+                                           max_chunk_bytes=100_000, workers=0)
+    assert [p.name for p in second["encoded"]] == ["one.m4a"] and not second["failed"]
+    assert writes == ["one_part0002_of_0003.png", "one_part0003_of_0003.png"]
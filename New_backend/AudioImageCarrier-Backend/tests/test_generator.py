@@ -0,0 +1,54 @@
+import asyncio
+import io
+import os
+import threading
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import AudioProcessor, audio_module
+from app.core.config import settings
+
+client = TestClient(app)
+
+
+def test_images_are_yielded_as_each_chunk_completes(tmp_path, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(400_000))
+    out = tmp_path / "out"
+    images = audio_module.iter_encode_file(audio, user_id, out_dir=out, max_chunk_bytes=40_000, master_hex=master_key)
+    name, path, meta = next(images)
+    assert name == "take_part0001_of_0010.png" and path == out / name and path.exists()
+    assert meta["chunk_index"] == 0 and meta["total_chunks"] == 10
+    assert len(list(out.glob("*.png"))) == 1  # later chunks are not written yet
+    images.close()
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+    in_memory = list(audio_module.iter_encode_file(audio, user_id, max_chunk_bytes=40_000, master_hex=master_key))
+    assert [type(png) for _, png, _ in in_memory] == [bytes] * 10
+    assert audio_module.decode_bytes(in_memory, user_id, master_hex=master_key) == audio.read_bytes()
+
+
+def test_async_iterator(tmp_path, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(100_000))
+
+    async def collect():
+        return [(path.name, meta["chunk_index"]) async for path, meta in AudioProcessor.aiter_encode_audio(
+            audio, tmp_path / "out", user_id, master_key, max_chunk_bytes=30_000)]
+
+    assert asyncio.run(collect()) == [(f"take_part{i:04d}_of_0004.png", i - 1) for i in range(1, 5)]
+
+
+def test_large_upload_zips_images_as_they_are_written(storage_dirs, monkeypatch, master_key, user_id):
+    monkeypatch.setattr(settings, "inmemory_max_mb", 0)  # force the file-based path
+    audio = os.urandom(120_000)
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("take.m4a", audio, "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key, "max_chunk_bytes": "50000"})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Images"] == "3"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    images = [(name, archive.read(name)) for name in archive.namelist()]
+    assert audio_module.decode_bytes(images, user_id, master_hex=master_key) == audio
@@ -0,0 +1,93 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import get_worker_pool
+from app.services.ingest_service import IngestService
+
+client = TestClient(app)
+
+
+def _ingest(frames, **start):
+    messages = []
+    with client.websocket_connect("/api/v1/ingest", headers={"X-API-Key": settings.api_key}) as ws:
+        ws.send_json({"type": "start", **start})
+        messages.append(ws.receive_json())
+        for frame in frames:
+            ws.send_bytes(frame)
+        ws.send_json({"type": "stop"})
+        while messages[-1]["type"] not in ("done", "error"):
+            messages.append(ws.receive_json())
+    return messages
+
+
+def test_live_ingest_roundtrip(tmp_path, storage_dirs, master_key, user_id):
+    audio = os.urandom(25_000)
+    frames = [audio[i:i + 3000] for i in range(0, len(audio), 3000)]
+    jobs = get_worker_pool().stats()["jobs"]
+    messages = _ingest(frames, user_id=user_id, master_key=master_key, filename="live.aac", segment_bytes=10_000)
+
+    assert messages[0]["type"] == "started"
+    segments = [m for m in messages if m["type"] == "segment"]
+    assert [s["seq"] for s in segments] == [0, 1, 2]
+    done = messages[-1]
+    assert done["type"] == "done" and done["total_chunks"] == 3
+    assert get_worker_pool().stats()["jobs"] == jobs + 4  # three segments and the seal ran on the pool
+
+    response = client.get(done["download"], headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 200
+    images = tmp_path / "images"
+    zipfile.ZipFile(io.BytesIO(response.content)).extractall(images)
+    assert (images / "live_manifest.json").exists()
+
+    out = tmp_path / "live.aac"
+    audio_module.decode_images_to_file(images, out, user_id, master_hex=master_key)
+    assert out.read_bytes() == audio
+
+
+def test_ingest_requires_api_key(storage_dirs):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/ingest") as ws:
+            ws.receive_json()
+
+
+def test_ingest_rejects_bad_start(storage_dirs):
+    messages = _ingest([], user_id="../x", filename="live.aac")
+    assert messages[-1]["type"] == "error"
+    assert "user_id" in messages[-1]["detail"]
+
+
+def test_ingest_cuts_idle_segment_by_time(storage_dirs, master_key, user_id):
+    with client.websocket_connect("/api/v1/ingest", headers={"X-API-Key": settings.api_key}) as ws:
+        ws.send_json({"type": "start", "user_id": user_id, "master_key": master_key,
+                      "filename": "live.aac", "segment_seconds": 0.2})
+        assert ws.receive_json()["type"] == "started"
+        ws.send_bytes(os.urandom(500))
+        # No more frames: the partial segment is encoded once it is 0.2s old
+        segment = ws.receive_json()
+        assert segment["type"] == "segment" and segment["bytes"] == 500
+        ws.send_json({"type": "stop"})
+        assert ws.receive_json()["total_chunks"] == 1
+
+
+def test_undownloaded_sessions_expire(storage_dirs, monkeypatch, master_key, user_id):
+    done = _ingest([os.urandom(2000)], user_id=user_id, master_key=master_key, filename="live.aac")[-1]
+    live = IngestService.start_session(user_id, "next.aac", master_key=master_key)
+    leftover = storage_dirs / "temp" / f"ingest_{'0' * 32}"  # from a previous server process
+    leftover.mkdir()
+    for path in storage_dirs.joinpath("temp").glob("ingest_*"):
+        os.utime(path, (0, 0))
+
+    monkeypatch.setattr(settings, "ingest_result_ttl_seconds", 3600)
+    response = client.get(done["download"], headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 404
+    assert not leftover.exists()
+    assert live.output_dir.is_dir()  # still recording, however idle
+    live.abort()
@@ -0,0 +1,57 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+
+client = TestClient(app)
+
+
+def test_bytes_api_matches_file_api(tmp_path, master_key, user_id):
+    audio = os.urandom(130_000)
+    images = audio_module.encode_bytes(audio, "take.m4a", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    assert [name for name, _, _ in images] == [f"take_part{i:04d}_of_0003.png" for i in (1, 2, 3)]
+    assert images[0][2]["original_size"] == 50_000 and images[0][2]["width"] > 0
+    assert audio_module.decode_bytes(list(reversed(images)), user_id, master_hex=master_key) == audio
+
+    # Images are interchangeable with the file-based encoder/decoder
+    for name, png, _ in images:
+        (tmp_path / name).write_bytes(png)
+    audio_module.decode_images_to_file(tmp_path, tmp_path / "out.m4a", user_id, master_hex=master_key)
+    assert (tmp_path / "out.m4a").read_bytes() == audio
+
+    with pytest.raises(RuntimeError, match="Incomplete chunk set"):
+        audio_module.decode_bytes(images[:2], user_id, master_hex=master_key)
+
+
+def test_decode_bytes_reads_open_streams(tmp_path, master_key, user_id):
+    audio = tmp_path / "live.aac"
+    audio.write_bytes(os.urandom(70_000))
+    result = audio_module.encode_append(audio, tmp_path / "out", user_id, max_chunk_bytes=30_000, master_hex=master_key)
+    pngs = [p.read_bytes() for p in result["images"]]
+    assert audio_module.decode_bytes(pngs, user_id, master_hex=master_key) == audio.read_bytes()
+
+
+def test_small_requests_skip_temp_files(storage_dirs, master_key, user_id):
+    audio = os.urandom(120_000)
+    headers = {"X-API-Key": settings.api_key}
+    data = {"user_id": user_id, "master_key": master_key, "max_chunk_bytes": "50000"}
+    encoded = client.post("/api/v1/encode", headers=headers,
+                          files={"file": ("take.m4a", audio, "audio/mp4")}, data=data)
+    assert encoded.status_code == 200
+    assert encoded.headers["X-Total-Images"] == "3"
+    assert 'filename="take_images.zip"' in encoded.headers["content-disposition"]
+    assert len(zipfile.ZipFile(io.BytesIO(encoded.content)).namelist()) == 3
+
+    decoded = client.post("/api/v1/decode", headers=headers,
+                          files={"images": ("take_images.zip", encoded.content, "application/zip")},
+                          data={"user_id": user_id, "master_key": master_key})
+    assert decoded.status_code == 200
+    assert decoded.content == audio
+    assert decoded.headers["X-Total-Chunks"] == "3"
+    assert not (storage_dirs / "uploads").exists() and not (storage_dirs / "temp").exists()
@@ -0,0 +1,100 @@
+import io
+import os
+import time
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.services.job_service import JobService, QUEUED, RUNNING
+
+client = TestClient(app)
+HEADERS = {"X-API-Key": settings.api_key}
+
+
+def _wait_for_job(job_id, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}", headers=HEADERS).json()
+        if job["status"] not in (QUEUED, RUNNING):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_reports_progress_and_serves_result(storage_dirs, master_key, user_id):
+    audio = os.urandom(150_000)
+    response = client.post("/api/v1/jobs/encode", headers=HEADERS,
+                           files={"file": ("take.m4a", audio, "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key, "max_chunk_bytes": "50000"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["result_url"] == f"/api/v1/jobs/{job_id}/result"
+
+    job = _wait_for_job(job_id)
+    assert job["status"] == "done", job["error"]
+    assert job["progress"] == {"chunks_done": 3, "total_chunks": 3, "percent": 100.0}
+    assert job["result"]["total_images"] == 3 and job["expires_at"]
+
+    result = client.get(f"/api/v1/jobs/{job_id}/result", headers=HEADERS)
+    assert result.status_code == 200 and result.headers["X-Total-Images"] == "3"
+    archive = zipfile.ZipFile(io.BytesIO(result.content))
+    images = [(name, archive.read(name)) for name in archive.namelist()]
+    assert audio_module.decode_bytes(images, user_id, master_hex=master_key) == audio
+    assert not (JobService.job_dir(job_id) / "input").exists()
+
+    assert client.delete(f"/api/v1/jobs/{job_id}", headers=HEADERS).json()["deleted"]
+    assert client.get(f"/api/v1/jobs/{job_id}", headers=HEADERS).status_code == 404
+    assert client.get("/api/v1/jobs/not-a-job", headers=HEADERS).status_code == 404
+
+
+def test_restart_requeues_env_key_jobs_and_expires_results(storage_dirs, monkeypatch, master_key, user_id):
+    store = JobService.store()
+    for job_id, key_in_env, status in [("a" * 32, True, RUNNING), ("b" * 32, False, QUEUED)]:
+        path = JobService.input_path(job_id, "take.m4a")
+        path.parent.mkdir(parents=True)
+        path.write_bytes(os.urandom(60_000))
+        store.insert({"job_id": job_id, "kind": "encode", "status": status, "user_id": user_id,
+                      "filename": "take.m4a", "params": {"max_chunk_bytes": 50_000, "compress": True,
+                                                         "chunking": "fixed"},
+                      "key_in_env": key_in_env, "created_at": time.time()})
+
+    # Both jobs were left unfinished by a previous server process
+    monkeypatch.setenv("AICARRIER_MASTER_KEY_HEX", master_key)
+    monkeypatch.setattr("app.services.job_service.get_worker_pool", lambda: _InlinePool())
+    assert JobService.resume_pending() == {"resumed": 1, "failed": 1, "purged": 0}
+
+    resumed, interrupted = _wait_for_job("a" * 32), _wait_for_job("b" * 32)
+    assert resumed["status"] == "done" and resumed["progress"]["chunks_done"] == 2
+    assert interrupted["status"] == "failed" and "resubmit" in interrupted["error"]
+    assert client.get(f"/api/v1/jobs/{'b' * 32}/result", headers=HEADERS).status_code == 409
+
+    store.update("a" * 32, expires_at=time.time() - 1)
+    assert client.get(f"/api/v1/jobs/{'a' * 32}", headers=HEADERS).status_code == 404
+    assert not JobService.job_dir("a" * 32).exists()
+
+
+def test_jobs_use_their_own_timeout(storage_dirs, monkeypatch, master_key, user_id):
+    monkeypatch.setattr(settings, "job_timeout_seconds", 0.01)  # would kill any real encode
+    monkeypatch.setattr(settings, "background_job_timeout_seconds", 3600.0)
+    monkeypatch.setattr("app.services.job_service.get_worker_pool", lambda: _InlinePool())
+    _InlinePool.timeouts = []
+    response = client.post("/api/v1/jobs/encode", headers=HEADERS,
+                           files={"file": ("take.m4a", os.urandom(60_000), "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 202
+
+    assert _wait_for_job(response.json()["job_id"])["status"] == "done"
+    assert _InlinePool.timeouts == [3600.0]
+
+
+class _InlinePool:
+    """Runs the job in the runner thread, which sees the test's environment master key."""
+
+    timeouts = []
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        return fn(*args, **kwargs)
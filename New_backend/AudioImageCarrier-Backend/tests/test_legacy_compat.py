@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+FIXTURES = Path(__file__).parent / "fixtures" / "legacy"
+REPO = Path(__file__).resolve().parents[3]
+ENTRY_POINTS = [
+    "New_backend/AudioImageCarrier-Backend/scripts/audio_image_chunked.py",
+    "New_backend/script/audio_image_chunked.py",
+    "Mobile_App/Backend/Python_Script/audio_image_chunked.py",
+    "PrinceWorkUpdates/audio_image_chunked.py",
+]
+
+
+@pytest.mark.parametrize("set_name, original", [("tone", "tone.wav"), ("memo", "memo.m4a"),
+                                                ("memo_raw", "memo.m4a")])
+def test_legacy_images_decode_with_the_shared_codec(tmp_path, master_key, user_id, set_name, original):
+    out = tmp_path / original
+    audio_module.decode_images_to_file(FIXTURES / set_name, out, user_id, master_hex=master_key)
+    assert out.read_bytes() == (FIXTURES / original).read_bytes()
+    report, = audio_module.verify_archives([FIXTURES / set_name], user_id, master_hex=master_key)
+    assert report["ok"] and report["kind"] == "file"
+    images = sorted((FIXTURES / set_name).glob("*.png"))
+    assert audio_module.decode_bytes([p.read_bytes() for p in images], user_id,
+                                     master_hex=master_key) == out.read_bytes()
+
+
+@pytest.mark.parametrize("entry_point", ENTRY_POINTS)
+def test_every_script_copy_delegates_to_the_package(tmp_path, master_key, user_id, entry_point):
+    env = {"PATH": "", "AICARRIER_MASTER_KEY_HEX": master_key}
+    out = tmp_path / "memo.m4a"
+    subprocess.run([sys.executable, str(REPO / entry_point), "decode", "-i", str(FIXTURES / "memo"),
+                    "-o", str(out), "-u", user_id], env=env, cwd=tmp_path, check=True, capture_output=True)
+    assert out.read_bytes() == (FIXTURES / "memo.m4a").read_bytes()
+    help_text = subprocess.run([sys.executable, str(REPO / entry_point), "--help"], env=env, cwd=tmp_path,
+                               check=True, capture_output=True, text=True).stdout
+    assert "verify" in help_text and "rekey" in help_text
@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+@pytest.fixture
+def merkle_mode(monkeypatch):
+    previous = audio_module.select_hash(None)
+    monkeypatch.setattr(audio_module, "MERKLE_LEAF_BYTES", 16 * 1024)  # several leaves per test chunk
+    audio_module.select_hash("merkle")
+    yield
+    audio_module.select_hash(previous)
+
+
+def test_tree_shape_and_parallel_leaves(monkeypatch):
+    data = os.urandom(5 * 1000 + 17)
+    serial = audio_module.merkle_leaf_digests(data, 1000)
+    monkeypatch.setattr(audio_module, "MERKLE_WORKERS", 1)
+    assert audio_module.merkle_leaf_digests(data, 1000) == serial
+    assert serial[0] == hashlib.sha256(b"\x00" + data[:1000]).digest() and len(serial) == 6
+
+    node = lambda a, b: hashlib.sha256(b"\x01" + a + b).digest()
+    l = serial
+    expected = node(node(node(l[0], l[1]), node(l[2], l[3])), node(l[4], l[5]))
+    assert audio_module.merkle_root(serial) == expected.hex()
+    assert audio_module.merkle_root(serial[:3]) == node(node(l[0], l[1]), l[2]).hex()
+
+
+def test_merkle_chunks_round_trip_and_verify_ranges(tmp_path, master_key, user_id, merkle_mode):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(120_000))
+    images = audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    header = audio_module.read_image_header(images[0])
+    assert "sha256" not in header and header["merkle_leaf_bytes"] == 16 * 1024
+    assert header["merkle_root"] == audio_module.hash_chunk(audio.read_bytes()[:50_000], header)
+
+    out = tmp_path / "restored.m4a"
+    audio_module.decode_images_to_file(tmp_path / "out", out, user_id, master_hex=master_key)
+    assert out.read_bytes() == audio.read_bytes()
+
+    flat = audio_module.image_pixels_to_bytes(images[0])
+    leaves = audio_module.read_merkle_leaves(flat, header)
+    assert len(leaves) == 4
+    data = audio.read_bytes()
+    assert audio_module.verify_leaf_range(header, leaves, 32 * 1024, data[32 * 1024:50_000])
+    assert not audio_module.verify_leaf_range(header, leaves, 16 * 1024, data[:16 * 1024])
+    with pytest.raises(ValueError):
+        audio_module.verify_leaf_range(header, leaves, 100, data[100:16 * 1024])
+    # A tampered leaf table no longer matches the authenticated root
+    idx = flat.find(audio_module.SENTINEL + audio_module.MERKLE_TRAILER) + 16
+    tampered = flat[:idx] + bytes([flat[idx] ^ 1]) + flat[idx + 1:]
+    assert audio_module.read_merkle_leaves(tampered, header) is None
+
+
+def test_file_roots_in_manifests_and_audits(tmp_path, master_key, user_id, merkle_mode):
+    audio = tmp_path / "live.aac"
+    audio.write_bytes(os.urandom(90_000))
+    result = audio_module.encode_append(audio, tmp_path / "s", user_id, max_chunk_bytes=40_000,
+                                        master_hex=master_key, seal=True)
+    roots = audio_module.peek_merkle_roots(tmp_path / "s")
+    assert len(roots) == 1 and roots[0]["kind"] == "stream" and roots[0]["merkle_root"]
+
+    manifest = audio_module.json.loads(result["manifest"].read_text())
+    assert manifest["merkle_root"] == roots[0]["merkle_root"]
+    out = audio_module.decode_stream(tmp_path / "s", tmp_path / "live.out", user_id, master_hex=master_key)
+    assert out.read_bytes() == audio.read_bytes()
+
+    cdc = audio_module.encode_cdc(audio, tmp_path / "c", user_id, tmp_path / "store", master_hex=master_key,
+                                  avg_chunk_bytes=16 * 1024)
+    assert "merkle_root" in audio_module.json.loads(cdc["manifest"].read_text())
+
+    audio_module.encode_streamed(audio, tmp_path / "f", user_id, max_chunk_bytes=40_000, master_hex=master_key)
+    reports = audio_module.verify_archives([tmp_path / "s", tmp_path / "c", tmp_path / "f"], user_id,
+                                           master_hex=master_key)
+    assert all(r["ok"] and r["merkle_root"] for r in reports)
+    by_kind = {r["kind"]: r["merkle_root"] for r in reports}
+    assert by_kind["stream"] == roots[0]["merkle_root"]
+    assert by_kind["file"] == audio_module.peek_merkle_roots(tmp_path / "f")[0]["merkle_root"]
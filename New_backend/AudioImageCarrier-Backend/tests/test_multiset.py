@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+def _encode_into(folder, tmp_path, name, size, user_id, master_key, chunk=40_000):
+    audio = tmp_path / "src" / name
+    audio.parent.mkdir(exist_ok=True)
+    audio.write_bytes(os.urandom(size))
+    work = tmp_path / "work"
+    shutil.rmtree(work, ignore_errors=True)
+    images = audio_module.encode_streamed(audio, work, user_id, max_chunk_bytes=chunk, master_hex=master_key)
+    folder.mkdir(exist_ok=True)
+    for i, image in enumerate(images):
+        shutil.move(str(image), str(folder / f"{audio.stem}.{os.urandom(2).hex()}.{i}{image.suffix}"))
+    return audio
+
+
+def test_sets_are_grouped_and_decoded_concurrently(tmp_path, master_key, user_id):
+    folder = tmp_path / "archive"
+    a = _encode_into(folder, tmp_path, "a.m4a", 100_000, user_id, master_key)
+    b = _encode_into(folder, tmp_path, "b.wav", 70_000, user_id, master_key)
+    a_bytes = a.read_bytes()
+    a2 = _encode_into(folder, tmp_path, "a.m4a", 90_000, user_id, master_key)  # same name and chunk count
+    stream = tmp_path / "src" / "live.aac"
+    stream.write_bytes(os.urandom(50_000))
+    audio_module.encode_append(stream, folder, user_id, max_chunk_bytes=40_000, master_hex=master_key)
+
+    recordings = audio_module.scan_recordings(folder)
+    assert sorted((r["kind"], r["orig_filename"], len(r["parts"])) for r in recordings) == [
+        ("file", "a.m4a", 3), ("file", "a.m4a", 3), ("file", "b.wav", 2), ("stream", "live.aac", 2)]
+    with pytest.raises(RuntimeError, match="Found 4 recordings"):
+        audio_module.decode_images_to_file(folder, tmp_path / "x", user_id, master_hex=master_key)
+
+    reports = audio_module.decode_directory(folder, tmp_path / "out", user_id, master_hex=master_key, workers=3)
+    assert all(r["ok"] for r in reports)
+    outputs = {r["output"].read_bytes() for r in reports}
+    assert outputs == {a_bytes, a2.read_bytes(), b.read_bytes(), stream.read_bytes()}
+    assert (tmp_path / "out" / "b.wav").read_bytes() == b.read_bytes()
+
+
+def test_incomplete_sets_are_reported_not_decoded(tmp_path, master_key, user_id):
+    folder = tmp_path / "archive"
+    a = _encode_into(folder, tmp_path, "a.m4a", 100_000, user_id, master_key)
+    _encode_into(folder, tmp_path, "b.m4a", 100_000, user_id, master_key)
+    victim = next(p for p in sorted(folder.iterdir()) if p.name.startswith("b.") and p.stem.endswith(".1"))
+    victim.unlink()
+
+    reports = {r["orig_filename"]: r for r in audio_module.decode_directory(folder, tmp_path / "out", user_id,
+                                                                            master_hex=master_key)}
+    assert reports["a.m4a"]["ok"] and (tmp_path / "out" / "a.m4a").read_bytes() == a.read_bytes()
+    assert not reports["b.m4a"]["ok"] and reports["b.m4a"]["missing"] == [1]
+    assert "missing chunk 2 of 3" in reports["b.m4a"]["error"]
+    assert not (tmp_path / "out" / "b.m4a").exists()
+
+
+def test_verify_and_peek_keep_same_named_sets_apart(tmp_path, master_key, user_id):
+    folder = tmp_path / "archive"
+    _encode_into(folder, tmp_path, "rec.m4a", 100_000, user_id, master_key)
+    _encode_into(folder, tmp_path, "rec.m4a", 110_000, user_id, master_key)  # same name and chunk count
+    assert len(audio_module.scan_recordings(folder)) == 2
+
+    reports = audio_module.verify_archives([folder], user_id, master_hex=master_key)
+    assert len(reports) == 2 and all(r["ok"] for r in reports), reports
+    assert sorted(len(r["chunks"]) for r in reports) == [3, 3]
+
+    roots = audio_module.peek_merkle_roots(folder)
+    assert len(roots) == 2 and len({r["set"] for r in roots}) == 2
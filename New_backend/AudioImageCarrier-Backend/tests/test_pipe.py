@@ -0,0 +1,72 @@
+import io
+import os
+import subprocess
+import sys
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+SCRIPT = Path(audio_module.__file__)
+
+
+class Unseekable(io.RawIOBase):
+    """A read-only pipe stand-in: no size, no seeking, short reads."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(memoryview(b)[:7_000])
+
+
+@pytest.mark.parametrize("fmt", ["tar", "zip"])
+def test_pipe_round_trip(master_key, user_id, fmt):
+    audio = os.urandom(230_000)
+    archive = io.BytesIO()
+    result = audio_module.encode_pipe(Unseekable(audio), archive, user_id, orig_filename="live.aac",
+                                      max_chunk_bytes=60_000, master_hex=master_key, archive_format=fmt)
+    assert result["total_chunks"] == 4 and result["orig_size"] == len(audio)
+
+    archive.seek(0)
+    src = Unseekable(archive.getvalue()) if fmt == "tar" else archive  # zip needs a seekable input
+    out = io.BytesIO()
+    decoded = audio_module.decode_pipe(src, out, user_id, master_hex=master_key)
+    assert out.getvalue() == audio
+    assert decoded == {"kind": "stream", "orig_filename": "live.aac", "total_chunks": 4, "size": len(audio)}
+
+
+def test_truncated_archive_is_rejected(master_key, user_id):
+    archive = io.BytesIO()
+    audio_module.encode_pipe(io.BytesIO(os.urandom(150_000)), archive, user_id, max_chunk_bytes=50_000,
+                             master_hex=master_key)
+    archive.seek(0)
+    dropped = io.BytesIO()
+    with tarfile.open(fileobj=archive) as src, tarfile.open(fileobj=dropped, mode="w") as dst:
+        for member in src.getmembers():
+            if not member.name.endswith("seq000002.png"):
+                dst.addfile(member, src.extractfile(member))
+    dropped.seek(0)
+    with pytest.raises(RuntimeError, match="incomplete"):
+        audio_module.decode_pipe(dropped, io.BytesIO(), user_id, master_hex=master_key)
+
+
+def test_cli_reads_stdin_and_writes_stdout(tmp_path, user_id):
+    env = {**os.environ, "AICARRIER_MASTER_KEY_HEX": os.urandom(32).hex()}
+    audio = os.urandom(120_000)
+    encoded = subprocess.run([sys.executable, str(SCRIPT), "encode", "-i", "-", "-o", "-", "-u", user_id,
+                              "--name", "mic.wav", "--max-chunk-bytes", "50000"],
+                             input=audio, capture_output=True, env=env, cwd=tmp_path, check=True)
+    names = tarfile.open(fileobj=io.BytesIO(encoded.stdout)).getnames()
+    assert names == ["mic_seq000000.png", "mic_seq000001.png", "mic_seq000002.png", "mic_manifest.json"]
+    assert b"Sealed stream" in encoded.stderr
+
+    decoded = subprocess.run([sys.executable, str(SCRIPT), "decode", "-i", "-", "-o", "-", "-u", user_id],
+                             input=encoded.stdout, capture_output=True, env=env, cwd=tmp_path, check=True)
+    assert decoded.stdout == audio
+    assert not list(tmp_path.iterdir())  # no scratch files
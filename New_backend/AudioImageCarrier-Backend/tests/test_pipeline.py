@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+def test_pipeline_keeps_order_and_overlaps_stages():
+    seen = {}
+
+    def stage(name, delay):
+        def run(item):
+            seen.setdefault(name, set()).add(threading.current_thread().name)
+            time.sleep(delay)
+            return item + [name]
+        return run
+
+    start = time.monotonic()
+    out = list(audio_module.run_pipeline(([i] for i in range(8)), [stage("a", 0.05), stage("b", 0.05)], depth=2))
+    elapsed = time.monotonic() - start
+    assert out == [[i, "a", "b"] for i in range(8)]
+    assert seen["a"].isdisjoint(seen["b"]) and threading.current_thread().name not in seen["a"]
+    assert elapsed < 8 * 0.09  # sequential would take the sum of both stages
+
+
+def test_pipeline_bounds_read_ahead():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stages = audio_module.run_pipeline(source(), [lambda x: x], depth=2)
+    assert next(stages) == 0
+    time.sleep(0.2)
+    assert len(produced) <= 8  # two queues of 2, one item per thread in hand, one consumed
+    stages.close()
+
+
+def test_pipeline_error_stops_and_discards():
+    discarded = []
+
+    def boom(x):
+        if x == 3:
+            raise ValueError("bad chunk")
+        return x
+
+    consumed = []
+    with pytest.raises(ValueError, match="bad chunk"):
+        for x in audio_module.run_pipeline(range(50), [boom], depth=2, discard=discarded.append):
+            consumed.append(x)
+            time.sleep(0.01)
+    assert consumed == list(range(len(consumed))) and 3 not in consumed + discarded
+    assert not set(consumed) & set(discarded)
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_pipelined_round_trip(tmp_path, master_key, user_id, depth):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(350_000))
+    images = audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=60_000,
+                                          master_hex=master_key, pipeline_depth=depth)
+    assert [p.name for p in images] == [f"take_part{i:04d}_of_0006.png" for i in range(1, 7)]
+    assert not [p for p in (tmp_path / "out").iterdir() if p.name.startswith(".")]
+    out = tmp_path / "restored.m4a"
+    audio_module.decode_images_to_file(tmp_path / "out", out, user_id, master_hex=master_key, pipeline_depth=depth)
+    assert out.read_bytes() == audio.read_bytes()
+
+
+def test_user_key_is_derived_once_per_encode(monkeypatch, master_key, user_id):
+    derived = []
+    derive = audio_module.derive_user_key
+    monkeypatch.setattr(audio_module, "derive_user_key", lambda *a: derived.append(a) or derive(*a))
+    images = audio_module.encode_bytes(os.urandom(200_000), "take.m4a", user_id, max_chunk_bytes=20_000,
+                                       master_hex=master_key)
+    assert len(images) == 10 and len(derived) == 1
@@ -0,0 +1,108 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.routes.decode import parse_byte_range
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+
+client = TestClient(app)
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def recording(master_key, user_id):
+    audio = os.urandom(200_000)
+    images = audio_module.encode_bytes(audio, "take.m4a", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    return audio, _zip([img[:2] for img in images])
+
+
+def test_range_decrypts_only_covering_chunks(tmp_path, monkeypatch, recording, master_key, user_id):
+    audio, data = recording
+    archive = tmp_path / "take.zip"
+    archive.write_bytes(data)
+    plan = audio_module.plan_zip_recording(archive, user_id, master_hex=master_key)
+    assert plan["kind"] == "file" and plan["size"] == len(audio) and len(plan["chunks"]) == 4
+
+    opened = []
+    open_payload = audio_module.open_payload
+    monkeypatch.setattr(audio_module, "open_payload",
+                        lambda flat, aead, label="chunk": opened.append(label) or open_payload(flat, aead, label))
+    part = b"".join(audio_module.iter_decode_zip_range(archive, plan, user_id, master_hex=master_key,
+                                                       start=60_000, end=110_000))
+    assert part == audio[60_000:110_000]
+    assert opened == ["take_part0002_of_0004.png", "take_part0003_of_0004.png"]
+    assert b"".join(audio_module.iter_decode_zip_range(archive, plan, user_id, master_hex=master_key)) == audio
+
+    plan["chunks"][1]["header"]["orig_chunk_size"] += 1  # a plan that does not match the images
+    with pytest.raises(RuntimeError, match="does not match"):
+        list(audio_module.iter_decode_zip_range(archive, plan, user_id, master_hex=master_key, start=60_000))
+
+
+def test_cdc_range(tmp_path, master_key, user_id):
+    audio_file = tmp_path / "take.m4a"
+    audio_file.write_bytes(os.urandom(150_000))
+    result = audio_module.encode_cdc(audio_file, tmp_path / "a", user_id, tmp_path / "store", master_hex=master_key,
+                                     avg_chunk_bytes=16_384)
+    archive = tmp_path / "a.zip"
+    archive.write_bytes(_zip([(result["manifest"].name, result["manifest"].read_bytes())]))
+    plan = audio_module.plan_zip_recording(archive, user_id, master_hex=master_key, store_dir=tmp_path / "store")
+    part = b"".join(audio_module.iter_decode_zip_range(archive, plan, user_id, master_hex=master_key,
+                                                       store_dir=tmp_path / "store", start=70_000, end=90_000))
+    assert plan["kind"] == "cdc" and part == audio_file.read_bytes()[70_000:90_000]
+
+
+def test_parse_byte_range():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=10-19", 100) == (10, 20)
+    assert parse_byte_range("bytes=90-", 100) == (90, 100)
+    assert parse_byte_range("bytes=-30", 100) == (70, 100)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 100)
+    assert parse_byte_range("bytes=0-1,5-9", 100) is None  # several ranges: send it all
+    assert parse_byte_range("items=0-1", 100) is None
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=100-", 100)
+
+
+def test_decode_endpoint_serves_ranges(storage_dirs, recording, master_key, user_id):
+    audio, data = recording
+    form = {"user_id": user_id, "master_key": master_key}
+
+    def decode(**headers):
+        return client.post("/api/v1/decode", headers={"X-API-Key": settings.api_key, **headers},
+                           files={"images": ("take.zip", data, "application/zip")}, data=form)
+
+    response = decode(Range="bytes=120000-149999")
+    assert response.status_code == 206 and response.content == audio[120_000:150_000]
+    assert response.headers["Content-Range"] == f"bytes 120000-149999/{len(audio)}"
+    assert response.headers["Accept-Ranges"] == "bytes" and response.headers["X-File-Size"] == str(len(audio))
+
+    response = decode(Range="bytes=-1000")
+    assert response.status_code == 206 and response.content == audio[-1000:]
+
+    response = decode(Range=f"bytes={len(audio)}-")
+    assert response.status_code == 416 and response.headers["Content-Range"] == f"bytes */{len(audio)}"
+    assert not list((storage_dirs / "uploads").glob("*"))
+
+
+def test_large_decode_is_streamed(storage_dirs, monkeypatch, recording, master_key, user_id):
+    monkeypatch.setattr(settings, "inmemory_max_mb", 0)
+    audio, data = recording
+    response = client.post("/api/v1/decode", headers={"X-API-Key": settings.api_key},
+                           files={"images": ("take.zip", data, "application/zip")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 200 and response.content == audio
+    assert response.headers["Accept-Ranges"] == "bytes" and response.headers["Content-Length"] == str(len(audio))
+    assert "take.m4a" in response.headers["content-disposition"]
+    assert not list((storage_dirs / "uploads").glob("*")) and not list((storage_dirs / "temp").glob("decode_*"))
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+NEW_KEY = "FFEEDDCCBBAA99887766554433221100FFEEDDCCBBAA99887766554433221100"
+
+
+def _audio(path, size):
+    # Half random, half repetitive: chunks are really zstd-compressed
+    path.write_bytes(os.urandom(size // 2) + bytes(range(256)) * (size // 512))
+    return path
+
+
+@pytest.fixture
+def archives(tmp_path, master_key, user_id):
+    src = tmp_path / "src"
+    src.mkdir()
+    take = _audio(src / "take.m4a", 120_000)
+    live = _audio(src / "live.aac", 70_000)
+    clips = [_audio(src / f"clip{i}.wav", 5_000) for i in range(3)]
+    audio_module.encode_streamed(take, tmp_path / "file", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    audio_module.encode_append(live, tmp_path / "stream", user_id, max_chunk_bytes=40_000, master_hex=master_key,
+                               seal=True)
+    audio_module.encode_cdc(take, tmp_path / "cdc", user_id, tmp_path / "store", master_hex=master_key,
+                            avg_chunk_bytes=16 * 1024)
+    audio_module.encode_bundle(clips, tmp_path / "bundle", user_id, master_hex=master_key)
+    return {"file": take, "stream": live, "cdc": take, "bundle": clips}
+
+
+def test_rekey_reencrypts_every_kind_without_recompressing(tmp_path, monkeypatch, master_key, user_id, archives):
+    def no_compression():
+        raise AssertionError("rekey must not recompress")
+
+    monkeypatch.setattr(audio_module, "zstd_compressor", no_compression)
+    indirs = [tmp_path / kind for kind in archives]
+    reports = audio_module.rekey_archives(indirs, tmp_path / "new", user_id, master_hex=master_key,
+                                          new_master_hex=NEW_KEY, cipher="chacha20-poly1305", workers=3)
+    assert all(r["ok"] for r in reports), [r["errors"] for r in reports]
+    assert {r["indir"].name: r["manifests"] for r in reports} == {"file": 0, "stream": 1, "cdc": 1, "bundle": 0}
+
+    new_dirs = [tmp_path / "new" / kind for kind in archives]
+    assert all(r["ok"] for r in audio_module.verify_archives(new_dirs, user_id, master_hex=NEW_KEY))
+    assert not any(r["ok"] for r in audio_module.verify_archives(new_dirs, user_id, master_hex=master_key))
+    header = audio_module.read_image_header(sorted((tmp_path / "new" / "file").glob("*.png"))[-1])
+    assert header["cipher"] == "chacha20-poly1305" and header["compressed"]
+
+    out = tmp_path / "out"
+    out.mkdir()
+    audio_module.decode_images_to_file(tmp_path / "new" / "file", out / "take.m4a", user_id, master_hex=NEW_KEY)
+    audio_module.decode_stream(tmp_path / "new" / "stream", out / "live.aac", user_id, master_hex=NEW_KEY)
+    audio_module.decode_images_to_file(tmp_path / "new" / "cdc", out / "cdc.m4a", user_id, master_hex=NEW_KEY)
+    assert (out / "take.m4a").read_bytes() == (out / "cdc.m4a").read_bytes() == archives["file"].read_bytes()
+    assert (out / "live.aac").read_bytes() == archives["stream"].read_bytes()
+    extracted = audio_module.extract_bundle_members(tmp_path / "new" / "bundle", out, user_id, master_hex=NEW_KEY)
+    assert sorted(p.read_bytes() for p in extracted) == sorted(c.read_bytes() for c in archives["bundle"])
+
+
+def test_migrate_keeps_key_and_reports_bad_chunks(tmp_path, master_key, user_id, archives):
+    victim = sorted((tmp_path / "file").glob("*.png"))[1]
+    victim.write_bytes(victim.read_bytes()[:200])  # truncated PNG
+
+    reports = audio_module.rekey_archives([tmp_path / "file", tmp_path / "stream"], tmp_path / "new", user_id,
+                                          master_hex=master_key, cipher="chacha20-poly1305")
+    by_dir = {r["indir"].name: r for r in reports}
+    assert by_dir["stream"]["ok"] and not by_dir["file"]["ok"]
+    assert by_dir["file"]["images"] == 2 and victim.name in by_dir["file"]["errors"][0]
+    assert all(r["ok"] for r in audio_module.verify_archives([tmp_path / "new" / "stream"], user_id,
+                                                             master_hex=master_key))
+    with pytest.raises(ValueError, match="differ"):
+        audio_module.rekey_archives([tmp_path / "file"], tmp_path, user_id, master_hex=master_key)
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from app.core.audio_processor import AudioProcessor, audio_module
+
+
+def _fail_on_call(monkeypatch, name, n, only=lambda *args: True):
+    real = getattr(audio_module, name)
+    calls = []
+
+    def flaky(*args, **kwargs):
+        if not only(*args):
+            return real(*args, **kwargs)
+        calls.append(args)
+        if len(calls) == n:
+            raise OSError("disk full")
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(audio_module, name, flaky)
+    return calls
+
+
+def _fail_on_image_write(monkeypatch, n):
+    return _fail_on_call(monkeypatch, "write_file_atomic", n, only=lambda path, data: path.suffix == ".png")
+
+
+def test_encode_resumes_after_last_intact_image(tmp_path, monkeypatch, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(300_000))
+    out = tmp_path / "out"
+    calls = _fail_on_image_write(monkeypatch, 4)
+    with pytest.raises(OSError, match="disk full"):
+        audio_module.encode_streamed(audio, out, user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    written = {p.name: p.read_bytes() for p in out.glob("*.png")}
+    assert len(written) == 3 and audio_module.encode_journal_path(out, audio).exists()
+
+    (out / "take_part0003_of_0006.png").write_bytes(b"torn")  # damaged after it was journaled
+    calls = _fail_on_image_write(monkeypatch, 0)
+    images = audio_module.encode_streamed(audio, out, user_id, max_chunk_bytes=50_000, master_hex=master_key,
+                                          resume=True)
+    assert len(images) == 6 and len(calls) == 4  # chunks 3..6 encoded again, 1..2 kept
+    for name in ("take_part0001_of_0006.png", "take_part0002_of_0006.png"):
+        assert (out / name).read_bytes() == written[name]
+    assert not audio_module.encode_journal_path(out, audio).exists()
+
+    restored = tmp_path / "restored.m4a"
+    audio_module.decode_images_to_file(out, restored, user_id, master_hex=master_key)
+    assert restored.read_bytes() == audio.read_bytes()
+
+
+def test_decode_resumes_from_flushed_bytes(tmp_path, monkeypatch, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(300_000))
+    audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    restored = tmp_path / "restored.m4a"
+    calls = _fail_on_call(monkeypatch, "open_payload", 5)
+    with pytest.raises(OSError, match="disk full"):
+        audio_module.decode_images_to_file(tmp_path / "out", restored, user_id, master_hex=master_key,
+                                           pipeline_depth=0)
+    assert restored.stat().st_size == 200_000
+
+    calls.clear()
+    audio_module.decode_images_to_file(tmp_path / "out", restored, user_id, master_hex=master_key, resume=True)
+    assert len(calls) == 2 and restored.read_bytes() == audio.read_bytes()
+    assert not audio_module.decode_journal_path(restored).exists()
+
+
+def test_service_retries_resume_instead_of_restarting(tmp_path, monkeypatch, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(200_000))
+    calls = _fail_on_image_write(monkeypatch, 3)
+    images = list(AudioProcessor.iter_encode_audio(audio, tmp_path / "out", user_id, master_key,
+                                                   max_chunk_bytes=50_000, retries=1))
+    assert [meta["chunk_index"] for _, meta in images] == [0, 1, 2, 3]
+    assert len(calls) == 5  # the failed write is retried once; earlier images are not rewritten
+
+    calls = _fail_on_image_write(monkeypatch, 1)
+    with pytest.raises(RuntimeError, match="Encoding failed: disk full"):
+        list(AudioProcessor.iter_encode_audio(audio, tmp_path / "again", user_id, master_key,
+                                              max_chunk_bytes=50_000))
+
+    restored = tmp_path / "restored.m4a"
+    _fail_on_call(monkeypatch, "open_payload", 2)
+    AudioProcessor.decode_images(tmp_path / "out", restored, user_id, master_key, retries=1)
+    assert restored.read_bytes() == audio.read_bytes()
+
+
+def test_decode_batches_fsyncs(tmp_path, monkeypatch, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(300_000))
+    audio_module.encode_streamed(audio, tmp_path / "out", user_id, max_chunk_bytes=50_000, master_hex=master_key)
+    synced = []
+    fsync = audio_module.os.fsync
+    monkeypatch.setattr(audio_module.os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    restored = tmp_path / "restored.m4a"
+    audio_module.decode_images_to_file(tmp_path / "out", restored, user_id, master_hex=master_key)
+    assert restored.read_bytes() == audio.read_bytes()
+    assert len(synced) == 1  # once at the end, not once per chunk (6 chunks)
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+CHUNK = 40_000
+
+
+def test_png_header_peek_matches_full_decode(tmp_path, master_key, user_id):
+    audio = tmp_path / "live.aac"
+    audio.write_bytes(os.urandom(90_000))
+    images = audio_module.encode_append(audio, tmp_path / "out", user_id, max_chunk_bytes=CHUNK,
+                                        master_hex=master_key)["images"]
+    for img in images:
+        full, _ = audio_module.parse_payload_header(audio_module.image_pixels_to_bytes(img))
+        assert audio_module.read_image_header(img) == full
+
+
+def test_append_encodes_only_new_audio(tmp_path, master_key, user_id):
+    audio = tmp_path / "live.aac"
+    out = tmp_path / "out"
+    first = os.urandom(100_000)
+    audio.write_bytes(first)
+    one = audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key)
+    assert one["total_chunks"] == 3
+
+    more = os.urandom(50_000)
+    with audio.open("ab") as f:
+        f.write(more)
+    two = audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key)
+    assert two["stream_id"] == one["stream_id"]
+    assert two["appended_bytes"] == 50_000
+    assert two["new_chunks"] == 2
+
+    # Still-open stream decodes everything received so far
+    recovered = tmp_path / "open.aac"
+    audio_module.decode_images_to_file(out, recovered, user_id, master_hex=master_key)
+    assert recovered.read_bytes() == first + more
+
+    audio_module.seal_stream(out, user_id, master_hex=master_key)
+    with pytest.raises(RuntimeError, match="sealed"):
+        audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key)
+
+    recovered = tmp_path / "sealed.aac"
+    audio_module.decode_images_to_file(out, recovered, user_id, master_hex=master_key)
+    assert recovered.read_bytes() == first + more
+
+
+def test_sealed_stream_requires_every_chunk(tmp_path, master_key, user_id):
+    audio = tmp_path / "live.aac"
+    out = tmp_path / "out"
+    audio.write_bytes(os.urandom(100_000))
+    result = audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key, seal=True)
+    result["images"][-1].unlink()
+    with pytest.raises(RuntimeError, match="missing chunk"):
+        audio_module.decode_images_to_file(out, tmp_path / "x.aac", user_id, master_hex=master_key)
+
+
+def test_append_rejects_rewritten_input(tmp_path, master_key, user_id):
+    audio = tmp_path / "live.aac"
+    out = tmp_path / "out"
+    audio.write_bytes(os.urandom(60_000))
+    audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key)
+    audio.write_bytes(os.urandom(80_000))
+    with pytest.raises(RuntimeError, match="does not match"):
+        audio_module.encode_append(audio, out, user_id, max_chunk_bytes=CHUNK, master_hex=master_key)
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import os
+import wave
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import get_worker_pool
+
+client = TestClient(app)
+
+
+class _TrickleReader(io.RawIOBase):
+    """Hands out at most 10 KB per read and records how far the encoder has read."""
+
+    def __init__(self, data):
+        self.data, self.pos = data, 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), 10_000, len(self.data) - self.pos)
+        b[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def test_reader_is_encoded_as_it_arrives(master_key, user_id):
+    audio = os.urandom(400_000)
+    src = _TrickleReader(audio)
+    images = audio_module.iter_encode_reader(src, len(audio), "take.m4a", user_id, max_chunk_bytes=20_000,
+                                             master_hex=master_key, pipeline_depth=1)
+    first = next(images)
+    assert first[0] == "take_part0001_of_0020.png" and src.pos <= len(audio) // 2  # only a few chunks in flight
+    rest = list(images)
+    assert audio_module.decode_bytes([first[:2]] + [i[:2] for i in rest], user_id, master_hex=master_key) == audio
+
+    with pytest.raises(ValueError, match="ended after 100000 of 120000"):
+        list(audio_module.iter_encode_reader(io.BytesIO(audio[:100_000]), 120_000, "take.m4a", user_id,
+                                             max_chunk_bytes=40_000, master_hex=master_key))
+    with pytest.raises(ValueError, match="longer than"):
+        list(audio_module.iter_encode_reader(io.BytesIO(audio), 120_000, "take.m4a", user_id,
+                                             max_chunk_bytes=40_000, master_hex=master_key))
+
+
+def test_stream_endpoint_matches_encode(storage_dirs, master_key, user_id):
+    pcm = io.BytesIO()
+    with wave.open(pcm, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(8000)
+        wf.writeframes(os.urandom(160_000))
+    audio = pcm.getvalue()
+
+    def body():
+        for pos in range(0, len(audio), 16_384):
+            yield audio[pos:pos + 16_384]
+
+    jobs = get_worker_pool().stats()["jobs"]
+    response = client.post("/api/v1/encode/stream", content=body(),
+                           params={"user_id": user_id, "filename": "memo.wav", "max_chunk_bytes": 50_000},
+                           headers={"X-API-Key": settings.api_key, "X-Master-Key": master_key,
+                                    "Content-Length": str(len(audio))})
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Total-Images"] == "1"  # a short WAV stays one chunk, as in /encode
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == ["memo_part0001_of_0001.png"]
+    images = [(name, archive.read(name)) for name in archive.namelist()]
+    assert audio_module.decode_bytes(images, user_id, master_hex=master_key) == audio
+    assert "content-length" not in response.headers  # streamed as the images were packed
+    assert not (storage_dirs / "uploads").exists()  # the upload never touched the disk
+    assert not list((storage_dirs / "temp").glob("encode_*"))  # nor did the ZIP
+    assert get_worker_pool().stats()["jobs"] == jobs + 1  # encoded by a pool worker fed from the request
+
+
+def test_disconnect_stops_the_encoder(storage_dirs, master_key, user_id):
+    audio = os.urandom(300_000)
+    messages = [{"type": "http.request", "body": audio, "more_body": False}, {"type": "http.disconnect"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/encode/stream", "root_path": "",
+             "query_string": f"user_id={user_id}&filename=take.m4a&max_chunk_bytes=50000".encode(),
+             "headers": [(b"x-api-key", settings.api_key.encode()), (b"x-master-key", master_key.encode()),
+                         (b"content-length", str(len(audio)).encode())]}
+    restarts = get_worker_pool().stats()["restarts"]
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 30))
+    assert sent[0]["status"] == 200
+    assert all(message.get("more_body", True) for message in sent[1:])  # the ZIP was cut off, not finished
+    assert get_worker_pool().stats()["busy"] == 0
+    assert get_worker_pool().stats()["restarts"] == restarts + 1  # the unfinished job's worker was replaced
+
+
+def test_stream_endpoint_checks_size_before_reading(storage_dirs, monkeypatch, user_id):
+    monkeypatch.setattr(settings, "max_upload_size_mb", 1)
+    params = {"user_id": user_id, "filename": "take.m4a"}
+    response = client.post("/api/v1/encode/stream", content=os.urandom(2 * 1024 * 1024), params=params,
+                           headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 413
+
+    response = client.post("/api/v1/encode/stream", content=(b"x" for _ in range(3)), params=params,
+                           headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 411
+
+    params["filename"] = "notes.txt"
+    response = client.post("/api/v1/encode/stream", content=b"x" * 10, params=params,
+                           headers={"X-API-Key": settings.api_key})
+    assert response.status_code == 400 and "Invalid audio format" in response.json()["detail"]
@@ -0,0 +1,72 @@
+import io
+import os
+import zipfile
+
+import numpy as np
+from PIL import Image
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.core.worker_pool import get_worker_pool
+
+client = TestClient(app)
+
+
+def _archives(tmp_path, master_key, user_id):
+    audio = tmp_path / "take.m4a"
+    audio.write_bytes(os.urandom(50_000))
+    dirs = {kind: tmp_path / kind for kind in ("fixed", "stream", "bundle", "cdc")}
+    audio_module.encode_streamed(audio, dirs["fixed"], user_id, max_chunk_bytes=20_000, master_hex=master_key)
+    audio_module.encode_append(audio, dirs["stream"], user_id, max_chunk_bytes=20_000, master_hex=master_key, seal=True)
+    audio_module.encode_bundle([audio], dirs["bundle"], user_id, master_hex=master_key)
+    audio_module.encode_cdc(audio, dirs["cdc"], user_id, tmp_path / "store", master_hex=master_key,
+                            avg_chunk_bytes=16 * 1024)
+    return dirs
+
+
+def test_verify_many_archives_without_writing(tmp_path, master_key, user_id):
+    dirs = _archives(tmp_path, master_key, user_id)
+    before = {d: sorted(p.name for p in d.iterdir()) for d in dirs.values()}
+    reports = audio_module.verify_archives(list(dirs.values()), user_id, master_hex=master_key, workers=4)
+    assert sorted(r["kind"] for r in reports) == ["bundle", "cdc", "file", "stream"]
+    assert all(r["ok"] for r in reports), reports
+    assert next(r for r in reports if r["kind"] == "file")["chunks"][0]["size"] == 20_000
+    assert {d: sorted(p.name for p in d.iterdir()) for d in dirs.values()} == before
+
+
+def test_verify_reports_missing_and_corrupt_chunks(tmp_path, master_key, user_id):
+    dirs = _archives(tmp_path, master_key, user_id)
+    (dirs["fixed"] / "take_part0002_of_0003.png").unlink()
+
+    corrupt = dirs["stream"] / "take_seq000001.png"
+    arr = np.array(Image.open(corrupt))
+    arr[-1, 0, 0] ^= 0xFF  # flip bits inside the ciphertext region
+    Image.fromarray(arr).save(corrupt)
+
+    reports = {r["kind"]: r for r in audio_module.verify_archives(list(dirs.values()), user_id, master_hex=master_key)}
+    assert not reports["file"]["ok"]
+    assert any("missing orig_chunk_index 1" in p for p in reports["file"]["problems"])
+    stream_rows = {row["image"]: row for row in reports["stream"]["chunks"]}
+    assert not stream_rows["take_seq000001.png"]["ok"]
+    assert reports["bundle"]["ok"] and reports["cdc"]["ok"]
+
+
+def test_verify_endpoint(tmp_path, storage_dirs, master_key, user_id):
+    dirs = _archives(tmp_path, master_key, user_id)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for p in dirs["fixed"].iterdir():
+            zf.write(p, p.name)
+    jobs = get_worker_pool().stats()["jobs"]
+    response = client.post(
+        "/api/v1/verify",
+        headers={"X-API-Key": settings.api_key},
+        files={"images": ("take_images.zip", buf.getvalue(), "application/zip")},
+        data={"user_id": user_id, "master_key": master_key},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ok"] and body["total_chunks"] == 3
+    assert get_worker_pool().stats()["jobs"] == jobs + 1
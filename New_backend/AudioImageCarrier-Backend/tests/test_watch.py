@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from app.core.audio_processor import audio_module
+
+
+def _wait_for(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_backlog_is_encoded_once_and_status_reported(tmp_path, master_key, user_id):
+    drop, out = tmp_path / "drop", tmp_path / "archive"
+    (drop / "day1").mkdir(parents=True)
+    (drop / "day1" / "a.m4a").write_bytes(os.urandom(120_000))
+    (drop / "b.wav").write_bytes(os.urandom(30_000))
+    (drop / "notes.txt").write_text("ignored")
+    audio_module.encode_directory(drop, out, user_id, master_hex=master_key, max_chunk_bytes=50_000, workers=0)
+    (drop / "c.aac").write_bytes(os.urandom(60_000))
+
+    result = audio_module.watch_directory(drop, out, user_id, master_hex=master_key, max_chunk_bytes=50_000,
+                                          workers=0, settle_seconds=0.1, poll_interval=0.05, backend="poll",
+                                          until_idle=True)
+    assert [p.name for p in result["encoded"]] == ["c.aac"] and not result["failed"]
+    assert sorted(p.name for p in (out / "c.aac").iterdir()) == [
+        "c_manifest.json", "c_part0001_of_0002.png", "c_part0002_of_0002.png"]
+    status = json.loads((out / audio_module.WATCH_STATUS_FILE).read_text())
+    assert status["backlog_files"] == 0 and status["encoded"] == 1 and status["backend"] == "poll"
+    assert not list((out / audio_module.WATCH_STAGING_DIR).iterdir())
+
+
+@pytest.mark.parametrize("backend", ["poll", pytest.param("inotify", marks=pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux-only"))])
+def test_growing_files_wait_to_settle_and_changes_republish(tmp_path, master_key, user_id, backend):
+    drop, out = tmp_path / "drop", tmp_path / "archive"
+    drop.mkdir()
+    stop = threading.Event()
+    thread = threading.Thread(target=audio_module.watch_directory, args=(drop, out, user_id), daemon=True,
+                              kwargs=dict(master_hex=master_key, max_chunk_bytes=50_000, workers=1,
+                                          settle_seconds=0.5, poll_interval=0.1, backend=backend, stop=stop))
+    thread.start()
+    manifest = out / "live" / "take.m4a" / "take_manifest.json"
+    try:
+        (drop / "live").mkdir()  # created after the watch started
+        audio = drop / "live" / "take.m4a"
+        with open(audio, "wb") as f:
+            f.write(os.urandom(40_000))
+            f.flush()
+            time.sleep(0.2)
+            f.write(os.urandom(40_000))  # still growing: must not be encoded yet
+        assert _wait_for(manifest.exists)
+        restored = tmp_path / "restored.m4a"
+        audio_module.decode_images_to_file(manifest.parent, restored, user_id, master_hex=master_key)
+        assert restored.read_bytes() == audio.read_bytes()
+
+        first = json.loads(manifest.read_text())["set_id"]
+        audio.write_bytes(os.urandom(20_000))
+        assert _wait_for(lambda: json.loads(manifest.read_text())["set_id"] != first)
+        assert sorted(p.name for p in manifest.parent.glob("*.png")) == ["take_part0001_of_0001.png"]
+        status_file = out / audio_module.WATCH_STATUS_FILE
+        assert _wait_for(lambda: json.loads(status_file.read_text())["backlog_files"] == 0)
+        status = json.loads(status_file.read_text())
+        assert status["backend"] == backend and status["encoded"] == 2  # the growing file was encoded once
+    finally:
+        stop.set()
+        thread.join(10)
+    assert not thread.is_alive()
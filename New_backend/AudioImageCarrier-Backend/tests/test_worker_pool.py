@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import settings
+from app.core.worker_pool import JobTimeout, WorkerCrashed, WorkerPool
+
+
+def _temp_dir():
+    return settings.temp_dir
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(size=1, timeout=30)
+    yield pool
+    pool.shutdown()
+
+
+def test_event_loop_stays_responsive_during_a_job(pool):
+    async def scenario():
+        await pool.run(int, "0")  # worker is booted and warm
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 10:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(pool.run(time.sleep, 0.8), ticker())
+        return max(b - a for a, b in zip(ticks, ticks[1:]))
+
+    assert asyncio.run(scenario()) < 0.3
+
+
+def test_timeouts_and_crashes_replace_the_worker(pool, monkeypatch):
+    monkeypatch.setattr(settings, "temp_dir", "elsewhere")  # parent-side settings reach the worker
+
+    async def scenario():
+        with pytest.raises(ValueError, match="invalid literal"):
+            await pool.run(int, "x")
+        started = time.monotonic()
+        with pytest.raises(JobTimeout):
+            await pool.run(time.sleep, 30, timeout=0.5)
+        assert time.monotonic() - started < 10
+        with pytest.raises(WorkerCrashed):
+            await pool.run(os._exit, 3)
+        return await pool.run(_temp_dir)
+
+    assert asyncio.run(scenario()) == "elsewhere"
+    stats = pool.stats()
+    assert stats["timeouts"] == stats["crashes"] == 1 and stats["restarts"] == 2
+    assert stats["jobs"] == 1 and stats["failed"] == 1 and stats["idle"] == 1
+
+
+def test_health_reports_pool(storage_dirs, master_key, user_id):
+    client = TestClient(app)
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("take.m4a", os.urandom(20_000), "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 200
+    stats = client.get("/health").json()["worker_pool"]
+    assert stats["workers"] == settings.worker_processes and stats["jobs"] >= 1
+
+
+def _count(n):
+    for i in range(n):
+        yield i
+
+
+def _tick(n, seconds):
+    for i in range(n):
+        time.sleep(seconds)
+        yield i
+
+
+def test_streamed_jobs_replace_an_abandoned_worker(pool):
+    assert list(pool.iter_call(_count, 3)) == [0, 1, 2]
+    items = pool.iter_call(_count, 1000)
+    assert next(items) == 0
+    items.close()  # the worker may still be mid-generator, so it is not reused
+    assert pool.call(_temp_dir) == settings.temp_dir
+    stats = pool.stats()
+    assert stats["restarts"] == 1 and stats["idle"] == 1
+
+    # Only waiting on the worker counts: ~0.5 s of it within 2 s of reading passes a 1.5 s timeout
+    items = []
+    for item in pool.iter_call(_tick, 6, 0.3, timeout=1.5):
+        time.sleep(0.25)
+        items.append(item)
+    assert items == list(range(6))
+
+
+def _digest(reader, chunk):
+    h = hashlib.sha256()
+    while True:
+        piece = reader.read(chunk)
+        if not piece:
+            return h.hexdigest()
+        h.update(piece)
+
+
+class _SlowFeed(io.RawIOBase):
+    """Takes 0.2 s per read, like an upload arriving slowly, then fails if told to."""
+
+    def __init__(self, pieces, error=None):
+        self.pieces, self.error = list(pieces), error
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        time.sleep(0.2)
+        if not self.pieces:
+            if self.error:
+                raise self.error
+            return 0
+        piece = self.pieces.pop(0)
+        b[:len(piece)] = piece
+        return len(piece)
+
+
+def test_jobs_read_their_feed_from_this_process(pool):
+    data = os.urandom(3 * 1024 * 1024 + 5)
+    assert pool.call(_digest, 100_000, feed=io.BytesIO(data)) == hashlib.sha256(data).hexdigest()
+
+    # Waiting on the feed is not job time: 2 s of slow input passes a 1 s timeout
+    feed = _SlowFeed([b"x" * 10] * 10)
+    assert pool.call(_digest, 64, feed=feed, timeout=1) == hashlib.sha256(b"x" * 100).hexdigest()
+
+    with pytest.raises(ValueError, match="client went away"):
+        pool.call(_digest, 64, feed=_SlowFeed([b"x"], ValueError("client went away")))
+    assert pool.call(_temp_dir) == settings.temp_dir  # the worker left mid-read was replaced
+    stats = pool.stats()
+    assert stats["restarts"] == 1 and stats["idle"] == 1
@@ -0,0 +1,91 @@
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.api.middleware import UploadSizeLimitMiddleware
+from app.api.routes import encode as encode_routes
+from app.core.audio_processor import audio_module
+from app.core.config import settings
+from app.utils.file_handler import iter_zip_stream
+
+client = TestClient(app)
+
+
+def test_members_are_written_as_they_arrive():
+    produced = []
+
+    def members():
+        for i in range(3):
+            produced.append(i)
+            yield f"part{i}.png", os.urandom(1000)
+        yield "meta.json", b"{}" * 500
+
+    pieces = iter_zip_stream(members())
+    first = next(pieces)
+    assert produced == [0]  # the first entry is out before the second one exists
+    archive = zipfile.ZipFile(io.BytesIO(first + b"".join(pieces)))
+    infos = archive.infolist()
+    assert [i.compress_type for i in infos] == [zipfile.ZIP_STORED] * 3 + [zipfile.ZIP_DEFLATED]
+    assert all(i.flag_bits & 0x08 for i in infos)  # sizes in data descriptors, no seeking back
+
+    with pytest.raises(ValueError, match="No files"):
+        list(iter_zip_stream([]))
+
+
+def test_large_upload_streams_stored_images(storage_dirs, monkeypatch, master_key, user_id):
+    monkeypatch.setattr(settings, "inmemory_max_mb", 0)  # past the in-memory limit
+    audio = os.urandom(200_000)
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("take.m4a", audio, "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key, "max_chunk_bytes": "50000"})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Images"] == "4" and response.headers["X-Original-Size"] == "200000"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert {i.compress_type for i in archive.infolist()} == {zipfile.ZIP_STORED}
+    images = [(name, archive.read(name)) for name in archive.namelist()]
+    assert audio_module.decode_bytes(images, user_id, master_hex=master_key) == audio
+    assert not (storage_dirs / "uploads").exists()  # the worker read the form's own spool file
+    assert not list((storage_dirs / "temp").rglob("*.png"))  # images never touched the disk
+
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("notes.m4a", b"", "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 400  # errors before the first image still get a status code
+    assert "File is empty" in response.json()["detail"]
+
+    monkeypatch.setattr(encode_routes, "stream_job", lambda *args, **kwargs: iter(()))
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("take.m4a", audio, "audio/mp4")},
+                           data={"user_id": user_id, "master_key": master_key})
+    assert response.status_code == 400 and response.json()["detail"] == "Encoding produced no images"
+
+
+def test_oversize_upload_is_refused_before_the_body_is_read(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_size_mb", 1)
+    sent = []
+
+    async def route(scope, receive, send):
+        raise AssertionError("the route ran")
+
+    async def receive():
+        raise AssertionError("the body was read")
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = UploadSizeLimitMiddleware(route, paths=["/api/v1/encode"])
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/encode",
+             "headers": [(b"content-length", str(2 * 1024 * 1024).encode())]}
+    asyncio.run(middleware(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert b"File too large" in sent[1]["body"]
+
+    response = client.post("/api/v1/encode", headers={"X-API-Key": settings.api_key},
+                           files={"file": ("take.m4a", os.urandom(2 * 1024 * 1024), "audio/mp4")},
+                           data={"user_id": "prince"})
+    assert response.status_code == 413